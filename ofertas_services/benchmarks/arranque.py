@@ -0,0 +1,126 @@
+"""Arranque en frío de un worker: tiempo de import y tiempo hasta la primera petición.
+
+1. Import: `python -X importtime` de `import main` y de `main.crear_app()`,
+   sumando el tiempo propio de cada módulo por paquete de primer nivel.
+2. Primera petición: arranca `uvicorn main:crear_app --factory` `--repeticiones`
+   veces y mide desde el lanzamiento del proceso hasta el primer 200 de `/`
+   (worker escuchando), la primera petición que usa la base
+   (`/repartidores/?limit=1`: primera conexión del pool) y una segunda ya en
+   caliente.
+
+Uso (desde ofertas_services/):
+    python -m benchmarks.arranque --database-url sqlite:////tmp/bench_arranque.db
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.comun import SERVICIO_DIR
+
+# Medición dentro del subproceso: import de main y construcción de la app por separado
+SCRIPT_IMPORT = """
+import json, time
+inicio = time.perf_counter()
+import main
+importado = time.perf_counter()
+main.crear_app()
+construida = time.perf_counter()
+print(json.dumps({"import_main_ms": (importado - inicio) * 1e3, "crear_app_ms": (construida - importado) * 1e3}))
+"""
+
+
+def desglose_importtime(entorno, top):
+    """Tiempo propio (ms) sumado por paquete de primer nivel según -X importtime"""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT_IMPORT],
+        cwd=SERVICIO_DIR, env=entorno, capture_output=True, text=True, check=True,
+    )
+    por_paquete = defaultdict(float)
+    for linea in resultado.stderr.splitlines():
+        # El tiempo propio de cada módulo no incluye el de sus imports: la suma no cuenta dos veces
+        coincidencia = re.match(r"import time:\s+(\d+) \|\s+\d+ \| +(\S+)", linea)
+        if coincidencia:
+            por_paquete[coincidencia.group(2).split(".")[0]] += int(coincidencia.group(1)) / 1e3
+    tiempos = json.loads(resultado.stdout.strip().splitlines()[-1])
+    principales = sorted(por_paquete.items(), key=lambda par: par[1], reverse=True)[:top]
+    return tiempos, {paquete: round(ms, 1) for paquete, ms in principales}
+
+
+def primera_peticion(entorno, puerto):
+    """Lanzar un worker y medir (ms desde el lanzamiento) escucha, primera consulta y segunda"""
+    base = f"http://127.0.0.1:{puerto}"
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:crear_app", "--factory", "--port", str(puerto), "--log-level", "warning"],
+        cwd=SERVICIO_DIR, env=entorno,
+    )
+    try:
+        with httpx.Client(base_url=base, timeout=5) as cliente:
+            limite = time.monotonic() + 30
+            while True:
+                try:
+                    if cliente.get("/").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    if time.monotonic() > limite:
+                        raise RuntimeError("El worker no arrancó")
+                    time.sleep(0.005)
+            escuchando = time.perf_counter()
+            cliente.get("/repartidores/?limit=1").raise_for_status()
+            primera = time.perf_counter()
+            cliente.get("/repartidores/?limit=1").raise_for_status()
+            segunda = time.perf_counter()
+    finally:
+        proceso.terminate()
+        proceso.wait()
+    return {
+        "hasta_escuchar_ms": (escuchando - inicio) * 1e3,
+        "primera_consulta_ms": (primera - escuchando) * 1e3,
+        "segunda_consulta_ms": (segunda - primera) * 1e3,
+        "hasta_primera_consulta_ms": (primera - inicio) * 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:////tmp/ofertas_bench_arranque.db"))
+    parser.add_argument("--modo", choices=("sync", "async"), default="sync")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="Paquetes a mostrar en el desglose de import")
+    parser.add_argument("--puerto", type=int, default=8767)
+    parser.add_argument("--salida", help="Guardar resultados en este archivo JSON")
+    args = parser.parse_args()
+
+    entorno = dict(os.environ, DATABASE_URL=args.database_url, DB_MODE=args.modo)
+    subprocess.run([sys.executable, "esquema.py", "migrar"], cwd=SERVICIO_DIR, env=entorno, check=True,
+                   capture_output=True)
+
+    tiempos_import, paquetes = desglose_importtime(entorno, args.top)
+    corridas = [primera_peticion(entorno, args.puerto) for _ in range(args.repeticiones)]
+    mediana = {clave: round(statistics.median(c[clave] for c in corridas), 1) for clave in corridas[0]}
+
+    print(f"Import (modo={args.modo}): import main {tiempos_import['import_main_ms']:.1f} ms, "
+          f"crear_app() {tiempos_import['crear_app_ms']:.1f} ms")
+    print(f"{'paquete':<24} {'ms propios':>14}")
+    for paquete, ms in paquetes.items():
+        print(f"{paquete:<24} {ms:>14}")
+    print(f"\nPrimera petición (mediana de {args.repeticiones} arranques, ms desde el lanzamiento del proceso)")
+    for clave, valor in mediana.items():
+        print(f"{clave:<28} {valor:>10}")
+
+    if args.salida:
+        with open(args.salida, "w") as archivo:
+            json.dump({"modo": args.modo, "import": {**tiempos_import, "por_paquete_ms": paquetes},
+                       "primera_peticion_ms": mediana, "corridas": corridas}, archivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
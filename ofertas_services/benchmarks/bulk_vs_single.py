@@ -0,0 +1,121 @@
+"""Throughput de los endpoints /bulk frente al camino de un elemento por petición.
+
+Crea, actualiza y elimina `--filas` productos de inventario primero con una
+petición por elemento y después con los endpoints /bulk en lotes de `--lote`,
+y reporta filas por segundo de cada operación.
+
+Uso (desde ofertas_services/):
+    python -m benchmarks.bulk_vs_single --database-url sqlite:////tmp/bench_bulk.db --filas 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+from benchmarks.comun import levantar_worker
+
+PRODUCTO = {
+    "nombre": "Producto bench", "cantidad": 10, "precio_unitario": 2.5,
+    "fecha_ingreso": "2024-01-01T08:00:00", "estado": "Disponible",
+}
+PREFIJO = "/inventario-productos"
+
+
+async def en_paralelo(peticiones, concurrencia):
+    """Ejecutar las corrutinas con a lo sumo `concurrencia` en vuelo"""
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def limitada(peticion):
+        async with semaforo:
+            respuesta = await peticion
+            respuesta.raise_for_status()
+            return respuesta
+
+    return await asyncio.gather(*(limitada(p) for p in peticiones))
+
+
+async def uno_a_uno(cliente, filas, concurrencia):
+    tiempos = {}
+    inicio = time.perf_counter()
+    creados = await en_paralelo([cliente.post(f"{PREFIJO}/", json=PRODUCTO) for _ in range(filas)], concurrencia)
+    tiempos["crear"] = time.perf_counter() - inicio
+    ids = [r.json()["id"] for r in creados]
+
+    inicio = time.perf_counter()
+    await en_paralelo([cliente.put(f"{PREFIJO}/{i}", json={**PRODUCTO, "cantidad": 5}) for i in ids], concurrencia)
+    tiempos["actualizar"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    await en_paralelo([cliente.delete(f"{PREFIJO}/{i}") for i in ids], concurrencia)
+    tiempos["eliminar"] = time.perf_counter() - inicio
+    return tiempos
+
+
+async def en_lote(cliente, filas, lote):
+    tiempos = {}
+    ids = []
+    inicio = time.perf_counter()
+    for desde in range(0, filas, lote):
+        respuesta = await cliente.post(f"{PREFIJO}/bulk", json=[PRODUCTO] * min(lote, filas - desde))
+        ids.extend(respuesta.json()["ids"])
+    tiempos["crear"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for desde in range(0, filas, lote):
+        await cliente.patch(f"{PREFIJO}/bulk", json=[{"id": i, "cantidad": 5} for i in ids[desde:desde + lote]])
+    tiempos["actualizar"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for desde in range(0, filas, lote):
+        await cliente.request("DELETE", f"{PREFIJO}/bulk", json={"ids": ids[desde:desde + lote]})
+    tiempos["eliminar"] = time.perf_counter() - inicio
+    return tiempos
+
+
+async def medir(base_url, filas, lote, concurrencia):
+    limites = httpx.Limits(max_connections=concurrencia)
+    async with httpx.AsyncClient(base_url=base_url, limits=limites, timeout=300) as cliente:
+        return {
+            "uno_a_uno": await uno_a_uno(cliente, filas, concurrencia),
+            "bulk": await en_lote(cliente, filas, lote),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:////tmp/ofertas_bench_bulk.db"))
+    parser.add_argument("--filas", type=int, default=5000)
+    parser.add_argument("--lote", type=int, default=1000, help="Elementos por petición /bulk")
+    parser.add_argument("--concurrencia", type=int, default=10, help="Peticiones simultáneas en el camino uno a uno")
+    parser.add_argument("--modo", choices=("sync", "async"), default="sync")
+    parser.add_argument("--puerto", type=int, default=8766)
+    parser.add_argument("--salida", help="Guardar resultados en este archivo JSON")
+    args = parser.parse_args()
+
+    proceso = levantar_worker(args.database_url, args.puerto, DB_MODE=args.modo)
+    try:
+        tiempos = asyncio.run(medir(f"http://127.0.0.1:{args.puerto}", args.filas, args.lote, args.concurrencia))
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+    resultados = {
+        camino: {op: round(args.filas / segundos, 1) for op, segundos in ops.items()}
+        for camino, ops in tiempos.items()
+    }
+    print(f"filas/s con {args.filas} productos (lote={args.lote}, modo={args.modo})")
+    print(f"{'operación':<12} {'uno a uno':>12} {'bulk':>12} {'mejora':>8}")
+    for op in ("crear", "actualizar", "eliminar"):
+        uno, bulk = resultados["uno_a_uno"][op], resultados["bulk"][op]
+        print(f"{op:<12} {uno:>12} {bulk:>12} {bulk / uno:>7.1f}x")
+
+    if args.salida:
+        with open(args.salida, "w") as archivo:
+            json.dump({"filas": args.filas, "lote": args.lote, "filas_por_segundo": resultados}, archivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Utilidades compartidas por los benchmarks: arranque de workers y estadísticas"""
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+SERVICIO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def levantar_worker(database_url, puerto, **entorno):
+    """Migrar `database_url`, arrancar un worker uvicorn contra ella y esperar a que responda"""
+    env = dict(os.environ, DATABASE_URL=database_url, **entorno)
+    subprocess.run([sys.executable, "esquema.py", "migrar"], cwd=SERVICIO_DIR, env=env, check=True)
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:crear_app", "--factory", "--port", str(puerto), "--log-level", "warning"],
+        cwd=SERVICIO_DIR,
+        env=env,
+    )
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        try:
+            if httpx.get(f"http://127.0.0.1:{puerto}/", timeout=1).status_code == 200:
+                return proceso
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proceso.terminate()
+    raise RuntimeError(f"El worker no arrancó con {entorno}")
+
+
+def memoria_rss_mb(pid):
+    """Memoria residente del proceso en MB (solo Linux)"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for linea in status:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
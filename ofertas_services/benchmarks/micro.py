@@ -0,0 +1,198 @@
+"""Micro-benchmarks de las funciones de crud/* y de la validación de schemas.py.
+
+Corre en el mismo proceso (sin HTTP) contra `--database-url`, sembrada con
+`--filas` filas por tabla; incluye el optimizador de recorridos sin pool y el
+cálculo vectorizado del motor de descuentos y el índice de búsqueda de texto
+en memoria. Cada caso se ejecuta `--repeticiones` veces de
+`--iteraciones` llamadas y se reporta la mediana en µs por llamada, además de
+las consultas SQL por llamada en los casos de crud.
+
+Uso (desde ofertas_services/):
+    python -m benchmarks.micro --database-url sqlite:////tmp/bench_micro.db --salida micro.json
+    python -m benchmarks.micro --comparar micro.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.comun import SERVICIO_DIR
+
+PRODUCTO = {"nombre": "Pan", "cantidad": 5, "precio_unitario": 2.5,
+            "fecha_ingreso": "2024-01-01T08:00:00", "estado": "Disponible"}
+
+
+def casos_crud(SessionLocal):
+    """(nombre, función sin argumentos) de crud/*, cada una con su propia sesión como en una petición"""
+    from crud.entrega import obtener_todas
+    from crud.inventario_producto import (
+        bulk_create_inventario_productos, create_inventario_producto, get_inventario_productos_con_ofertas,
+    )
+    from crud.oferta_reducida import get_ofertas_activas
+    from crud.repartidor import _get_repartidor, get_repartidor, get_repartidores
+    from schemas import InventarioProductoCreate
+
+    producto = InventarioProductoCreate(**PRODUCTO)
+    en = datetime(2024, 1, 1, 12, 0)
+
+    def con_sesion(funcion, *args):
+        def caso():
+            with SessionLocal() as db:
+                funcion(db, *args)
+        return caso
+
+    return [
+        ("get_repartidor (cache)", con_sesion(get_repartidor, 1)),
+        ("_get_repartidor (sin cache)", con_sesion(_get_repartidor, 1)),
+        ("get_repartidores limit=100", con_sesion(get_repartidores, None, 100)),
+        ("get_inventario_productos_con_ofertas limit=100", con_sesion(get_inventario_productos_con_ofertas, None, 100)),
+        ("obtener_todas (entregas) limit=100", con_sesion(obtener_todas, None, 100)),
+        ("get_ofertas_activas limit=100", con_sesion(get_ofertas_activas, en, None, None, None, None, 100)),
+        ("create_inventario_producto", con_sesion(create_inventario_producto, producto)),
+        ("bulk_create_inventario_productos x100", con_sesion(bulk_create_inventario_productos, [PRODUCTO] * 100)),
+    ]
+
+
+def casos_schemas():
+    """(nombre, función sin argumentos) de validación de entrada y de salida"""
+    from pydantic import TypeAdapter
+    from schemas import (
+        EntregaCreate, EntregaOut, InventarioProductoCreate, OfertaReducidaCreate, Pagina, RepartidorCreate,
+        RutaEntregaCreate,
+    )
+
+    oferta = {"producto_id": 1, "precio_oferta": 1.5, "fecha_inicio": "2024-01-01T08:00:00", "fecha_fin": "2024-01-02T08:00:00"}
+    repartidor = {"nombre": "Ana", "telefono": "0991234567", "zona": "Norte"}
+    entrega = {"repartidor_id": 1, "fecha": "2024-01-01T08:00:00", "descripcion": "Entrega"}
+    ruta = {"repartidor_id": 1, "destino": "Calle 1", "hora_salida": "2024-01-01T08:00:00", "hora_llegada": "2024-01-01T09:00:00"}
+    pagina = {"items": [{**entrega, "id": i, "fecha": datetime(2024, 1, 1), "repartidor": {**repartidor, "id": 1}}
+                        for i in range(100)], "next_cursor": None}
+    pagina_entregas = TypeAdapter(Pagina[EntregaOut])
+
+    return [
+        ("InventarioProductoCreate", lambda: InventarioProductoCreate.model_validate(PRODUCTO)),
+        ("OfertaReducidaCreate", lambda: OfertaReducidaCreate.model_validate(oferta)),
+        ("RepartidorCreate", lambda: RepartidorCreate.model_validate(repartidor)),
+        ("EntregaCreate", lambda: EntregaCreate.model_validate(entrega)),
+        ("RutaEntregaCreate", lambda: RutaEntregaCreate.model_validate(ruta)),
+        ("Pagina[EntregaOut] x100", lambda: pagina_entregas.validate_python(pagina)),
+    ]
+
+
+def casos_rutas():
+    """(nombre, función sin argumentos) del optimizador de recorridos, sin pool de procesos"""
+    import random
+    from optimizacion_rutas import resolver
+
+    r = random.Random(0)
+    casos = []
+    for n in (50, 300):
+        paradas = [(r.uniform(-0.35, -0.05), r.uniform(-78.58, -78.42)) for _ in range(n)]
+        casos.append((f"resolver {n} paradas", lambda paradas=paradas: resolver(paradas)))
+    return casos
+
+
+def casos_descuentos():
+    """(nombre, función sin argumentos) del cálculo de precios de descuentos.py sobre 1M productos"""
+    import numpy as np
+    from descuentos import CURVAS, calcular_ofertas
+
+    r = np.random.default_rng(0)
+    ahora = datetime(2024, 1, 1, 12, 0)
+    precios = np.round(r.lognormal(1, 0.5, 1_000_000), 2)
+    ingresos = np.datetime64(ahora, "us") - r.integers(0, 72 * 3600 * 10**6, 1_000_000).astype("timedelta64[us]")
+    return [
+        (f"calcular_ofertas 1M {curva}",
+         lambda curva=curva: calcular_ofertas(precios, ingresos, ahora, 72, curva, 0.1, 0.7))
+        for curva in CURVAS
+    ]
+
+
+def casos_busqueda():
+    """(nombre, función sin argumentos) de búsquedas en el índice de trigramas de busqueda.py con 1M destinos"""
+    import random
+    from busqueda import IndiceTexto
+    from scriptDatos import CALLES
+
+    r = random.Random(0)
+    indice = IndiceTexto(ttl=float("inf"))
+    indice.reconstruir((i, f"{r.choice(CALLES)} N{r.randint(1, 80)}-{r.randint(1, 200)}") for i in range(1, 1_000_001))
+    return [
+        (f"buscar 1M '{q}'", lambda q=q: indice.buscar(q, 20, 0.5))
+        for q in ("amazonas", "amazonsa n12-40", "garcia moreno")
+    ]
+
+
+def medir(caso, iteraciones, repeticiones, metricas=None):
+    """Mediana de µs por llamada y consultas por llamada (si se pasan las métricas del motor)"""
+    caso()  # calentar (primera compilación de la consulta, cache de entidades)
+    tiempos = []
+    consultas_antes = metricas.consultas if metricas else 0
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for _ in range(iteraciones):
+            caso()
+        tiempos.append((time.perf_counter() - inicio) / iteraciones * 1e6)
+    resultado = {"us_por_llamada": round(statistics.median(tiempos), 2)}
+    if metricas:
+        resultado["consultas_por_llamada"] = round((metricas.consultas - consultas_antes) / (iteraciones * repeticiones), 2)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:////tmp/ofertas_bench_micro.db"))
+    parser.add_argument("--filas", type=int, default=5000)
+    parser.add_argument("--iteraciones", type=int, default=200)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--salida", help="Guardar resultados en este archivo JSON")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para mostrar la diferencia")
+    args = parser.parse_args()
+
+    if args.database_url.startswith("sqlite:///") and os.path.exists(args.database_url[len("sqlite:///"):]):
+        os.remove(args.database_url[len("sqlite:///"):])
+    # config.py lee DATABASE_URL al importarse
+    os.environ["DATABASE_URL"] = args.database_url
+    subprocess.run([sys.executable, "esquema.py", "migrar"], cwd=SERVICIO_DIR, env=os.environ, check=True,
+                   capture_output=True)
+    from benchmarks.serializacion import sembrar
+    from database import METRICAS_POOL, SessionLocal, engine
+
+    sembrar(engine, args.filas, 2)
+    resultados = {"crud": {}, "schemas": {}, "rutas": {}, "descuentos": {}, "busqueda": {}}
+    for nombre, caso in casos_crud(SessionLocal):
+        resultados["crud"][nombre] = medir(caso, args.iteraciones, args.repeticiones, METRICAS_POOL["sync"])
+    for nombre, caso in casos_schemas():
+        resultados["schemas"][nombre] = medir(caso, args.iteraciones * 10, args.repeticiones)
+    for nombre, caso in casos_rutas():
+        resultados["rutas"][nombre] = medir(caso, max(1, args.iteraciones // 50), args.repeticiones)
+    for nombre, caso in casos_descuentos():
+        resultados["descuentos"][nombre] = medir(caso, max(1, args.iteraciones // 100), args.repeticiones)
+    for nombre, caso in casos_busqueda():
+        resultados["busqueda"][nombre] = medir(caso, max(1, args.iteraciones // 20), args.repeticiones)
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar) as archivo:
+            anterior = json.load(archivo)["resultados"]
+    for grupo, casos in resultados.items():
+        print(f"\n{grupo:<48} {'µs/llamada':>11} {'consultas':>10}" + (f" {'cambio':>8}" if anterior else ""))
+        for nombre, r in casos.items():
+            linea = f"{nombre:<48} {r['us_por_llamada']:>11} {r.get('consultas_por_llamada', ''):>10}"
+            previo = (anterior or {}).get(grupo, {}).get(nombre)
+            if previo:
+                linea += f" {(r['us_por_llamada'] / previo['us_por_llamada'] - 1) * 100:>+7.1f}%"
+            print(linea)
+
+    if args.salida:
+        with open(args.salida, "w") as archivo:
+            json.dump({"fecha": datetime.now().isoformat(timespec="seconds"), "filas": args.filas,
+                       "resultados": resultados}, archivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Posiciones de repartidores: actualizaciones por segundo y búsqueda de los más cercanos.
+
+En proceso mide el índice en rejilla (indice_repartidores) con `--repartidores`
+repartidores moviéndose por la ciudad: actualizaciones/s, consultas k-NN/s y
+el volcado write-behind de todas las posiciones a la base. Por HTTP arranca un
+worker y envía durante `--duracion` segundos posiciones sueltas
+(PUT /repartidores/{id}/posicion) desde `--concurrencia` clientes y después
+lotes de `--lote` (PUT /repartidores/posiciones).
+
+Uso (desde ofertas_services/):
+    python -m benchmarks.posiciones --database-url sqlite:////tmp/bench_posiciones.db --salida posiciones.json
+    python -m benchmarks.posiciones --solo-indice --repartidores 50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime
+
+import httpx
+
+from benchmarks.comun import levantar_worker, percentil
+
+# Misma área que scriptDatos.py
+AREA = ((-0.35, -0.05), (-78.58, -78.42))
+
+
+def _punto(r):
+    return r.uniform(*AREA[0]), r.uniform(*AREA[1])
+
+
+def sembrar(engine, repartidores):
+    from sqlalchemy import delete, insert
+    from models.posicion_repartidor import PosicionRepartidor
+    from models.repartidor import Repartidor
+
+    zonas = ["Norte", "Sur", "Centro"]
+    with engine.begin() as conexion:
+        conexion.execute(delete(PosicionRepartidor))
+        conexion.execute(delete(Repartidor))
+        conexion.execute(insert(Repartidor), [
+            {"id": i, "nombre": f"Repartidor {i}", "telefono": f"09{i:08d}", "zona": zonas[i % 3]}
+            for i in range(1, repartidores + 1)
+        ])
+
+
+def medir_indice(repartidores, actualizaciones, consultas):
+    from database import SessionLocal
+    from crud.posicion_repartidor import guardar_posiciones
+    from indice_repartidores import indice
+
+    r = random.Random(1)
+    indice.reconstruir([])
+    indice.registrar({i: {"zona": ["Norte", "Sur", "Centro"][i % 3]} for i in range(1, repartidores + 1)})
+    ahora = datetime.now()
+    posiciones = [_punto(r) for _ in range(repartidores)]
+
+    inicio = time.perf_counter()
+    for n in range(actualizaciones):
+        i = n % repartidores
+        # Paso corto (~50 m) desde la posición anterior
+        lat, lon = posiciones[i]
+        posiciones[i] = (lat + r.uniform(-5e-4, 5e-4), lon + r.uniform(-5e-4, 5e-4))
+        indice.actualizar(i + 1, *posiciones[i], ahora)
+    segundos_actualizar = time.perf_counter() - inicio
+
+    latencias = []
+    for _ in range(consultas):
+        lat, lon = _punto(r)
+        inicio = time.perf_counter()
+        indice.cercanos(lat, lon, 20, 5)
+        latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    with SessionLocal() as db:
+        guardadas = guardar_posiciones(db)
+    segundos_volcado = time.perf_counter() - inicio
+
+    return {
+        "repartidores": repartidores,
+        "actualizaciones_por_s": round(actualizaciones / segundos_actualizar),
+        "knn_por_s": round(consultas / sum(latencias)),
+        "knn_p50_ms": round(percentil(latencias, 50) * 1000, 3),
+        "knn_p99_ms": round(percentil(latencias, 99) * 1000, 3),
+        "volcado_filas": guardadas,
+        "volcado_ms": round(segundos_volcado * 1000, 1),
+    }
+
+
+async def medir_http(url, repartidores, duracion, concurrencia, lote):
+    r = random.Random(2)
+    resultados = {}
+    async with httpx.AsyncClient(base_url=url, timeout=30) as cliente:
+        latencias, errores = [], 0
+        fin = time.monotonic() + duracion
+
+        async def enviar_sueltas():
+            nonlocal errores
+            while time.monotonic() < fin:
+                lat, lon = _punto(r)
+                inicio = time.perf_counter()
+                respuesta = await cliente.put(f"/repartidores/{r.randint(1, repartidores)}/posicion",
+                                              json={"latitud": lat, "longitud": lon})
+                latencias.append(time.perf_counter() - inicio)
+                errores += respuesta.status_code != 204
+
+        inicio = time.monotonic()
+        await asyncio.gather(*(enviar_sueltas() for _ in range(concurrencia)))
+        segundos = time.monotonic() - inicio
+        resultados["sueltas"] = {
+            "peticiones": len(latencias),
+            "por_s": round(len(latencias) / segundos),
+            "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+            "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+            "errores": errores,
+        }
+
+        enviadas, peticiones = 0, 0
+        inicio = time.monotonic()
+        while time.monotonic() - inicio < duracion:
+            items = [{"repartidor_id": r.randint(1, repartidores), **dict(zip(("latitud", "longitud"), _punto(r)))}
+                     for _ in range(lote)]
+            respuesta = await cliente.put("/repartidores/posiciones", json=items)
+            respuesta.raise_for_status()
+            enviadas += respuesta.json()["updated_count"]
+            peticiones += 1
+        segundos = time.monotonic() - inicio
+        resultados["lotes"] = {"lote": lote, "peticiones": peticiones, "posiciones_por_s": round(enviadas / segundos)}
+
+        respuesta = await cliente.post("/entregas/asignar", json={"latitud": -0.2, "longitud": -78.5, "k": 5})
+        respuesta.raise_for_status()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:////tmp/ofertas_bench_posiciones.db"))
+    parser.add_argument("--repartidores", type=int, default=5000)
+    parser.add_argument("--actualizaciones", type=int, default=200000, help="Actualizaciones en proceso")
+    parser.add_argument("--consultas", type=int, default=5000, help="Búsquedas k-NN en proceso")
+    parser.add_argument("--duracion", type=float, default=10, help="Segundos de cada fase HTTP")
+    parser.add_argument("--concurrencia", type=int, default=32)
+    parser.add_argument("--lote", type=int, default=500)
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--solo-indice", action="store_true", help="Omitir las fases HTTP")
+    parser.add_argument("--salida", help="Guardar resultados en este archivo JSON")
+    args = parser.parse_args()
+
+    # config.py lee DATABASE_URL al importarse
+    os.environ["DATABASE_URL"] = args.database_url
+    proceso = None
+    if not args.solo_indice:
+        proceso = levantar_worker(args.database_url, args.puerto)
+    try:
+        from database import engine
+        if proceso is None:
+            from esquema import migrar
+            migrar(engine)
+        sembrar(engine, args.repartidores)
+        resultados = {"indice": medir_indice(args.repartidores, args.actualizaciones, args.consultas)}
+        if proceso is not None:
+            resultados["http"] = asyncio.run(medir_http(f"http://127.0.0.1:{args.puerto}", args.repartidores,
+                                                        args.duracion, args.concurrencia, args.lote))
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+
+    print(json.dumps(resultados, indent=2))
+    if args.salida:
+        with open(args.salida, "w") as archivo:
+            json.dump(resultados, archivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
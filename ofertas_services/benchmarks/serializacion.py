@@ -0,0 +1,183 @@
+"""Costo por fila de serializar los listados: camino ORM + response_model frente a dicts + JSON rápido.
+
+Siembra `--filas` entregas y productos (con `--ofertas` ofertas cada uno) y
+recorre todos los listados por páginas de `--limit`, midiendo por separado la
+consulta y la serialización para EntregaOut e InventarioProductoConOfertas:
+
+- antes: Query ORM (joinedload/selectinload) -> instancias -> validación del
+  response_model con from_attributes (incluye los validadores de los esquemas
+  de entrada, como hacían los *Out) -> json.dumps, igual que FastAPI.
+- después: select() de columnas -> dicts (crud/*) -> serializacion.dumps.
+
+Uso (desde ofertas_services/):
+    python -m benchmarks.serializacion --database-url sqlite:////tmp/bench_serializacion.db --filas 20000
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+
+def sembrar(engine, filas, ofertas):
+    from sqlalchemy import insert
+    from models.entrega import Entrega
+    from models.inventario_producto import InventarioProducto
+    from models.oferta_reducida import OfertaReducida
+    from models.repartidor import Repartidor
+
+    base = datetime(2024, 1, 1, 8, 0)
+    with engine.begin() as conexion:
+        conexion.execute(insert(Repartidor), [
+            {"id": i, "nombre": f"Repartidor {i}", "telefono": f"09{i:08d}", "zona": "Norte"} for i in range(1, 51)
+        ])
+        conexion.execute(insert(Entrega), [
+            {"id": i, "repartidor_id": i % 50 + 1, "fecha": base + timedelta(minutes=i), "descripcion": f"Entrega {i}"}
+            for i in range(1, filas + 1)
+        ])
+        conexion.execute(insert(InventarioProducto), [
+            {"id": i, "nombre": f"Producto {i}", "cantidad": 10, "precio_unitario": 2.5,
+             "fecha_ingreso": base, "estado": "Disponible"}
+            for i in range(1, filas + 1)
+        ])
+        conexion.execute(insert(OfertaReducida), [
+            {"producto_id": i, "precio_oferta": 1.5, "fecha_inicio": base, "fecha_fin": base + timedelta(days=1 + j)}
+            for i in range(1, filas + 1) for j in range(ofertas)
+        ])
+
+
+def esquemas_antes():
+    """Los *Out previos: heredaban de los *Base con sus restricciones y validadores"""
+    from schemas import EntregaBase, InventarioProductoBase, OfertaReducidaBase, Pagina, RepartidorBase
+
+    class RepartidorOut(RepartidorBase):
+        id: int
+        model_config = {"from_attributes": True}
+
+    class EntregaOut(EntregaBase):
+        id: int
+        repartidor: RepartidorOut
+        model_config = {"from_attributes": True}
+
+    class OfertaReducidaOut(OfertaReducidaBase):
+        id: int
+        model_config = {"from_attributes": True}
+
+    class InventarioProductoConOfertas(InventarioProductoBase):
+        id: int
+        ofertas_reducidas: list[OfertaReducidaOut] = []
+        model_config = {"from_attributes": True}
+
+    return Pagina[EntregaOut], Pagina[InventarioProductoConOfertas]
+
+
+def paginas_orm(db, query, columna, limit):
+    """Mismo keyset que paginacion.paginar, pero devolviendo instancias ORM"""
+    ultimo = None
+    while True:
+        consulta = query if ultimo is None else query.filter(columna > ultimo)
+        filas = consulta.order_by(columna).limit(limit + 1).all()
+        yield {"items": filas[:limit], "next_cursor": None}
+        if len(filas) <= limit:
+            return
+        ultimo = filas[limit - 1].id
+        # Cada petición real usa una sesión nueva: no acumular el identity map
+        db.expunge_all()
+
+
+def paginas_dict(db, funcion, limit):
+    cursor = None
+    while True:
+        resultado = funcion(db, cursor, limit)
+        yield resultado
+        cursor = resultado["next_cursor"]
+        if cursor is None:
+            return
+
+
+def medir(paginas, serializar):
+    """Recorrer las páginas separando el tiempo de consulta del de serialización"""
+    consulta = serializacion = 0.0
+    filas = 0
+    iterador = iter(paginas)
+    while True:
+        inicio = time.perf_counter()
+        try:
+            pagina = next(iterador)
+        except StopIteration:
+            break
+        medio = time.perf_counter()
+        serializar(pagina)
+        consulta += medio - inicio
+        serializacion += time.perf_counter() - medio
+        filas += len(pagina["items"])
+    return {
+        "filas": filas,
+        "consulta_us_por_fila": round(consulta / filas * 1e6, 2),
+        "serializacion_us_por_fila": round(serializacion / filas * 1e6, 2),
+        "total_us_por_fila": round((consulta + serializacion) / filas * 1e6, 2),
+    }
+
+
+def serializador_fastapi(adaptador):
+    """Lo que hace FastAPI con un response_model: validar from_attributes, volcar a JSON y json.dumps"""
+    def serializar(pagina):
+        valor = adaptador.validate_python(pagina, from_attributes=True)
+        contenido = adaptador.dump_python(valor, mode="json")
+        return json.dumps(contenido, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+    return serializar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:////tmp/ofertas_bench_serializacion.db"))
+    parser.add_argument("--filas", type=int, default=20000)
+    parser.add_argument("--ofertas", type=int, default=2, help="Ofertas por producto")
+    parser.add_argument("--limit", type=int, default=500, help="Tamaño de página")
+    parser.add_argument("--salida", help="Guardar resultados en este archivo JSON")
+    args = parser.parse_args()
+
+    # config.py lee DATABASE_URL al importarse
+    os.environ["DATABASE_URL"] = args.database_url
+    from pydantic import TypeAdapter
+    from sqlalchemy.orm import joinedload, selectinload
+    from database import Base, SessionLocal, engine
+    from crud.entrega import obtener_todas
+    from crud.inventario_producto import get_inventario_productos_con_ofertas
+    from models.entrega import Entrega
+    from models.inventario_producto import InventarioProducto
+    from serializacion import dumps, orjson
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    sembrar(engine, args.filas, args.ofertas)
+
+    pagina_entregas, pagina_productos = (TypeAdapter(esquema) for esquema in esquemas_antes())
+    resultados = {}
+    with SessionLocal() as db:
+        query = db.query(Entrega).options(joinedload(Entrega.repartidor))
+        resultados["EntregaOut"] = {
+            "antes": medir(paginas_orm(db, query, Entrega.id, args.limit), serializador_fastapi(pagina_entregas)),
+            "despues": medir(paginas_dict(db, obtener_todas, args.limit), dumps),
+        }
+        query = db.query(InventarioProducto).options(selectinload(InventarioProducto.ofertas_reducidas))
+        resultados["InventarioProductoConOfertas"] = {
+            "antes": medir(paginas_orm(db, query, InventarioProducto.id, args.limit), serializador_fastapi(pagina_productos)),
+            "despues": medir(paginas_dict(db, get_inventario_productos_con_ofertas, args.limit), dumps),
+        }
+
+    print(f"µs por fila con {args.filas} filas, páginas de {args.limit} (JSON: {'orjson' if orjson else 'json'})")
+    print(f"{'esquema':<30} {'camino':<8} {'consulta':>10} {'serializar':>11} {'total':>9}")
+    for esquema, caminos in resultados.items():
+        for camino, r in caminos.items():
+            print(f"{esquema:<30} {camino:<8} {r['consulta_us_por_fila']:>10} {r['serializacion_us_por_fila']:>11} {r['total_us_por_fila']:>9}")
+        mejora = caminos["antes"]["total_us_por_fila"] / caminos["despues"]["total_us_por_fila"]
+        print(f"{'':<30} {'mejora':<8} {mejora:>32.1f}x")
+
+    if args.salida:
+        with open(args.salida, "w") as archivo:
+            json.dump({"filas": args.filas, "limit": args.limit, "us_por_fila": resultados}, archivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import math
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+from cambios import suscribir, ELIMINAR, CASCADA
+
+
+# Palabras para los trigramas: letras y dígitos, como pg_trgm
+PALABRA = re.compile(r"[^\W_]+")
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y sin tildes (como lower(unaccent(...)) en PostgreSQL)"""
+    if texto.isascii():
+        return texto.lower()
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def trigramas(texto: str) -> set:
+    """Trigramas de cada palabra al estilo pg_trgm: dos espacios delante y uno detrás"""
+    resultado = set()
+    for palabra in PALABRA.findall(texto):
+        relleno = f"  {palabra} "
+        resultado.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return resultado
+
+
+class IndiceTexto:
+    """Índice invertido de trigramas en memoria: búsqueda aproximada donde no hay pg_trgm (SQLite).
+
+    Cada trigrama apunta a los ids de los textos que lo contienen: los
+    construidos desde la base en arrays de numpy y los recibidos después
+    (cambios.py) en listas aparte. Una búsqueda cuenta con bincount cuántos
+    trigramas de la consulta tiene cada id y puntúa como word_similarity
+    (fracción de los trigramas de la consulta presentes) y, para desempatar,
+    como similarity (Jaccard sobre los trigramas de todo el texto).
+
+    Los ids editados o borrados quedan "obsoletos": sus entradas viejas no se
+    borran, así que se puntúan desde el texto actual. El lifespan lo
+    reconstruye en segundo plano cada BUSQUEDA_INDICE_TTL segundos para
+    incorporar los cambios de otros workers; los cambios que llegan mientras
+    se lee la base se vuelven a aplicar sobre el contenido nuevo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listo = threading.Event()
+        self._durante = None  # cambios recibidos durante una reconstrucción: [(columna, acción, filas)]
+        self._vaciar()
+
+    def _vaciar(self):
+        self._textos = {}                          # id -> texto normalizado
+        self._base = {}                            # trigrama -> array de ids (de la reconstrucción)
+        self._nuevos = {}                          # trigrama -> lista de ids (añadidos después)
+        self._tamanos = np.zeros(0, dtype=np.int32)  # id -> nº de trigramas del texto
+        self._obsoletos = set()
+
+    def _tamano(self, fila_id, tamano):
+        if fila_id >= len(self._tamanos):
+            crecido = np.zeros(max(fila_id + 1, 2 * len(self._tamanos)), dtype=np.int32)
+            crecido[:len(self._tamanos)] = self._tamanos
+            self._tamanos = crecido
+        self._tamanos[fila_id] = tamano
+
+    def _poner(self, fila_id, texto):
+        texto = normalizar(texto)
+        anterior = self._textos.get(fila_id)
+        if anterior == texto:
+            return
+        if anterior is not None:
+            self._obsoletos.add(fila_id)
+        self._textos[fila_id] = texto
+        propios = trigramas(texto)
+        for trigrama in propios:
+            self._nuevos.setdefault(trigrama, []).append(fila_id)
+        self._tamano(fila_id, len(propios))
+
+    def _quitar(self, fila_id):
+        if self._textos.pop(fila_id, None) is not None:
+            self._obsoletos.add(fila_id)
+
+    # Mantenimiento incremental
+
+    def _aplicar(self, columna, accion, filas):
+        if accion == CASCADA:
+            # Solo se conoce el padre: los ids borrados no se leen al buscar y salen en la próxima reconstrucción
+            return
+        for fila in filas:
+            if accion == ELIMINAR:
+                self._quitar(fila["id"])
+            elif fila.get(columna) is not None:
+                self._poner(fila["id"], fila[columna])
+
+    def aplicar(self, columna):
+        """Suscriptor de cambios.py para la tabla cuyo texto está en `columna`"""
+        def aplicar(tabla, accion, filas):
+            with self._lock:
+                if self._durante is not None:
+                    self._durante.append((columna, accion, filas))
+                if self._listo.is_set():
+                    self._aplicar(columna, accion, filas)
+        return aplicar
+
+    # Carga desde la base de datos
+
+    def listo(self):
+        return self._listo.is_set()
+
+    def esperar(self, segundos: float):
+        """Esperar a la primera construcción (la hace el lifespan); True si terminó"""
+        return self._listo.wait(segundos)
+
+    def iniciar_reconstruccion(self):
+        """Empezar a guardar los cambios publicados: llamar antes de leer la base para reconstruir"""
+        with self._lock:
+            self._durante = []
+
+    def cancelar_reconstruccion(self):
+        with self._lock:
+            self._durante = None
+
+    def reconstruir(self, filas):
+        """Reemplazar el contenido con las filas (id, texto) leídas de la base.
+
+        Los textos repetidos (nombres de catálogo, calles) se procesan una sola
+        vez: cada texto distinto extiende las listas de sus trigramas con todos
+        sus ids de golpe. El contenido nuevo se arma sin el lock y se reemplaza
+        de una vez; después se aplican los cambios guardados desde
+        iniciar_reconstruccion (los que ya estaban en la lectura no cambian nada).
+        """
+        por_texto = {}
+        for fila_id, texto in filas:
+            por_texto.setdefault(texto, []).append(fila_id)
+        listas, textos = {}, {}
+        tamanos = np.zeros(max((max(ids) for ids in por_texto.values()), default=-1) + 1, dtype=np.int32)
+        for texto, ids in por_texto.items():
+            texto = normalizar(texto)
+            textos.update(dict.fromkeys(ids, texto))
+            propios = trigramas(texto)
+            tamanos[ids] = len(propios)
+            for trigrama in propios:
+                listas.setdefault(trigrama, []).extend(ids)
+        base = {trigrama: np.fromiter(ids, dtype=np.int64, count=len(ids)) for trigrama, ids in listas.items()}
+        with self._lock:
+            self._vaciar()
+            self._textos, self._base, self._tamanos = textos, base, tamanos
+            durante, self._durante = self._durante or [], None
+            for columna, accion, cambios in durante:
+                self._aplicar(columna, accion, cambios)
+            self._listo.set()
+
+    # Consulta
+
+    def buscar(self, consulta: str, limite: int, umbral: float):
+        """[(id, puntuación)] de los `limite` textos más parecidos con puntuación >= `umbral`"""
+        buscados = trigramas(normalizar(consulta))
+        if not buscados:
+            return []
+        # Trigramas en común que exige el umbral (el épsilon absorbe el redondeo)
+        minimo = max(math.ceil(umbral * len(buscados) - 1e-9), 1)
+        with self._lock:
+            partes = [self._base[t] for t in buscados if t in self._base]
+            partes += [np.array(self._nuevos[t], dtype=np.int64) for t in buscados if t in self._nuevos]
+            if not partes:
+                return []
+            cuentas = np.bincount(np.concatenate(partes))
+            ids = np.nonzero(cuentas >= minimo)[0]
+            comunes = cuentas[ids].astype(np.float64)
+            tamanos = self._tamanos[ids].astype(np.float64)
+            # Los obsoletos (editados o borrados) se puntúan desde su texto actual
+            if self._obsoletos:
+                obsoletos = np.nonzero(np.isin(ids, np.fromiter(self._obsoletos, dtype=np.int64)))[0]
+                for i in obsoletos.tolist():
+                    texto = self._textos.get(int(ids[i]))
+                    propios = trigramas(texto) if texto is not None else set()
+                    comunes[i] = len(buscados & propios)
+                    tamanos[i] = len(propios)
+            parecido = comunes / len(buscados)
+            similitud = comunes / (len(buscados) + tamanos - comunes)
+            validos = parecido >= umbral
+            ids, parecido, similitud = ids[validos], parecido[validos], similitud[validos]
+            orden = np.lexsort((ids, -similitud, -parecido))[:limite]
+            return [(int(ids[i]), round(float(parecido[i]), 4)) for i in orden]
+
+
+productos = IndiceTexto()
+rutas = IndiceTexto()
+suscribir("inventario_producto", productos.aplicar("nombre"))
+suscribir("ruta_entrega", rutas.aplicar("destino"))
@@ -0,0 +1,259 @@
+import fnmatch
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import config
+from cambios import suscribir, fila_de, CASCADA
+
+
+class CacheLRU:
+    """Cache en proceso con expiración por TTL y desalojo LRU al superar `max_entradas`"""
+
+    def __init__(self, ttl: float, max_entradas: int):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()  # clave -> (expira_en, valor)
+        self._lock = threading.Lock()
+        self.contadores = {"hits": 0, "misses": 0, "evictions": 0, "expiradas": 0, "invalidaciones": 0}
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.contadores["misses"] += 1
+                return None
+            if entrada[0] < time.monotonic():
+                del self._datos[clave]
+                self.contadores["expiradas"] += 1
+                self.contadores["misses"] += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.contadores["hits"] += 1
+            return entrada[1]
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self.contadores["evictions"] += 1
+
+    def borrar(self, clave):
+        with self._lock:
+            if self._datos.pop(clave, None) is not None:
+                self.contadores["invalidaciones"] += 1
+
+    def borrar_prefijo(self, prefijo):
+        with self._lock:
+            claves = [clave for clave in self._datos if clave.startswith(prefijo)]
+            for clave in claves:
+                del self._datos[clave]
+            self.contadores["invalidaciones"] += len(claves)
+
+    def resumen(self):
+        with self._lock:
+            return {"backend": "memoria", "entradas": len(self._datos), "max_entradas": self.max_entradas,
+                    "ttl": self.ttl, **self.contadores}
+
+
+class ClienteMemoria:
+    """Sustituto local del cliente compartido (subconjunto get/set/delete/incr/mget/scan_iter de redis-py).
+
+    Sirve para desarrollo y pruebas sin levantar el servicio compartido; no se
+    comparte entre procesos.
+    """
+
+    def __init__(self):
+        self._datos = {}
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None or entrada[0] < time.monotonic():
+                self._datos.pop(clave, None)
+                return None
+            return entrada[1]
+
+    def set(self, clave, valor, ex=None):
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + ex if ex else float("inf"), valor)
+
+    def delete(self, clave):
+        with self._lock:
+            return 1 if self._datos.pop(clave, None) is not None else 0
+
+    def incr(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            valor = int(entrada[1]) + 1 if entrada is not None else 1
+            self._datos[clave] = (float("inf"), valor)
+            return valor
+
+    def mget(self, claves):
+        return [self.get(clave) for clave in claves]
+
+    def scan_iter(self, match="*"):
+        with self._lock:
+            claves = list(self._datos)
+        return (clave for clave in claves if fnmatch.fnmatchcase(clave, match))
+
+    def dbsize(self):
+        with self._lock:
+            return len(self._datos)
+
+
+def _json_default(valor):
+    if isinstance(valor, datetime):
+        return {"__datetime__": valor.isoformat()}
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def _json_hook(objeto):
+    if "__datetime__" in objeto:
+        return datetime.fromisoformat(objeto["__datetime__"])
+    return objeto
+
+
+class CacheCompartida:
+    """Cache compartida entre workers sobre un cliente tipo redis; el TTL y el desalojo los aplica el servidor"""
+
+    def __init__(self, cliente, ttl: float, prefijo="ofertas:"):
+        self.cliente = cliente
+        self.ttl = ttl
+        self.prefijo = prefijo
+        self._lock = threading.Lock()
+        self.contadores = {"hits": 0, "misses": 0, "evictions": 0, "expiradas": 0, "invalidaciones": 0}
+
+    def _contar(self, contador):
+        with self._lock:
+            self.contadores[contador] += 1
+
+    def obtener(self, clave):
+        crudo = self.cliente.get(self.prefijo + clave)
+        if crudo is None:
+            self._contar("misses")
+            return None
+        self._contar("hits")
+        return json.loads(crudo, object_hook=_json_hook)
+
+    def guardar(self, clave, valor):
+        self.cliente.set(self.prefijo + clave, json.dumps(valor, default=_json_default), ex=max(1, int(self.ttl)))
+
+    def borrar(self, clave):
+        if self.cliente.delete(self.prefijo + clave):
+            self._contar("invalidaciones")
+
+    def borrar_prefijo(self, prefijo):
+        # SCAN recorre el espacio de claves por tandas sin bloquear el servidor como KEYS
+        for clave in self.cliente.scan_iter(match=self.prefijo + prefijo + "*"):
+            if self.cliente.delete(clave):
+                self._contar("invalidaciones")
+
+    def resumen(self):
+        with self._lock:
+            return {"backend": "compartida", "cliente": type(self.cliente).__name__, "ttl": self.ttl,
+                    **self.contadores}
+
+
+def _crear_cache():
+    if config.CACHE_BACKEND == "memoria":
+        return CacheLRU(config.CACHE_TTL, config.CACHE_MAX_ENTRADAS)
+    if config.CACHE_BACKEND == "compartida":
+        if not config.CACHE_URL:
+            return CacheCompartida(ClienteMemoria(), config.CACHE_TTL)
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_URL requiere el paquete 'redis' (pip install redis)") from e
+        return CacheCompartida(redis.Redis.from_url(config.CACHE_URL), config.CACHE_TTL)
+    return None
+
+
+cache = _crear_cache()
+
+# Generación de cada clave (y de cada tabla, para CASCADA) en este proceso: una
+# lectura que empezó antes de una invalidación no guarda su resultado (ya
+# podría estar desactualizado)
+_generaciones = {}
+_generaciones_tabla = {}
+_lock_generaciones = threading.Lock()
+
+# Instante (monotonic) de la última invalidación de cada clave y tabla: una
+# lectura en una réplica (DB_REPLICAS) poco después aún puede ver la fila vieja
+_invalidada_en = {}
+_invalidada_tabla_en = {}
+
+
+def _clave(tabla, entidad_id):
+    return f"{tabla}:{entidad_id}"
+
+
+def invalidar(tabla, accion, filas):
+    """Suscriptor de cambios.py: descartar las entidades escritas"""
+    if cache is None:
+        return
+    if accion == CASCADA:
+        # Los ids de los hijos borrados no se conocen: se descarta la tabla entera
+        with _lock_generaciones:
+            _generaciones_tabla[tabla] = _generaciones_tabla.get(tabla, 0) + 1
+            _invalidada_tabla_en[tabla] = time.monotonic()
+        cache.borrar_prefijo(_clave(tabla, ""))
+        return
+    for fila in filas:
+        clave = _clave(tabla, fila["id"])
+        with _lock_generaciones:
+            _generaciones[clave] = _generaciones.get(clave, 0) + 1
+            _invalidada_en[clave] = time.monotonic()
+        cache.borrar(clave)
+
+
+suscribir("*", invalidar)
+
+
+def _recien_invalidada(clave, tabla):
+    """True si la clave o su tabla se invalidaron hace menos de DB_REPLICAS_RETRASO segundos"""
+    limite = time.monotonic() - config.DB_REPLICAS_RETRASO
+    return _invalidada_en.get(clave, limite) > limite or _invalidada_tabla_en.get(tabla, limite) > limite
+
+
+def cacheado(tabla: str):
+    """Read-through para getters `funcion(db, id)` que devuelven una instancia ORM o None.
+
+    En un acierto se devuelve el dict de columnas guardado sin tocar la base de
+    datos; en un fallo se consulta, se guarda el dict y se devuelve. Las
+    escrituras de crud/* invalidan la entrada a través de cambios.py.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(db, entidad_id):
+            if cache is None:
+                return funcion(db, entidad_id)
+            clave = _clave(tabla, entidad_id)
+            valor = cache.obtener(clave)
+            if valor is not None:
+                return valor
+            generacion = (_generaciones.get(clave, 0), _generaciones_tabla.get(tabla, 0))
+            objeto = funcion(db, entidad_id)
+            if objeto is None:
+                return None
+            valor = fila_de(objeto)
+            if db.info.get("replica") and _recien_invalidada(clave, tabla):
+                # La réplica puede ir atrasada respecto de la escritura: no se guarda
+                return valor
+            with _lock_generaciones:
+                if (_generaciones.get(clave, 0), _generaciones_tabla.get(tabla, 0)) == generacion:
+                    cache.guardar(clave, valor)
+            return valor
+        return envoltura
+    return decorador
+
+
+def estado_cache():
+    """Contadores de la cache de entidades para /health/cache"""
+    return cache.resumen() if cache is not None else {"backend": "desactivada"}
@@ -0,0 +1,232 @@
+"""Barrido de caducidad: expira productos y retira ofertas vencidas en lotes acotados.
+
+- Productos: pasan de Disponible a Expirado al superar su vida útil
+  (CADUCIDAD_VIDA_UTIL_HORAS desde fecha_ingreso).
+- Ofertas: se retiran (archivado_en) CADUCIDAD_RETENCION_HORAS después de su
+  fecha_fin; dejan de aparecer en listados, exportaciones y lecturas.
+
+Cada lote es un UPDATE ... WHERE id IN (las `lote` filas más atrasadas)
+RETURNING en su propia transacción, así que el barrido nunca retiene bloqueos
+sobre muchas filas. Los cambios se publican (cambios.py) para la cache y los
+índices en memoria; con PostgreSQL el relevo de difusion.py los lleva también
+a los demás workers (la CLI arranca solo su emisor). De todos los procesos
+solo barre uno a la vez: en PostgreSQL lo decide un advisory lock de sesión;
+en SQLite, un flock sobre un fichero junto a la base (sin fcntl, o con la base
+en memoria, barren todos: los UPDATE son idempotentes). Cada lote deja en el log sus filas, su duración y
+su atraso: cuánto llevaba vencida la fila más antigua respecto del reloj.
+
+Uso (desde ofertas_services/):
+    python caducidad.py --una-vez
+    python caducidad.py --intervalo 30 --lote 5000
+"""
+import argparse
+import json
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, text, update
+
+import config
+from cambios import publicar, ACTUALIZAR, ELIMINAR
+from crud.escritura import vigentes
+from database import SessionLocal, engine
+from models.inventario_producto import InventarioProducto
+from models.oferta_reducida import OfertaReducida
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Clave del advisory lock (cualquier bigint): la misma en todos los workers
+CLAVE_BLOQUEO = 7_021_001
+
+# Último barrido de este proceso, para /health/caducidad
+_ultimo = {"estado": "sin ejecutar"}
+
+
+def productos_vencidos(ahora: datetime, lote: int):
+    """Ids de los `lote` productos disponibles que más tiempo llevan vencidos (ix_inventario_producto_caducidad).
+
+    Incluye los archivados: si no se expiraran, cada lote volvería a recorrerlos.
+    """
+    vida_util = timedelta(hours=config.CADUCIDAD_VIDA_UTIL_HORAS)
+    return (
+        select(InventarioProducto.id)
+        .where(InventarioProducto.estado == "Disponible", InventarioProducto.fecha_ingreso <= ahora - vida_util)
+        .order_by(InventarioProducto.fecha_ingreso)
+        .limit(lote)
+    )
+
+
+def ofertas_vencidas(ahora: datetime, lote: int):
+    """Ids de las `lote` ofertas vigentes que terminaron hace más tiempo (ix_oferta_reducida_caducidad)"""
+    retencion = timedelta(hours=config.CADUCIDAD_RETENCION_HORAS)
+    return (
+        select(OfertaReducida.id)
+        .where(*vigentes(OfertaReducida), OfertaReducida.fecha_fin <= ahora - retencion)
+        .order_by(OfertaReducida.fecha_fin)
+        .limit(lote)
+    )
+
+
+def _actualizar_lote(db, tabla, pendientes, valores, devolver):
+    """UPDATE de las filas de `pendientes` con RETURNING y commit: un lote, una transacción"""
+    if db.get_bind().dialect.name == "postgresql":
+        # Si otro proceso barre a la vez (p. ej. la CLI sin lock) cada uno toma filas distintas
+        pendientes = pendientes.with_for_update(skip_locked=True)
+    # Las condiciones se repiten fuera: la fila pudo cambiar entre el SELECT y el UPDATE
+    filas = db.execute(
+        update(tabla).where(tabla.c.id.in_(pendientes), pendientes.whereclause)
+        .values(**valores).returning(*devolver)
+    ).mappings().all()
+    db.commit()
+    return [dict(fila) for fila in filas]
+
+
+def expirar_productos(db, ahora: datetime, lote: int):
+    """Un lote de productos Disponible -> Expirado; devuelve (filas, vencimiento más antiguo)"""
+    tabla = InventarioProducto.__table__
+    filas = _actualizar_lote(db, tabla, productos_vencidos(ahora, lote), {"estado": "Expirado"}, tabla.columns)
+    # Los archivados no existen para la API: no se notifican
+    publicar(tabla.name, ACTUALIZAR, [fila for fila in filas if fila["archivado_en"] is None])
+    vida_util = timedelta(hours=config.CADUCIDAD_VIDA_UTIL_HORAS)
+    return len(filas), min((fila["fecha_ingreso"] for fila in filas), default=ahora - vida_util) + vida_util
+
+
+def retirar_ofertas(db, ahora: datetime, lote: int):
+    """Un lote de ofertas vencidas archivadas; devuelve (filas, vencimiento más antiguo)"""
+    tabla = OfertaReducida.__table__
+    filas = _actualizar_lote(db, tabla, ofertas_vencidas(ahora, lote), {"archivado_en": ahora},
+                             (tabla.c.id, tabla.c.fecha_fin))
+    publicar(tabla.name, ELIMINAR, [{"id": fila["id"]} for fila in filas])
+    retencion = timedelta(hours=config.CADUCIDAD_RETENCION_HORAS)
+    return len(filas), min((fila["fecha_fin"] for fila in filas), default=ahora - retencion) + retencion
+
+
+TAREAS = {"productos": expirar_productos, "ofertas": retirar_ofertas}
+
+
+def _barrer_tarea(nombre, tarea, lote):
+    """Lotes de `tarea` hasta que uno salga incompleto; resumen con filas, lotes y atraso máximo"""
+    resumen = {"filas": 0, "lotes": 0, "atraso_s": 0.0}
+    inicio_tarea = time.perf_counter()
+    while True:
+        inicio = time.perf_counter()
+        ahora = datetime.now()
+        with SessionLocal() as db:
+            filas, vencimiento = tarea(db, ahora, lote)
+        if not filas:
+            break
+        atraso = round((ahora - vencimiento).total_seconds(), 1)
+        resumen["filas"] += filas
+        resumen["lotes"] += 1
+        resumen["atraso_s"] = max(resumen["atraso_s"], atraso)
+        logger.info("Caducidad %s: lote de %d filas en %.1f ms, atraso %.1f s",
+                    nombre, filas, (time.perf_counter() - inicio) * 1000, atraso)
+        if filas < lote:
+            break
+    resumen["duracion_ms"] = round((time.perf_counter() - inicio_tarea) * 1000, 1)
+    return resumen
+
+
+@contextmanager
+def _bloqueo_fichero(base):
+    """flock no bloqueante sobre `<base>.caducidad.lock`; True sin fcntl o con la base en memoria.
+
+    El sistema lo libera si el proceso muere (se cierra el descriptor).
+    """
+    if fcntl is None or not base or base == ":memory:":
+        yield True
+        return
+    with open(f"{base}.caducidad.lock", "a") as fichero:
+        try:
+            fcntl.flock(fichero, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fichero, fcntl.LOCK_UN)
+
+
+@contextmanager
+def _bloqueo(motor):
+    """True si este proceso debe barrer: advisory lock de sesión en PostgreSQL, flock en SQLite.
+
+    El lock vive en una conexión propia mientras dura el barrido; si el proceso
+    muere, PostgreSQL lo libera al cerrarse la conexión.
+    """
+    if motor.dialect.name == "sqlite":
+        with _bloqueo_fichero(motor.url.database) as obtenido:
+            yield obtenido
+        return
+    if motor.dialect.name != "postgresql":
+        yield True
+        return
+    with motor.connect() as conexion:
+        obtenido = conexion.scalar(text("SELECT pg_try_advisory_lock(:clave)"), {"clave": CLAVE_BLOQUEO})
+        # El lock es de sesión: la transacción no tiene que quedar abierta
+        conexion.commit()
+        try:
+            yield obtenido
+        finally:
+            if obtenido:
+                conexion.execute(text("SELECT pg_advisory_unlock(:clave)"), {"clave": CLAVE_BLOQUEO})
+                conexion.commit()
+
+
+def barrer(lote=None):
+    """Un barrido completo de productos y ofertas; devuelve el informe (también en /health/caducidad)"""
+    lote = lote or config.CADUCIDAD_LOTE
+    informe = {"inicio": datetime.now()}
+    try:
+        with _bloqueo(engine) as obtenido:
+            if not obtenido:
+                informe["estado"] = "omitido: otro worker tiene el lock"
+            else:
+                informe["tareas"] = {nombre: _barrer_tarea(nombre, tarea, lote) for nombre, tarea in TAREAS.items()}
+                informe["estado"] = "completado"
+    except Exception as e:
+        informe.update(estado="error", error=str(e))
+        raise
+    finally:
+        informe["fin"] = datetime.now()
+        _ultimo.clear()
+        _ultimo.update(informe)
+    return informe
+
+
+def estado_caducidad():
+    return dict(_ultimo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--una-vez", action="store_true", help="Un solo barrido y salir")
+    parser.add_argument("--intervalo", type=float, default=config.CADUCIDAD_INTERVALO or 60,
+                        help="Segundos entre barridos")
+    parser.add_argument("--lote", type=int, default=config.CADUCIDAD_LOTE, help="Filas por UPDATE")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    # Sin event loop: con PostgreSQL solo emite (NOTIFY) los cambios del barrido a los workers
+    from difusion import relevo
+    relevo.iniciar()
+    try:
+        while True:
+            print(json.dumps(barrer(args.lote), indent=2, default=str, ensure_ascii=False))
+            if args.una_vez:
+                break
+            time.sleep(args.intervalo)
+    finally:
+        relevo.detener()
+
+
+if __name__ == "__main__":
+    main()
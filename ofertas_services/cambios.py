@@ -0,0 +1,56 @@
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+# Acciones que publican las funciones de escritura de crud/*
+CREAR = "crear"
+ACTUALIZAR = "actualizar"
+ELIMINAR = "eliminar"
+# Filas hijas borradas por ON DELETE CASCADE: se conocen sus padres, no sus ids
+CASCADA = "cascada"
+
+# tabla -> [(función, recibe los cambios remotos)]; "*" recibe los cambios de todas las tablas
+_suscriptores = defaultdict(list)
+
+
+def suscribir(tabla: str, funcion, remotos: bool = True):
+    """Registrar `funcion(tabla, accion, filas)` para los cambios confirmados de `tabla`.
+
+    Con remotos=False solo recibe los cambios hechos en este proceso, no los
+    que llegan de otros workers (p. ej. el relevo que los reenvía, para no
+    difundirlos otra vez).
+    """
+    _suscriptores[tabla].append((funcion, remotos))
+    return funcion
+
+
+def publicar(tabla: str, accion: str, filas: list, remoto: bool = False):
+    """Notificar un cambio ya confirmado (después del commit).
+
+    `filas` son dicts con las columnas de cada fila afectada; en ELIMINAR basta
+    con {"id": ...} y en CASCADA llega {columna_fk: id_padre} por cada padre
+    borrado (todas las filas con ese valor ya no existen). `remoto` marca los
+    cambios de otro worker recibidos por difusion.py. Un suscriptor que falla se registra en el log pero no
+    afecta a la escritura ni al resto de suscriptores.
+    """
+    if not filas:
+        return
+    for funcion, remotos in _suscriptores[tabla] + _suscriptores["*"]:
+        if remoto and not remotos:
+            continue
+        try:
+            funcion(tabla, accion, filas)
+        except Exception:
+            logger.exception("Error en el suscriptor %r de cambios en %s", funcion, tabla)
+
+
+def publicar_cascada(columnas, ids_padres):
+    """Notificar los hijos que borró ON DELETE CASCADE a través de sus columnas FK, sin leerlos"""
+    for columna in columnas:
+        publicar(columna.table.name, CASCADA, [{columna.key: padre_id} for padre_id in ids_padres])
+
+
+def fila_de(objeto):
+    """Columnas de una instancia ORM como dict"""
+    return {columna.key: getattr(objeto, columna.key) for columna in objeto.__table__.columns}
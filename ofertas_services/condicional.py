@@ -0,0 +1,153 @@
+import hashlib
+import threading
+import time
+import uuid
+
+from fastapi import Depends, Request, Response
+from starlette.concurrency import run_in_threadpool
+
+import cache
+import config
+from cambios import suscribir
+from replicas import replica_de
+
+
+class NoModificado(Exception):
+    """El ETag que envió el cliente sigue vigente: se responde 304 sin ejecutar la consulta"""
+
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+class VersionesLocales:
+    """Contador de versión por tabla en este proceso.
+
+    El token de arranque entra en el ETag para que un reinicio (contadores en
+    cero) no repita ETags anteriores. Un worker no ve todas las escrituras
+    (las de otros workers, las de la CLI de caducidad), así que el ETag
+    incluye además el periodo de `vigencia` segundos en curso: un 304 con
+    datos viejos dura como mucho eso.
+    """
+
+    remoto = False
+
+    def __init__(self, vigencia: float):
+        self.vigencia = vigencia
+        self.token = uuid.uuid4().hex
+        self._versiones = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, tabla):
+        with self._lock:
+            self._versiones[tabla] = self._versiones.get(tabla, 0) + 1
+
+    def actuales(self, tablas):
+        with self._lock:
+            return [self._versiones.get(tabla, 0) for tabla in tablas]
+
+    def periodo(self):
+        return int(time.time() // self.vigencia)
+
+
+class VersionesCompartidas:
+    """Contadores de versión en el cliente de la cache compartida (INCR/MGET), comunes a todos los workers"""
+
+    remoto = True
+
+    def __init__(self, cliente, prefijo="ofertas:version:"):
+        self.cliente = cliente
+        self.prefijo = prefijo
+        self.token = "compartida"
+
+    def incrementar(self, tabla):
+        self.cliente.incr(self.prefijo + tabla)
+
+    def actuales(self, tablas):
+        return [int(v) if v is not None else 0 for v in self.cliente.mget([self.prefijo + t for t in tablas])]
+
+    def periodo(self):
+        # Todos los workers ven todas las escrituras: el ETag no caduca
+        return 0
+
+
+if isinstance(cache.cache, cache.CacheCompartida):
+    versiones = VersionesCompartidas(cache.cache.cliente)
+elif config.ETAG_VIGENCIA_LOCAL > 0:
+    versiones = VersionesLocales(config.ETAG_VIGENCIA_LOCAL)
+else:
+    # Sin versiones compartidas ni vigencia local: los GET no llevan ETag
+    versiones = None
+
+
+def _incrementar(tabla, accion, filas):
+    versiones.incrementar(tabla)
+
+
+if versiones is not None:
+    # Las versiones compartidas ya las incrementó el worker que escribió
+    suscribir("*", _incrementar, remotos=not versiones.remoto)
+
+
+def calcular_etag(request: Request, tablas, numeros) -> str:
+    """ETag fuerte a partir de la URL pedida y la versión de cada tabla de la que depende"""
+    base = f"{versiones.token}.{versiones.periodo()}|{request.url.path}?{request.url.query}|" + ",".join(
+        f"{tabla}={numero}" for tabla, numero in zip(tablas, numeros)
+    )
+    return '"' + hashlib.sha1(base.encode()).hexdigest()[:24] + '"'
+
+
+# tabla -> (versión, instante en que este proceso la vio por primera vez)
+_vistas = {}
+
+
+def recien_escritas(tablas, numeros) -> bool:
+    """True si alguna de `tablas` cambió de versión hace menos de DB_REPLICAS_RETRASO segundos"""
+    ahora = time.monotonic()
+    recientes = False
+    for tabla, numero in zip(tablas, numeros):
+        vista = _vistas.get(tabla)
+        if vista is None or vista[0] != numero:
+            vista = _vistas[tabla] = (numero, ahora)
+        recientes |= ahora - vista[1] < config.DB_REPLICAS_RETRASO
+    return recientes
+
+
+def coincide(if_none_match, etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110) con una lista de ETags separada por comas.
+
+    `*` no coincide nunca: solo vale si existe una representación actual, y la
+    dependencia se resuelve antes de consultar (un GET de un id inexistente
+    tiene que seguir dando 404, no 304).
+    """
+    if not if_none_match:
+        return False
+    candidatos = [valor.strip() for valor in if_none_match.split(",")]
+    return any(c.removeprefix("W/") == etag for c in candidatos)
+
+
+def etag(*tablas: str):
+    """Dependencia para GETs cuyo resultado solo cambia cuando se escribe en `tablas`.
+
+    Se resuelve antes que el endpoint: si If-None-Match coincide se lanza
+    NoModificado (304) y la consulta no llega a ejecutarse; si no, se agrega el
+    ETag a la respuesta. La versión se lee antes de consultar, así una
+    escritura concurrente solo puede hacer que el ETag quede viejo (y el
+    próximo GET responda 200), nunca lo contrario. Sin versiones compartidas
+    el ETag caduca a los ETAG_VIGENCIA_LOCAL segundos (ver VersionesLocales).
+    """
+    async def dependencia(request: Request, response: Response):
+        if versiones is None:
+            return
+        if versiones.remoto:
+            numeros = await run_in_threadpool(versiones.actuales, tablas)
+        else:
+            numeros = versiones.actuales(tablas)
+        valor = calcular_etag(request, tablas, numeros)
+        if coincide(request.headers.get("if-none-match"), valor):
+            raise NoModificado(valor)
+        if replica_de(request) is not None and recien_escritas(tablas, numeros):
+            # Una réplica atrasada dejaría datos viejos bajo el ETag nuevo: esta respuesta va sin ETag
+            return
+        response.headers["ETag"] = valor
+        response.headers["Cache-Control"] = "no-cache"
+    return Depends(dependencia)
@@ -0,0 +1,61 @@
+from contextvars import ContextVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.util import await_only
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+# True mientras una función CRUD corre dentro de run_sync, es decir, en el hilo del event loop
+_en_event_loop = ContextVar("en_event_loop", default=False)
+
+
+async def ejecutar(db, funcion, *args, **kwargs):
+    """Ejecutar una función CRUD desde un endpoint async sin bloquear el event loop.
+
+    Con una AsyncSession la función corre dentro de run_sync: el mismo código ORM
+    espera cada consulta sobre el driver asíncrono sin ocupar hilos. Ese código
+    corre en el hilo del event loop, así que su trabajo de CPU (índices en
+    memoria, numpy) pasa por `calcular`. Con una Session síncrona se envía al
+    threadpool, igual que un endpoint `def`.
+    """
+    if isinstance(db, AsyncSession):
+        marca = _en_event_loop.set(True)
+        try:
+            return await db.run_sync(funcion, *args, **kwargs)
+        finally:
+            _en_event_loop.reset(marca)
+    return await run_in_threadpool(funcion, db, *args, **kwargs)
+
+
+def _fuera_del_loop(funcion, args, kwargs):
+    _en_event_loop.set(False)
+    return funcion(*args, **kwargs)
+
+
+def calcular(funcion, *args, **kwargs):
+    """Llamar a `funcion` (CPU, sin E/S de base de datos) desde una función CRUD sin ocupar el event loop.
+
+    Dentro de run_sync se espera su resultado en el threadpool como se espera
+    una consulta (await_only): el event loop sigue atendiendo otras peticiones
+    mientras tanto. En modo sync la función CRUD ya corre en un hilo del
+    threadpool y se llama directamente.
+    """
+    if not _en_event_loop.get():
+        return funcion(*args, **kwargs)
+    return await_only(run_in_threadpool(_fuera_del_loop, funcion, args, kwargs))
+
+
+async def iterar_lotes(db, consulta, tamano_lote: int = 1000):
+    """Recorrer una consulta con cursor del lado del servidor, entregando lotes de filas.
+
+    yield_per activa stream_results: el driver trae `tamano_lote` filas por viaje y
+    nunca materializa el resultado completo. Cada lote es una lista de dicts.
+    """
+    consulta = consulta.execution_options(yield_per=tamano_lote)
+    if isinstance(db, AsyncSession):
+        resultado = await db.stream(consulta)
+        async for particion in resultado.mappings().partitions():
+            yield [dict(fila) for fila in particion]
+    else:
+        resultado = await run_in_threadpool(db.execute, consulta)
+        async for particion in iterate_in_threadpool(resultado.mappings().partitions()):
+            yield [dict(fila) for fila in particion]
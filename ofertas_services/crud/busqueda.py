@@ -0,0 +1,98 @@
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+import config
+from crud import calcular
+from crud.escritura import columnas, vigentes
+
+
+# Backend de la búsqueda en este worker: True con pg_trgm en la base y False con los índices en
+# memoria. Lo fija el lifespan al arrancar; None mientras no se haya comprobado
+pg_trgm = None
+
+
+def detectar_pg_trgm(db: Session) -> bool:
+    """Comprobar en la base si están pg_trgm, unaccent y texto_busqueda() (migración 0007) y fijar el backend"""
+    global pg_trgm
+    if db.get_bind().dialect.name != "postgresql":
+        pg_trgm = False
+    else:
+        pg_trgm = bool(db.execute(text(
+            "SELECT count(*) = 2 AND to_regprocedure('texto_busqueda(text)') IS NOT NULL "
+            "FROM pg_extension WHERE extname IN ('pg_trgm', 'unaccent')"
+        )).scalar())
+    return pg_trgm
+
+
+def _buscar_postgresql(db: Session, modelo, columna, q: str, limit: int):
+    """word_similarity de pg_trgm sobre texto_busqueda(columna): el operador %> usa el índice GIN.
+
+    El umbral del operador (pg_trgm.word_similarity_threshold) se fija al
+    conectar con BUSQUEDA_UMBRAL (database.py).
+    """
+    texto = func.texto_busqueda(columna)
+    consulta = func.texto_busqueda(q)
+    puntuacion = func.word_similarity(consulta, texto)
+    filas = db.execute(
+        select(*columnas(modelo), puntuacion.label("puntuacion"))
+        .where(texto.op("%>")(consulta), *vigentes(modelo))
+        .order_by(puntuacion.desc(), func.similarity(consulta, texto).desc(), modelo.id)
+        .limit(limit)
+    ).mappings()
+    return [{**fila, "puntuacion": round(fila["puntuacion"], 4)} for fila in filas]
+
+
+# Segundos que una búsqueda espera la primera construcción del índice (al arrancar el worker)
+ESPERA_INDICE = 30
+
+
+def reconstruir_indice(db: Session, modelo, columna, indice):
+    """Cargar `indice` con el texto de `columna` de las filas vigentes (tarea periódica del lifespan)"""
+    # Los cambios publicados desde antes de la lectura se vuelven a aplicar tras el reemplazo
+    indice.iniciar_reconstruccion()
+    try:
+        # Por la conexión (Core): puede ser la tabla entera
+        filas = db.connection().execute(select(modelo.id, columna).where(*vigentes(modelo))).all()
+    except Exception:
+        indice.cancelar_reconstruccion()
+        raise
+    indice.reconstruir(filas)
+
+
+def reconstruir_indices(db: Session):
+    """Reconstruir los índices de trigramas de productos y rutas"""
+    from busqueda import productos, rutas
+    from models.inventario_producto import InventarioProducto
+    from models.ruta_entrega import RutaEntrega
+
+    reconstruir_indice(db, InventarioProducto, InventarioProducto.nombre, productos)
+    reconstruir_indice(db, RutaEntrega, RutaEntrega.destino, rutas)
+
+
+def _buscar_en_memoria(db: Session, modelo, columna, indice, q: str, limit: int):
+    """Ids y puntuaciones del índice en memoria y una consulta para leer esas filas.
+
+    El índice lo construye el lifespan: la búsqueda nunca lo reconstruye y,
+    recién arrancado el worker, espera (fuera del event loop) a que esté listo.
+    """
+    if not indice.listo():
+        calcular(indice.esperar, ESPERA_INDICE)
+    encontrados = calcular(indice.buscar, q, limit, config.BUSQUEDA_UMBRAL)
+    if not encontrados:
+        return []
+    puntuaciones = dict(encontrados)
+    filas = db.execute(select(*columnas(modelo)).where(modelo.id.in_(puntuaciones), *vigentes(modelo))).mappings()
+    por_id = {fila["id"]: dict(fila) for fila in filas}
+    return [{**por_id[fila_id], "puntuacion": puntuacion} for fila_id, puntuacion in encontrados if fila_id in por_id]
+
+
+def buscar(db: Session, modelo, columna, indice, q: str, limit: int):
+    """Filas vigentes de `modelo` cuyo texto en `columna` más se parece a `q`, de mayor a menor puntuación.
+
+    Sin tildes ni mayúsculas y tolerante a erratas: la puntuación (0..1) es la
+    fracción de trigramas de `q` presentes en el texto. En PostgreSQL con
+    pg_trgm instalado; si no, con `indice` (busqueda.IndiceTexto).
+    """
+    if pg_trgm if pg_trgm is not None else detectar_pg_trgm(db):
+        return _buscar_postgresql(db, modelo, columna, q, limit)
+    return _buscar_en_memoria(db, modelo, columna, indice, q, limit)
@@ -1,32 +1,63 @@
-from sqlalchemy.orm import Session, joinedload
+from typing import Optional
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+from paginacion import paginar
+from crud.lote import crear_en_lote, actualizar_en_lote, eliminar_en_lote
+from crud.escritura import insertar, actualizar, eliminar, columnas, vigentes
+from crud.repartidor import get_repartidor
+from cambios import fila_de
 from models.entrega import Entrega
+from models.repartidor import Repartidor
 from schemas import EntregaCreate
 
+def _con_repartidor(db: Session, fila):
+    """Anidar el repartidor de la fila escrita, leído a través de la cache de entidades"""
+    if fila is None:
+        return None
+    repartidor = get_repartidor(db, fila["repartidor_id"]) if fila["repartidor_id"] is not None else None
+    return {**fila, "repartidor": repartidor if repartidor is None or isinstance(repartidor, dict) else fila_de(repartidor)}
+
 def crear_entrega(db: Session, entrega: EntregaCreate):
-    nueva = Entrega(**entrega.dict())
-    db.add(nueva)
-    db.commit()
-    db.refresh(nueva)
-    return nueva
+    """INSERT ... RETURNING y el repartidor desde la cache (sin refresh)"""
+    return _con_repartidor(db, insertar(db, Entrega, entrega.model_dump()))
+
+# Columnas del repartidor en el JOIN, con etiqueta para no chocar con las de la entrega
+COLUMNAS_REPARTIDOR = {f"repartidor__{columna.key}": columna.key for columna in columnas(Repartidor)}
+
+def _anidar_repartidor(fila: dict):
+    repartidor = {nombre: fila.pop(etiqueta) for etiqueta, nombre in COLUMNAS_REPARTIDOR.items()}
+    fila["repartidor"] = repartidor if repartidor["id"] is not None else None
+    return fila
+
+def _consulta_con_repartidor():
+    # Un repartidor archivado no se anida (como si no existiera), igual que en get_repartidor
+    return select(
+        *Entrega.__table__.columns,
+        *(Repartidor.__table__.c[nombre].label(etiqueta) for etiqueta, nombre in COLUMNAS_REPARTIDOR.items()),
+    ).outerjoin(Repartidor, and_(Entrega.repartidor_id == Repartidor.id, *vigentes(Repartidor)))
 
-def obtener_todas(db: Session):
-    return db.query(Entrega).options(joinedload(Entrega.repartidor)).all()
+def obtener_todas(db: Session, cursor: Optional[str] = None, limit: int = 100):
+    resultado = paginar(db, _consulta_con_repartidor(), cursor, limit, Entrega.id)
+    resultado["items"] = [_anidar_repartidor(fila) for fila in resultado["items"]]
+    return resultado
 
 def obtener_por_id(db: Session, entrega_id: int):
-    return db.query(Entrega).options(joinedload(Entrega.repartidor)).filter(Entrega.id == entrega_id).first()
+    fila = db.execute(_consulta_con_repartidor().where(Entrega.id == entrega_id)).mappings().first()
+    return _anidar_repartidor(dict(fila)) if fila is not None else None
 
 def actualizar_entrega(db: Session, entrega_id: int, datos: dict):
-    entrega = obtener_por_id(db, entrega_id)
-    if entrega:
-        for key, value in datos.items():
-            setattr(entrega, key, value)
-        db.commit()
-        db.refresh(entrega)
-    return entrega
+    """UPDATE ... RETURNING con todos los campos (PUT) o los enviados (PATCH); None si no existe"""
+    return _con_repartidor(db, actualizar(db, Entrega, entrega_id, datos))
 
 def eliminar_entrega(db: Session, entrega_id: int):
-    entrega = obtener_por_id(db, entrega_id)
-    if entrega:
-        db.delete(entrega)
-        db.commit()
-    return entrega
+    """DELETE ... RETURNING sin lectura previa; False si no existe"""
+    return eliminar(db, Entrega, entrega_id)
+
+def crear_entregas_lote(db: Session, items: list):
+    return crear_en_lote(db, Entrega, EntregaCreate, items, [("repartidor_id", Repartidor)])
+
+def actualizar_entregas_lote(db: Session, items: list):
+    return actualizar_en_lote(db, Entrega, EntregaCreate, items, [("repartidor_id", Repartidor)])
+
+def eliminar_entregas_lote(db: Session, ids: list):
+    return eliminar_en_lote(db, Entrega, ids)
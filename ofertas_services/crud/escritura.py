@@ -0,0 +1,94 @@
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from cambios import publicar, publicar_cascada, CREAR, ACTUALIZAR, ELIMINAR
+
+
+class RestriccionIncumplida(ValueError):
+    """La fila existe pero el cambio no cumple una condición que depende de sus valores actuales"""
+
+
+def columnas(modelo):
+    """Columnas que expone la API: todas salvo la marca de borrado lógico"""
+    return [columna for columna in modelo.__table__.columns if columna.key != "archivado_en"]
+
+
+def vigentes(modelo):
+    """Condiciones que excluyen las filas archivadas (ninguna si la tabla no tiene borrado lógico)"""
+    tabla = modelo.__table__
+    return (tabla.c.archivado_en.is_(None),) if "archivado_en" in tabla.c else ()
+
+
+def insertar(db: Session, modelo, datos: dict):
+    """INSERT ... RETURNING de todas las columnas: la fila creada en un solo viaje, sin refresh"""
+    tabla = modelo.__table__
+    fila = dict(db.execute(insert(tabla).values(**datos).returning(*tabla.columns)).mappings().one())
+    db.commit()
+    publicar(tabla.name, CREAR, [fila])
+    return fila
+
+
+def actualizar(db: Session, modelo, fila_id: int, cambios: dict, condiciones=(), mensaje=None):
+    """UPDATE ... WHERE id = :id RETURNING de las columnas en `cambios`; None si la fila no existe.
+
+    Sin lectura previa: que no vuelva ninguna fila indica el 404. Las
+    `condiciones` (sobre los valores actuales de la fila) van en el mismo
+    WHERE; solo cuando no se actualiza nada se distingue, con una consulta
+    más, entre fila inexistente y RestriccionIncumplida(`mensaje`).
+    """
+    tabla = modelo.__table__
+    if not cambios:
+        fila = db.execute(select(*tabla.columns).where(tabla.c.id == fila_id, *vigentes(modelo))).mappings().first()
+        return dict(fila) if fila is not None else None
+    fila = db.execute(
+        update(tabla).where(tabla.c.id == fila_id, *vigentes(modelo), *condiciones)
+        .values(**cambios).returning(*tabla.columns)
+    ).mappings().first()
+    if fila is None:
+        db.rollback()
+        if condiciones and db.scalar(select(tabla.c.id).where(tabla.c.id == fila_id, *vigentes(modelo))) is not None:
+            raise RestriccionIncumplida(mensaje)
+        return None
+    fila = dict(fila)
+    db.commit()
+    publicar(tabla.name, ACTUALIZAR, [fila])
+    return fila
+
+
+def eliminar(db: Session, modelo, fila_id: int, hijos=()):
+    """DELETE ... WHERE id = :id RETURNING id; False si la fila no existe o está archivada.
+
+    Una fila archivada no existe para la API: tampoco se puede borrar (ni
+    arrastrar sus hijas) por aquí. Las filas de las tablas hijas las borra la base (ON DELETE CASCADE) en la
+    misma sentencia, sin cargarlas: de cada columna FK de `hijos` se publica
+    una notificación CASCADA con el id del padre, en memoria constante.
+    """
+    tabla = modelo.__table__
+    if db.scalar(delete(tabla).where(tabla.c.id == fila_id, *vigentes(modelo)).returning(tabla.c.id)) is None:
+        db.rollback()
+        return False
+    db.commit()
+    publicar_cascada(hijos, [fila_id])
+    publicar(tabla.name, ELIMINAR, [{"id": fila_id}])
+    return True
+
+
+def archivar(db: Session, modelo, fila_id: int):
+    """Borrado lógico: marca archivado_en con un UPDATE; False si no existe o ya estaba archivada.
+
+    La fila y sus hijas se conservan; para la API deja de existir (lecturas,
+    listados y escrituras filtran por archivado_en IS NULL).
+    """
+    tabla = modelo.__table__
+    archivada = db.scalar(
+        update(tabla).where(tabla.c.id == fila_id, *vigentes(modelo))
+        .values(archivado_en=datetime.now()).returning(tabla.c.id)
+    )
+    if archivada is None:
+        db.rollback()
+        return False
+    db.commit()
+    publicar(tabla.name, ELIMINAR, [{"id": fila_id}])
+    return True
@@ -1,48 +1,98 @@
-from sqlalchemy.orm import Session, selectinload
+from typing import Optional
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
 from models.inventario_producto import InventarioProducto
+from models.oferta_reducida import OfertaReducida
 from schemas import InventarioProductoCreate
+from paginacion import paginar
+from crud.lote import crear_en_lote, actualizar_en_lote, eliminar_en_lote
+from cache import cacheado
+from crud.escritura import insertar, actualizar, eliminar, archivar, columnas, vigentes
+from crud.busqueda import buscar
+from busqueda import productos as indice_nombres
 
 def create_inventario_producto(db: Session, producto: InventarioProductoCreate):
-    """Crear nuevo producto en inventario"""
-    nuevo = InventarioProducto(**producto.dict())
-    db.add(nuevo)
-    db.commit()
-    db.refresh(nuevo)
-    return nuevo
-
-def get_inventario_productos(db: Session, skip: int = 0, limit: int = 100):
-    """Obtener todos los productos con paginación"""
-    return db.query(InventarioProducto).offset(skip).limit(limit).all()
-
-def get_inventario_productos_con_ofertas(db: Session, skip: int = 0, limit: int = 100):
-    """Obtener todos los productos con sus ofertas asociadas"""
+    """Crear nuevo producto en inventario (INSERT ... RETURNING, sin refresh)"""
+    return insertar(db, InventarioProducto, producto.model_dump())
+
+def get_inventario_productos(db: Session, cursor: Optional[str] = None, limit: int = 100):
+    """Obtener productos paginados por cursor sobre el id (dicts de columnas)"""
+    return paginar(db, select(*columnas(InventarioProducto)).where(*vigentes(InventarioProducto)), cursor, limit,
+                   InventarioProducto.id)
+
+def get_inventario_productos_con_ofertas(db: Session, cursor: Optional[str] = None, limit: int = 100):
+    """Obtener productos paginados por cursor con sus ofertas asociadas (dicts de columnas)"""
+    resultado = paginar(db, select(*columnas(InventarioProducto)).where(*vigentes(InventarioProducto)), cursor, limit,
+                        InventarioProducto.id)
+    por_id = {}
+    for producto in resultado["items"]:
+        producto["ofertas_reducidas"] = []
+        por_id[producto["id"]] = producto
+    if por_id:
+        # Una sola consulta para las ofertas de toda la página (como selectinload)
+        ofertas = db.execute(
+            select(*columnas(OfertaReducida))
+            .where(OfertaReducida.producto_id.in_(por_id), *vigentes(OfertaReducida))
+            .order_by(OfertaReducida.id)
+        ).mappings()
+        for oferta in ofertas:
+            por_id[oferta["producto_id"]]["ofertas_reducidas"].append(dict(oferta))
+    return resultado
+
+# Columnas de la oferta en la exportación plana -> nombre dentro de ofertas_reducidas
+COLUMNAS_OFERTA_EXPORT = {
+    "oferta_id": "id",
+    "precio_oferta": "precio_oferta",
+    "fecha_inicio": "fecha_inicio",
+    "fecha_fin": "fecha_fin",
+}
+
+def export_inventario_productos_query():
+    """Consulta plana producto + ofertas (LEFT JOIN) ordenada por producto para exportar en streaming"""
     return (
-        db.query(InventarioProducto)
-        .options(selectinload(InventarioProducto.ofertas_reducidas))
-        .offset(skip)
-        .limit(limit)
-        .all()
+        select(
+            *columnas(InventarioProducto),
+            OfertaReducida.id.label("oferta_id"),
+            OfertaReducida.precio_oferta,
+            OfertaReducida.fecha_inicio,
+            OfertaReducida.fecha_fin,
+        )
+        .outerjoin(OfertaReducida, and_(OfertaReducida.producto_id == InventarioProducto.id, *vigentes(OfertaReducida)))
+        .where(*vigentes(InventarioProducto))
+        .order_by(InventarioProducto.id, OfertaReducida.id)
     )
 
+def buscar_inventario_productos(db: Session, q: str, limit: int = 20):
+    """Productos por nombre, sin tildes y tolerante a erratas, del más parecido al menos"""
+    return buscar(db, InventarioProducto, InventarioProducto.nombre, indice_nombres, q, limit)
+
+def _get_inventario_producto(db: Session, producto_id: int, *opciones):
+    """Obtener producto por ID sin pasar por la cache (instancia ORM para las escrituras)"""
+    return db.query(InventarioProducto).options(*opciones).filter(InventarioProducto.id == producto_id, *vigentes(InventarioProducto)).first()
+
+@cacheado(InventarioProducto.__tablename__)
 def get_inventario_producto(db: Session, producto_id: int):
-    """Obtener producto por ID"""
-    return db.query(InventarioProducto).filter(InventarioProducto.id == producto_id).first()
-
-def update_inventario_producto(db: Session, producto_id: int, producto_data: InventarioProductoCreate):
-    """Actualizar producto existente"""
-    producto = get_inventario_producto(db, producto_id)
-    if producto:
-        for key, value in producto_data.dict().items():
-            setattr(producto, key, value)
-        db.commit()
-        db.refresh(producto)
-    return producto
-
-def delete_inventario_producto(db: Session, producto_id: int):
-    """Eliminar producto"""
-    producto = get_inventario_producto(db, producto_id)
-    if producto:
-        db.delete(producto)
-        db.commit()
-        return True
-    return False
+    """Obtener producto por ID con read-through en la cache de entidades"""
+    return _get_inventario_producto(db, producto_id)
+
+def update_inventario_producto(db: Session, producto_id: int, cambios: dict):
+    """Actualizar producto con un UPDATE ... RETURNING: todos los campos (PUT) o los enviados (PATCH)"""
+    return actualizar(db, InventarioProducto, producto_id, cambios)
+
+def delete_inventario_producto(db: Session, producto_id: int, archivado: bool = False):
+    """Eliminar producto con un solo DELETE (ON DELETE CASCADE borra sus ofertas) o archivarlo"""
+    if archivado:
+        return archivar(db, InventarioProducto, producto_id)
+    return eliminar(db, InventarioProducto, producto_id, hijos=[OfertaReducida.producto_id])
+
+def bulk_create_inventario_productos(db: Session, items: list):
+    """Crear productos en lote"""
+    return crear_en_lote(db, InventarioProducto, InventarioProductoCreate, items)
+
+def bulk_update_inventario_productos(db: Session, items: list):
+    """Actualizar productos en lote"""
+    return actualizar_en_lote(db, InventarioProducto, InventarioProductoCreate, items)
+
+def bulk_delete_inventario_productos(db: Session, ids: list):
+    """Eliminar productos en lote junto con sus ofertas"""
+    return eliminar_en_lote(db, InventarioProducto, ids, hijos=[OfertaReducida.producto_id])
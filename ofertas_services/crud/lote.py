@@ -0,0 +1,134 @@
+from pydantic import ValidationError
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from cambios import publicar, publicar_cascada, CREAR, ACTUALIZAR, ELIMINAR
+from crud.escritura import vigentes
+
+def _error(indice, detalle, item_id=None):
+    return {"index": indice, "id": item_id, "detail": detalle}
+
+
+def _mensaje_validacion(error: ValidationError):
+    return "; ".join(
+        f"{'.'.join(str(parte) for parte in e['loc'])}: {e['msg']}" if e["loc"] else e["msg"]
+        for e in error.errors()
+    )
+
+
+def _validar(esquema, indice, datos, errores, item_id=None):
+    """Validar un elemento con el esquema de creación; None si no es válido"""
+    try:
+        return esquema.model_validate(datos).model_dump()
+    except ValidationError as e:
+        errores.append(_error(indice, _mensaje_validacion(e), item_id))
+        return None
+
+
+def _filtrar_referencias(db: Session, validos, referencias, errores):
+    """Descartar los elementos cuyas claves foráneas no existen (una consulta por referencia)"""
+    for campo, padre in referencias:
+        solicitados = {datos[campo] for _, datos in validos if datos.get(campo) is not None}
+        existentes = set(db.scalars(select(padre.id).where(padre.id.in_(solicitados)))) if solicitados else set()
+        conservados = []
+        for indice, datos in validos:
+            if datos.get(campo) is not None and datos[campo] not in existentes:
+                errores.append(_error(indice, f"{campo}: no existe {padre.__tablename__} con id {datos[campo]}", datos.get("id")))
+            else:
+                conservados.append((indice, datos))
+        validos = conservados
+    return validos
+
+
+def crear_en_lote(db: Session, modelo, esquema, items: list, referencias=()):
+    """Validar cada elemento y crear los válidos con un INSERT multi-fila en una transacción"""
+    errores = []
+    validos = []
+    for indice, item in enumerate(items):
+        datos = _validar(esquema, indice, item, errores)
+        if datos is not None:
+            validos.append((indice, datos))
+    validos = _filtrar_referencias(db, validos, referencias, errores)
+
+    ids = []
+    if validos:
+        ids = list(db.scalars(
+            insert(modelo).returning(modelo.id, sort_by_parameter_order=True),
+            [datos for _, datos in validos],
+        ))
+        db.commit()
+        publicar(modelo.__tablename__, CREAR, [{**datos, "id": nuevo_id} for (_, datos), nuevo_id in zip(validos, ids)])
+    return {
+        "created_count": len(ids),
+        "ids": ids,
+        "errors": sorted(errores, key=lambda e: e["index"]),
+        "message": f"{len(ids)} de {len(items)} elementos creados",
+    }
+
+
+def actualizar_en_lote(db: Session, modelo, esquema, items: list, referencias=()):
+    """Actualizar en lote: una lectura de las filas afectadas y un UPDATE executemany.
+
+    Cada elemento trae su `id` y los campos a cambiar; se combinan con la fila
+    actual para validar el registro completo con el esquema de creación.
+    """
+    tabla = modelo.__table__
+    errores = []
+    cambios = {}
+    for indice, item in enumerate(items):
+        item_id = item.get("id") if isinstance(item, dict) else None
+        if not isinstance(item_id, int):
+            errores.append(_error(indice, "Cada elemento debe incluir un id entero"))
+        elif item_id in cambios:
+            errores.append(_error(indice, "id repetido en el lote", item_id))
+        else:
+            cambios[item_id] = (indice, item)
+
+    actuales = {}
+    if cambios:
+        filas = db.execute(select(tabla).where(tabla.c.id.in_(cambios), *vigentes(modelo))).mappings()
+        actuales = {fila["id"]: dict(fila) for fila in filas}
+
+    validos = []
+    for item_id, (indice, item) in cambios.items():
+        if item_id not in actuales:
+            errores.append(_error(indice, "No encontrado", item_id))
+            continue
+        datos = _validar(esquema, indice, {**actuales[item_id], **item}, errores, item_id)
+        if datos is not None:
+            validos.append((indice, {**datos, "id": item_id}))
+    validos = _filtrar_referencias(db, validos, referencias, errores)
+
+    if validos:
+        columnas = [c.key for c in tabla.columns if c.key in esquema.model_fields]
+        # executemany: el SET se arma con las columnas presentes en los parámetros
+        db.execute(
+            update(tabla).where(tabla.c.id == bindparam("_id")),
+            [{"_id": datos["id"], **{c: datos[c] for c in columnas}} for _, datos in validos],
+        )
+        db.commit()
+        publicar(modelo.__tablename__, ACTUALIZAR, [datos for _, datos in validos])
+    return {
+        "updated_count": len(validos),
+        "errors": sorted(errores, key=lambda e: e["index"]),
+        "message": f"{len(validos)} de {len(items)} elementos actualizados",
+    }
+
+
+def eliminar_en_lote(db: Session, modelo, ids: list, hijos=()):
+    """Eliminar por id con un único DELETE ... WHERE id IN (...).
+
+    `hijos` son las columnas FK de las tablas dependientes: sus filas las borra
+    la base (ON DELETE CASCADE) y se notifican como CASCADA por padre borrado.
+    Los ids archivados cuentan como no encontrados.
+    """
+    eliminados = set(db.scalars(delete(modelo).where(modelo.id.in_(ids), *vigentes(modelo)).returning(modelo.id)))
+    db.commit()
+    publicar_cascada(hijos, sorted(eliminados))
+    publicar(modelo.__tablename__, ELIMINAR, [{"id": item_id} for item_id in eliminados])
+    errores = [_error(indice, "No encontrado", item_id) for indice, item_id in enumerate(ids) if item_id not in eliminados]
+    return {
+        "deleted_count": len(eliminados),
+        "errors": errores,
+        "message": f"{len(eliminados)} de {len(ids)} elementos eliminados",
+    }
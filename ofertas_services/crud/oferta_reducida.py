@@ -1,38 +1,282 @@
+import time
+from datetime import datetime
+from typing import Optional
+import numpy as np
+from sqlalchemy import String, bindparam, cast, insert, select, update
 from sqlalchemy.orm import Session
 from models.oferta_reducida import OfertaReducida
-from schemas import OfertaReducidaCreate
+from models.inventario_producto import InventarioProducto
+from schemas import OfertaReducidaCreate, RepreciarRequest
+import config
+from cambios import publicar, CREAR, ACTUALIZAR
+from descuentos import calcular_ofertas
+from paginacion import paginar, pagina, decodificar_cursor
+from ofertas_activas import indice
+from crud.lote import crear_en_lote, actualizar_en_lote, eliminar_en_lote
+from cache import cacheado
+from crud import calcular
+from crud.escritura import insertar, actualizar, eliminar, columnas, vigentes
 
 def create_oferta_reducida(db: Session, oferta: OfertaReducidaCreate):
-    """Crear nueva oferta reducida"""
-    nueva = OfertaReducida(**oferta.dict())
-    db.add(nueva)
-    db.commit()
-    db.refresh(nueva)
-    return nueva
+    """Crear nueva oferta reducida (INSERT ... RETURNING, sin refresh)"""
+    return insertar(db, OfertaReducida, oferta.model_dump())
+
+def get_ofertas_reducidas(db: Session, cursor: Optional[str] = None, limit: int = 100):
+    """Obtener ofertas paginadas por cursor sobre el id (dicts de columnas)"""
+    return paginar(db, select(*columnas(OfertaReducida)).where(*vigentes(OfertaReducida)), cursor, limit,
+                   OfertaReducida.id)
+
+def export_ofertas_reducidas_query():
+    """Consulta de todas las ofertas ordenada por id para exportar en streaming"""
+    return select(*columnas(OfertaReducida)).where(*vigentes(OfertaReducida)).order_by(OfertaReducida.id)
+
+def _consulta_con_producto():
+    return select(
+        *columnas(OfertaReducida),
+        InventarioProducto.nombre.label("producto_nombre"),
+        InventarioProducto.estado.label("producto_estado"),
+    ).join(InventarioProducto, InventarioProducto.id == OfertaReducida.producto_id).where(*vigentes(InventarioProducto), *vigentes(OfertaReducida))
+
+def reconstruir_indice_activas(db: Session):
+    """Cargar en el índice las ofertas que terminan después del horizonte (tarea periódica del lifespan)"""
+    # Los cambios publicados desde antes de la lectura se vuelven a aplicar tras el reemplazo
+    indice.iniciar_reconstruccion()
+    try:
+        horizonte = datetime.now() - indice.historial
+        filas = db.execute(_consulta_con_producto().where(OfertaReducida.fecha_fin >= horizonte)).mappings()
+        ofertas, productos = [], {}
+        for fila in filas:
+            ofertas.append({c.key: fila[c.key] for c in columnas(OfertaReducida)})
+            productos[fila["producto_id"]] = {"nombre": fila["producto_nombre"], "estado": fila["producto_estado"]}
+    except Exception:
+        indice.cancelar_reconstruccion()
+        raise
+    indice.reconstruir(ofertas, productos)
+
+def get_ofertas_activas(
+    db: Session,
+    en: Optional[datetime] = None,
+    precio_min: Optional[float] = None,
+    precio_max: Optional[float] = None,
+    estado: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+):
+    """Ofertas vigentes en `en` (por defecto ahora), servidas desde el índice en memoria.
+
+    Nunca reconstruye el índice (lo hace el lifespan): mientras no esté listo,
+    o para instantes anteriores a su horizonte, se consulta la base.
+    """
+    if en is None:
+        en = datetime.now()
+    elif en.tzinfo is not None:
+        # Las fechas se guardan sin zona horaria, en hora local
+        en = en.astimezone().replace(tzinfo=None)
+    despues_de = decodificar_cursor(cursor, [OfertaReducida.id])[0] if cursor else None
 
-def get_ofertas_reducidas(db: Session, skip: int = 0, limit: int = 100):
-    """Obtener todas las ofertas con paginación"""
-    return db.query(OfertaReducida).offset(skip).limit(limit).all()
+    if not indice.listo() or en < indice.horizonte:
+        # Índice aún sin construir o fuera de su historial: consulta por ventana sobre ix_oferta_reducida_ventana
+        consulta = _consulta_con_producto().where(OfertaReducida.fecha_inicio <= en, OfertaReducida.fecha_fin > en)
+        if precio_min is not None:
+            consulta = consulta.where(OfertaReducida.precio_oferta >= precio_min)
+        if precio_max is not None:
+            consulta = consulta.where(OfertaReducida.precio_oferta <= precio_max)
+        if estado is not None:
+            consulta = consulta.where(InventarioProducto.estado == estado)
+        if despues_de is not None:
+            consulta = consulta.where(OfertaReducida.id > despues_de)
+        filas = [dict(fila) for fila in db.execute(consulta.order_by(OfertaReducida.id).limit(limit + 1)).mappings()]
+        return pagina(filas, limit)
 
+    pendientes = indice.productos_pendientes()
+    if pendientes:
+        productos = db.execute(
+            select(InventarioProducto.id, InventarioProducto.nombre, InventarioProducto.estado,
+                   InventarioProducto.archivado_en)
+            .where(InventarioProducto.id.in_(pendientes))
+        )
+        # Los archivados se registran como None: dejan de estar pendientes y sus ofertas no se listan
+        indice.registrar_productos({
+            p.id: {"nombre": p.nombre, "estado": p.estado} if p.archivado_en is None else None for p in productos
+        })
+    return pagina(indice.activas(en, precio_min, precio_max, estado, despues_de, limit), limit)
+
+def _get_oferta_reducida(db: Session, oferta_id: int):
+    """Obtener oferta por ID sin pasar por la cache (instancia ORM para las escrituras)"""
+    return db.query(OfertaReducida).filter(OfertaReducida.id == oferta_id, *vigentes(OfertaReducida)).first()
+
+@cacheado(OfertaReducida.__tablename__)
 def get_oferta_reducida(db: Session, oferta_id: int):
-    """Obtener oferta por ID"""
-    return db.query(OfertaReducida).filter(OfertaReducida.id == oferta_id).first()
-
-def update_oferta_reducida(db: Session, oferta_id: int, oferta_data: OfertaReducidaCreate):
-    """Actualizar oferta existente"""
-    oferta = get_oferta_reducida(db, oferta_id)
-    if oferta:
-        for key, value in oferta_data.dict().items():
-            setattr(oferta, key, value)
-        db.commit()
-        db.refresh(oferta)
-    return oferta
+    """Obtener oferta por ID con read-through en la cache de entidades"""
+    return _get_oferta_reducida(db, oferta_id)
+
+def update_oferta_reducida(db: Session, oferta_id: int, cambios: dict):
+    """Actualizar oferta con un UPDATE ... RETURNING: todos los campos (PUT) o los enviados (PATCH)"""
+    condiciones = []
+    # Con una sola de las fechas, la otra es la guardada: el orden se exige en el WHERE
+    if "fecha_fin" in cambios and "fecha_inicio" not in cambios:
+        condiciones.append(OfertaReducida.fecha_inicio < cambios["fecha_fin"])
+    if "fecha_inicio" in cambios and "fecha_fin" not in cambios:
+        condiciones.append(OfertaReducida.fecha_fin > cambios["fecha_inicio"])
+    return actualizar(db, OfertaReducida, oferta_id, cambios, condiciones,
+                      "La fecha de fin debe ser posterior a la fecha de inicio")
 
 def delete_oferta_reducida(db: Session, oferta_id: int):
-    """Eliminar oferta"""
-    oferta = get_oferta_reducida(db, oferta_id)
-    if oferta:
-        db.delete(oferta)
-        db.commit()
-        return True
-    return False
\ No newline at end of file
+    """Eliminar oferta con un DELETE ... RETURNING (sin lectura previa)"""
+    return eliminar(db, OfertaReducida, oferta_id)
+
+def bulk_create_ofertas_reducidas(db: Session, items: list):
+    """Crear ofertas en lote"""
+    return crear_en_lote(db, OfertaReducida, OfertaReducidaCreate, items, [("producto_id", InventarioProducto)])
+
+def bulk_update_ofertas_reducidas(db: Session, items: list):
+    """Actualizar ofertas en lote"""
+    return actualizar_en_lote(db, OfertaReducida, OfertaReducidaCreate, items, [("producto_id", InventarioProducto)])
+
+def bulk_delete_ofertas_reducidas(db: Session, ids: list):
+    """Eliminar ofertas en lote"""
+    return eliminar_en_lote(db, OfertaReducida, ids)
+
+def _como_texto(columna):
+    """Fecha leída como texto ISO: numpy la convierte mucho más rápido que a los datetime del driver"""
+    return cast(columna, String).label(columna.key)
+
+def _columnas_np(filas, tipos):
+    """Lista de tuplas -> un array por columna con el dtype de `tipos`"""
+    columnas = list(zip(*filas)) if filas else [()] * len(tipos)
+    return [np.array(columna, dtype=tipo) for columna, tipo in zip(columnas, tipos)]
+
+def _ofertas_vigentes(db: Session, ahora: datetime):
+    """Filas (producto_id, id, precio, inicio, fin) de las ofertas vigentes, ordenadas por producto_id e id"""
+    # Por la conexión (Core): sin la capa ORM de resultados, que duplica el costo por fila
+    return db.connection().execute(
+        select(OfertaReducida.producto_id, OfertaReducida.id, OfertaReducida.precio_oferta,
+               _como_texto(OfertaReducida.fecha_inicio), _como_texto(OfertaReducida.fecha_fin))
+        .where(OfertaReducida.fecha_inicio <= ahora, OfertaReducida.fecha_fin > ahora,
+               OfertaReducida.producto_id.is_not(None), *vigentes(OfertaReducida))
+        .order_by(OfertaReducida.producto_id, OfertaReducida.id)
+    ).all()
+
+def _ultima_por_producto(filas):
+    """La oferta vigente más reciente (mayor id) de cada producto, como arrays ordenados por producto_id"""
+    productos, ids, precios, inicios, fines = _columnas_np(
+        filas, (np.int64, np.int64, np.float64, "datetime64[us]", "datetime64[us]"))
+    ultima = np.append(productos[1:] != productos[:-1], True) if len(productos) else np.zeros(0, dtype=bool)
+    return productos[ultima], ids[ultima], precios[ultima], inicios[ultima], fines[ultima]
+
+def _trozos(n):
+    return (slice(inicio, inicio + config.DESCUENTOS_LOTE) for inicio in range(0, n, config.DESCUENTOS_LOTE))
+
+def _calcular_repreciado(productos, ofertas, ahora: datetime, parametros: RepreciarRequest):
+    """El diff completo con numpy, sin E/S: filas del inventario y de las ofertas vigentes -> (resultado, nuevas, cambiadas)"""
+    ids, precios, ingresos = _columnas_np(productos, (np.int64, np.float64, "datetime64[us]"))
+    precios_oferta, fines, validos = calcular_ofertas(
+        precios, ingresos, ahora, parametros.vida_util_horas, parametros.curva,
+        parametros.descuento_min, parametros.descuento_max, parametros.pendiente,
+    )
+
+    # Cruce con la oferta vigente de cada producto
+    con_oferta, oferta_ids, precios_ant, inicios_ant, fines_ant = _ultima_por_producto(ofertas)
+    if len(con_oferta):
+        posicion = np.minimum(np.searchsorted(con_oferta, ids), len(con_oferta) - 1)
+        tiene = con_oferta[posicion] == ids
+        cambia = (np.abs(precios_oferta - precios_ant[posicion]) >= 0.005) | (fines != fines_ant[posicion])
+    else:
+        posicion = np.zeros(len(ids), dtype=np.int64)
+        tiene = cambia = np.zeros(len(ids), dtype=bool)
+    crear = validos & ~tiene
+    actualizar_ = validos & tiene & cambia
+
+    cambios = np.flatnonzero(crear | actualizar_)[:parametros.muestra]
+    resultado = {
+        "simulado": parametros.simular,
+        "productos": int(len(ids)),
+        "caducados": int((~validos).sum()),
+        "creadas": int(crear.sum()),
+        "actualizadas": int(actualizar_.sum()),
+        "sin_cambios": int((validos & tiene & ~cambia).sum()),
+        "descuento_medio": round(float(1 - (precios_oferta[validos] / precios[validos]).mean()), 4)
+        if validos.any() else None,
+        "cambios": [
+            {
+                "producto_id": int(ids[i]),
+                "oferta_id": int(oferta_ids[posicion[i]]) if tiene[i] else None,
+                "accion": "actualizar" if tiene[i] else "crear",
+                "precio_unitario": float(precios[i]),
+                "precio_anterior": float(precios_ant[posicion[i]]) if tiene[i] else None,
+                "precio_oferta": float(precios_oferta[i]),
+                "fecha_fin_anterior": fines_ant[posicion[i]].item() if tiene[i] else None,
+                "fecha_fin": fines[i].item(),
+            }
+            for i in cambios
+        ],
+    }
+    nuevas = {"producto_id": ids[crear], "precio_oferta": precios_oferta[crear], "fecha_fin": fines[crear]}
+    nuevas["id"] = np.zeros(len(nuevas["producto_id"]), dtype=np.int64)
+    cambiadas = {
+        "id": oferta_ids[posicion[actualizar_]], "producto_id": ids[actualizar_],
+        "precio_oferta": precios_oferta[actualizar_], "fecha_inicio": inicios_ant[posicion[actualizar_]],
+        "fecha_fin": fines[actualizar_],
+    }
+    return resultado, nuevas, cambiadas
+
+def _publicar_repreciado(nuevas, cambiadas, ahora: datetime):
+    """Notificar las ofertas creadas y actualizadas por trozos, sin materializar todas las filas a la vez"""
+    tabla = OfertaReducida.__table__
+    for accion, columnas in ((CREAR, nuevas), (ACTUALIZAR, cambiadas)):
+        for trozo in _trozos(len(columnas["id"])):
+            valores = {nombre: columnas[nombre][trozo].tolist() for nombre in columnas}
+            if "fecha_inicio" not in valores:
+                valores["fecha_inicio"] = [ahora] * len(valores["id"])
+            publicar(tabla.name, accion, [dict(zip(valores, fila)) for fila in zip(*valores.values())])
+
+def repreciar_ofertas(db: Session, parametros: RepreciarRequest):
+    """Recalcular la oferta de todos los productos disponibles y escribirla (o solo simularla).
+
+    Lee el inventario disponible y las ofertas vigentes en dos consultas, calcula
+    todos los precios a la vez (descuentos.py) y aplica el diff en una sola
+    transacción: INSERT multi-fila para los productos sin oferta vigente y
+    UPDATE executemany de precio y fin para los que la tienen con otros
+    valores, en sentencias de DESCUENTOS_LOTE filas. Con `simular` solo
+    devuelve el diff. El cálculo y las notificaciones pasan por `calcular`:
+    en modo async no ocupan el event loop, que solo espera las consultas.
+    """
+    inicio = time.perf_counter()
+    ahora = datetime.now()
+    productos = db.connection().execute(
+        select(InventarioProducto.id, InventarioProducto.precio_unitario, _como_texto(InventarioProducto.fecha_ingreso))
+        .where(InventarioProducto.estado == "Disponible", *vigentes(InventarioProducto))
+        .order_by(InventarioProducto.id)
+    ).all()
+    ofertas = _ofertas_vigentes(db, ahora)
+    resultado, nuevas, cambiadas = calcular(_calcular_repreciado, productos, ofertas, ahora, parametros)
+    del productos, ofertas
+    if parametros.simular:
+        resultado["duracion_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        return resultado
+
+    tabla = OfertaReducida.__table__
+    for trozo in _trozos(len(nuevas["id"])):
+        # RETURNING sin orden garantizado (así SQLite también agrupa filas por sentencia):
+        # cada id se ubica por su producto_id, único entre las ofertas nuevas
+        devueltas = db.execute(
+            insert(tabla).returning(tabla.c.producto_id, tabla.c.id),
+            [{"producto_id": p, "precio_oferta": x, "fecha_inicio": ahora, "fecha_fin": f}
+             for p, x, f in zip(nuevas["producto_id"][trozo].tolist(), nuevas["precio_oferta"][trozo].tolist(),
+                                nuevas["fecha_fin"][trozo].tolist())],
+        ).all()
+        productos, nuevos_ids = _columnas_np(devueltas, (np.int64, np.int64))
+        orden = np.argsort(productos)
+        nuevas["id"][trozo] = nuevos_ids[orden]
+    sentencia = update(tabla).where(tabla.c.id == bindparam("_id")).values(
+        precio_oferta=bindparam("_precio"), fecha_fin=bindparam("_fin"))
+    for trozo in _trozos(len(cambiadas["id"])):
+        db.execute(sentencia, [
+            {"_id": i, "_precio": x, "_fin": f}
+            for i, x, f in zip(cambiadas["id"][trozo].tolist(), cambiadas["precio_oferta"][trozo].tolist(),
+                               cambiadas["fecha_fin"][trozo].tolist())
+        ])
+    db.commit()
+    calcular(_publicar_repreciado, nuevas, cambiadas, ahora)
+    resultado["duracion_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    return resultado
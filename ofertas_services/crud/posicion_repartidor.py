@@ -0,0 +1,228 @@
+import heapq
+import math
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+import config
+from models.entrega import Entrega
+from models.posicion_repartidor import PosicionRepartidor
+from models.repartidor import Repartidor
+from schemas import PosicionRepartidorIn, PosicionRepartidorLote
+from indice_repartidores import KM_POR_GRADO, distancia_km, indice
+from crud import calcular
+from crud.lote import _error, _validar
+from crud.escritura import RestriccionIncumplida, vigentes
+from crud.entrega import actualizar_entrega
+
+# Máximo de candidatos cuya carga se consulta en una asignación
+MAX_CANDIDATOS = 1000
+
+def _instante(en: Optional[datetime]):
+    """Hora de la posición en hora local sin zona (como el resto de fechas); nunca en el futuro"""
+    ahora = datetime.now()
+    if en is None:
+        return ahora
+    if en.tzinfo is not None:
+        en = en.astimezone().replace(tzinfo=None)
+    return min(en, ahora)
+
+def registrar_repartidores(db: Session, ids):
+    """Leer la zona de los repartidores `ids` para el índice; los archivados o inexistentes quedan como None"""
+    ids = set(ids)
+    filas = db.execute(select(Repartidor.id, Repartidor.zona).where(Repartidor.id.in_(ids), *vigentes(Repartidor)))
+    encontrados = {fila.id: {"zona": fila.zona} for fila in filas}
+    indice.registrar({repartidor_id: encontrados.get(repartidor_id) for repartidor_id in ids})
+
+def actualizar_posicion(db: Session, repartidor_id: int, posicion: PosicionRepartidorIn):
+    """Registrar la posición en el índice; False si el repartidor no existe o está archivado.
+
+    Solo consulta la base la primera vez que se ve al repartidor; la escritura
+    en posicion_repartidor la hace el volcado periódico.
+    """
+    if indice.pendientes([repartidor_id]):
+        registrar_repartidores(db, [repartidor_id])
+    return indice.actualizar(repartidor_id, posicion.latitud, posicion.longitud, _instante(posicion.en))
+
+def actualizar_posiciones(db: Session, items: list):
+    """Registrar un lote de posiciones {repartidor_id, latitud, longitud, en}: una consulta como máximo"""
+    errores = []
+    validos = []
+    for i, item in enumerate(items):
+        datos = _validar(PosicionRepartidorLote, i, item, errores)
+        if datos is not None:
+            validos.append((i, datos))
+    pendientes = indice.pendientes({datos["repartidor_id"] for _, datos in validos})
+    if pendientes:
+        registrar_repartidores(db, pendientes)
+    actualizadas = 0
+    for i, datos in validos:
+        if indice.actualizar(datos["repartidor_id"], datos["latitud"], datos["longitud"], _instante(datos["en"])):
+            actualizadas += 1
+        else:
+            errores.append(_error(i, f"repartidor_id: no existe repartidor con id {datos['repartidor_id']}"))
+    return {
+        "updated_count": actualizadas,
+        "errors": sorted(errores, key=lambda e: e["index"]),
+        "message": f"{actualizadas} de {len(items)} posiciones actualizadas",
+    }
+
+def delete_posicion(db: Session, repartidor_id: int):
+    """Quitar la posición del índice y de la base (repartidor fuera de servicio); False si no tenía"""
+    en_indice = indice.quitar(repartidor_id)
+    tabla = PosicionRepartidor.__table__
+    borrada = db.scalar(delete(tabla).where(tabla.c.repartidor_id == repartidor_id).returning(tabla.c.repartidor_id))
+    db.commit()
+    return en_indice or borrada is not None
+
+def _upsert(db: Session):
+    dialecto = {"postgresql": postgresql, "sqlite": sqlite}[db.get_bind().dialect.name]
+    sentencia = dialecto.insert(PosicionRepartidor.__table__)
+    excluida = sentencia.excluded
+    # Dos workers pueden volcar el mismo repartidor: solo gana la posición más reciente
+    return sentencia.on_conflict_do_update(
+        index_elements=[PosicionRepartidor.repartidor_id],
+        set_={"latitud": excluida.latitud, "longitud": excluida.longitud, "actualizado_en": excluida.actualizado_en},
+        where=PosicionRepartidor.actualizado_en < excluida.actualizado_en,
+    )
+
+def guardar_posiciones(db: Session):
+    """Volcar las posiciones sin guardar del índice: una lectura de vigencia y un upsert executemany.
+
+    Las de repartidores borrados o archivados mientras tanto se descartan (y
+    salen del índice). Si falla, las posiciones se vuelven a marcar para el
+    próximo volcado. Devuelve cuántas se guardaron.
+    """
+    sucios = indice.tomar_sucios()
+    if not sucios:
+        return 0
+    try:
+        existentes = set(db.scalars(select(Repartidor.id).where(Repartidor.id.in_(sucios), *vigentes(Repartidor))))
+        filas = [
+            {"repartidor_id": repartidor_id, "latitud": lat, "longitud": lon, "actualizado_en": en}
+            for repartidor_id, (lat, lon, en) in sucios.items() if repartidor_id in existentes
+        ]
+        if filas:
+            db.execute(_upsert(db), filas)
+        db.commit()
+    except Exception:
+        db.rollback()
+        indice.devolver_sucios(sucios)
+        raise
+    indice.registrar({repartidor_id: None for repartidor_id in sucios.keys() - existentes})
+    return len(filas)
+
+def _posiciones_recientes():
+    """Posiciones de menos de `vigencia` de antigüedad de los repartidores vigentes, con su zona"""
+    desde = datetime.now() - indice.vigencia
+    return (
+        select(*PosicionRepartidor.__table__.columns, Repartidor.zona)
+        .join(Repartidor, Repartidor.id == PosicionRepartidor.repartidor_id)
+        .where(PosicionRepartidor.actualizado_en >= desde, *vigentes(Repartidor))
+    )
+
+def reconstruir_indice_repartidores(db: Session):
+    """Cargar en el índice las posiciones recientes de los repartidores vigentes (tarea periódica del lifespan)"""
+    # Los cambios recibidos desde antes de la lectura se vuelven a aplicar tras el reemplazo
+    indice.iniciar_reconstruccion()
+    try:
+        filas = [dict(fila) for fila in db.execute(_posiciones_recientes()).mappings()]
+    except Exception:
+        indice.cancelar_reconstruccion()
+        raise
+    indice.reconstruir(filas)
+
+def _cercanos_en_base(db: Session, latitud, longitud, radio_km, limite, zona=None):
+    """Lo mismo que indice.cercanos, leyendo las posiciones guardadas dentro del rectángulo que cubre el radio"""
+    grados_lat = radio_km / KM_POR_GRADO
+    grados_lon = grados_lat / max(math.cos(math.radians(min(abs(latitud) + grados_lat, 89.9))), 1e-3)
+    consulta = _posiciones_recientes().where(
+        PosicionRepartidor.latitud.between(latitud - grados_lat, latitud + grados_lat),
+        PosicionRepartidor.longitud.between(longitud - grados_lon, longitud + grados_lon),
+    )
+    if zona is not None:
+        consulta = consulta.where(Repartidor.zona == zona)
+    encontrados = []
+    for fila in db.execute(consulta):
+        distancia = distancia_km(latitud, longitud, fila.latitud, fila.longitud)
+        if distancia <= radio_km:
+            encontrados.append({"repartidor_id": fila.repartidor_id, "zona": fila.zona, "distancia_km": distancia,
+                                "latitud": fila.latitud, "longitud": fila.longitud, "posicion_en": fila.actualizado_en})
+    return heapq.nsmallest(limite, encontrados, key=lambda c: (c["distancia_km"], c["repartidor_id"]))
+
+def _cargas(db: Session, ids):
+    """{repartidor_id: (zona, entregas en el horizonte de carga)} de los repartidores vigentes de `ids`"""
+    ahora = datetime.now()
+    consulta = (
+        select(Repartidor.id, Repartidor.zona, func.count(Entrega.id))
+        .outerjoin(Entrega, and_(
+            Entrega.repartidor_id == Repartidor.id,
+            Entrega.fecha >= ahora,
+            Entrega.fecha < ahora + timedelta(hours=config.REPARTIDORES_CARGA_HORAS),
+        ))
+        .where(Repartidor.id.in_(ids), *vigentes(Repartidor))
+        .group_by(Repartidor.id, Repartidor.zona)
+    )
+    return {repartidor_id: (zona, carga) for repartidor_id, zona, carga in db.execute(consulta)}
+
+def get_repartidores_cercanos(
+    db: Session,
+    latitud: float,
+    longitud: float,
+    k: int = 5,
+    zona: Optional[str] = None,
+    carga_max: Optional[int] = None,
+    radio_km: float = 20,
+):
+    """Los `k` repartidores disponibles más cercanos al punto, con su carga actual.
+
+    La búsqueda espacial se resuelve en el índice en memoria; la carga (y la
+    vigencia y zona del repartidor) se leen en una sola consulta agrupada
+    sobre los candidatos. Con `carga_max` se descartan los que la superan.
+    Nunca reconstruye el índice (lo hace el lifespan): mientras no esté listo
+    se buscan en la base las posiciones ya volcadas.
+    """
+    # Con filtro de carga hacen falta más candidatos que los k pedidos
+    limite = k if carga_max is None else MAX_CANDIDATOS
+    if indice.listo():
+        pendientes = indice.pendientes()
+        if pendientes:
+            registrar_repartidores(db, pendientes)
+        candidatos = calcular(indice.cercanos, latitud, longitud, radio_km, limite, zona)
+    else:
+        candidatos = _cercanos_en_base(db, latitud, longitud, radio_km, limite, zona)
+    if not candidatos:
+        return []
+    cargas = _cargas(db, [c["repartidor_id"] for c in candidatos])
+    indice.registrar({c["repartidor_id"]: None for c in candidatos if c["repartidor_id"] not in cargas})
+    resultado = []
+    for candidato in candidatos:
+        if candidato["repartidor_id"] not in cargas:
+            continue
+        zona_actual, carga = cargas[candidato["repartidor_id"]]
+        if (zona is not None and zona_actual != zona) or (carga_max is not None and carga > carga_max):
+            continue
+        resultado.append({**candidato, "zona": zona_actual, "distancia_km": round(candidato["distancia_km"], 3),
+                          "carga": carga})
+        if len(resultado) == k:
+            break
+    return resultado
+
+def asignar_entrega(db: Session, entrega_id: int, k: int = 5, zona: Optional[str] = None,
+                    carga_max: Optional[int] = None, radio_km: float = 20):
+    """Asignar la entrega al repartidor disponible más cercano a su punto.
+
+    Devuelve (candidatos, entrega actualizada o None si no hubo candidato);
+    None si la entrega no existe y RestriccionIncumplida si no tiene coordenadas.
+    """
+    tabla = Entrega.__table__
+    entrega = db.execute(select(tabla.c.latitud, tabla.c.longitud).where(tabla.c.id == entrega_id)).first()
+    if entrega is None:
+        return None
+    if entrega.latitud is None:
+        raise RestriccionIncumplida("La entrega no tiene coordenadas")
+    candidatos = get_repartidores_cercanos(db, entrega.latitud, entrega.longitud, k, zona, carga_max, radio_km)
+    if not candidatos:
+        return candidatos, None
+    return candidatos, actualizar_entrega(db, entrega_id, {"repartidor_id": candidatos[0]["repartidor_id"]})
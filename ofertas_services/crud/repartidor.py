@@ -1,38 +1,38 @@
+from typing import Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from models.entrega import Entrega
+from models.posicion_repartidor import PosicionRepartidor
 from models.repartidor import Repartidor
+from models.ruta_entrega import RutaEntrega
 from schemas import RepartidorCreate
+from paginacion import paginar
+from cache import cacheado
+from crud.escritura import insertar, actualizar, eliminar, archivar, columnas, vigentes
 
 def create_repartidor(db: Session, repartidor: RepartidorCreate):
-    """Crear nuevo repartidor"""
-    nuevo = Repartidor(**repartidor.dict())
-    db.add(nuevo)
-    db.commit()
-    db.refresh(nuevo)
-    return nuevo
+    """Crear nuevo repartidor (INSERT ... RETURNING, sin refresh)"""
+    return insertar(db, Repartidor, repartidor.model_dump())
 
-def get_repartidores(db: Session, skip: int = 0, limit: int = 100):
-    """Obtener todos los repartidores con paginación"""
-    return db.query(Repartidor).offset(skip).limit(limit).all()
+def get_repartidores(db: Session, cursor: Optional[str] = None, limit: int = 100):
+    """Obtener repartidores paginados por cursor sobre el id (dicts de columnas)"""
+    return paginar(db, select(*columnas(Repartidor)).where(*vigentes(Repartidor)), cursor, limit, Repartidor.id)
 
+def _get_repartidor(db: Session, repartidor_id: int, *opciones):
+    """Obtener repartidor por ID sin pasar por la cache (instancia ORM para las escrituras)"""
+    return db.query(Repartidor).options(*opciones).filter(Repartidor.id == repartidor_id, *vigentes(Repartidor)).first()
+
+@cacheado(Repartidor.__tablename__)
 def get_repartidor(db: Session, repartidor_id: int):
-    """Obtener repartidor por ID"""
-    return db.query(Repartidor).filter(Repartidor.id == repartidor_id).first()
+    """Obtener repartidor por ID con read-through en la cache de entidades"""
+    return _get_repartidor(db, repartidor_id)
 
-def update_repartidor(db: Session, repartidor_id: int, repartidor_data: RepartidorCreate):
-    """Actualizar repartidor existente"""
-    repartidor = get_repartidor(db, repartidor_id)
-    if repartidor:
-        for key, value in repartidor_data.dict().items():
-            setattr(repartidor, key, value)
-        db.commit()
-        db.refresh(repartidor)
-    return repartidor
+def update_repartidor(db: Session, repartidor_id: int, cambios: dict):
+    """Actualizar repartidor con un UPDATE ... RETURNING: todos los campos (PUT) o los enviados (PATCH)"""
+    return actualizar(db, Repartidor, repartidor_id, cambios)
 
-def delete_repartidor(db: Session, repartidor_id: int):
-    """Eliminar repartidor"""
-    repartidor = get_repartidor(db, repartidor_id)
-    if repartidor:
-        db.delete(repartidor)
-        db.commit()
-        return True
-    return False
\ No newline at end of file
+def delete_repartidor(db: Session, repartidor_id: int, archivado: bool = False):
+    """Eliminar repartidor con un solo DELETE (ON DELETE CASCADE borra sus entregas, rutas y posición) o archivarlo"""
+    if archivado:
+        return archivar(db, Repartidor, repartidor_id)
+    return eliminar(db, Repartidor, repartidor_id, hijos=[Entrega.repartidor_id, RutaEntrega.repartidor_id, PosicionRepartidor.repartidor_id])
\ No newline at end of file
@@ -0,0 +1,67 @@
+from datetime import date
+from typing import Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from paginacion import paginar
+from crud.escritura import vigentes
+from models.inventario_producto import InventarioProducto
+from models.repartidor import Repartidor
+from models.reporte import ReporteEntregasDiarias, ReporteOfertasProducto, ReporteRutasDiarias
+
+# Los reportes leen las tablas de rollup que mantienen los triggers de la migración 0008:
+# su costo depende de los días y repartidores del rango, no de las filas de origen.
+
+def get_entregas_diarias(db: Session, desde: date, hasta: date, repartidor_id: Optional[int] = None,
+                         cursor: Optional[str] = None, limit: int = 100):
+    """Entregas por día y repartidor en [desde, hasta]; repartidor_id None = sin asignar"""
+    consulta = select(*ReporteEntregasDiarias.__table__.columns).where(
+        ReporteEntregasDiarias.dia.between(desde, hasta), ReporteEntregasDiarias.entregas > 0
+    )
+    if repartidor_id is not None:
+        consulta = consulta.where(ReporteEntregasDiarias.repartidor_id == repartidor_id)
+    resultado = paginar(db, consulta, cursor, limit, ReporteEntregasDiarias.dia, ReporteEntregasDiarias.repartidor_id)
+    # El cursor ya se codificó con el 0 de la tabla
+    for fila in resultado["items"]:
+        fila["repartidor_id"] = fila["repartidor_id"] or None
+    return resultado
+
+def get_rutas_por_zona(db: Session, desde: date, hasta: date):
+    """Rutas terminadas y su duración media por zona (la actual de cada repartidor) en [desde, hasta]"""
+    rutas = func.sum(ReporteRutasDiarias.rutas)
+    filas = db.execute(
+        select(Repartidor.zona, rutas.label("rutas"), func.sum(ReporteRutasDiarias.segundos).label("segundos"))
+        .outerjoin(Repartidor, ReporteRutasDiarias.repartidor_id == Repartidor.id)
+        .where(ReporteRutasDiarias.dia.between(desde, hasta))
+        .group_by(Repartidor.zona)
+        .having(rutas > 0)
+        .order_by(rutas.desc())
+    ).mappings()
+    return [
+        {"zona": fila["zona"], "rutas": fila["rutas"], "minutos_promedio": round(fila["segundos"] / fila["rutas"] / 60, 1)}
+        for fila in filas
+    ]
+
+def _consulta_ofertas_producto():
+    return (
+        select(
+            ReporteOfertasProducto.producto_id,
+            InventarioProducto.nombre,
+            ReporteOfertasProducto.ofertas,
+            (ReporteOfertasProducto.precio_total / ReporteOfertasProducto.ofertas).label("precio_promedio"),
+        )
+        .join(InventarioProducto, ReporteOfertasProducto.producto_id == InventarioProducto.id)
+        .where(ReporteOfertasProducto.ofertas > 0, *vigentes(InventarioProducto))
+    )
+
+def get_ofertas_por_producto(db: Session, cursor: Optional[str] = None, limit: int = 100):
+    """Ofertas vigentes y su precio medio por producto, paginado por producto_id"""
+    return paginar(db, _consulta_ofertas_producto(), cursor, limit, ReporteOfertasProducto.producto_id)
+
+def get_productos_mas_ofertados(db: Session, limit: int = 10):
+    """Los `limit` productos con más ofertas vigentes (ix_reporte_ofertas_producto_ofertas)"""
+    filas = db.execute(
+        _consulta_ofertas_producto()
+        .order_by(ReporteOfertasProducto.ofertas.desc(), ReporteOfertasProducto.producto_id)
+        .limit(limit)
+    ).mappings()
+    return [dict(fila) for fila in filas]
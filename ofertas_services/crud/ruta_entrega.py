@@ -1,38 +1,100 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import and_, or_, select
 from sqlalchemy.orm import Session
+from models.entrega import Entrega
 from models.ruta_entrega import RutaEntrega
+from models.repartidor import Repartidor
 from schemas import RutaEntregaCreate
+from paginacion import paginar
+from crud.lote import crear_en_lote, actualizar_en_lote, eliminar_en_lote
+from cache import cacheado
+from crud.escritura import insertar, actualizar, eliminar, vigentes
+from crud.busqueda import buscar
+from busqueda import rutas as indice_destinos
 
 def create_ruta_entrega(db: Session, ruta: RutaEntregaCreate):
-    """Crear nueva ruta de entrega"""
-    nueva = RutaEntrega(**ruta.dict())
-    db.add(nueva)
-    db.commit()
-    db.refresh(nueva)
-    return nueva
+    """Crear nueva ruta de entrega (INSERT ... RETURNING, sin refresh)"""
+    return insertar(db, RutaEntrega, ruta.model_dump())
 
-def get_rutas_entrega(db: Session, skip: int = 0, limit: int = 100):
-    """Obtener todas las rutas con paginación"""
-    return db.query(RutaEntrega).offset(skip).limit(limit).all()
+def get_rutas_entrega(db: Session, cursor: Optional[str] = None, limit: int = 100):
+    """Obtener rutas paginadas por cursor sobre el id (dicts de columnas)"""
+    return paginar(db, select(*RutaEntrega.__table__.columns), cursor, limit, RutaEntrega.id)
 
-def get_ruta_entrega(db: Session, ruta_id: int):
-    """Obtener ruta por ID"""
+def buscar_rutas_entrega(db: Session, q: str, limit: int = 20):
+    """Rutas por destino, sin tildes y tolerante a erratas, de la más parecida a la menos"""
+    return buscar(db, RutaEntrega, RutaEntrega.destino, indice_destinos, q, limit)
+
+def _get_ruta_entrega(db: Session, ruta_id: int):
+    """Obtener ruta por ID sin pasar por la cache (instancia ORM para las escrituras)"""
     return db.query(RutaEntrega).filter(RutaEntrega.id == ruta_id).first()
 
-def update_ruta_entrega(db: Session, ruta_id: int, ruta_data: RutaEntregaCreate):
-    """Actualizar ruta existente"""
-    ruta = get_ruta_entrega(db, ruta_id)
-    if ruta:
-        for key, value in ruta_data.dict().items():
-            setattr(ruta, key, value)
-        db.commit()
-        db.refresh(ruta)
-    return ruta
+@cacheado(RutaEntrega.__tablename__)
+def get_ruta_entrega(db: Session, ruta_id: int):
+    """Obtener ruta por ID con read-through en la cache de entidades"""
+    return _get_ruta_entrega(db, ruta_id)
+
+def update_ruta_entrega(db: Session, ruta_id: int, cambios: dict):
+    """Actualizar ruta con un UPDATE ... RETURNING: todos los campos (PUT) o los enviados (PATCH)"""
+    condiciones = []
+    # Con una sola de las horas, la otra es la guardada: el orden se exige en el WHERE
+    if cambios.get("hora_llegada") is not None and "hora_salida" not in cambios:
+        condiciones.append(RutaEntrega.hora_salida < cambios["hora_llegada"])
+    if "hora_salida" in cambios and "hora_llegada" not in cambios:
+        condiciones.append(or_(RutaEntrega.hora_llegada.is_(None), RutaEntrega.hora_llegada > cambios["hora_salida"]))
+    return actualizar(db, RutaEntrega, ruta_id, cambios, condiciones,
+                      "La hora de llegada debe ser posterior a la hora de salida")
 
 def delete_ruta_entrega(db: Session, ruta_id: int):
-    """Eliminar ruta"""
-    ruta = get_ruta_entrega(db, ruta_id)
-    if ruta:
-        db.delete(ruta)
-        db.commit()
-        return True
-    return False
\ No newline at end of file
+    """Eliminar ruta con un DELETE ... RETURNING (sin lectura previa)"""
+    return eliminar(db, RutaEntrega, ruta_id)
+
+def bulk_create_rutas_entrega(db: Session, items: list):
+    """Crear rutas en lote"""
+    return crear_en_lote(db, RutaEntrega, RutaEntregaCreate, items, [("repartidor_id", Repartidor)])
+
+def bulk_update_rutas_entrega(db: Session, items: list):
+    """Actualizar rutas en lote"""
+    return actualizar_en_lote(db, RutaEntrega, RutaEntregaCreate, items, [("repartidor_id", Repartidor)])
+
+def bulk_delete_rutas_entrega(db: Session, ids: list):
+    """Eliminar rutas en lote"""
+    return eliminar_en_lote(db, RutaEntrega, ids)
+
+
+# Tabla de la que salen las paradas a optimizar y su columna de fecha para acotarlas
+FUENTES_PARADAS = {
+    "entregas": (Entrega, Entrega.fecha),
+    "rutas": (RutaEntrega, RutaEntrega.hora_salida),
+}
+
+def get_paradas(
+    db: Session,
+    repartidor_id: Optional[int] = None,
+    zona: Optional[str] = None,
+    fuente: str = "entregas",
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+):
+    """Paradas con coordenadas de un repartidor o de los de una zona, en una consulta.
+
+    Devuelve {repartidor_id: [{"id", "latitud", "longitud"}]}; los repartidores
+    archivados y las filas sin coordenadas no se incluyen.
+    """
+    modelo, fecha = FUENTES_PARADAS[fuente]
+    consulta = (
+        select(modelo.repartidor_id, modelo.id, modelo.latitud, modelo.longitud)
+        .join(Repartidor, and_(Repartidor.id == modelo.repartidor_id, *vigentes(Repartidor)))
+        .where(modelo.latitud.is_not(None), modelo.longitud.is_not(None))
+        .where(Repartidor.id == repartidor_id if repartidor_id is not None else Repartidor.zona == zona)
+    )
+    if desde is not None:
+        consulta = consulta.where(fecha >= desde)
+    if hasta is not None:
+        consulta = consulta.where(fecha < hasta)
+    paradas = {}
+    for fila in db.execute(consulta.order_by(modelo.repartidor_id, modelo.id)):
+        paradas.setdefault(fila.repartidor_id, []).append(
+            {"id": fila.id, "latitud": fila.latitud, "longitud": fila.longitud}
+        )
+    return paradas
@@ -0,0 +1,88 @@
+"""Motor de descuentos dinámicos: precio de oferta según la antigüedad de cada producto.
+
+El descuento crece con la fracción consumida de la vida útil (desde
+fecha_ingreso) siguiendo una curva configurable, entre un mínimo y un máximo.
+Todo el cálculo es aritmética de arrays sobre el inventario completo; la
+lectura y la escritura (upsert por lotes, simulación con diff) están en
+crud/oferta_reducida.py.
+
+Uso (desde ofertas_services/):
+    python descuentos.py --simular
+    python descuentos.py --curva exponencial --vida-util-horas 96 --descuento-max 0.8
+"""
+import argparse
+import json
+from datetime import datetime
+
+import numpy as np
+
+import config
+
+CURVAS = ("lineal", "exponencial", "escalonada")
+
+
+def fraccion_descuento(consumida: np.ndarray, curva: str, descuento_min: float, descuento_max: float,
+                       pendiente: float = 3.0, escalones: int = 4) -> np.ndarray:
+    """Descuento (0..1) para cada fracción de vida útil consumida (0..1).
+
+    - lineal: crece a ritmo constante.
+    - exponencial: casi plano al principio y acelera cerca de la caducidad
+      (`pendiente` > 0 controla cuánto).
+    - escalonada: `escalones` niveles fijos, de descuento_min a descuento_max.
+    """
+    x = np.clip(consumida, 0.0, 1.0)
+    if curva == "lineal":
+        forma = x
+    elif curva == "exponencial":
+        forma = np.expm1(pendiente * x) / np.expm1(pendiente)
+    elif curva == "escalonada":
+        forma = np.minimum(np.floor(x * escalones), escalones - 1) / max(escalones - 1, 1)
+    else:
+        raise ValueError(f"Curva desconocida: {curva}")
+    return descuento_min + (descuento_max - descuento_min) * forma
+
+
+def calcular_ofertas(precios: np.ndarray, ingresos: np.ndarray, ahora: datetime, vida_util_horas: float,
+                     curva: str, descuento_min: float, descuento_max: float, pendiente: float = 3.0):
+    """Precio de oferta y fin de la oferta (la caducidad) de cada producto.
+
+    `ingresos` es un array datetime64. Devuelve (precios_oferta, fechas_fin,
+    vigentes): los productos que ya superaron su vida útil quedan con
+    vigentes=False y no reciben oferta. Los precios se redondean al céntimo y
+    nunca bajan de 0.01.
+    """
+    vida_util = np.timedelta64(int(vida_util_horas * 3600 * 1e6), "us")
+    edad = np.datetime64(ahora, "us") - ingresos.astype("datetime64[us]")
+    consumida = edad / vida_util
+    descuento = fraccion_descuento(consumida, curva, descuento_min, descuento_max, pendiente)
+    precios_oferta = np.maximum(np.round(precios * (1 - descuento), 2), 0.01)
+    fechas_fin = ingresos.astype("datetime64[us]") + vida_util
+    return precios_oferta, fechas_fin, consumida < 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--curva", choices=CURVAS, default=config.DESCUENTOS_CURVA)
+    parser.add_argument("--vida-util-horas", type=float, default=config.DESCUENTOS_VIDA_UTIL_HORAS)
+    parser.add_argument("--descuento-min", type=float, default=config.DESCUENTOS_MIN)
+    parser.add_argument("--descuento-max", type=float, default=config.DESCUENTOS_MAX)
+    parser.add_argument("--pendiente", type=float, default=config.DESCUENTOS_PENDIENTE)
+    parser.add_argument("--simular", action="store_true", help="Calcular y mostrar el diff sin escribir")
+    parser.add_argument("--muestra", type=int, default=20, help="Cambios a detallar en el diff")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+    from crud.oferta_reducida import repreciar_ofertas
+    from schemas import RepreciarRequest
+
+    parametros = RepreciarRequest(
+        curva=args.curva, vida_util_horas=args.vida_util_horas, descuento_min=args.descuento_min,
+        descuento_max=args.descuento_max, pendiente=args.pendiente, simular=args.simular, muestra=args.muestra,
+    )
+    with SessionLocal() as db:
+        resultado = repreciar_ofertas(db, parametros)
+    print(json.dumps(resultado, indent=2, default=str, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""Difusión de cambios a clientes conectados (GET /stream por SSE o WebSocket).
+
+Las escrituras de crud/* publican sus cambios (cambios.py) y este módulo los
+reenvía a los clientes suscritos, para que no tengan que sondear los listados:
+
+- Un hilo emisor toma los cambios de una cola acotada, resuelve la zona del
+  repartidor de cada entrega o ruta (una consulta por tanda) y los serializa
+  una sola vez, como líneas JSON.
+- Con PostgreSQL las líneas se publican con NOTIFY y un hilo en LISTEN las
+  recibe en cada worker, así que todos ven los cambios de todos. Con otras
+  bases se entregan directamente en el worker que escribió.
+- Con PostgreSQL se relevan los cambios de todas las tablas, no solo las que
+  se difunden: el oyente los vuelve a publicar en cambios.py como remotos
+  (publicar(..., remoto=True)) para que la cache, los ETag y los índices en
+  memoria de cada worker se enteren de las escrituras de los demás. El relevo
+  no recibe los remotos, así que no se reenvían; cada paquete lleva el origen
+  para descartar los propios.
+- El difusor reparte cada línea, en el event loop, a los suscriptores de su
+  tabla y su zona (entregas, rutas) o producto (ofertas). Cada suscriptor
+  tiene una cola acotada: si se llena, se vacía y recibe un evento "resync"
+  para releer los listados. Un suscriptor inactivo ocupa unos 2 KB.
+
+No hay historial: al conectar (o tras un resync) el cliente lee el estado
+actual con los listados y a partir de ahí aplica los eventos.
+"""
+import asyncio
+import json
+import logging
+import queue
+import select as seleccion
+import threading
+import uuid
+from collections import defaultdict, deque
+from datetime import date, datetime
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.pool import NullPool
+
+import config
+from cambios import publicar, suscribir, CASCADA
+from serializacion import dumps
+
+logger = logging.getLogger(__name__)
+
+# Tablas que se difunden y el campo del evento por el que filtran los clientes
+FILTROS = {"oferta_reducida": "producto_id", "entrega": "zona", "ruta_entrega": "zona"}
+
+# Bytes máximos de un NOTIFY (PostgreSQL rechaza cargas de 8000 o más)
+MAX_CARGA = 7500
+
+# Evento para un suscriptor que perdió eventos: debe releer los listados
+RESYNC = '{"tipo":"resync"}'
+
+
+class Suscriptor:
+    """Un cliente conectado: sus filtros y una cola acotada de eventos ya serializados.
+
+    La cola es un deque y el envío espera en un Future que solo existe
+    mientras no hay eventos: un suscriptor inactivo ocupa unos 2 KB (con un
+    asyncio.Queue por cliente, más del doble).
+    """
+
+    __slots__ = ("tablas", "valores", "tamano_cola", "_eventos", "_esperando", "_cerrado")
+
+    def __init__(self, tablas, zonas, productos, tamano_cola: int):
+        self.tablas = tablas
+        self.valores = {"zona": zonas, "producto_id": productos}
+        self.tamano_cola = tamano_cola
+        self._eventos = deque()
+        self._esperando = None
+        self._cerrado = False
+
+    def claves(self):
+        """(tabla, valor) bajo las que se registra; valor None = todos los eventos de la tabla"""
+        for tabla in self.tablas:
+            valores = self.valores[FILTROS[tabla]]
+            if valores:
+                yield from ((tabla, valor) for valor in valores)
+            else:
+                yield tabla, None
+
+    def pendientes(self) -> int:
+        return len(self._eventos)
+
+    def entregar(self, evento) -> bool:
+        """Encolar un evento; False si la cola estaba llena (se reemplaza por un resync)"""
+        if self._cerrado:
+            return True
+        completa = len(self._eventos) >= self.tamano_cola
+        if completa:
+            self._eventos.clear()
+            evento = RESYNC
+        self._eventos.append(evento)
+        self._despertar()
+        return not completa
+
+    def cerrar(self):
+        """Terminar el envío: None como último elemento de la cola"""
+        self._cerrado = True
+        self._eventos.clear()
+        self._eventos.append(None)
+        self._despertar()
+
+    def _despertar(self):
+        if self._esperando is not None and not self._esperando.done():
+            self._esperando.set_result(None)
+
+    async def siguiente(self):
+        """El próximo evento, esperando a que llegue; None cuando se cierra"""
+        while not self._eventos:
+            self._esperando = asyncio.get_running_loop().create_future()
+            try:
+                await self._esperando
+            finally:
+                self._esperando = None
+        return self._eventos.popleft()
+
+
+class Difusor:
+    """Suscriptores del worker indexados por (tabla, valor del filtro).
+
+    Solo se usa desde el event loop (los hilos llegan con call_soon_threadsafe),
+    así que no necesita lock.
+    """
+
+    def __init__(self, max_suscriptores: int, tamano_cola: int):
+        self.max_suscriptores = max_suscriptores
+        self.tamano_cola = tamano_cola
+        self._indice = defaultdict(set)      # (tabla, valor) -> suscriptores; valor None = sin filtro
+        self._por_tabla = defaultdict(set)   # tabla -> todos sus suscriptores
+        self._suscriptores = set()
+        self._contadores = {"eventos": 0, "entregas": 0, "desbordes": 0}
+
+    def lleno(self) -> bool:
+        return len(self._suscriptores) >= self.max_suscriptores
+
+    def suscribir(self, tablas, zonas, productos):
+        """Registrar un suscriptor; None si el worker ya tiene el máximo"""
+        if self.lleno():
+            return None
+        suscriptor = Suscriptor(tablas, zonas, productos, self.tamano_cola)
+        for clave in suscriptor.claves():
+            self._indice[clave].add(suscriptor)
+        for tabla in tablas:
+            self._por_tabla[tabla].add(suscriptor)
+        self._suscriptores.add(suscriptor)
+        return suscriptor
+
+    def cancelar(self, suscriptor):
+        if suscriptor not in self._suscriptores:
+            return
+        self._suscriptores.discard(suscriptor)
+        for clave in suscriptor.claves():
+            self._indice[clave].discard(suscriptor)
+            if not self._indice[clave]:
+                del self._indice[clave]
+        for tabla in suscriptor.tablas:
+            self._por_tabla[tabla].discard(suscriptor)
+
+    def _destinos(self, evento):
+        if evento.get("tipo") == "resync":
+            return self._suscriptores
+        tabla = evento["tabla"]
+        campo = FILTROS.get(tabla)
+        if campo is None:
+            return ()
+        if campo not in evento:
+            # Sin el valor del filtro (p. ej. un borrado, que solo trae el id): a todos los de la tabla
+            return self._por_tabla[tabla]
+        destinos = self._indice.get((tabla, None), set())
+        if evento[campo] is not None:
+            destinos = destinos | self._indice.get((tabla, evento[campo]), set())
+        return destinos
+
+    def repartir(self, lineas):
+        """Entregar cada línea (un evento en JSON) a los suscriptores cuyos filtros coinciden"""
+        for linea in lineas:
+            self._contadores["eventos"] += 1
+            for suscriptor in list(self._destinos(json.loads(linea))):
+                self._contadores["entregas"] += 1
+                if not suscriptor.entregar(linea):
+                    self._contadores["desbordes"] += 1
+
+    def cerrar_todos(self):
+        for suscriptor in list(self._suscriptores):
+            suscriptor.cerrar()
+
+    def resumen(self):
+        return {
+            "suscriptores": len(self._suscriptores),
+            "max_suscriptores": self.max_suscriptores,
+            "eventos_en_cola": sum(s.pendientes() for s in self._suscriptores),
+            **self._contadores,
+        }
+
+
+class Relevo:
+    """Lleva los cambios publicados en este proceso hasta los difusores de todos los workers"""
+
+    def __init__(self, difusor: Difusor, max_pendientes: int, canal: str):
+        self.difusor = difusor
+        self.canal = canal
+        self._pendientes = queue.Queue(maxsize=max_pendientes)
+        self._parar = threading.Event()
+        self._hilos = []
+        self._bucle = None
+        self._motor = None
+        self._activo = False
+        self._notifica = False
+        # Identifica los paquetes de este proceso, que el oyente no vuelve a publicar
+        self.origen = uuid.uuid4().hex
+        self.descartados = 0
+
+    # Lado de las escrituras (cualquier hilo)
+
+    def encolar(self, tabla, accion, filas):
+        """Suscriptor de cambios.py (solo los cambios locales): no bloquea la escritura; si la cola está llena se descarta"""
+        if not self._activo or (tabla not in FILTROS and not self._notifica):
+            return
+        try:
+            self._pendientes.put_nowait((tabla, accion, filas))
+        except queue.Full:
+            if not self.descartados:
+                logger.warning("Cola de difusión llena: se descartan cambios (STREAM_PENDIENTES)")
+            self.descartados += len(filas)
+
+    # Arranque y parada (desde el lifespan)
+
+    def iniciar(self, bucle=None):
+        """Arrancar los hilos. Sin `bucle` (un proceso sin clientes, como la CLI de caducidad) solo
+        se emiten los cambios con NOTIFY; con otras bases no hay a quién entregarlos y no se arranca nada.
+        """
+        from database import DATABASE_URL, engine
+
+        self._bucle = bucle
+        self._parar.clear()
+        if engine.dialect.name == "postgresql":
+            # Conexiones propias fuera del pool: LISTEN y NOTIFY las ocupan mientras vive el worker
+            self._motor = create_engine(DATABASE_URL, poolclass=NullPool, isolation_level="AUTOCOMMIT")
+            destinos = (self._emitir, self._escuchar) if bucle is not None else (self._emitir,)
+        else:
+            self._motor = engine
+            destinos = (self._emitir,) if bucle is not None else ()
+        self._notifica = engine.dialect.name == "postgresql"
+        self._activo = bool(destinos)
+        self._hilos = [threading.Thread(target=destino, name=f"difusion-{destino.__name__}", daemon=True)
+                       for destino in destinos]
+        for hilo in self._hilos:
+            hilo.start()
+
+    def detener(self):
+        """Parar los hilos (el emisor vacía antes la cola) y cerrar los envíos en curso"""
+        self._activo = False
+        self._parar.set()
+        for hilo in self._hilos:
+            hilo.join(timeout=5)
+        if self._bucle is not None:
+            self._bucle.call_soon_threadsafe(self.difusor.cerrar_todos)
+        self._bucle = None
+        if self._motor is not None and self._motor.dialect.name == "postgresql":
+            self._motor.dispose()
+
+    # Hilo emisor
+
+    def _tanda(self):
+        """Los cambios pendientes (esperando hasta 1 s por el primero); [] si no hubo"""
+        try:
+            cambios = [self._pendientes.get(timeout=1)]
+        except queue.Empty:
+            return []
+        while len(cambios) < 1000:
+            try:
+                cambios.append(self._pendientes.get_nowait())
+            except queue.Empty:
+                break
+        return cambios
+
+    def _zonas(self, conexion, cambios):
+        """Zona de cada repartidor de las entregas y rutas de la tanda, leída en una consulta"""
+        from models.repartidor import Repartidor
+
+        ids = {
+            fila["repartidor_id"]
+            for tabla, accion, filas in cambios if FILTROS.get(tabla) == "zona" and accion != CASCADA
+            for fila in filas if fila.get("repartidor_id") is not None
+        }
+        if not ids:
+            return {}
+        return dict(conexion.execute(select(Repartidor.id, Repartidor.zona).where(Repartidor.id.in_(ids))).all())
+
+    def _lineas(self, cambios, zonas):
+        for tabla, accion, filas in cambios:
+            for fila in filas:
+                evento = {"tabla": tabla, "accion": accion, "fila": fila}
+                if tabla == "oferta_reducida":
+                    if "producto_id" in fila:
+                        evento["producto_id"] = fila["producto_id"]
+                elif "repartidor_id" in fila and accion != CASCADA:
+                    # En CASCADA el repartidor ya no existe: zona desconocida, va a todos
+                    evento["zona"] = zonas.get(fila["repartidor_id"])
+                linea = dumps(evento).decode()
+                if len(linea.encode()) > MAX_CARGA:
+                    evento["fila"] = {"id": fila.get("id")}
+                    evento["recortado"] = True
+                    linea = dumps(evento).decode()
+                yield linea
+
+    def _notificar(self, conexion, lineas):
+        """NOTIFY en paquetes de líneas que no superen MAX_CARGA; la primera línea de cada paquete es el origen"""
+        inicio = len(self.origen) + 1
+        paquete, tamano = [self.origen], inicio
+        for linea in lineas:
+            largo = len(linea.encode()) + 1
+            if len(paquete) > 1 and tamano + largo > MAX_CARGA:
+                conexion.execute(text("SELECT pg_notify(:canal, :carga)"), {"canal": self.canal, "carga": "\n".join(paquete)})
+                paquete, tamano = [self.origen], inicio
+            paquete.append(linea)
+            tamano += largo
+        if len(paquete) > 1:
+            conexion.execute(text("SELECT pg_notify(:canal, :carga)"), {"canal": self.canal, "carga": "\n".join(paquete)})
+
+    def _emitir(self):
+        postgresql = self._motor.dialect.name == "postgresql"
+        while not self._parar.is_set() or not self._pendientes.empty():
+            cambios = self._tanda()
+            if not cambios:
+                continue
+            try:
+                with self._motor.connect() as conexion:
+                    lineas = list(self._lineas(cambios, self._zonas(conexion, cambios)))
+                    if postgresql:
+                        self._notificar(conexion, lineas)
+                if not postgresql:
+                    self._bucle.call_soon_threadsafe(self.difusor.repartir, lineas)
+            except Exception:
+                logger.exception("No se pudieron difundir %d cambios", sum(len(filas) for _, _, filas in cambios))
+
+    # Hilo oyente (PostgreSQL)
+
+    def _escuchar(self):
+        reconexion = False
+        while not self._parar.is_set():
+            try:
+                conexion = self._motor.raw_connection()
+                try:
+                    dbapi = conexion.dbapi_connection
+                    dbapi.autocommit = True
+                    dbapi.cursor().execute(f"LISTEN {self.canal}")
+                    if reconexion:
+                        # Sin LISTEN se pudieron perder eventos: todos releen
+                        self._bucle.call_soon_threadsafe(self.difusor.repartir, [RESYNC])
+                    reconexion = True
+                    while not self._parar.is_set():
+                        if not seleccion.select([dbapi], [], [], 1)[0]:
+                            continue
+                        dbapi.poll()
+                        lineas = []
+                        while dbapi.notifies:
+                            origen, *recibidas = dbapi.notifies.pop(0).payload.split("\n")
+                            lineas.extend(self._recibir(origen, recibidas))
+                        if lineas:
+                            self._bucle.call_soon_threadsafe(self.difusor.repartir, lineas)
+                finally:
+                    conexion.close()
+            except Exception:
+                logger.exception("Se perdió la conexión de LISTEN; reintentando")
+                self._parar.wait(1)
+
+    def _recibir(self, origen, lineas):
+        """Publicar como remotos los cambios de otros workers; devuelve las líneas que se difunden a clientes"""
+        difundir = []
+        for linea in lineas:
+            evento = json.loads(linea)
+            tabla = evento.get("tabla")
+            if tabla is None:
+                continue
+            if origen != self.origen:
+                publicar(tabla, evento["accion"], [_fila_local(tabla, evento["fila"])], remoto=True)
+            if tabla in FILTROS:
+                difundir.append(linea)
+        return difundir
+
+    def resumen(self):
+        return {
+            "relevo": "notify" if self._motor is not None and self._motor.dialect.name == "postgresql" else "local",
+            "activo": self._activo,
+            "cambios_pendientes": self._pendientes.qsize(),
+            "filas_descartadas": self.descartados,
+        }
+
+
+def _fila_local(tabla, fila):
+    """La fila recibida en JSON con sus fechas de nuevo como date/datetime, como la publica crud/*"""
+    from database import Base
+
+    columnas = Base.metadata.tables[tabla].columns if tabla in Base.metadata.tables else {}
+    for clave, valor in fila.items():
+        if isinstance(valor, str) and clave in columnas:
+            tipo = columnas[clave].type.python_type
+            if tipo in (date, datetime):
+                fila[clave] = tipo.fromisoformat(valor)
+    return fila
+
+
+difusor = Difusor(max_suscriptores=config.STREAM_MAX_SUSCRIPTORES, tamano_cola=config.STREAM_COLA)
+relevo = Relevo(difusor, max_pendientes=config.STREAM_PENDIENTES, canal=config.STREAM_CANAL)
+suscribir("*", relevo.encolar, remotos=False)
+
+
+def estado_stream():
+    return {**difusor.resumen(), **relevo.resumen()}
@@ -0,0 +1,161 @@
+"""Gestión del esquema de la base de datos: migraciones (Alembic) y verificación de planes.
+
+Uso (desde ofertas_services/):
+    python esquema.py migrar      # alembic upgrade head
+    python esquema.py verificar   # ¿la base está en la última revisión? (código de salida 1 si no)
+    python esquema.py planes      # EXPLAIN de las consultas calientes de crud/*
+"""
+import argparse
+import logging
+import os
+import re
+import sys
+from datetime import datetime
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import delete, inspect, select
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger(__name__)
+
+
+def configuracion_alembic():
+    configuracion = Config(os.path.join(DIRECTORIO, "alembic.ini"))
+    configuracion.set_main_option("script_location", os.path.join(DIRECTORIO, "migraciones"))
+    # Llamado desde el servicio, los logs los configura quien lo llama: el fileConfig
+    # de alembic.ini desactivaría los loggers ya creados (el de este módulo incluido)
+    configuracion.attributes["configurar_logs"] = False
+    return configuracion
+
+
+def migrar(motor):
+    """Llevar la base a la última revisión.
+
+    Una base creada por el antiguo create_all (tablas sin alembic_version) se
+    marca primero en 0001, que describe exactamente ese esquema.
+    """
+    configuracion = configuracion_alembic()
+    tablas = inspect(motor).get_table_names()
+    if "alembic_version" not in tablas and "inventario_producto" in tablas:
+        logger.warning("Base creada con create_all: se marca en la revisión 0001")
+        command.stamp(configuracion, "0001")
+    command.upgrade(configuracion, "head")
+
+
+def estado_esquema(motor):
+    """Revisión aplicada en la base frente a la última de migraciones/"""
+    esperada = ScriptDirectory.from_config(configuracion_alembic()).get_current_head()
+    with motor.connect() as conexion:
+        actual = MigrationContext.configure(conexion).get_current_revision()
+    return {"actual": actual, "esperada": esperada, "al_dia": actual == esperada}
+
+
+def consultas_calientes():
+    """(descripción, sentencia, índices aceptables) de las consultas de crud/* que dependen de índices secundarios"""
+    from caducidad import ofertas_vencidas, productos_vencidos
+    from crud.escritura import columnas
+    from crud.oferta_reducida import _consulta_con_producto
+    from models.entrega import Entrega
+    from models.inventario_producto import InventarioProducto
+    from models.oferta_reducida import OfertaReducida
+    from models.posicion_repartidor import PosicionRepartidor
+    from models.reporte import ReporteEntregasDiarias, ReporteOfertasProducto
+    from models.ruta_entrega import RutaEntrega
+
+    ahora = datetime(2024, 1, 1, 12, 0)
+    return [
+        ("entregas de un repartidor (ON DELETE CASCADE de delete_repartidor)",
+         select(Entrega.id).where(Entrega.repartidor_id == 1), ("ix_entrega_repartidor_id",)),
+        ("rutas de un repartidor (ON DELETE CASCADE de delete_repartidor)",
+         select(RutaEntrega.id).where(RutaEntrega.repartidor_id == 1), ("ix_ruta_entrega_repartidor_id",)),
+        ("ofertas de una página de productos (get_inventario_productos_con_ofertas)",
+         select(*columnas(OfertaReducida)).where(OfertaReducida.producto_id.in_([1, 2, 3])),
+         ("ix_oferta_reducida_producto_id",)),
+        ("borrado de ofertas hijas (ON DELETE CASCADE de delete_inventario_producto)",
+         delete(OfertaReducida).where(OfertaReducida.producto_id.in_([1, 2, 3])), ("ix_oferta_reducida_producto_id",)),
+        ("ofertas vigentes fuera del índice en memoria (get_ofertas_activas)",
+         _consulta_con_producto().where(OfertaReducida.fecha_inicio <= ahora, OfertaReducida.fecha_fin > ahora),
+         # Según las estadísticas el planificador puede preferir acotar solo por fecha_fin (entre las no retiradas)
+         ("ix_oferta_reducida_ventana", "ix_oferta_reducida_fecha_fin", "ix_oferta_reducida_caducidad")),
+        ("ofertas vencidas por retirar (caducidad.py)", ofertas_vencidas(ahora, 1000),
+         ("ix_oferta_reducida_caducidad",)),
+        ("productos vencidos por expirar (caducidad.py)", productos_vencidos(ahora, 1000),
+         ("ix_inventario_producto_caducidad",)),
+        ("posiciones recientes (reconstrucción del índice de repartidores)",
+         select(PosicionRepartidor.repartidor_id).where(PosicionRepartidor.actualizado_en >= ahora),
+         ("ix_posicion_repartidor_actualizado_en",)),
+        ("entregas diarias de un repartidor (GET /reportes/entregas-diarias)",
+         select(ReporteEntregasDiarias.dia).where(ReporteEntregasDiarias.repartidor_id == 1,
+                                                  ReporteEntregasDiarias.dia >= ahora.date()),
+         ("ix_reporte_entregas_diarias_repartidor",)),
+        ("productos con más ofertas (GET /reportes/ofertas-por-producto/top)",
+         select(ReporteOfertasProducto.producto_id).order_by(ReporteOfertasProducto.ofertas.desc()).limit(10),
+         ("ix_reporte_ofertas_producto_ofertas",)),
+        ("productos por estado", select(InventarioProducto.id).where(InventarioProducto.estado == "Disponible"),
+         ("ix_inventario_producto_estado",)),
+    ]
+
+
+def _indices_usados(conexion, sentencia):
+    """Nombres de índice que aparecen en el plan de `sentencia`"""
+    compilada = sentencia.compile(dialect=conexion.dialect, compile_kwargs={"render_postcompile": True})
+    parametros = (
+        tuple(compilada.params[nombre] for nombre in compilada.positiontup)
+        if compilada.positional else compilada.params
+    )
+    if conexion.dialect.name == "postgresql":
+        # Con tablas pequeñas el planificador prefiere un seq scan; se desactiva
+        # para comprobar que el índice es utilizable por la consulta
+        conexion.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = conexion.exec_driver_sql("EXPLAIN (FORMAT JSON) " + compilada.string, parametros).scalar()
+        nombres = set()
+        pendientes = [plan[0]["Plan"]]
+        while pendientes:
+            nodo = pendientes.pop()
+            if "Index Name" in nodo:
+                nombres.add(nodo["Index Name"])
+            pendientes.extend(nodo.get("Plans", []))
+        return nombres
+    filas = conexion.exec_driver_sql("EXPLAIN QUERY PLAN " + compilada.string, parametros).all()
+    return {nombre for fila in filas for nombre in re.findall(r"INDEX (\w+)", fila[-1])}
+
+
+def verificar_planes(motor):
+    """Comprobar con EXPLAIN que cada consulta caliente usa su índice; devuelve True si todas lo hacen"""
+    correcto = True
+    with motor.connect() as conexion:
+        for descripcion, sentencia, aceptables in consultas_calientes():
+            with conexion.begin() as transaccion:
+                usados = _indices_usados(conexion, sentencia)
+                transaccion.rollback()
+            ok = bool(usados & set(aceptables))
+            correcto &= ok
+            print(f"{'OK   ' if ok else 'FALTA'} {aceptables[0]:<38} {descripcion}  (plan: {', '.join(sorted(usados)) or 'sin índices'})")
+    return correcto
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("accion", choices=("migrar", "verificar", "planes"))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    from database import engine
+
+    if args.accion == "migrar":
+        migrar(engine)
+    elif args.accion == "verificar":
+        estado = estado_esquema(engine)
+        print(f"Revisión aplicada: {estado['actual']}, última: {estado['esperada']}")
+        if not estado["al_dia"]:
+            sys.exit(1)
+    elif not verificar_planes(engine):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import csv
+import io
+from datetime import datetime
+
+from fastapi.responses import StreamingResponse
+
+from serializacion import dumps
+
+# Formatos de exportación soportados y su tipo de contenido (Starlette añade "; charset=utf-8" a los text/*)
+TIPOS_CONTENIDO = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+async def _ndjson(lotes):
+    async for lote in lotes:
+        if lote:
+            yield b"".join(dumps(fila) + b"\n" for fila in lote)
+
+
+async def _csv(lotes, columnas):
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=columnas, extrasaction="ignore")
+    escritor.writeheader()
+    async for lote in lotes:
+        escritor.writerows(
+            {k: v.isoformat() if isinstance(v, datetime) else v for k, v in fila.items()} for fila in lote
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def anidar_hijos(lotes, clave, campo_hijos, columnas_hijo):
+    """Convertir filas de un LEFT JOIN ordenado por `clave` en padres con su lista de hijos.
+
+    `columnas_hijo` mapea la etiqueta plana de cada columna del hijo a su nombre
+    anidado. Solo se retiene el padre en curso, así que la memoria no depende
+    del total de filas.
+    """
+    clave_hijo = next(iter(columnas_hijo))
+    actual = None
+    async for lote in lotes:
+        completos = []
+        for fila in lote:
+            if actual is None or actual[clave] != fila[clave]:
+                if actual is not None:
+                    completos.append(actual)
+                actual = {k: v for k, v in fila.items() if k not in columnas_hijo}
+                actual[campo_hijos] = []
+            if fila[clave_hijo] is not None:
+                actual[campo_hijos].append({nombre: fila[etiqueta] for etiqueta, nombre in columnas_hijo.items()})
+        yield completos
+    if actual is not None:
+        yield [actual]
+
+
+def respuesta_exportacion(lotes, formato: str, columnas, nombre: str):
+    """StreamingResponse en NDJSON (un objeto por línea) o CSV con cabecera"""
+    cuerpo = _ndjson(lotes) if formato == "ndjson" else _csv(lotes, columnas)
+    return StreamingResponse(
+        cuerpo,
+        media_type=TIPOS_CONTENIDO[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'},
+    )
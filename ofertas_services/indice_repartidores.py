@@ -0,0 +1,260 @@
+import heapq
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import config
+from cambios import suscribir, ELIMINAR
+from optimizacion_rutas import RADIO_TIERRA_KM
+
+KM_POR_GRADO = math.pi * RADIO_TIERRA_KM / 180
+
+
+def distancia_km(lat1, lon1, lat2, lon2):
+    """Distancia haversine en km entre dos puntos en grados"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(min(h, 1.0)))
+
+
+class IndiceRepartidores:
+    """Rejilla en memoria con la última posición de cada repartidor para buscar los más cercanos.
+
+    Cada posición se guarda en la celda de `celda` grados que la contiene; una
+    búsqueda recorre anillos de celdas alrededor del punto hasta reunir los
+    candidatos pedidos o superar el radio. Mover un repartidor es sacarlo de
+    una celda y meterlo en otra: O(1) bajo el lock, sin tocar la base.
+
+    Las posiciones nuevas quedan "sucias" hasta que el volcado periódico
+    (write-behind) las guarda en posicion_repartidor con un upsert por lotes.
+    La zona de cada repartidor sigue a los cambios publicados en la tabla
+    repartidor (cambios.py); los archivados o borrados se registran como None.
+    El lifespan lo reconstruye desde la base en segundo plano cada
+    REPARTIDORES_INDICE_TTL segundos para incorporar las posiciones que
+    recibieron otros workers. Los cambios que llegan mientras se lee la base
+    se guardan y se vuelven a aplicar sobre el contenido nuevo.
+    """
+
+    def __init__(self, vigencia: timedelta, celda=0.01):
+        self.vigencia = vigencia
+        self.celda = celda
+        self._lock = threading.Lock()
+        self._construido_en = None
+        self._durante = None               # cambios recibidos durante una reconstrucción
+        self._posiciones = {}              # repartidor_id -> (latitud, longitud, en)
+        self._celdas = defaultdict(set)    # (fila, columna) -> ids
+        self._repartidores = {}            # repartidor_id -> {"zona"} (None si está archivado o no existe)
+        self._sucios = {}                  # repartidor_id -> (latitud, longitud, en) sin guardar aún
+
+    def _clave(self, latitud, longitud):
+        return math.floor(latitud / self.celda), math.floor(longitud / self.celda)
+
+    def _colocar(self, repartidor_id, posicion):
+        self._quitar(repartidor_id)
+        self._posiciones[repartidor_id] = posicion
+        self._celdas[self._clave(posicion[0], posicion[1])].add(repartidor_id)
+
+    def _quitar(self, repartidor_id):
+        posicion = self._posiciones.pop(repartidor_id, None)
+        if posicion is None:
+            return
+        clave = self._clave(posicion[0], posicion[1])
+        ids = self._celdas.get(clave)
+        if ids is not None:
+            ids.discard(repartidor_id)
+            if not ids:
+                del self._celdas[clave]
+
+    # Posiciones
+
+    def actualizar(self, repartidor_id, latitud, longitud, en: datetime):
+        """Registrar una posición; False si el repartidor está archivado o no existe.
+
+        Una posición más antigua que la guardada (llegó desordenada) se ignora.
+        """
+        with self._lock:
+            if self._repartidores.get(repartidor_id, {}) is None:
+                return False
+            actual = self._posiciones.get(repartidor_id)
+            if actual is not None and actual[2] > en:
+                return True
+            posicion = (latitud, longitud, en)
+            self._colocar(repartidor_id, posicion)
+            self._sucios[repartidor_id] = posicion
+            if self._durante is not None:
+                self._durante.append((self._reponer, (repartidor_id, posicion)))
+            return True
+
+    def _reponer(self, repartidor_id, posicion):
+        """Volver a colocar una posición recibida durante la reconstrucción (ya volcada o no)"""
+        if self._repartidores.get(repartidor_id, {}) is None:
+            return
+        actual = self._posiciones.get(repartidor_id)
+        if actual is None or actual[2] < posicion[2]:
+            self._colocar(repartidor_id, posicion)
+
+    def quitar(self, repartidor_id):
+        """Olvidar la posición (repartidor fuera de servicio); True si había una"""
+        with self._lock:
+            self._sucios.pop(repartidor_id, None)
+            habia = repartidor_id in self._posiciones
+            self._quitar(repartidor_id)
+            if self._durante is not None:
+                self._durante.append((self._quitar, (repartidor_id,)))
+            return habia
+
+    def tomar_sucios(self):
+        """Posiciones pendientes de guardar; dejan de estarlo aunque el volcado falle (ver devolver_sucios)"""
+        with self._lock:
+            sucios, self._sucios = self._sucios, {}
+            return sucios
+
+    def devolver_sucios(self, sucios):
+        """Volver a marcar un volcado fallido, salvo lo que se haya actualizado o quitado mientras tanto"""
+        with self._lock:
+            for repartidor_id, posicion in sucios.items():
+                if self._posiciones.get(repartidor_id) == posicion:
+                    self._sucios.setdefault(repartidor_id, posicion)
+
+    # Repartidores
+
+    def pendientes(self, ids=None):
+        """Repartidores con posición (o de `ids`) cuya zona y vigencia aún no se conocen"""
+        with self._lock:
+            candidatos = self._posiciones if ids is None else ids
+            return {repartidor_id for repartidor_id in candidatos if repartidor_id not in self._repartidores}
+
+    def _registrar(self, repartidores):
+        for repartidor_id, repartidor in repartidores.items():
+            self._repartidores[repartidor_id] = repartidor
+            if repartidor is None:
+                self._sucios.pop(repartidor_id, None)
+                self._quitar(repartidor_id)
+
+    def registrar(self, repartidores):
+        """Registrar {repartidor_id: {"zona"} o None}; los None pierden su posición"""
+        with self._lock:
+            if self._durante is not None:
+                self._durante.append((self._registrar, (repartidores,)))
+            self._registrar(repartidores)
+
+    def _aplicar_repartidores(self, accion, filas):
+        if accion == ELIMINAR:
+            self._registrar({fila["id"]: None for fila in filas})
+            return
+        for fila in filas:
+            if "zona" in fila:
+                self._repartidores[fila["id"]] = {"zona": fila["zona"]}
+            else:
+                # Cambio sin la zona: se vuelve a leer de la base cuando haga falta
+                self._repartidores.pop(fila["id"], None)
+
+    def aplicar_repartidores(self, tabla, accion, filas):
+        with self._lock:
+            if self._durante is not None:
+                self._durante.append((self._aplicar_repartidores, (accion, filas)))
+            self._aplicar_repartidores(accion, filas)
+
+    # Carga desde la base de datos
+
+    def listo(self):
+        """True si ya se construyó alguna vez (hasta entonces las búsquedas van a la base)"""
+        return self._construido_en is not None
+
+    def iniciar_reconstruccion(self):
+        """Empezar a guardar los cambios recibidos: llamar antes de leer la base para reconstruir"""
+        with self._lock:
+            self._durante = []
+
+    def cancelar_reconstruccion(self):
+        with self._lock:
+            self._durante = None
+
+    def reconstruir(self, filas):
+        """Reemplazar el contenido con las posiciones recientes de la base.
+
+        `filas` son dicts con repartidor_id, latitud, longitud, actualizado_en y
+        zona (solo repartidores vigentes). La rejilla nueva se arma sin el lock
+        (las búsquedas siguen con la anterior) y se reemplaza de una vez. Las
+        posiciones locales aún sin guardar se conservan si son más nuevas que
+        las de la base, y después se aplican los cambios guardados desde
+        iniciar_reconstruccion.
+        """
+        nuevo = IndiceRepartidores(self.vigencia, self.celda)
+        for fila in filas:
+            nuevo._colocar(fila["repartidor_id"], (fila["latitud"], fila["longitud"], fila["actualizado_en"]))
+            nuevo._repartidores[fila["repartidor_id"]] = {"zona": fila["zona"]}
+        with self._lock:
+            self._posiciones, self._celdas, self._repartidores = nuevo._posiciones, nuevo._celdas, nuevo._repartidores
+            for repartidor_id, posicion in self._sucios.items():
+                self._reponer(repartidor_id, posicion)
+            self._construido_en = time.monotonic()
+            durante, self._durante = self._durante or [], None
+            for aplicar, argumentos in durante:
+                aplicar(*argumentos)
+
+    # Consulta
+
+    def cercanos(self, latitud, longitud, radio_km, limite, zona=None):
+        """Hasta `limite` repartidores disponibles a menos de `radio_km`, del más cercano al más lejano.
+
+        Disponible: vigente y con una posición de menos de `vigencia` de
+        antigüedad. Con `zona` solo se consideran los de esa zona.
+        """
+        desde = datetime.now() - self.vigencia
+        km_fila = self.celda * KM_POR_GRADO
+        # Las columnas se estrechan hacia los polos: cota con la latitud más alejada del ecuador dentro del radio
+        km_columna = km_fila * max(math.cos(math.radians(min(abs(latitud) + radio_km / KM_POR_GRADO, 89.9))), 1e-3)
+        km_celda = min(km_fila, km_columna)
+        anillos = math.ceil(radio_km / km_celda) + 1
+        fila0, columna0 = self._clave(latitud, longitud)
+        encontrados = []
+
+        def considerar(ids):
+            for repartidor_id in ids:
+                repartidor = self._repartidores.get(repartidor_id)
+                lat, lon, en = self._posiciones[repartidor_id]
+                if repartidor is None or en < desde:
+                    continue
+                if zona is not None and repartidor["zona"] != zona:
+                    continue
+                distancia = distancia_km(latitud, longitud, lat, lon)
+                if distancia <= radio_km:
+                    encontrados.append((distancia, repartidor_id))
+
+        with self._lock:
+            if (2 * anillos + 1) ** 2 >= len(self._posiciones):
+                # Pocas posiciones para el área a cubrir: se revisan todas
+                considerar(self._posiciones)
+            else:
+                for anillo in range(anillos + 1):
+                    for fila in range(fila0 - anillo, fila0 + anillo + 1):
+                        borde = abs(fila - fila0) == anillo
+                        paso = 1 if borde else 2 * anillo
+                        for columna in range(columna0 - anillo, columna0 + anillo + 1, max(paso, 1)):
+                            ids = self._celdas.get((fila, columna))
+                            if ids:
+                                considerar(ids)
+                    # Lo que quede fuera de los anillos recorridos está al menos a esta distancia
+                    cota = anillo * km_celda
+                    if len(encontrados) >= limite and sum(d <= cota for d, _ in encontrados) >= limite:
+                        break
+            return [
+                {
+                    "repartidor_id": repartidor_id,
+                    "zona": self._repartidores[repartidor_id]["zona"],
+                    "distancia_km": distancia,
+                    "latitud": self._posiciones[repartidor_id][0],
+                    "longitud": self._posiciones[repartidor_id][1],
+                    "posicion_en": self._posiciones[repartidor_id][2],
+                }
+                for distancia, repartidor_id in heapq.nsmallest(limite, encontrados)
+            ]
+
+
+indice = IndiceRepartidores(
+    vigencia=timedelta(seconds=config.REPARTIDORES_POSICION_VIGENCIA),
+)
+suscribir("repartidor", indice.aplicar_repartidores)
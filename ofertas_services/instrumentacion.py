@@ -0,0 +1,163 @@
+"""Medición por petición: latencia por plantilla de ruta y trabajo SQL de cada petición.
+
+El middleware abre una MedicionPeticion en un ContextVar; los eventos
+before/after_cursor_execute del motor (registrados en database.py) la
+alimentan. El ContextVar llega tanto al threadpool (modo sync) como al
+greenlet de run_sync (modo async), así que cada sentencia se atribuye a la
+petición que la emitió. Fuera de una petición (scripts, tareas) no se mide.
+
+Modo estricto (DB_ESTRICTO, para desarrollo y pruebas): las relaciones no
+cargadas explícitamente lanzan error en vez de hacer un SELECT por fila, y
+una petición que supera el presupuesto de consultas de su ruta falla.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi import Depends
+from sqlalchemy.orm import raiseload
+
+from metricas import RegistroRutas
+
+logger = logging.getLogger(__name__)
+
+# Métricas acumuladas por (método, plantilla de ruta), expuestas en /metrics
+registro = RegistroRutas()
+
+_medicion = ContextVar("medicion_peticion", default=None)
+
+
+class PresupuestoExcedido(Exception):
+    """Una petición (o un bloque contar_consultas) intentó más sentencias SQL de las presupuestadas"""
+
+    def __init__(self, presupuesto, sentencia):
+        super().__init__(f"Presupuesto de {presupuesto} consultas excedido al ejecutar: {sentencia[:200]}")
+        self.presupuesto = presupuesto
+
+
+class MedicionPeticion:
+    """Trabajo en la base de una petición en curso y su presupuesto de consultas"""
+
+    __slots__ = ("consultas", "segundos_db", "filas", "presupuesto", "estricto", "excedido")
+
+    def __init__(self, estricto=False):
+        self.consultas = 0
+        self.segundos_db = 0.0
+        self.filas = 0
+        self.presupuesto = None
+        self.estricto = estricto  # fallar al exceder el presupuesto en vez de solo avisar
+        self.excedido = False
+
+
+def medicion_actual():
+    """MedicionPeticion de la petición en curso, o None fuera de una petición"""
+    return _medicion.get()
+
+
+def presupuesto(consultas: int):
+    """Dependencia de ruta: máximo de sentencias SQL que puede emitir una petición"""
+    async def dependencia():
+        medicion = _medicion.get()
+        if medicion is not None:
+            medicion.presupuesto = consultas
+    return Depends(dependencia)
+
+
+@contextmanager
+def contar_consultas(presupuesto=None):
+    """Medir las sentencias SQL de un bloque (pruebas, scripts); lanza PresupuestoExcedido al superarlo"""
+    medicion = MedicionPeticion(estricto=True)
+    medicion.presupuesto = presupuesto
+    token = _medicion.set(medicion)
+    try:
+        yield medicion
+    finally:
+        _medicion.reset(token)
+
+
+def sin_cargas_implicitas(estado):
+    """Evento do_orm_execute del modo estricto: raiseload("*") en las consultas ORM de primer nivel.
+
+    Las relaciones pedidas con joinedload/selectinload o refresh(obj, [...])
+    se cargan igual; acceder a cualquier otra lanza InvalidRequestError en
+    lugar de emitir un SELECT por fila.
+    """
+    if estado.is_select and not estado.is_column_load and not estado.is_relationship_load:
+        estado.statement = estado.statement.options(raiseload("*"))
+
+
+def antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    medicion = _medicion.get()
+    if medicion is None:
+        return
+    if medicion.presupuesto is not None and medicion.consultas >= medicion.presupuesto:
+        medicion.excedido = True
+        if medicion.estricto:
+            raise PresupuestoExcedido(medicion.presupuesto, statement)
+    context._inicio_medicion = time.perf_counter()
+
+
+def despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    medicion = _medicion.get()
+    inicio = getattr(context, "_inicio_medicion", None)
+    if medicion is None or inicio is None:
+        return
+    medicion.consultas += 1
+    medicion.segundos_db += time.perf_counter() - inicio
+    if cursor.description is not None and cursor.rowcount > 0:
+        medicion.filas += cursor.rowcount
+
+
+def server_timing(medicion, segundos):
+    """Valor de la cabecera Server-Timing: tiempo en la base y total hasta la respuesta"""
+    return (f'db;dur={medicion.segundos_db * 1e3:.2f};desc="{medicion.consultas} consultas", '
+            f"app;dur={segundos * 1e3:.2f}")
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI que mide cada petición HTTP y la registra bajo su plantilla de ruta.
+
+    Se usa la plantilla (`/entregas/{entrega_id}`) y no la ruta concreta para
+    acotar la cardinalidad; las peticiones sin ruta se agrupan en "sin_ruta".
+    Con `server_timing` añade la cabecera Server-Timing a la respuesta (en
+    respuestas en streaming solo cubre lo ocurrido antes de las cabeceras).
+    Con `estricto` las peticiones que superan su presupuesto fallan; si no,
+    solo se registra un aviso.
+    """
+
+    def __init__(self, app, server_timing: bool = False, estricto: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+        self.estricto = estricto
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        medicion = MedicionPeticion(self.estricto)
+        token = _medicion.set(medicion)
+        inicio = time.perf_counter()
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                if self.server_timing:
+                    cabecera = server_timing(medicion, time.perf_counter() - inicio).encode("latin-1")
+                    mensaje["headers"] = [*mensaje.get("headers", []), (b"server-timing", cabecera)]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicion.reset(token)
+            # APIRoute.matches deja la ruta en el scope al resolverla
+            ruta = getattr(scope.get("route"), "path_format", "sin_ruta")
+            registro.obtener(scope["method"], ruta).observar(
+                time.perf_counter() - inicio, medicion.consultas, medicion.segundos_db, medicion.filas, estado,
+            )
+            if medicion.excedido and not self.estricto:
+                logger.warning("%s %s superó su presupuesto de %s consultas (%s)",
+                               scope["method"], ruta, medicion.presupuesto, medicion.consultas)
@@ -1,30 +1,43 @@
-from fastapi import FastAPI, Depends
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, FastAPI, Depends, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from sqlalchemy import text
-from sqlalchemy.orm import Session
-
-# Importa engine y Base directamente desde database.py
-from database import engine, Base, get_db
-
-# Importa los routers desde la carpeta routes
-from routes import (
-    inventario_producto,
-    oferta_reducida,
-    repartidor,
-    entrega,
-    ruta_entrega,
-)
-
-app = FastAPI(
-    title="Too Good To Go - API de Ofertas",
-    description="API para gestionar inventario, ofertas, repartidores y entregas",
-    version="1.0.0"
-)
-
-# Crear tablas en la base de datos (si no usas migraciones)
-Base.metadata.create_all(bind=engine)
-
-# Endpoint de salud
-@app.get("/")
+from starlette.concurrency import run_in_threadpool
+
+import config
+# Sesión y estado de los pools desde database.py (crear los motores no abre conexiones)
+from database import METRICAS_POOL, get_db, motores, estado_pool
+from crud import ejecutar
+from crud.escritura import RestriccionIncumplida
+from cache import estado_cache
+from paginacion import CursorInvalido
+from condicional import NoModificado
+from instrumentacion import MiddlewareMetricas, PresupuestoExcedido, registro
+from metricas import exposicion_prometheus
+from optimizacion_rutas import cerrar_pool
+
+logger = logging.getLogger(__name__)
+
+# Endpoints de salud
+salud = APIRouter()
+
+async def cursor_invalido_handler(request: Request, exc: CursorInvalido):
+    return JSONResponse(status_code=400, content={"detail": "Cursor inválido"})
+
+async def restriccion_incumplida_handler(request: Request, exc: RestriccionIncumplida):
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
+
+async def no_modificado_handler(request: Request, exc: NoModificado):
+    return Response(status_code=304, headers={"ETag": exc.etag, "Cache-Control": "no-cache"})
+
+async def presupuesto_excedido_handler(request: Request, exc: PresupuestoExcedido):
+    logger.error("%s %s: %s", request.method, request.url.path, exc)
+    return JSONResponse(status_code=500, content={"detail": str(exc)})
+
+@salud.get("/")
 def health_check():
     return {
         "message": "API Too Good To Go funcionando correctamente",
@@ -32,11 +45,11 @@ def health_check():
         "version": "1.0.0"
     }
 
-@app.get("/health")
-def detailed_health_check(db: Session = Depends(get_db)):
+@salud.get("/health")
+async def detailed_health_check(db=Depends(get_db)):
     try:
         # Verificar conexión a la base de datos
-        db.execute(text("SELECT 1"))  # ✅ Correcto
+        await ejecutar(db, lambda sesion: sesion.execute(text("SELECT 1")))
         return {
             "status": "healthy",
             "database": "connected",
@@ -49,13 +62,253 @@ def detailed_health_check(db: Session = Depends(get_db)):
             "error": str(e)
         }
 
-# Incluye los routers
-app.include_router(inventario_producto.router)
-app.include_router(oferta_reducida.router)
-app.include_router(repartidor.router)
-app.include_router(entrega.router)
-app.include_router(ruta_entrega.router)
+@salud.get("/health/pool")
+def pool_health_check():
+    """Estado y métricas de los pools de conexiones"""
+    return {nombre: estado_pool(motor, nombre) for nombre, motor in motores().items()}
+
+@salud.get("/health/cache")
+def cache_health_check():
+    """Contadores de la cache de entidades (hits, misses, evictions)"""
+    return estado_cache()
+
+@salud.get("/metrics", response_class=PlainTextResponse)
+def metricas_prometheus():
+    """Métricas por ruta y por pool en formato Prometheus"""
+    return PlainTextResponse(exposicion_prometheus(registro, METRICAS_POOL), media_type="text/plain; version=0.0.4")
+
+@salud.get("/health/caducidad")
+def caducidad_health_check():
+    """Último barrido de caducidad de este worker: filas, lotes y atraso por tarea"""
+    from caducidad import estado_caducidad
+    return estado_caducidad()
+
+@salud.get("/health/stream")
+def stream_health_check():
+    """Suscriptores de /stream en este worker, eventos repartidos y estado del relevo"""
+    from difusion import estado_stream
+    return estado_stream()
+
+@salud.get("/health/replicas")
+def replicas_health_check():
+    """Réplicas de lectura y resultado de su última comprobación"""
+    from replicas import replicas
+    return replicas.resumen()
+
+@salud.get("/health/esquema")
+def esquema_health_check(request: Request):
+    """Resultado de la comprobación del esquema hecha al arrancar"""
+    return getattr(request.app.state, "esquema", {"estado": "sin comprobar"})
+
+async def _verificar_esquema(app: FastAPI):
+    from database import engine
+    from esquema import estado_esquema
+    app.state.esquema = await run_in_threadpool(estado_esquema, engine)
+    return app.state.esquema
+
+async def _avisar_esquema(app: FastAPI):
+    try:
+        estado = await _verificar_esquema(app)
+    except Exception as e:
+        logger.warning("No se pudo comprobar el esquema: %s", e)
+        return
+    if not estado["al_dia"]:
+        logger.warning("Esquema en la revisión %s, se esperaba %s: ejecutar python esquema.py migrar",
+                       estado["actual"], estado["esperada"])
+
+def _guardar_posiciones():
+    from database import SessionLocal
+    from crud.posicion_repartidor import guardar_posiciones
+    with SessionLocal() as db:
+        return guardar_posiciones(db)
+
+async def _volcar_posiciones():
+    """Guardar cada REPARTIDORES_VOLCADO segundos las posiciones recibidas (write-behind)"""
+    while True:
+        await asyncio.sleep(config.REPARTIDORES_VOLCADO)
+        try:
+            await run_in_threadpool(_guardar_posiciones)
+        except Exception:
+            logger.exception("No se pudieron guardar las posiciones de los repartidores")
+
+def _reconstruir_ofertas_activas():
+    from database import SessionLocal
+    from crud.oferta_reducida import reconstruir_indice_activas
+    with SessionLocal() as db:
+        reconstruir_indice_activas(db)
+
+async def _mantener_ofertas_activas():
+    """Reconstruir el índice de ofertas activas cada OFERTAS_ACTIVAS_TTL segundos, fuera de las peticiones"""
+    while True:
+        try:
+            await run_in_threadpool(_reconstruir_ofertas_activas)
+        except Exception:
+            logger.exception("No se pudo reconstruir el índice de ofertas activas")
+        await asyncio.sleep(config.OFERTAS_ACTIVAS_TTL)
+
+def _detectar_pg_trgm():
+    from database import SessionLocal
+    from crud.busqueda import detectar_pg_trgm
+    with SessionLocal() as db:
+        return detectar_pg_trgm(db)
+
+async def _elegir_busqueda():
+    """True si la búsqueda usa pg_trgm en la base; si no, la sirven índices de trigramas en memoria"""
+    from crud import busqueda
+    from database import engine
+    try:
+        if await run_in_threadpool(_detectar_pg_trgm):
+            return True
+    except Exception as e:
+        logger.warning("No se pudo comprobar pg_trgm (%s): búsqueda de texto con índices en memoria", e)
+        busqueda.pg_trgm = False
+        return False
+    if engine.dialect.name == "postgresql":
+        logger.warning("pg_trgm no está instalado (migración 0007): búsqueda de texto con índices en memoria")
+    return False
+
+def _reconstruir_busqueda():
+    from database import SessionLocal
+    from crud.busqueda import reconstruir_indices
+    with SessionLocal() as db:
+        reconstruir_indices(db)
+
+async def _mantener_busqueda():
+    """Sin pg_trgm: reconstruir los índices de trigramas cada BUSQUEDA_INDICE_TTL segundos, fuera de las peticiones"""
+    while True:
+        try:
+            await run_in_threadpool(_reconstruir_busqueda)
+        except Exception:
+            logger.exception("No se pudieron reconstruir los índices de búsqueda")
+        await asyncio.sleep(config.BUSQUEDA_INDICE_TTL)
+
+def _reconstruir_repartidores():
+    from database import SessionLocal
+    from crud.posicion_repartidor import reconstruir_indice_repartidores
+    with SessionLocal() as db:
+        reconstruir_indice_repartidores(db)
+
+async def _mantener_repartidores():
+    """Reconstruir el índice de posiciones de repartidores cada REPARTIDORES_INDICE_TTL segundos, fuera de las peticiones"""
+    while True:
+        try:
+            await run_in_threadpool(_reconstruir_repartidores)
+        except Exception:
+            logger.exception("No se pudo reconstruir el índice de repartidores")
+        await asyncio.sleep(config.REPARTIDORES_INDICE_TTL)
+
+async def _comprobar_replicas():
+    """Sacar del turno de lectura las réplicas que no responden (y devolver las que vuelven)"""
+    from replicas import replicas
+    while True:
+        await replicas.comprobar()
+        await asyncio.sleep(config.DB_REPLICAS_COMPROBACION)
+
+async def _barrer_caducidad():
+    """Expirar productos y retirar ofertas vencidas cada CADUCIDAD_INTERVALO segundos"""
+    from caducidad import barrer
+    while True:
+        await asyncio.sleep(config.CADUCIDAD_INTERVALO)
+        try:
+            await run_in_threadpool(barrer)
+        except Exception:
+            logger.exception("Falló el barrido de caducidad")
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    """Arranque y parada del worker: la primera E/S contra la base ocurre aquí, no al importar"""
+    tarea = None
+    if config.DB_VERIFICAR_ESQUEMA == "estricto":
+        estado = await _verificar_esquema(app)
+        if not estado["al_dia"]:
+            raise RuntimeError(f"Esquema en la revisión {estado['actual']}, se esperaba {estado['esperada']}: "
+                               "ejecutar python esquema.py migrar")
+    elif config.DB_VERIFICAR_ESQUEMA == "avisar":
+        # En segundo plano: una base lenta no retrasa que el worker empiece a atender
+        tarea = asyncio.create_task(_avisar_esquema(app))
+    volcado = asyncio.create_task(_volcar_posiciones())
+    ofertas_activas = asyncio.create_task(_mantener_ofertas_activas())
+    repartidores = asyncio.create_task(_mantener_repartidores())
+    busqueda = None if await _elegir_busqueda() else asyncio.create_task(_mantener_busqueda())
+    from difusion import relevo
+    relevo.iniciar(asyncio.get_running_loop())
+    barrido = asyncio.create_task(_barrer_caducidad()) if config.CADUCIDAD_INTERVALO > 0 else None
+    comprobacion = asyncio.create_task(_comprobar_replicas()) if config.DB_REPLICAS else None
+    yield
+    if comprobacion is not None:
+        comprobacion.cancel()
+    if tarea is not None:
+        tarea.cancel()
+    if barrido is not None:
+        barrido.cancel()
+    volcado.cancel()
+    ofertas_activas.cancel()
+    repartidores.cancel()
+    if busqueda is not None:
+        busqueda.cancel()
+    # Último volcado: las posiciones recibidas desde el anterior no se pierden al parar
+    try:
+        await run_in_threadpool(_guardar_posiciones)
+    except Exception:
+        logger.exception("No se pudieron guardar las posiciones de los repartidores")
+    # Cierra los /stream que sigan abiertos y para los hilos del relevo
+    await run_in_threadpool(relevo.detener)
+    # Espera a que terminen las optimizaciones en curso (acotadas por su plazo)
+    await run_in_threadpool(cerrar_pool)
+
+def crear_app() -> FastAPI:
+    """Construir la aplicación: `uvicorn main:crear_app --factory`.
+
+    No abre conexiones ni ejecuta DDL; el esquema se aplica con
+    `python esquema.py migrar` y se comprueba en el lifespan según
+    DB_VERIFICAR_ESQUEMA.
+    """
+    # Los routers (y con ellos crud, modelos y esquemas) se importan al construir la app
+    from routes import (
+        inventario_producto,
+        oferta_reducida,
+        repartidor,
+        entrega,
+        ruta_entrega,
+        reporte,
+        stream,
+    )
+
+    app = FastAPI(
+        title="Too Good To Go - API de Ofertas",
+        description="API para gestionar inventario, ofertas, repartidores y entregas",
+        version="1.0.0",
+        lifespan=ciclo_de_vida,
+    )
+    app.add_exception_handler(CursorInvalido, cursor_invalido_handler)
+    app.add_exception_handler(NoModificado, no_modificado_handler)
+    app.add_exception_handler(RestriccionIncumplida, restriccion_incumplida_handler)
+    app.add_exception_handler(PresupuestoExcedido, presupuesto_excedido_handler)
+    if config.DB_REPLICAS:
+        from replicas import MiddlewareLecturaPropia
+        app.add_middleware(MiddlewareLecturaPropia)
+    if config.METRICAS_RUTAS or config.DB_ESTRICTO:
+        app.add_middleware(MiddlewareMetricas, server_timing=config.METRICAS_SERVER_TIMING,
+                           estricto=config.DB_ESTRICTO)
+
+    # Incluye los routers
+    app.include_router(salud)
+    app.include_router(inventario_producto.router)
+    app.include_router(oferta_reducida.router)
+    app.include_router(repartidor.router)
+    app.include_router(entrega.router)
+    app.include_router(ruta_entrega.router)
+    app.include_router(reporte.router)
+    app.include_router(stream.router)
+    return app
+
+def __getattr__(nombre):
+    # Compatibilidad con `uvicorn main:app`: la app se construye la primera vez que se pide
+    if nombre == "app":
+        globals()["app"] = crear_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run("main:crear_app", factory=True, host="0.0.0.0", port=8000)
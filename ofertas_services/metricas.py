@@ -0,0 +1,161 @@
+import bisect
+import threading
+
+# Límites superiores (en segundos) de los buckets de los histogramas de latencia
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histograma:
+    """Histograma acumulativo thread-safe al estilo Prometheus"""
+
+    def __init__(self, buckets=BUCKETS_SEGUNDOS):
+        self.buckets = tuple(buckets)
+        self.conteos = [0] * (len(self.buckets) + 1)
+        self.suma = 0.0
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float):
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            self.conteos[indice] += 1
+            self.suma += valor
+            self.total += 1
+
+    def resumen(self):
+        """Conteos acumulados por bucket (le = "menor o igual que")"""
+        with self._lock:
+            conteos = list(self.conteos)
+            suma, total = self.suma, self.total
+        buckets, acumulado = {}, 0
+        for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+            acumulado += conteo
+            buckets["+Inf" if limite == float("inf") else str(limite)] = acumulado
+        return {"count": total, "sum": round(suma, 6), "buckets": buckets}
+
+
+class MetricasPool:
+    """Contadores de un motor y su pool de conexiones alimentados por sus eventos y checkouts"""
+
+    def __init__(self):
+        self.tiempo_espera = Histograma()
+        self.checkouts = 0
+        self.esperas = 0  # checkouts que encontraron el pool saturado
+        self.timeouts = 0
+        self.conexiones_creadas = 0
+        self.invalidaciones = 0
+        self.consultas = 0  # sentencias enviadas a la base (un executemany cuenta una)
+        self._lock = threading.Lock()
+
+    def incrementar(self, contador: str):
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+    def resumen(self):
+        return {
+            "checkouts": self.checkouts,
+            "esperas": self.esperas,
+            "timeouts": self.timeouts,
+            "conexiones_creadas": self.conexiones_creadas,
+            "invalidaciones": self.invalidaciones,
+            "consultas": self.consultas,
+            "tiempo_espera_segundos": self.tiempo_espera.resumen(),
+        }
+
+
+# Límites de los buckets del histograma de consultas SQL por petición
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class MetricasRuta:
+    """Latencia y trabajo en la base de las peticiones a una plantilla de ruta"""
+
+    def __init__(self):
+        self.latencia = Histograma()
+        self.consultas_por_peticion = Histograma(BUCKETS_CONSULTAS)
+        self.consultas = 0
+        self.segundos_db = 0.0
+        self.filas = 0  # filas devueltas según el driver (SQLite no las informa)
+        self.errores = 0  # respuestas 5xx
+        self._lock = threading.Lock()
+
+    def observar(self, segundos: float, consultas: int, segundos_db: float, filas: int, estado: int):
+        self.latencia.observar(segundos)
+        self.consultas_por_peticion.observar(consultas)
+        with self._lock:
+            self.consultas += consultas
+            self.segundos_db += segundos_db
+            self.filas += filas
+            self.errores += estado >= 500
+
+
+class RegistroRutas:
+    """MetricasRuta por (método, plantilla de ruta), creadas la primera vez que se observan"""
+
+    def __init__(self):
+        self.rutas = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, metodo: str, ruta: str) -> MetricasRuta:
+        metricas = self.rutas.get((metodo, ruta))
+        if metricas is None:
+            with self._lock:
+                metricas = self.rutas.setdefault((metodo, ruta), MetricasRuta())
+        return metricas
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _etiquetas(**etiquetas):
+    return "{" + ",".join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in etiquetas.items()) + "}"
+
+
+def _histograma_prometheus(lineas, nombre, histograma, **etiquetas):
+    resumen = histograma.resumen()
+    for limite, conteo in resumen["buckets"].items():
+        lineas.append(f"{nombre}_bucket{_etiquetas(**etiquetas, le=limite)} {conteo}")
+    lineas.append(f"{nombre}_sum{_etiquetas(**etiquetas)} {resumen['sum']}")
+    lineas.append(f"{nombre}_count{_etiquetas(**etiquetas)} {resumen['count']}")
+
+
+# Contadores de MetricasPool expuestos en /metrics
+CONTADORES_POOL = ("checkouts", "esperas", "timeouts", "conexiones_creadas", "invalidaciones", "consultas")
+
+
+def exposicion_prometheus(registro: RegistroRutas, pools: dict) -> str:
+    """Métricas por ruta y por pool en el formato de texto de Prometheus"""
+    rutas = sorted(registro.rutas.items())
+    lineas = []
+
+    lineas += ["# HELP ofertas_http_duracion_segundos Latencia de las peticiones por plantilla de ruta",
+               "# TYPE ofertas_http_duracion_segundos histogram"]
+    for (metodo, ruta), metricas in rutas:
+        _histograma_prometheus(lineas, "ofertas_http_duracion_segundos", metricas.latencia, metodo=metodo, ruta=ruta)
+
+    lineas += ["# HELP ofertas_http_consultas_por_peticion Sentencias SQL emitidas por cada petición",
+               "# TYPE ofertas_http_consultas_por_peticion histogram"]
+    for (metodo, ruta), metricas in rutas:
+        _histograma_prometheus(lineas, "ofertas_http_consultas_por_peticion", metricas.consultas_por_peticion,
+                               metodo=metodo, ruta=ruta)
+
+    for nombre, ayuda, atributo in (
+        ("ofertas_http_consultas_total", "Sentencias SQL emitidas por la ruta", "consultas"),
+        ("ofertas_http_db_segundos_total", "Tiempo en la base (ejecución de sentencias) por la ruta", "segundos_db"),
+        ("ofertas_http_db_filas_total", "Filas devueltas por la base a la ruta", "filas"),
+        ("ofertas_http_errores_total", "Respuestas 5xx de la ruta", "errores"),
+    ):
+        lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} counter"]
+        for (metodo, ruta), metricas in rutas:
+            valor = getattr(metricas, atributo)
+            lineas.append(f"{nombre}{_etiquetas(metodo=metodo, ruta=ruta)} {round(valor, 6) if isinstance(valor, float) else valor}")
+
+    for contador in CONTADORES_POOL:
+        nombre = f"ofertas_db_pool_{contador}_total"
+        lineas += [f"# TYPE {nombre} counter"]
+        lineas += [f"{nombre}{_etiquetas(motor=motor)} {getattr(metricas, contador)}" for motor, metricas in pools.items()]
+    lineas += ["# TYPE ofertas_db_pool_espera_segundos histogram"]
+    for motor, metricas in pools.items():
+        _histograma_prometheus(lineas, "ofertas_db_pool_espera_segundos", metricas.tiempo_espera, motor=motor)
+    return "\n".join(lineas) + "\n"
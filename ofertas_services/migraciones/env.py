@@ -0,0 +1,58 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from config import DATABASE_URL
+from database import Base
+import models  # noqa: F401  registra las tablas en Base.metadata
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configurar_logs", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """Generar el SQL de las migraciones sin conectarse (alembic upgrade --sql)"""
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Aplicar las migraciones sobre DATABASE_URL, una transacción por revisión"""
+    conexion_externa = config.attributes.get("connection")
+    if conexion_externa is not None:
+        _configurar_y_migrar(conexion_externa)
+        return
+    motor = create_engine(DATABASE_URL, poolclass=NullPool)
+    with motor.connect() as conexion:
+        _configurar_y_migrar(conexion)
+    motor.dispose()
+
+
+def _configurar_y_migrar(conexion):
+    context.configure(
+        connection=conexion,
+        target_metadata=target_metadata,
+        # Cada revisión en su propia transacción: permite autocommit_block (CREATE INDEX CONCURRENTLY)
+        transaction_per_migration=True,
+        render_as_batch=conexion.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,88 @@
+"""Esquema inicial: las tablas tal como las creaba Base.metadata.create_all
+
+Las bases de datos creadas antes de las migraciones ya tienen este esquema:
+`python esquema.py migrar` las marca en esta revisión sin volver a crearlas.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "inventario_producto",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("nombre", sa.String(), nullable=False),
+        sa.Column("cantidad", sa.Integer(), nullable=False),
+        sa.Column("precio_unitario", sa.Float(), nullable=False),
+        sa.Column("fecha_ingreso", sa.DateTime(), nullable=False),
+        sa.Column("estado", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_inventario_producto_id", "inventario_producto", ["id"])
+
+    op.create_table(
+        "repartidor",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("nombre", sa.String(), nullable=False),
+        sa.Column("telefono", sa.String(), nullable=False),
+        sa.Column("zona", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_repartidor_id", "repartidor", ["id"])
+
+    op.create_table(
+        "oferta_reducida",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("producto_id", sa.Integer(), nullable=True),
+        sa.Column("precio_oferta", sa.Float(), nullable=False),
+        sa.Column("fecha_inicio", sa.DateTime(), nullable=False),
+        sa.Column("fecha_fin", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["producto_id"], ["inventario_producto.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_oferta_reducida_id", "oferta_reducida", ["id"])
+
+    op.create_table(
+        "entrega",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("repartidor_id", sa.Integer(), nullable=True),
+        sa.Column("fecha", sa.DateTime(), nullable=False),
+        sa.Column("descripcion", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["repartidor_id"], ["repartidor.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_entrega_id", "entrega", ["id"])
+
+    op.create_table(
+        "ruta_entrega",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("repartidor_id", sa.Integer(), nullable=True),
+        sa.Column("destino", sa.String(), nullable=False),
+        sa.Column("hora_salida", sa.DateTime(), nullable=False),
+        sa.Column("hora_llegada", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["repartidor_id"], ["repartidor.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_ruta_entrega_id", "ruta_entrega", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("ruta_entrega")
+    op.drop_table("entrega")
+    op.drop_table("oferta_reducida")
+    op.drop_table("repartidor")
+    op.drop_table("inventario_producto")
@@ -0,0 +1,61 @@
+"""Índices de claves foráneas, estado y rangos de fechas
+
+En PostgreSQL se crean con CREATE INDEX CONCURRENTLY (fuera de transacción)
+para no bloquear escrituras en tablas grandes. IF NOT EXISTS permite aplicar
+la revisión sobre bases creadas con create_all que ya tenían alguno (por
+ejemplo ix_oferta_reducida_ventana).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# nombre, tabla, columnas
+INDICES = [
+    ("ix_entrega_repartidor_id", "entrega", ["repartidor_id"]),
+    ("ix_entrega_fecha", "entrega", ["fecha"]),
+    ("ix_ruta_entrega_repartidor_id", "ruta_entrega", ["repartidor_id"]),
+    ("ix_ruta_entrega_hora_salida", "ruta_entrega", ["hora_salida"]),
+    ("ix_oferta_reducida_producto_id", "oferta_reducida", ["producto_id"]),
+    ("ix_oferta_reducida_fecha_fin", "oferta_reducida", ["fecha_fin"]),
+    ("ix_oferta_reducida_ventana", "oferta_reducida", ["fecha_inicio", "fecha_fin", "producto_id"]),
+    ("ix_inventario_producto_estado", "inventario_producto", ["estado"]),
+    ("ix_inventario_producto_fecha_ingreso", "inventario_producto", ["fecha_ingreso"]),
+]
+
+
+def _descartar_si_invalido(nombre):
+    """Un CREATE INDEX CONCURRENTLY interrumpido deja el índice marcado como inválido; se borra para rehacerlo"""
+    invalido = op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :nombre AND NOT i.indisvalid"),
+        {"nombre": nombre},
+    ).first()
+    if invalido:
+        op.drop_index(nombre, postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    revisar_invalidos = op.get_bind().dialect.name == "postgresql" and not context.is_offline_mode()
+    with op.get_context().autocommit_block():
+        for nombre, tabla, columnas in INDICES:
+            if revisar_invalidos:
+                _descartar_si_invalido(nombre)
+            op.create_index(nombre, tabla, columnas, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for nombre, tabla, _ in reversed(INDICES):
+            op.drop_index(nombre, table_name=tabla, if_exists=True, postgresql_concurrently=True)
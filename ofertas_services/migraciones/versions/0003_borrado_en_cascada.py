@@ -0,0 +1,72 @@
+"""Claves foráneas ON DELETE CASCADE y columna archivado_en (borrado lógico)
+
+Borrar un repartidor o un producto pasa a ser un único DELETE: la base borra
+sus entregas, rutas u ofertas sin que el ORM las cargue. En PostgreSQL la
+clave nueva se crea NOT VALID (sin recorrer la tabla bajo un bloqueo que
+frena las escrituras) y se valida después, fuera de la transacción. SQLite no
+altera restricciones: batch recrea la tabla hija, y la convención de nombres
+identifica la FK sin nombre que creó 0001.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# tabla hija, columna, tabla padre
+CLAVES = [
+    ("entrega", "repartidor_id", "repartidor"),
+    ("ruta_entrega", "repartidor_id", "repartidor"),
+    ("oferta_reducida", "producto_id", "inventario_producto"),
+]
+
+# Tablas con borrado lógico
+ARCHIVABLES = ["repartidor", "inventario_producto"]
+
+# Nombre que PostgreSQL da a las FK sin nombre explícito
+CONVENCION_FK = {"fk": "%(table_name)s_%(column_0_name)s_fkey"}
+
+
+def _nombre(tabla, columna):
+    return f"{tabla}_{columna}_fkey"
+
+
+def _recrear_claves(ondelete):
+    if op.get_bind().dialect.name != "postgresql":
+        for tabla, columna, padre in CLAVES:
+            with op.batch_alter_table(tabla, naming_convention=CONVENCION_FK) as batch:
+                batch.drop_constraint(_nombre(tabla, columna), type_="foreignkey")
+                batch.create_foreign_key(_nombre(tabla, columna), padre, [columna], ["id"], ondelete=ondelete)
+        return
+    for tabla, columna, padre in CLAVES:
+        op.drop_constraint(_nombre(tabla, columna), tabla, type_="foreignkey")
+        op.create_foreign_key(_nombre(tabla, columna), tabla, padre, [columna], ["id"], ondelete=ondelete,
+                              postgresql_not_valid=True)
+    # VALIDATE solo toma SHARE UPDATE EXCLUSIVE: en su propia transacción no bloquea escrituras
+    with op.get_context().autocommit_block():
+        for tabla, columna, _ in CLAVES:
+            op.execute(f"ALTER TABLE {tabla} VALIDATE CONSTRAINT {_nombre(tabla, columna)}")
+
+
+def upgrade() -> None:
+    _recrear_claves("CASCADE")
+    for tabla in ARCHIVABLES:
+        op.add_column(tabla, sa.Column("archivado_en", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    for tabla in ARCHIVABLES:
+        with op.batch_alter_table(tabla) as batch:
+            batch.drop_column("archivado_en")
+    _recrear_claves(None)
@@ -0,0 +1,36 @@
+"""Coordenadas (latitud, longitud) en entregas y rutas para optimizar recorridos
+
+Columnas nullable sin valor por defecto: en PostgreSQL el ADD COLUMN solo
+toca el catálogo, sin reescribir la tabla.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 11:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLAS = ["entrega", "ruta_entrega"]
+
+
+def upgrade() -> None:
+    for tabla in TABLAS:
+        op.add_column(tabla, sa.Column("latitud", sa.Float(), nullable=True))
+        op.add_column(tabla, sa.Column("longitud", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    for tabla in TABLAS:
+        with op.batch_alter_table(tabla) as batch:
+            batch.drop_column("longitud")
+            batch.drop_column("latitud")
@@ -0,0 +1,39 @@
+"""Tabla posicion_repartidor: última posición de cada repartidor
+
+Tabla aparte y estrecha: las posiciones se reescriben con mucha frecuencia
+(upsert por lotes) sin tocar la fila del repartidor ni su entrada en cache.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "posicion_repartidor",
+        sa.Column("repartidor_id", sa.Integer(), nullable=False),
+        sa.Column("latitud", sa.Float(), nullable=False),
+        sa.Column("longitud", sa.Float(), nullable=False),
+        sa.Column("actualizado_en", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["repartidor_id"], ["repartidor.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("repartidor_id"),
+    )
+    op.create_index("ix_posicion_repartidor_actualizado_en", "posicion_repartidor", ["actualizado_en"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_posicion_repartidor_actualizado_en", table_name="posicion_repartidor")
+    op.drop_table("posicion_repartidor")
@@ -0,0 +1,35 @@
+"""Barrido de caducidad: archivado_en en oferta_reducida e índices de los vencimientos
+
+Las ofertas vencidas se retiran con borrado lógico, como los productos. Los
+índices compuestos permiten que cada lote del barrido tome las filas más
+atrasadas sin recorrer las ya procesadas, que se acumulan con el tiempo.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 14:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("oferta_reducida", sa.Column("archivado_en", sa.DateTime(), nullable=True))
+    op.create_index("ix_oferta_reducida_caducidad", "oferta_reducida", ["archivado_en", "fecha_fin"])
+    op.create_index("ix_inventario_producto_caducidad", "inventario_producto", ["estado", "fecha_ingreso"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_inventario_producto_caducidad", table_name="inventario_producto")
+    op.drop_index("ix_oferta_reducida_caducidad", table_name="oferta_reducida")
+    with op.batch_alter_table("oferta_reducida") as batch:
+        batch.drop_column("archivado_en")
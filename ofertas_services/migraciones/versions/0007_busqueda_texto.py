@@ -0,0 +1,56 @@
+"""Búsqueda de texto: pg_trgm, unaccent e índices GIN de trigramas (solo PostgreSQL)
+
+texto_busqueda() envuelve lower(unaccent(...)) como IMMUTABLE (unaccent no lo
+es, porque depende del diccionario) para poder indexar la expresión. Los
+índices se crean CONCURRENTLY, fuera de la transacción, para no bloquear las
+escrituras en tablas grandes. En SQLite no hay nada que crear: la búsqueda
+usa el índice en memoria de busqueda.py.
+
+Crear las extensiones requiere permisos de superusuario o de owner de la base.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 16:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# índice, tabla, columna
+INDICES = [
+    ("ix_inventario_producto_nombre_trgm", "inventario_producto", "nombre"),
+    ("ix_ruta_entrega_destino_trgm", "ruta_entrega", "destino"),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute(
+        "CREATE OR REPLACE FUNCTION texto_busqueda(texto text) RETURNS text "
+        "LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE "
+        "AS $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, texto)) $$"
+    )
+    with op.get_context().autocommit_block():
+        for indice, tabla, columna in INDICES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {indice} ON {tabla} "
+                       f"USING gin (texto_busqueda({columna}) gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        for indice, _, _ in INDICES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {indice}")
+    op.execute("DROP FUNCTION IF EXISTS texto_busqueda(text)")
@@ -0,0 +1,163 @@
+"""Tablas de reportes (rollups) mantenidas por triggers
+
+- reporte_entregas_diarias: entregas por día y repartidor (0 = sin asignar).
+- reporte_rutas_diarias: rutas terminadas y su duración total por día de
+  salida y repartidor (la zona se toma del repartidor al consultar).
+- reporte_ofertas_producto: ofertas vigentes (no archivadas) y suma de sus
+  precios por producto.
+
+Cada INSERT, UPDATE o DELETE en entrega, ruta_entrega u oferta_reducida suma
+su delta con un upsert, venga de la API, de una operación en lote, de un ON
+DELETE CASCADE o de otro servicio. En PostgreSQL los triggers son por
+sentencia con tablas de transición (un upsert agrupado por sentencia); en
+SQLite, por fila. Al final se cargan los totales del historial existente:
+CREATE TRIGGER bloquea las escrituras en PostgreSQL hasta el commit, así que
+ninguna fila queda sin contar ni se cuenta dos veces.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 18:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _segundos(desde, hasta, dialecto):
+    if dialecto == "postgresql":
+        return f"EXTRACT(EPOCH FROM ({hasta} - {desde}))"
+    return f"(julianday({hasta}) - julianday({desde})) * 86400"
+
+
+def _contribuciones(dialecto):
+    """tabla origen -> (tabla del reporte, claves, valores, SELECT de la contribución de `f` con signo `s`)
+
+    En el SELECT, `{f}` es la fila (NEW/OLD en SQLite, el alias de la tabla de
+    transición en PostgreSQL) y `{desde}` el FROM de PostgreSQL (vacío en SQLite).
+    """
+    return {
+        "entrega": (
+            "reporte_entregas_diarias", ("dia", "repartidor_id"), ("entregas",),
+            "SELECT date({f}.fecha) AS dia, COALESCE({f}.repartidor_id, 0) AS repartidor_id, {s} AS entregas "
+            "{desde} WHERE true",
+        ),
+        "ruta_entrega": (
+            "reporte_rutas_diarias", ("dia", "repartidor_id"), ("rutas", "segundos"),
+            "SELECT date({f}.hora_salida) AS dia, COALESCE({f}.repartidor_id, 0) AS repartidor_id, {s} AS rutas, "
+            "{s} * " + _segundos("{f}.hora_salida", "{f}.hora_llegada", dialecto) + " AS segundos "
+            "{desde} WHERE {f}.hora_llegada IS NOT NULL",
+        ),
+        "oferta_reducida": (
+            "reporte_ofertas_producto", ("producto_id",), ("ofertas", "precio_total"),
+            "SELECT {f}.producto_id AS producto_id, {s} AS ofertas, {s} * {f}.precio_oferta AS precio_total "
+            "{desde} WHERE {f}.producto_id IS NOT NULL AND {f}.archivado_en IS NULL",
+        ),
+    }
+
+
+def _upsert(reporte, claves, valores, select):
+    columnas = ", ".join(claves + valores)
+    sumas = ", ".join(f"{v} = {reporte}.{v} + excluded.{v}" for v in valores)
+    return f"INSERT INTO {reporte} ({columnas}) {select} ON CONFLICT ({', '.join(claves)}) DO UPDATE SET {sumas}"
+
+
+def _triggers_sqlite():
+    for tabla, (reporte, claves, valores, select) in _contribuciones("sqlite").items():
+        fila = {signo: _upsert(reporte, claves, valores, select.format(f=f, s=signo, desde=""))
+                for f, signo in (("NEW", "1"), ("OLD", "-1"))}
+        op.execute(f"CREATE TRIGGER {tabla}_reporte_insert AFTER INSERT ON {tabla} BEGIN {fila['1']}; END")
+        op.execute(f"CREATE TRIGGER {tabla}_reporte_delete AFTER DELETE ON {tabla} BEGIN {fila['-1']}; END")
+        op.execute(f"CREATE TRIGGER {tabla}_reporte_update AFTER UPDATE ON {tabla} "
+                   f"BEGIN {fila['-1']}; {fila['1']}; END")
+
+
+def _triggers_postgresql():
+    # Tablas de transición de cada operación: (alias, signo)
+    fuentes = {
+        "insert": [("nuevas", "1")],
+        "delete": [("viejas", "-1")],
+        "update": [("viejas", "-1"), ("nuevas", "1")],
+    }
+    referencias = {
+        "insert": "REFERENCING NEW TABLE AS nuevas",
+        "delete": "REFERENCING OLD TABLE AS viejas",
+        "update": "REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas",
+    }
+    for tabla, (reporte, claves, valores, select) in _contribuciones("postgresql").items():
+        for operacion, partes in fuentes.items():
+            union = " UNION ALL ".join(select.format(f=alias, s=signo, desde=f"FROM {alias}")
+                                       for alias, signo in partes)
+            # Un UPDATE que no toca las columnas del reporte suma cero: no se escribe nada
+            agrupado = (f"SELECT {', '.join(claves)}, {', '.join(f'sum({v}) AS {v}' for v in valores)} "
+                        f"FROM ({union}) AS d GROUP BY {', '.join(claves)} "
+                        f"HAVING {' OR '.join(f'sum({v}) <> 0' for v in valores)}")
+            funcion = f"{tabla}_reporte_{operacion}"
+            op.execute(f"CREATE FUNCTION {funcion}() RETURNS trigger LANGUAGE plpgsql AS $$ "
+                       f"BEGIN {_upsert(reporte, claves, valores, agrupado)}; RETURN NULL; END $$")
+            op.execute(f"CREATE TRIGGER {funcion} AFTER {operacion.upper()} ON {tabla} {referencias[operacion]} "
+                       f"FOR EACH STATEMENT EXECUTE FUNCTION {funcion}()")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "reporte_entregas_diarias",
+        sa.Column("dia", sa.Date(), nullable=False),
+        sa.Column("repartidor_id", sa.Integer(), nullable=False),
+        sa.Column("entregas", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("dia", "repartidor_id"),
+    )
+    op.create_index("ix_reporte_entregas_diarias_repartidor", "reporte_entregas_diarias", ["repartidor_id", "dia"])
+    op.create_table(
+        "reporte_rutas_diarias",
+        sa.Column("dia", sa.Date(), nullable=False),
+        sa.Column("repartidor_id", sa.Integer(), nullable=False),
+        sa.Column("rutas", sa.Integer(), nullable=False),
+        sa.Column("segundos", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("dia", "repartidor_id"),
+    )
+    op.create_table(
+        "reporte_ofertas_producto",
+        sa.Column("producto_id", sa.Integer(), nullable=False),
+        sa.Column("ofertas", sa.Integer(), nullable=False),
+        sa.Column("precio_total", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("producto_id"),
+    )
+    op.create_index("ix_reporte_ofertas_producto_ofertas", "reporte_ofertas_producto", ["ofertas"])
+
+    dialecto = op.get_bind().dialect.name
+    if dialecto == "postgresql":
+        _triggers_postgresql()
+    else:
+        _triggers_sqlite()
+
+    # Totales del historial existente
+    for tabla, (reporte, claves, valores, select) in _contribuciones(dialecto).items():
+        contribucion = select.format(f=tabla, s="1", desde=f"FROM {tabla}")
+        op.execute(f"INSERT INTO {reporte} ({', '.join(claves + valores)}) "
+                   f"SELECT {', '.join(claves)}, {', '.join(f'sum({v})' for v in valores)} "
+                   f"FROM ({contribucion}) AS d GROUP BY {', '.join(claves)}")
+
+
+def downgrade() -> None:
+    dialecto = op.get_bind().dialect.name
+    for tabla in ("entrega", "ruta_entrega", "oferta_reducida"):
+        for operacion in ("insert", "update", "delete"):
+            if dialecto == "postgresql":
+                op.execute(f"DROP TRIGGER IF EXISTS {tabla}_reporte_{operacion} ON {tabla}")
+                op.execute(f"DROP FUNCTION IF EXISTS {tabla}_reporte_{operacion}()")
+            else:
+                op.execute(f"DROP TRIGGER IF EXISTS {tabla}_reporte_{operacion}")
+    op.drop_index("ix_reporte_ofertas_producto_ofertas", table_name="reporte_ofertas_producto")
+    op.drop_table("reporte_ofertas_producto")
+    op.drop_table("reporte_rutas_diarias")
+    op.drop_index("ix_reporte_entregas_diarias_repartidor", table_name="reporte_entregas_diarias")
+    op.drop_table("reporte_entregas_diarias")
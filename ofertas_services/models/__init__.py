@@ -3,11 +3,17 @@ from .oferta_reducida import OfertaReducida
 from .repartidor import Repartidor
 from .entrega import Entrega
 from .ruta_entrega import RutaEntrega
+from .posicion_repartidor import PosicionRepartidor
+from .reporte import ReporteEntregasDiarias, ReporteRutasDiarias, ReporteOfertasProducto
 
 __all__ = [
     "InventarioProducto",
     "OfertaReducida", 
     "Repartidor",
     "Entrega",
-    "RutaEntrega"
+    "RutaEntrega",
+    "PosicionRepartidor",
+    "ReporteEntregasDiarias",
+    "ReporteRutasDiarias",
+    "ReporteOfertasProducto"
 ]
\ No newline at end of file
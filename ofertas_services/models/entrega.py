@@ -1,5 +1,5 @@
 # models/entrega.py
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, String
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, String, Float
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -7,8 +7,11 @@ class Entrega(Base):
     __tablename__ = "entrega"
 
     id = Column(Integer, primary_key=True, index=True)
-    repartidor_id = Column(Integer, ForeignKey("repartidor.id"))
-    fecha = Column(DateTime, nullable=False)
+    repartidor_id = Column(Integer, ForeignKey("repartidor.id", ondelete="CASCADE"), index=True)
+    fecha = Column(DateTime, nullable=False, index=True)
     descripcion = Column(String)
+    # Punto de entrega (grados WGS84); las entregas sin coordenadas no entran en la optimización de rutas
+    latitud = Column(Float)
+    longitud = Column(Float)
 
     repartidor = relationship("Repartidor", back_populates="entregas")
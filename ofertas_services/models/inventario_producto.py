@@ -1,16 +1,22 @@
 # models/inventario_producto.py
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
 class InventarioProducto(Base):
     __tablename__ = "inventario_producto"
+    __table_args__ = (
+        # Barrido de caducidad: los disponibles ordenados por fecha de ingreso
+        Index("ix_inventario_producto_caducidad", "estado", "fecha_ingreso"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nombre = Column(String, nullable=False)
     cantidad = Column(Integer, nullable=False)
     precio_unitario = Column(Float, nullable=False)
-    fecha_ingreso = Column(DateTime, nullable=False)
-    estado = Column(String, nullable=False)  # Disponible, Vendido, Expirado
+    fecha_ingreso = Column(DateTime, nullable=False, index=True)
+    estado = Column(String, nullable=False, index=True)  # Disponible, Vendido, Expirado
+    archivado_en = Column(DateTime)  # borrado lógico: NULL mientras está vigente
 
-    ofertas_reducidas = relationship("OfertaReducida", back_populates="producto", cascade="all, delete-orphan", lazy='select')
+    # passive_deletes: al borrar el producto no se cargan sus ofertas, las borra ON DELETE CASCADE
+    ofertas_reducidas = relationship("OfertaReducida", back_populates="producto", cascade="all, delete-orphan", passive_deletes=True, lazy='select')
@@ -1,15 +1,22 @@
 # models/oferta_reducida.py
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
 class OfertaReducida(Base):
     __tablename__ = "oferta_reducida"
+    __table_args__ = (
+        # Consultas por ventana de vigencia (ofertas activas en un instante)
+        Index("ix_oferta_reducida_ventana", "fecha_inicio", "fecha_fin", "producto_id"),
+        # Barrido de caducidad: las vigentes (archivado_en NULL) ordenadas por fin
+        Index("ix_oferta_reducida_caducidad", "archivado_en", "fecha_fin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    producto_id = Column(Integer, ForeignKey("inventario_producto.id"))
+    producto_id = Column(Integer, ForeignKey("inventario_producto.id", ondelete="CASCADE"), index=True)
     precio_oferta = Column(Float, nullable=False)
     fecha_inicio = Column(DateTime, nullable=False)
-    fecha_fin = Column(DateTime, nullable=False)
+    fecha_fin = Column(DateTime, nullable=False, index=True)
+    archivado_en = Column(DateTime)  # retirada por el barrido de caducidad: NULL mientras está vigente
 
     producto = relationship("InventarioProducto", back_populates="ofertas_reducidas")
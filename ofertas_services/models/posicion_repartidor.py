@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime
+from database import Base
+
+class PosicionRepartidor(Base):
+    """Última posición conocida de cada repartidor (una fila por repartidor, se sobrescribe)"""
+    __tablename__ = "posicion_repartidor"
+
+    repartidor_id = Column(Integer, ForeignKey("repartidor.id", ondelete="CASCADE"), primary_key=True)
+    latitud = Column(Float, nullable=False)
+    longitud = Column(Float, nullable=False)
+    actualizado_en = Column(DateTime, nullable=False, index=True)  # reconstrucción: solo posiciones recientes
@@ -1,5 +1,5 @@
 # models/repartidor.py
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, DateTime
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -10,6 +10,8 @@ class Repartidor(Base):
     nombre = Column(String, nullable=False)
     telefono = Column(String, nullable=False)
     zona = Column(String)  # Norte, Sur, Centro, etc.
+    archivado_en = Column(DateTime)  # borrado lógico: NULL mientras está vigente
 
-    entregas = relationship("Entrega", back_populates="repartidor", cascade="all, delete-orphan", lazy='select')
-    rutas = relationship("RutaEntrega", back_populates="repartidor", cascade="all, delete-orphan", lazy='select')
+    # passive_deletes: al borrar el repartidor no se cargan los hijos, los borra ON DELETE CASCADE
+    entregas = relationship("Entrega", back_populates="repartidor", cascade="all, delete-orphan", passive_deletes=True, lazy='select')
+    rutas = relationship("RutaEntrega", back_populates="repartidor", cascade="all, delete-orphan", passive_deletes=True, lazy='select')
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, Float, Date, Index
+from database import Base
+
+
+# Tablas de reportes: las mantienen los triggers de la migración 0008, la API solo las lee
+
+class ReporteEntregasDiarias(Base):
+    """Entregas por día y repartidor (repartidor_id 0 = sin asignar)"""
+    __tablename__ = "reporte_entregas_diarias"
+    __table_args__ = (
+        Index("ix_reporte_entregas_diarias_repartidor", "repartidor_id", "dia"),
+    )
+
+    dia = Column(Date, primary_key=True)
+    repartidor_id = Column(Integer, primary_key=True)
+    entregas = Column(Integer, nullable=False)
+
+
+class ReporteRutasDiarias(Base):
+    """Rutas terminadas (con hora_llegada) y su duración total por día de salida y repartidor"""
+    __tablename__ = "reporte_rutas_diarias"
+
+    dia = Column(Date, primary_key=True)
+    repartidor_id = Column(Integer, primary_key=True)
+    rutas = Column(Integer, nullable=False)
+    segundos = Column(Float, nullable=False)
+
+
+class ReporteOfertasProducto(Base):
+    """Ofertas vigentes (no archivadas) y suma de sus precios por producto"""
+    __tablename__ = "reporte_ofertas_producto"
+    __table_args__ = (
+        Index("ix_reporte_ofertas_producto_ofertas", "ofertas"),
+    )
+
+    producto_id = Column(Integer, primary_key=True)
+    ofertas = Column(Integer, nullable=False)
+    precio_total = Column(Float, nullable=False)
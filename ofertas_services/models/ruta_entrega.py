@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -6,9 +6,12 @@ class RutaEntrega(Base):
     __tablename__ = "ruta_entrega"
 
     id = Column(Integer, primary_key=True, index=True)
-    repartidor_id = Column(Integer, ForeignKey("repartidor.id"))
+    repartidor_id = Column(Integer, ForeignKey("repartidor.id", ondelete="CASCADE"), index=True)
     destino = Column(String, nullable=False)
-    hora_salida = Column(DateTime, nullable=False)
+    hora_salida = Column(DateTime, nullable=False, index=True)
     hora_llegada = Column(DateTime)
+    # Coordenadas del destino (grados WGS84)
+    latitud = Column(Float)
+    longitud = Column(Float)
 
     repartidor = relationship("Repartidor")
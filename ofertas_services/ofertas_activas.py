@@ -0,0 +1,218 @@
+import bisect
+import heapq
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import config
+from cambios import suscribir, ELIMINAR, CASCADA
+
+EPOCA = datetime(1970, 1, 1)
+
+
+class IndiceOfertasActivas:
+    """Índice de intervalos en memoria para responder "qué ofertas están vigentes en t".
+
+    Cada oferta se registra en los buckets de tiempo (de `ancho_bucket`) que cubre
+    su ventana [fecha_inicio, fecha_fin); una consulta solo revisa el bucket del
+    instante pedido. Las ofertas que cubren más de `max_buckets` se guardan
+    aparte y se revisan siempre. Cada bucket (y las largas) es una lista de
+    ids ordenada: una página se lee desde el cursor y se corta al llegar a
+    `limit`, sin ordenar el bucket en cada consulta. Solo se indexan las ofertas que terminan
+    después del horizonte (ahora - historial); para instantes anteriores la
+    consulta va a la base de datos.
+
+    Se mantiene al día con los cambios publicados por crud/* (cambios.py) y el
+    lifespan lo reconstruye completo en segundo plano cada OFERTAS_ACTIVAS_TTL
+    segundos para incorporar los cambios hechos por otros workers. Los cambios
+    que llegan mientras se lee la base se guardan y se vuelven a aplicar sobre
+    el contenido nuevo, así que ninguno se pierde en el reemplazo.
+    """
+
+    def __init__(self, historial: timedelta, ancho_bucket=timedelta(hours=1), max_buckets=24 * 14):
+        self.historial = historial
+        self.ancho_bucket = ancho_bucket
+        self.max_buckets = max_buckets
+        self._lock = threading.Lock()
+        self._productos_pendientes = set()  # productos de ofertas nuevas aún sin nombre/estado
+        self._construido_en = None
+        self._durante = None                # cambios recibidos durante una reconstrucción
+        self._vaciar()
+
+    def _vaciar(self):
+        self._ofertas = {}                 # id -> dict de la oferta
+        self._buckets = defaultdict(list)  # nº de bucket -> ids ordenados
+        self._largas = []                  # ids ordenados de las que cubren demasiados buckets
+        self._productos = {}               # producto_id -> {"nombre", "estado"} (None si está archivado)
+        self.horizonte = datetime.now() - self.historial
+
+    def _bucket(self, instante: datetime) -> int:
+        return int((instante - EPOCA) / self.ancho_bucket)
+
+    def _rango(self, oferta):
+        return range(self._bucket(oferta["fecha_inicio"]), self._bucket(oferta["fecha_fin"]) + 1)
+
+    def _insertar(self, oferta):
+        if oferta["fecha_fin"] < self.horizonte:
+            return
+        self._ofertas[oferta["id"]] = oferta
+        rango = self._rango(oferta)
+        if len(rango) > self.max_buckets:
+            bisect.insort(self._largas, oferta["id"])
+        else:
+            for bucket in rango:
+                bisect.insort(self._buckets[bucket], oferta["id"])
+        if oferta["producto_id"] not in self._productos:
+            self._productos_pendientes.add(oferta["producto_id"])
+
+    def _quitar(self, oferta_id):
+        oferta = self._ofertas.pop(oferta_id, None)
+        if oferta is None:
+            return
+        if _descartar(self._largas, oferta_id):
+            return
+        for bucket in self._rango(oferta):
+            ids = self._buckets.get(bucket)
+            if ids is not None:
+                _descartar(ids, oferta_id)
+                if not ids:
+                    del self._buckets[bucket]
+
+    # Mantenimiento incremental
+
+    def _aplicar_ofertas(self, accion, filas):
+        if accion == CASCADA:
+            # Ofertas borradas junto con su producto: solo se conoce el producto_id
+            productos = {fila["producto_id"] for fila in filas}
+            for oferta_id in [o["id"] for o in self._ofertas.values() if o["producto_id"] in productos]:
+                self._quitar(oferta_id)
+            return
+        for fila in filas:
+            self._quitar(fila["id"])
+            if "fecha_fin" not in fila:
+                # Fila recortada por el relevo (difusion.py): vuelve en la próxima reconstrucción
+                continue
+            if accion != ELIMINAR and fila.get("archivado_en") is None:
+                # Sin la marca de borrado lógico: las ofertas se devuelven tal cual en /activas
+                self._insertar({clave: valor for clave, valor in fila.items() if clave != "archivado_en"})
+
+    def _aplicar_productos(self, accion, filas):
+        for fila in filas:
+            if accion == ELIMINAR:
+                self._productos.pop(fila["id"], None)
+            elif fila["id"] in self._productos:
+                if "nombre" in fila and "estado" in fila:
+                    self._productos[fila["id"]] = {"nombre": fila["nombre"], "estado": fila["estado"]}
+                else:
+                    # Fila recortada por el relevo (difusion.py): se vuelve a leer en la próxima consulta
+                    del self._productos[fila["id"]]
+                    self._productos_pendientes.add(fila["id"])
+
+    def aplicar_ofertas(self, tabla, accion, filas):
+        with self._lock:
+            if self._durante is not None:
+                self._durante.append((self._aplicar_ofertas, accion, filas))
+            if self._construido_en is not None:
+                self._aplicar_ofertas(accion, filas)
+
+    def aplicar_productos(self, tabla, accion, filas):
+        with self._lock:
+            if self._durante is not None:
+                self._durante.append((self._aplicar_productos, accion, filas))
+            self._aplicar_productos(accion, filas)
+
+    # Carga desde la base de datos
+
+    def listo(self):
+        """True si ya se construyó alguna vez (hasta entonces las consultas van a la base)"""
+        return self._construido_en is not None
+
+    def iniciar_reconstruccion(self):
+        """Empezar a guardar los cambios publicados: llamar antes de leer la base para reconstruir"""
+        with self._lock:
+            self._durante = []
+
+    def cancelar_reconstruccion(self):
+        with self._lock:
+            self._durante = None
+
+    def reconstruir(self, ofertas, productos):
+        """Reemplazar el contenido con las ofertas (dicts) y productos {id: {...}} leídos de la BD.
+
+        El contenido nuevo se arma sin el lock (las consultas siguen con el
+        anterior) y se reemplaza de una vez; después se aplican los cambios
+        guardados desde iniciar_reconstruccion (los que ya estaban en la
+        lectura se aplican de nuevo sin efecto).
+        """
+        nuevo = IndiceOfertasActivas(self.historial, self.ancho_bucket, self.max_buckets)
+        for oferta in ofertas:
+            nuevo._insertar(oferta)
+        nuevo._productos.update(productos)
+        nuevo._productos_pendientes -= set(productos)
+        with self._lock:
+            self._ofertas, self._buckets, self._largas = nuevo._ofertas, nuevo._buckets, nuevo._largas
+            self._productos, self._productos_pendientes = nuevo._productos, nuevo._productos_pendientes
+            self.horizonte = nuevo.horizonte
+            self._construido_en = time.monotonic()
+            durante, self._durante = self._durante or [], None
+            for aplicar, accion, filas in durante:
+                aplicar(accion, filas)
+
+    def productos_pendientes(self):
+        with self._lock:
+            return set(self._productos_pendientes)
+
+    def registrar_productos(self, productos):
+        with self._lock:
+            self._productos.update(productos)
+            self._productos_pendientes -= set(productos)
+
+    # Consulta
+
+    def activas(self, en: datetime, precio_min=None, precio_max=None, estado=None, despues_de=None, limit=100):
+        """Hasta limit+1 ofertas vigentes en `en` con id > despues_de, ordenadas por id, con el nombre y estado de su producto"""
+        with self._lock:
+            listas = (self._buckets.get(self._bucket(en), []), self._largas)
+            resultado = []
+            for oferta_id in heapq.merge(*(_desde(ids, despues_de) for ids in listas)):
+                oferta = self._ofertas[oferta_id]
+                if not (oferta["fecha_inicio"] <= en < oferta["fecha_fin"]):
+                    continue
+                if precio_min is not None and oferta["precio_oferta"] < precio_min:
+                    continue
+                if precio_max is not None and oferta["precio_oferta"] > precio_max:
+                    continue
+                producto = self._productos.get(oferta["producto_id"])
+                if producto is None or (estado is not None and producto["estado"] != estado):
+                    continue
+                resultado.append({
+                    **oferta,
+                    "producto_nombre": producto["nombre"],
+                    "producto_estado": producto["estado"],
+                })
+                if len(resultado) > limit:
+                    break
+            return resultado
+
+
+def _desde(ids, despues_de):
+    """Los ids de la lista ordenada `ids` mayores que `despues_de`, empezando por búsqueda binaria"""
+    inicio = 0 if despues_de is None else bisect.bisect_right(ids, despues_de)
+    return (ids[posicion] for posicion in range(inicio, len(ids)))
+
+
+def _descartar(ids, oferta_id):
+    """Quitar `oferta_id` de la lista ordenada `ids`; False si no estaba"""
+    posicion = bisect.bisect_left(ids, oferta_id)
+    if posicion < len(ids) and ids[posicion] == oferta_id:
+        del ids[posicion]
+        return True
+    return False
+
+
+indice = IndiceOfertasActivas(
+    historial=timedelta(hours=config.OFERTAS_ACTIVAS_HISTORIAL_HORAS),
+)
+suscribir("oferta_reducida", indice.aplicar_ofertas)
+suscribir("inventario_producto", indice.aplicar_productos)
@@ -0,0 +1,148 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+import config
+
+RADIO_TIERRA_KM = 6371.0088
+
+
+def distancias(coordenadas) -> np.ndarray:
+    """Matriz n x n de distancias haversine en km entre pares (latitud, longitud) en grados"""
+    puntos = np.radians(np.asarray(coordenadas, dtype=float).reshape(-1, 2))
+    lat, lon = puntos[:, 0], puntos[:, 1]
+    h = (np.sin((lat[:, None] - lat[None, :]) / 2) ** 2
+         + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin((lon[:, None] - lon[None, :]) / 2) ** 2)
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+
+def _vecino_mas_cercano(d, inicio, nodos):
+    """Recorrido greedy desde `inicio`: siempre a la parada sin visitar más cercana"""
+    pendiente = np.zeros(len(d), dtype=bool)
+    pendiente[nodos] = True
+    recorrido, actual = [], inicio
+    for _ in range(len(nodos)):
+        actual = int(np.argmin(np.where(pendiente, d[actual], np.inf)))
+        pendiente[actual] = False
+        recorrido.append(actual)
+    return recorrido
+
+
+def _dos_opt(d, recorrido, fin_en):
+    """Mejorar el recorrido invirtiendo tramos mientras acorten el total o hasta `fin_en`.
+
+    `recorrido` empieza y termina en nodos fijos; solo se invierten tramos
+    interiores. Para cada posición i se evalúan a la vez (vectorizado) todos
+    los tramos [i, j] y se aplica el que más acorta. Devuelve (recorrido,
+    mejoras, completo), con completo=False si se agotó el tiempo.
+    """
+    recorrido = np.asarray(recorrido)
+    ultimo = len(recorrido) - 2
+    mejoras = 0
+    mejorado = True
+    while mejorado:
+        mejorado = False
+        for i in range(1, ultimo):
+            if time.time() >= fin_en:
+                return recorrido, mejoras, False
+            a, b = recorrido[i - 1], recorrido[i]
+            c, e = recorrido[i + 1:ultimo + 1], recorrido[i + 2:ultimo + 2]
+            delta = d[a, c] + d[b, e] - d[a, b] - d[c, e]
+            j = int(np.argmin(delta))
+            if delta[j] < -1e-9:
+                recorrido[i:i + j + 2] = recorrido[i:i + j + 2][::-1].copy()
+                mejoras += 1
+                mejorado = True
+    return recorrido, mejoras, True
+
+
+def resolver(coordenadas, origen=None, fin_en=None):
+    """Ordenar las paradas `coordenadas` [(lat, lon), ...] para recorrerlas con la menor distancia.
+
+    Recorrido abierto: empieza en `origen` (lat, lon) si se da, o en la parada
+    que convenga, y termina en la última parada sin volver. Vecino más cercano
+    y luego 2-opt hasta que no mejora o se alcanza `fin_en` (time.time()).
+    Devuelve el orden (índices en `coordenadas`), los tramos en km y totales.
+    """
+    n = len(coordenadas)
+    puntos = list(coordenadas) + ([origen] if origen is not None else [])
+    # Nodo ficticio a distancia 0 de todos: cierra el recorrido sin coste, así
+    # el 2-opt trata igual los extremos libres que los tramos interiores
+    d = np.zeros((len(puntos) + 1, len(puntos) + 1))
+    d[:-1, :-1] = distancias(puntos)
+    ficticio = len(puntos)
+    inicio = n if origen is not None else ficticio
+
+    recorrido = [inicio] + _vecino_mas_cercano(d, inicio, list(range(n))) + [ficticio]
+    recorrido, mejoras, completo = _dos_opt(d, recorrido, fin_en if fin_en is not None else float("inf"))
+
+    tramos = d[recorrido[:-2], recorrido[1:-1]]
+    inicial = [inicio] + list(range(n)) + [ficticio]
+    return {
+        "orden": [int(i) for i in recorrido[1:-1]],
+        "tramos_km": [float(t) for t in tramos],
+        "distancia_km": float(tramos.sum()),
+        "distancia_inicial_km": float(d[inicial[:-2], inicial[1:-1]].sum()),
+        "mejoras": mejoras,
+        "completo": completo,
+    }
+
+
+# Pool de procesos para resolver varios repartidores en paralelo sin competir
+# por el GIL con el worker web. Se crea con la primera optimización.
+_pool = None
+
+
+def _obtener_pool():
+    global _pool
+    if _pool is None:
+        # spawn: los procesos hijos no heredan hilos ni conexiones abiertas del worker
+        _pool = ProcessPoolExecutor(max_workers=config.RUTAS_PROCESOS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def cerrar_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+async def resolver_varios(problemas, origen=None, tiempo_max=None):
+    """Resolver {clave: coordenadas} en el pool de procesos, todos con el mismo plazo total.
+
+    Con RUTAS_PROCESOS=0 se resuelven en el threadpool. Los que esperan un
+    proceso libre empiezan más tarde y tienen menos tiempo para el 2-opt; el
+    vecino más cercano se completa siempre.
+    """
+    fin_en = time.time() + (tiempo_max or config.RUTAS_TIEMPO_MAX)
+    if config.RUTAS_PROCESOS > 0:
+        loop = asyncio.get_running_loop()
+        pool = _obtener_pool()
+        tareas = [loop.run_in_executor(pool, resolver, coordenadas, origen, fin_en) for coordenadas in problemas.values()]
+    else:
+        tareas = [run_in_threadpool(resolver, coordenadas, origen, fin_en) for coordenadas in problemas.values()]
+    return dict(zip(problemas, await asyncio.gather(*tareas)))
+
+
+async def planificar(paradas, origen=None, tiempo_max=None):
+    """Planes ordenados por repartidor a partir de {repartidor_id: [{"id", "latitud", "longitud"}]}"""
+    problemas = {repartidor_id: [(p["latitud"], p["longitud"]) for p in lista]
+                 for repartidor_id, lista in paradas.items() if lista}
+    soluciones = await resolver_varios(problemas, origen, tiempo_max)
+    planes = []
+    for repartidor_id, solucion in soluciones.items():
+        lista = paradas[repartidor_id]
+        planes.append({
+            "repartidor_id": repartidor_id,
+            "paradas": [{**lista[i], "distancia_km": round(tramo, 3)}
+                        for i, tramo in zip(solucion["orden"], solucion["tramos_km"])],
+            "distancia_km": round(solucion["distancia_km"], 3),
+            "distancia_inicial_km": round(solucion["distancia_inicial_km"], 3),
+            "completo": solucion["completo"],
+        })
+    return planes
@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import tuple_
+
+# Máximo de elementos por página en cualquier listado
+MAX_LIMIT = 500
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no corresponde a ningún listado de este servicio"""
+
+
+def codificar_cursor(valores):
+    """Serializar los valores de la clave de orden en un cursor opaco"""
+    crudo = json.dumps([v.isoformat() if isinstance(v, date) else v for v in valores])
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor, columnas):
+    """Recuperar los valores de la clave de orden con el tipo de cada columna"""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(valores, list) or len(valores) != len(columnas):
+            raise CursorInvalido(cursor)
+        return [
+            columna.type.python_type.fromisoformat(valor) if columna.type.python_type in (date, datetime)
+            else columna.type.python_type(valor)
+            for columna, valor in zip(columnas, valores)
+        ]
+    except (ValueError, TypeError) as e:
+        raise CursorInvalido(cursor) from e
+
+
+def pagina(filas, limit, claves=("id",)):
+    """Armar una página a partir de hasta limit+1 filas (dicts) ya ordenadas por `claves`"""
+    if len(filas) > limit:
+        filas = filas[:limit]
+        return {"items": filas, "next_cursor": codificar_cursor([filas[-1][clave] for clave in claves])}
+    return {"items": filas, "next_cursor": None}
+
+
+def paginar(db, consulta, cursor, limit, *columnas):
+    """Paginación keyset: filtra por la clave de orden en vez de usar OFFSET.
+
+    Cada página cuesta lo mismo que la primera porque el filtro `(columnas) > cursor`
+    se resuelve sobre el índice de la clave. Se pide una fila de más para saber si
+    hay página siguiente sin un COUNT. `consulta` es un select() de columnas y
+    las filas se devuelven como dicts, sin construir instancias ORM.
+    """
+    if cursor:
+        valores = decodificar_cursor(cursor, columnas)
+        if len(columnas) == 1:
+            consulta = consulta.where(columnas[0] > valores[0])
+        else:
+            consulta = consulta.where(tuple_(*columnas) > tuple_(*valores))
+    filas = [dict(fila) for fila in db.execute(consulta.order_by(*columnas).limit(limit + 1)).mappings()]
+    return pagina(filas, limit, [columna.key for columna in columnas])
@@ -0,0 +1,189 @@
+"""Lecturas en réplicas: los GET leen de una réplica y las escrituras van a la primaria.
+
+- get_db_lectura reparte las lecturas por turnos entre las réplicas sanas
+  (DB_REPLICAS); sin réplicas, o si ninguna responde, lee de la primaria.
+- Una comprobación periódica (SELECT 1 cada DB_REPLICAS_COMPROBACION
+  segundos, en el lifespan) saca y devuelve réplicas al turno.
+- Lectura de las propias escrituras: tras un POST/PUT/PATCH/DELETE correcto,
+  MiddlewareLecturaPropia deja una cookie que hace que los GET de ese cliente
+  lean de la primaria durante DB_REPLICAS_RETRASO segundos. La cookie lleva su
+  vencimiento, así que vale en cualquier worker sin estado compartido.
+- Lo leído en una réplica poco después de una escritura en la misma tabla
+  puede estar atrasado: en ese intervalo no se guarda en la cache de
+  entidades ni se responde con ETag (cache.py, condicional.py).
+- Los GET servidos desde índices en memoria (/activas, /buscar) siguen en la
+  primaria: el índice ya tiene las últimas escrituras y una réplica atrasada
+  no encontraría esas filas al leerlas.
+
+Para probarlo en local con SQLite, la réplica es otro fichero que se pone al
+día a mano (no hay replicación):
+    DB_REPLICAS=sqlite:///./replica.db python replicas.py sincronizar
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import sqlite3
+import time
+from contextlib import closing
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from starlette.concurrency import run_in_threadpool
+
+import config
+from database import REPLICAS, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Cookie de lectura de las propias escrituras; su valor es el instante (epoch) en que vence
+COOKIE_PRIMARIA = "ofertas_primaria"
+
+# Métodos que no escriben: no renuevan la cookie
+METODOS_LECTURA = {"GET", "HEAD", "OPTIONS"}
+
+
+class Replicas:
+    """Turno rotatorio entre las réplicas que respondieron a la última comprobación"""
+
+    def __init__(self, replicas):
+        self._replicas = replicas
+        self._sanas = list(replicas)
+        self._turno = itertools.count()
+        self._estado = {replica["nombre"]: {"sana": True, "fallos": 0, "error": None} for replica in replicas}
+
+    def elegir(self):
+        """La réplica siguiente del turno; None si no hay ninguna sana"""
+        sanas = self._sanas
+        if not sanas:
+            return None
+        return sanas[next(self._turno) % len(sanas)]
+
+    async def _responde(self, replica):
+        if config.ASYNC_MODE:
+            async with replica["motor"].connect() as conexion:
+                await conexion.execute(text("SELECT 1"))
+        else:
+            def consultar():
+                with replica["motor"].connect() as conexion:
+                    conexion.execute(text("SELECT 1"))
+            await run_in_threadpool(consultar)
+
+    async def comprobar(self):
+        """SELECT 1 en cada réplica; las que fallan o tardan más que el intervalo salen del turno"""
+        sanas = []
+        for replica in self._replicas:
+            estado = self._estado[replica["nombre"]]
+            try:
+                await asyncio.wait_for(self._responde(replica), config.DB_REPLICAS_COMPROBACION)
+            except Exception as e:
+                if estado["sana"]:
+                    logger.warning("Réplica %s fuera del turno: %s", replica["nombre"], e)
+                estado.update(sana=False, fallos=estado["fallos"] + 1, error=str(e) or type(e).__name__)
+                continue
+            if not estado["sana"]:
+                logger.info("Réplica %s de vuelta en el turno", replica["nombre"])
+            estado.update(sana=True, error=None)
+            sanas.append(replica)
+        self._sanas = sanas
+
+    def resumen(self):
+        return {
+            "replicas": {nombre: dict(estado) for nombre, estado in self._estado.items()},
+            "retraso_tolerado_s": config.DB_REPLICAS_RETRASO,
+        }
+
+
+replicas = Replicas(REPLICAS)
+
+
+def lee_sus_escrituras(request: Request) -> bool:
+    """True si el cliente escribió hace menos de DB_REPLICAS_RETRASO segundos (cookie vigente)"""
+    try:
+        return float(request.cookies.get(COOKIE_PRIMARIA, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def replica_de(request: Request):
+    """Réplica de la que lee esta petición (None = la primaria), elegida una vez por petición"""
+    if not hasattr(request.state, "replica"):
+        request.state.replica = None if not REPLICAS or lee_sus_escrituras(request) else replicas.elegir()
+    return request.state.replica
+
+
+def _sesiones(request: Request):
+    replica = replica_de(request)
+    if replica is not None:
+        return replica["sesiones"]
+    if config.ASYNC_MODE:
+        from database import AsyncSessionLocal
+        return AsyncSessionLocal
+    return SessionLocal
+
+
+if config.ASYNC_MODE:
+    # Dependencia para los GET: sesión en una réplica o en la primaria
+    async def get_db_lectura(request: Request):
+        async with _sesiones(request)() as db:
+            yield db
+else:
+    def get_db_lectura(request: Request):
+        db = _sesiones(request)()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+class MiddlewareLecturaPropia:
+    """Middleware ASGI: tras una escritura correcta, cookie para que el cliente lea de la primaria"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in METODOS_LECTURA:
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and mensaje["status"] < 400:
+                vence = time.time() + config.DB_REPLICAS_RETRASO
+                cookie = (f"{COOKIE_PRIMARIA}={vence:.3f}; Max-Age={max(int(config.DB_REPLICAS_RETRASO), 1)}; "
+                          "Path=/; HttpOnly; SameSite=Lax")
+                mensaje["headers"] = [*mensaje.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
+
+
+def sincronizar():
+    """Copiar la base primaria en cada réplica SQLite (API de backup): simula la replicación en local"""
+    primaria = make_url(config.DATABASE_URL)
+    if primaria.get_backend_name() != "sqlite":
+        raise SystemExit("sincronizar solo copia bases SQLite; en PostgreSQL la réplica se mantiene sola")
+    with closing(sqlite3.connect(primaria.database)) as origen:
+        for nombre, url in zip((replica["nombre"] for replica in REPLICAS), config.DB_REPLICAS):
+            url = make_url(url)
+            if url.get_backend_name() != "sqlite":
+                continue
+            try:
+                with closing(sqlite3.connect(url.database)) as destino:
+                    origen.backup(destino)
+            except sqlite3.Error as e:
+                print(f"{nombre}: no se pudo copiar ({e})")
+                continue
+            print(f"{nombre}: copiada desde la primaria")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("accion", choices=("sincronizar",))
+    parser.parse_args()
+    sincronizar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Reportes de logística: reconstrucción de las tablas de rollup.
+
+Las tablas reporte_* (models/reporte.py) las mantienen al día los triggers de
+la migración 0008: cada escritura en entrega, ruta_entrega u oferta_reducida
+suma su delta en la misma transacción, así que los reportes solo leen unas
+pocas filas agregadas. Este módulo las recalcula desde cero a partir de las
+tablas de origen, para repararlas si se escribió con los triggers
+desactivados (p. ej. una restauración con session_replication_role=replica).
+
+Uso (desde ofertas_services/):
+    python reportes.py reconstruir
+"""
+import argparse
+import time
+
+from sqlalchemy import delete, func, insert, literal, select, text
+
+from models.entrega import Entrega
+from models.oferta_reducida import OfertaReducida
+from models.reporte import ReporteEntregasDiarias, ReporteOfertasProducto, ReporteRutasDiarias
+from models.ruta_entrega import RutaEntrega
+
+
+def _segundos(desde, hasta, dialecto):
+    """Segundos entre dos DateTime, como en los triggers"""
+    if dialecto == "postgresql":
+        return func.extract("epoch", hasta - desde)
+    return (func.julianday(hasta) - func.julianday(desde)) * literal(86400)
+
+
+def agregados(dialecto):
+    """(tabla de reporte, SELECT con sus filas calculadas desde las tablas de origen)"""
+    dia_entrega = func.date(Entrega.fecha)
+    repartidor_entrega = func.coalesce(Entrega.repartidor_id, 0)
+    dia_ruta = func.date(RutaEntrega.hora_salida)
+    repartidor_ruta = func.coalesce(RutaEntrega.repartidor_id, 0)
+    return [
+        (ReporteEntregasDiarias, select(dia_entrega, repartidor_entrega, func.count())
+         .group_by(dia_entrega, repartidor_entrega)),
+        (ReporteRutasDiarias, select(
+            dia_ruta, repartidor_ruta, func.count(),
+            func.sum(_segundos(RutaEntrega.hora_salida, RutaEntrega.hora_llegada, dialecto)),
+        ).where(RutaEntrega.hora_llegada.is_not(None)).group_by(dia_ruta, repartidor_ruta)),
+        (ReporteOfertasProducto, select(OfertaReducida.producto_id, func.count(), func.sum(OfertaReducida.precio_oferta))
+         .where(OfertaReducida.producto_id.is_not(None), OfertaReducida.archivado_en.is_(None))
+         .group_by(OfertaReducida.producto_id)),
+    ]
+
+
+def reconstruir(db):
+    """Vaciar y recalcular las tablas de reporte en una transacción; devuelve filas por tabla"""
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "postgresql":
+        # Sin escrituras concurrentes en el origen: sus deltas se perderían al vaciar
+        db.execute(text("LOCK TABLE entrega, ruta_entrega, oferta_reducida IN SHARE MODE"))
+    filas = {}
+    for modelo, consulta in agregados(dialecto):
+        tabla = modelo.__table__
+        db.execute(delete(tabla))
+        filas[tabla.name] = db.execute(
+            insert(tabla).from_select([columna.key for columna in tabla.columns], consulta)
+        ).rowcount
+    db.commit()
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("accion", choices=("reconstruir",))
+    parser.parse_args()
+
+    from database import SessionLocal
+
+    inicio = time.perf_counter()
+    with SessionLocal() as db:
+        filas = reconstruir(db)
+    for tabla, n in filas.items():
+        print(f"{tabla}: {n} filas")
+    print(f"Reconstruido en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,96 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response
+from typing import Any, Dict, List, Optional
 from database import get_db
+from replicas import get_db_lectura
+from paginacion import MAX_LIMIT
+from crud import ejecutar
+from condicional import etag
+from instrumentacion import presupuesto
+from serializacion import responder
 from crud.entrega import (
     crear_entrega,
     obtener_todas,
     obtener_por_id,
     actualizar_entrega,
-    eliminar_entrega
+    eliminar_entrega,
+    crear_entregas_lote,
+    actualizar_entregas_lote,
+    eliminar_entregas_lote
+)
+from crud.posicion_repartidor import get_repartidores_cercanos, asignar_entrega
+from schemas import (
+    EntregaCreate,
+    EntregaUpdate,
+    EntregaOut,
+    Pagina,
+    AsignarRepartidorRequest,
+    AsignacionOut,
+    BulkCreateResponse,
+    BulkUpdateResponse,
+    BulkDeleteRequest,
+    BulkDeleteResponse,
+    MAX_LOTE,
 )
-from schemas import EntregaCreate, EntregaOut
 
 router = APIRouter(prefix="/entregas", tags=["Entregas"])
 
-@router.post("/", response_model=EntregaOut)
-def crear_nueva_entrega(entrega: EntregaCreate, db: Session = Depends(get_db)):
-    return crear_entrega(db, entrega)
+@router.post("/", response_model=EntregaOut, dependencies=[presupuesto(2)])
+async def crear_nueva_entrega(entrega: EntregaCreate, db=Depends(get_db)):
+    return await ejecutar(db, crear_entrega, entrega)
+
+@router.post("/asignar", response_model=AsignacionOut, dependencies=[presupuesto(6)])
+async def asignar_repartidor(datos: AsignarRepartidorRequest, db=Depends(get_db)):
+    """Los k repartidores disponibles más cercanos; con entrega_id, la asigna al primero"""
+    filtros = (datos.k, datos.zona, datos.carga_max, datos.radio_km)
+    if datos.entrega_id is None:
+        candidatos = await ejecutar(db, get_repartidores_cercanos, datos.latitud, datos.longitud, *filtros)
+        return {"candidatos": candidatos}
+    asignacion = await ejecutar(db, asignar_entrega, datos.entrega_id, *filtros)
+    if asignacion is None:
+        raise HTTPException(status_code=404, detail="Entrega no encontrada")
+    candidatos, entrega = asignacion
+    return {"candidatos": candidatos, "entrega": entrega}
+
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def crear_entregas_lote_endpoint(items: List[Dict[str, Any]] = Body(..., max_length=MAX_LOTE), db=Depends(get_db)):
+    return await ejecutar(db, crear_entregas_lote, items)
+
+@router.patch("/bulk", response_model=BulkUpdateResponse)
+async def actualizar_entregas_lote_endpoint(items: List[Dict[str, Any]] = Body(..., max_length=MAX_LOTE), db=Depends(get_db)):
+    return await ejecutar(db, actualizar_entregas_lote, items)
 
-@router.get("/{entrega_id}", response_model=EntregaOut)
-def leer_entrega(entrega_id: int, db: Session = Depends(get_db)):
-    db_entrega = obtener_por_id(db, entrega_id)
+@router.delete("/bulk", response_model=BulkDeleteResponse)
+async def eliminar_entregas_lote_endpoint(datos: BulkDeleteRequest, db=Depends(get_db)):
+    return await ejecutar(db, eliminar_entregas_lote, datos.ids)
+
+@router.get("/{entrega_id}", response_model=EntregaOut, dependencies=[presupuesto(1), etag("entrega", "repartidor")])
+async def leer_entrega(entrega_id: int, db=Depends(get_db_lectura)):
+    db_entrega = await ejecutar(db, obtener_por_id, entrega_id)
     if not db_entrega:
         raise HTTPException(status_code=404, detail="Entrega no encontrada")
     return db_entrega
 
-@router.get("/", response_model=List[EntregaOut])
-def leer_entregas(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return obtener_todas(db)
+@router.get("/", response_model=Pagina[EntregaOut], dependencies=[presupuesto(1), etag("entrega", "repartidor")])
+async def leer_entregas(response: Response, cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=MAX_LIMIT), db=Depends(get_db_lectura)):
+    return responder(await ejecutar(db, obtener_todas, cursor, limit), response)
+
+@router.put("/{entrega_id}", response_model=EntregaOut, dependencies=[presupuesto(2)])
+async def actualizar_entrega_endpoint(entrega_id: int, entrega: EntregaCreate, db=Depends(get_db)):
+    db_entrega = await ejecutar(db, actualizar_entrega, entrega_id, entrega.model_dump())
+    if not db_entrega:
+        raise HTTPException(status_code=404, detail="Entrega no encontrada")
+    return db_entrega
 
-@router.put("/{entrega_id}", response_model=EntregaOut)
-def actualizar_entrega_endpoint(entrega_id: int, entrega: EntregaCreate, db: Session = Depends(get_db)):
-    db_entrega = actualizar_entrega(db, entrega_id, entrega.dict())
+@router.patch("/{entrega_id}", response_model=EntregaOut, dependencies=[presupuesto(2)])
+async def actualizar_entrega_parcial_endpoint(entrega_id: int, entrega: EntregaUpdate, db=Depends(get_db)):
+    db_entrega = await ejecutar(db, actualizar_entrega, entrega_id, entrega.cambios())
     if not db_entrega:
         raise HTTPException(status_code=404, detail="Entrega no encontrada")
     return db_entrega
 
-@router.delete("/{entrega_id}")
-def eliminar_entrega_endpoint(entrega_id: int, db: Session = Depends(get_db)):
-    entrega = eliminar_entrega(db, entrega_id)
+@router.delete("/{entrega_id}", dependencies=[presupuesto(1)])
+async def eliminar_entrega_endpoint(entrega_id: int, db=Depends(get_db)):
+    entrega = await ejecutar(db, eliminar_entrega, entrega_id)
     if not entrega:
         raise HTTPException(status_code=404, detail="Entrega no encontrada")
     return {"detail": "Entrega eliminada"}
\ No newline at end of file
@@ -1,43 +1,110 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response
+from typing import Any, Dict, List, Literal, Optional
 from database import get_db
+from replicas import get_db_lectura
+from paginacion import MAX_LIMIT
+from crud import ejecutar, iterar_lotes
+from condicional import etag
+from instrumentacion import presupuesto
+from serializacion import responder
+from exportacion import anidar_hijos, respuesta_exportacion
 from crud.inventario_producto import (
+    buscar_inventario_productos,
     create_inventario_producto,
     get_inventario_producto,
     get_inventario_productos_con_ofertas,  # Función para obtener productos con ofertas
     update_inventario_producto,
-    delete_inventario_producto
+    delete_inventario_producto,
+    bulk_create_inventario_productos,
+    bulk_update_inventario_productos,
+    bulk_delete_inventario_productos,
+    export_inventario_productos_query,
+    COLUMNAS_OFERTA_EXPORT
+)
+from schemas import (
+    InventarioProductoCreate,
+    InventarioProductoUpdate,
+    InventarioProductoOut,
+    InventarioProductoConOfertas,  # Esquema con ofertas
+    Pagina,
+    Resultados,
+    ProductoEncontrado,
+    BulkCreateResponse,
+    BulkUpdateResponse,
+    BulkDeleteRequest,
+    BulkDeleteResponse,
+    MAX_LOTE,
 )
-from schemas import InventarioProductoCreate, InventarioProductoOut, InventarioProductoConOfertas  # Esquema con ofertas
 
 router = APIRouter(prefix="/inventario-productos", tags=["InventarioProductos"])
 
-@router.post("/", response_model=InventarioProductoOut)
-def crear_inventario_producto(item: InventarioProductoCreate, db: Session = Depends(get_db)):
-    return create_inventario_producto(db, item)
+@router.post("/", response_model=InventarioProductoOut, dependencies=[presupuesto(1)])
+async def crear_inventario_producto(item: InventarioProductoCreate, db=Depends(get_db)):
+    return await ejecutar(db, create_inventario_producto, item)
+
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def crear_inventario_productos_lote(items: List[Dict[str, Any]] = Body(..., max_length=MAX_LOTE), db=Depends(get_db)):
+    return await ejecutar(db, bulk_create_inventario_productos, items)
+
+@router.patch("/bulk", response_model=BulkUpdateResponse)
+async def actualizar_inventario_productos_lote(items: List[Dict[str, Any]] = Body(..., max_length=MAX_LOTE), db=Depends(get_db)):
+    return await ejecutar(db, bulk_update_inventario_productos, items)
+
+@router.delete("/bulk", response_model=BulkDeleteResponse)
+async def eliminar_inventario_productos_lote(datos: BulkDeleteRequest, db=Depends(get_db)):
+    return await ejecutar(db, bulk_delete_inventario_productos, datos.ids)
+
+@router.get("/export")
+async def exportar_inventario_productos(formato: Literal["ndjson", "csv"] = "ndjson", db=Depends(get_db_lectura)):
+    """Exportar todo el inventario en streaming; en NDJSON cada producto lleva sus ofertas"""
+    consulta = export_inventario_productos_query()
+    lotes = iterar_lotes(db, consulta)
+    if formato == "ndjson":
+        lotes = anidar_hijos(lotes, "id", "ofertas_reducidas", COLUMNAS_OFERTA_EXPORT)
+    return respuesta_exportacion(lotes, formato, list(consulta.selected_columns.keys()), "inventario_productos")
 
-@router.get("/{item_id}", response_model=InventarioProductoOut)
-def leer_inventario_producto(item_id: int, db: Session = Depends(get_db)):
-    db_item = get_inventario_producto(db, item_id)
+@router.get("/buscar", response_model=Resultados[ProductoEncontrado], dependencies=[presupuesto(2)])
+async def buscar_inventario_productos_por_nombre(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Texto a buscar"),
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+    db=Depends(get_db),  # en la primaria: el índice en memoria ya tiene las últimas escrituras
+):
+    """Productos por nombre: sin tildes, tolerante a erratas y ordenados por parecido"""
+    return responder({"items": await ejecutar(db, buscar_inventario_productos, q, limit)}, response)
+
+@router.get("/{item_id}", response_model=InventarioProductoOut, dependencies=[presupuesto(1), etag("inventario_producto")])
+async def leer_inventario_producto(item_id: int, db=Depends(get_db_lectura)):
+    db_item = await ejecutar(db, get_inventario_producto, item_id)
     if not db_item:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     return db_item
 
-@router.get("/", response_model=List[InventarioProductoConOfertas])  # Cambiado para mostrar ofertas
-def leer_inventario_productos(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return get_inventario_productos_con_ofertas(db, skip, limit)
+@router.get("/", response_model=Pagina[InventarioProductoConOfertas], dependencies=[presupuesto(2), etag("inventario_producto", "oferta_reducida")])  # Cambiado para mostrar ofertas
+async def leer_inventario_productos(response: Response, cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=MAX_LIMIT), db=Depends(get_db_lectura)):
+    return responder(await ejecutar(db, get_inventario_productos_con_ofertas, cursor, limit), response)
+
+@router.put("/{item_id}", response_model=InventarioProductoOut, dependencies=[presupuesto(1)])
+async def actualizar_inventario_producto(item_id: int, item: InventarioProductoCreate, db=Depends(get_db)):
+    db_item = await ejecutar(db, update_inventario_producto, item_id, item.model_dump())
+    if not db_item:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    return db_item
 
-@router.put("/{item_id}", response_model=InventarioProductoOut)
-def actualizar_inventario_producto(item_id: int, item: InventarioProductoCreate, db: Session = Depends(get_db)):
-    db_item = update_inventario_producto(db, item_id, item)
+@router.patch("/{item_id}", response_model=InventarioProductoOut, dependencies=[presupuesto(1)])
+async def actualizar_inventario_producto_parcial(item_id: int, item: InventarioProductoUpdate, db=Depends(get_db)):
+    db_item = await ejecutar(db, update_inventario_producto, item_id, item.cambios())
     if not db_item:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     return db_item
 
-@router.delete("/{item_id}")
-def eliminar_inventario_producto(item_id: int, db: Session = Depends(get_db)):
-    success = delete_inventario_producto(db, item_id)
+@router.delete("/{item_id}", dependencies=[presupuesto(1)])
+async def eliminar_inventario_producto(
+    item_id: int,
+    archivar: bool = Query(False, description="Archivar (borrado lógico) en lugar de borrar con sus ofertas"),
+    db=Depends(get_db),
+):
+    success = await ejecutar(db, delete_inventario_producto, item_id, archivar)
     if not success:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
-    return {"detail": "Producto eliminado"}
+    return {"detail": "Producto archivado" if archivar else "Producto eliminado"}
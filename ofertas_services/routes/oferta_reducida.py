@@ -1,43 +1,113 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
 from database import get_db
+from replicas import get_db_lectura
+from paginacion import MAX_LIMIT
+from crud import ejecutar, iterar_lotes
+from condicional import etag
+from instrumentacion import presupuesto
+from serializacion import responder
+from exportacion import respuesta_exportacion
 from crud.oferta_reducida import (
     create_oferta_reducida,
     get_oferta_reducida,
     get_ofertas_reducidas,
     update_oferta_reducida,
-    delete_oferta_reducida
+    delete_oferta_reducida,
+    bulk_create_ofertas_reducidas,
+    bulk_update_ofertas_reducidas,
+    bulk_delete_ofertas_reducidas,
+    export_ofertas_reducidas_query,
+    get_ofertas_activas,
+    repreciar_ofertas
+)
+from schemas import (
+    OfertaReducidaCreate,
+    OfertaReducidaUpdate,
+    OfertaReducidaOut,
+    OfertaActivaOut,
+    RepreciarRequest,
+    RepreciarOut,
+    Pagina,
+    BulkCreateResponse,
+    BulkUpdateResponse,
+    BulkDeleteRequest,
+    BulkDeleteResponse,
+    MAX_LOTE,
 )
-from schemas import OfertaReducidaCreate, OfertaReducidaOut
 
 router = APIRouter(prefix="/ofertas-reducidas", tags=["OfertasReducidas"])
 
-@router.post("/", response_model=OfertaReducidaOut)
-def crear_oferta(oferta: OfertaReducidaCreate, db: Session = Depends(get_db)):
-    return create_oferta_reducida(db, oferta)
+@router.post("/", response_model=OfertaReducidaOut, dependencies=[presupuesto(1)])
+async def crear_oferta(oferta: OfertaReducidaCreate, db=Depends(get_db)):
+    return await ejecutar(db, create_oferta_reducida, oferta)
+
+@router.post("/repreciar", response_model=RepreciarOut)
+async def repreciar(parametros: Optional[RepreciarRequest] = None, db=Depends(get_db)):
+    """Recalcular en bloque la oferta de cada producto disponible según su antigüedad (o simularlo)"""
+    return await ejecutar(db, repreciar_ofertas, parametros or RepreciarRequest())
+
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def crear_ofertas_lote(items: List[Dict[str, Any]] = Body(..., max_length=MAX_LOTE), db=Depends(get_db)):
+    return await ejecutar(db, bulk_create_ofertas_reducidas, items)
+
+@router.patch("/bulk", response_model=BulkUpdateResponse)
+async def actualizar_ofertas_lote(items: List[Dict[str, Any]] = Body(..., max_length=MAX_LOTE), db=Depends(get_db)):
+    return await ejecutar(db, bulk_update_ofertas_reducidas, items)
+
+@router.delete("/bulk", response_model=BulkDeleteResponse)
+async def eliminar_ofertas_lote(datos: BulkDeleteRequest, db=Depends(get_db)):
+    return await ejecutar(db, bulk_delete_ofertas_reducidas, datos.ids)
+
+@router.get("/export")
+async def exportar_ofertas(formato: Literal["ndjson", "csv"] = "ndjson", db=Depends(get_db_lectura)):
+    """Exportar todas las ofertas en streaming"""
+    consulta = export_ofertas_reducidas_query()
+    return respuesta_exportacion(iterar_lotes(db, consulta), formato, list(consulta.selected_columns.keys()), "ofertas_reducidas")
 
-@router.get("/{oferta_id}", response_model=OfertaReducidaOut)
-def leer_oferta(oferta_id: int, db: Session = Depends(get_db)):
-    db_oferta = get_oferta_reducida(db, oferta_id)
+@router.get("/activas", response_model=Pagina[OfertaActivaOut], dependencies=[presupuesto(2)])
+async def leer_ofertas_activas(
+    response: Response,
+    en: Optional[datetime] = Query(None, description="Instante a consultar; por defecto ahora"),
+    precio_min: Optional[float] = Query(None, ge=0),
+    precio_max: Optional[float] = Query(None, ge=0),
+    estado: Optional[Literal["Disponible", "Vendido", "Expirado"]] = Query(None, description="Estado del producto"),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    db=Depends(get_db),  # en la primaria: el índice en memoria ya tiene las últimas escrituras
+):
+    """Ofertas vigentes en un instante, con filtros de precio y estado del producto"""
+    return responder(await ejecutar(db, get_ofertas_activas, en, precio_min, precio_max, estado, cursor, limit), response)
+
+@router.get("/{oferta_id}", response_model=OfertaReducidaOut, dependencies=[presupuesto(1), etag("oferta_reducida")])
+async def leer_oferta(oferta_id: int, db=Depends(get_db_lectura)):
+    db_oferta = await ejecutar(db, get_oferta_reducida, oferta_id)
     if not db_oferta:
         raise HTTPException(status_code=404, detail="Oferta no encontrada")
     return db_oferta
 
-@router.get("/", response_model=List[OfertaReducidaOut])
-def leer_ofertas(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return get_ofertas_reducidas(db, skip, limit)
+@router.get("/", response_model=Pagina[OfertaReducidaOut], dependencies=[presupuesto(1), etag("oferta_reducida")])
+async def leer_ofertas(response: Response, cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=MAX_LIMIT), db=Depends(get_db_lectura)):
+    return responder(await ejecutar(db, get_ofertas_reducidas, cursor, limit), response)
+
+@router.put("/{oferta_id}", response_model=OfertaReducidaOut, dependencies=[presupuesto(1)])
+async def actualizar_oferta(oferta_id: int, oferta: OfertaReducidaCreate, db=Depends(get_db)):
+    db_oferta = await ejecutar(db, update_oferta_reducida, oferta_id, oferta.model_dump())
+    if not db_oferta:
+        raise HTTPException(status_code=404, detail="Oferta no encontrada")
+    return db_oferta
 
-@router.put("/{oferta_id}", response_model=OfertaReducidaOut)
-def actualizar_oferta(oferta_id: int, oferta: OfertaReducidaCreate, db: Session = Depends(get_db)):
-    db_oferta = update_oferta_reducida(db, oferta_id, oferta)
+@router.patch("/{oferta_id}", response_model=OfertaReducidaOut, dependencies=[presupuesto(2)])
+async def actualizar_oferta_parcial(oferta_id: int, oferta: OfertaReducidaUpdate, db=Depends(get_db)):
+    db_oferta = await ejecutar(db, update_oferta_reducida, oferta_id, oferta.cambios())
     if not db_oferta:
         raise HTTPException(status_code=404, detail="Oferta no encontrada")
     return db_oferta
 
-@router.delete("/{oferta_id}")
-def eliminar_oferta(oferta_id: int, db: Session = Depends(get_db)):
-    success = delete_oferta_reducida(db, oferta_id)
+@router.delete("/{oferta_id}", dependencies=[presupuesto(1)])
+async def eliminar_oferta(oferta_id: int, db=Depends(get_db)):
+    success = await ejecutar(db, delete_oferta_reducida, oferta_id)
     if not success:
         raise HTTPException(status_code=404, detail="Oferta no encontrada")
     return {"detail": "Oferta eliminada"}
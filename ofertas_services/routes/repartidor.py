@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response
+from typing import Any, Dict, List, Optional
 from database import get_db
+from replicas import get_db_lectura
+from paginacion import MAX_LIMIT
+from crud import ejecutar
+from condicional import etag
+from instrumentacion import presupuesto
+from serializacion import responder
 from crud.repartidor import (
     create_repartidor,
     get_repartidor,
@@ -9,35 +14,75 @@ from crud.repartidor import (
     update_repartidor,
     delete_repartidor
 )
-from schemas import RepartidorCreate, RepartidorOut
+from crud.posicion_repartidor import actualizar_posicion, actualizar_posiciones, delete_posicion
+from schemas import (
+    RepartidorCreate,
+    RepartidorUpdate,
+    RepartidorOut,
+    Pagina,
+    PosicionRepartidorIn,
+    BulkUpdateResponse,
+    MAX_LOTE,
+)
 
 router = APIRouter(prefix="/repartidores", tags=["Repartidores"])
 
-@router.post("/", response_model=RepartidorOut)
-def crear_repartidor(repartidor: RepartidorCreate, db: Session = Depends(get_db)):
-    return create_repartidor(db, repartidor)
+@router.post("/", response_model=RepartidorOut, dependencies=[presupuesto(1)])
+async def crear_repartidor(repartidor: RepartidorCreate, db=Depends(get_db)):
+    return await ejecutar(db, create_repartidor, repartidor)
+
+# Declarada antes de /{repartidor_id}: "posiciones" no es un id
+@router.put("/posiciones", response_model=BulkUpdateResponse, dependencies=[presupuesto(1)])
+async def actualizar_posiciones_endpoint(items: List[Dict[str, Any]] = Body(..., max_length=MAX_LOTE), db=Depends(get_db)):
+    """Posiciones de varios repartidores {repartidor_id, latitud, longitud, en}; se guardan en segundo plano"""
+    return await ejecutar(db, actualizar_posiciones, items)
+
+@router.put("/{repartidor_id}/posicion", status_code=204, dependencies=[presupuesto(1)])
+async def actualizar_posicion_repartidor(repartidor_id: int, posicion: PosicionRepartidorIn, db=Depends(get_db)):
+    """Posición actual del repartidor en el índice en memoria; se guarda en segundo plano"""
+    if not await ejecutar(db, actualizar_posicion, repartidor_id, posicion):
+        raise HTTPException(status_code=404, detail="Repartidor no encontrado")
+    return Response(status_code=204)
+
+@router.delete("/{repartidor_id}/posicion", dependencies=[presupuesto(1)])
+async def eliminar_posicion_repartidor(repartidor_id: int, db=Depends(get_db)):
+    """Retirar al repartidor de las asignaciones hasta que envíe una nueva posición"""
+    if not await ejecutar(db, delete_posicion, repartidor_id):
+        raise HTTPException(status_code=404, detail="Posición no encontrada")
+    return {"detail": "Posición eliminada"}
 
-@router.get("/{repartidor_id}", response_model=RepartidorOut)
-def leer_repartidor(repartidor_id: int, db: Session = Depends(get_db)):
-    db_repartidor = get_repartidor(db, repartidor_id)
+@router.get("/{repartidor_id}", response_model=RepartidorOut, dependencies=[presupuesto(1), etag("repartidor")])
+async def leer_repartidor(repartidor_id: int, db=Depends(get_db_lectura)):
+    db_repartidor = await ejecutar(db, get_repartidor, repartidor_id)
     if not db_repartidor:
         raise HTTPException(status_code=404, detail="Repartidor no encontrado")
     return db_repartidor
 
-@router.get("/", response_model=List[RepartidorOut])
-def leer_repartidores(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return get_repartidores(db, skip, limit)
+@router.get("/", response_model=Pagina[RepartidorOut], dependencies=[presupuesto(1), etag("repartidor")])
+async def leer_repartidores(response: Response, cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=MAX_LIMIT), db=Depends(get_db_lectura)):
+    return responder(await ejecutar(db, get_repartidores, cursor, limit), response)
+
+@router.put("/{repartidor_id}", response_model=RepartidorOut, dependencies=[presupuesto(1)])
+async def actualizar_repartidor(repartidor_id: int, repartidor: RepartidorCreate, db=Depends(get_db)):
+    db_repartidor = await ejecutar(db, update_repartidor, repartidor_id, repartidor.model_dump())
+    if not db_repartidor:
+        raise HTTPException(status_code=404, detail="Repartidor no encontrado")
+    return db_repartidor
 
-@router.put("/{repartidor_id}", response_model=RepartidorOut)
-def actualizar_repartidor(repartidor_id: int, repartidor: RepartidorCreate, db: Session = Depends(get_db)):
-    db_repartidor = update_repartidor(db, repartidor_id, repartidor)
+@router.patch("/{repartidor_id}", response_model=RepartidorOut, dependencies=[presupuesto(1)])
+async def actualizar_repartidor_parcial(repartidor_id: int, repartidor: RepartidorUpdate, db=Depends(get_db)):
+    db_repartidor = await ejecutar(db, update_repartidor, repartidor_id, repartidor.cambios())
     if not db_repartidor:
         raise HTTPException(status_code=404, detail="Repartidor no encontrado")
     return db_repartidor
 
-@router.delete("/{repartidor_id}")
-def eliminar_repartidor(repartidor_id: int, db: Session = Depends(get_db)):
-    success = delete_repartidor(db, repartidor_id)
+@router.delete("/{repartidor_id}", dependencies=[presupuesto(1)])
+async def eliminar_repartidor(
+    repartidor_id: int,
+    archivar: bool = Query(False, description="Archivar (borrado lógico) en lugar de borrar con sus entregas y rutas"),
+    db=Depends(get_db),
+):
+    success = await ejecutar(db, delete_repartidor, repartidor_id, archivar)
     if not success:
         raise HTTPException(status_code=404, detail="Repartidor no encontrado")
-    return {"detail": "Repartidor eliminado"}
+    return {"detail": "Repartidor archivado" if archivar else "Repartidor eliminado"}
@@ -0,0 +1,67 @@
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import List, Optional
+import config
+from replicas import get_db_lectura
+from paginacion import MAX_LIMIT
+from crud import ejecutar
+from condicional import etag
+from instrumentacion import presupuesto
+from serializacion import responder
+from crud.reporte import (
+    get_entregas_diarias,
+    get_rutas_por_zona,
+    get_ofertas_por_producto,
+    get_productos_mas_ofertados
+)
+from schemas import (
+    EntregasDia,
+    RutasZona,
+    OfertasProducto,
+    Pagina,
+)
+
+router = APIRouter(prefix="/reportes", tags=["Reportes"])
+
+def _rango(desde: date, hasta: date):
+    if desde > hasta:
+        raise HTTPException(status_code=422, detail="desde debe ser anterior o igual a hasta")
+    if (hasta - desde).days >= config.REPORTES_MAX_DIAS:
+        raise HTTPException(status_code=422, detail=f"El rango no puede superar {config.REPORTES_MAX_DIAS} días")
+
+@router.get("/entregas-diarias", response_model=Pagina[EntregasDia], dependencies=[presupuesto(1), etag("entrega")])
+async def leer_entregas_diarias(
+    response: Response,
+    desde: date = Query(..., description="Primer día (inclusive)"),
+    hasta: date = Query(..., description="Último día (inclusive)"),
+    repartidor_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    db=Depends(get_db_lectura),
+):
+    """Entregas por día y repartidor, ordenadas por día"""
+    _rango(desde, hasta)
+    return responder(await ejecutar(db, get_entregas_diarias, desde, hasta, repartidor_id, cursor, limit), response)
+
+@router.get("/rutas-por-zona", response_model=List[RutasZona], dependencies=[presupuesto(1), etag("ruta_entrega", "repartidor")])
+async def leer_rutas_por_zona(
+    response: Response,
+    desde: date = Query(..., description="Primer día de salida (inclusive)"),
+    hasta: date = Query(..., description="Último día de salida (inclusive)"),
+    db=Depends(get_db_lectura),
+):
+    """Rutas terminadas y su duración media por zona, de la zona con más rutas a la que menos"""
+    _rango(desde, hasta)
+    return responder(await ejecutar(db, get_rutas_por_zona, desde, hasta), response)
+
+@router.get("/ofertas-por-producto/top", response_model=List[OfertasProducto],
+            dependencies=[presupuesto(1), etag("oferta_reducida", "inventario_producto")])
+async def leer_productos_mas_ofertados(response: Response, limit: int = Query(10, ge=1, le=MAX_LIMIT), db=Depends(get_db_lectura)):
+    """Los productos con más ofertas vigentes"""
+    return responder(await ejecutar(db, get_productos_mas_ofertados, limit), response)
+
+@router.get("/ofertas-por-producto", response_model=Pagina[OfertasProducto],
+            dependencies=[presupuesto(1), etag("oferta_reducida", "inventario_producto")])
+async def leer_ofertas_por_producto(response: Response, cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=MAX_LIMIT), db=Depends(get_db_lectura)):
+    """Ofertas vigentes y precio medio por producto, paginado por producto_id"""
+    return responder(await ejecutar(db, get_ofertas_por_producto, cursor, limit), response)
@@ -1,43 +1,118 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+import time
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response
+from typing import Any, Dict, List, Optional
 from database import get_db
+from replicas import get_db_lectura
+from paginacion import MAX_LIMIT
+from crud import ejecutar
+from condicional import etag
+from instrumentacion import presupuesto
+from serializacion import responder
+from optimizacion_rutas import planificar
+from crud.repartidor import get_repartidor
 from crud.ruta_entrega import (
+    buscar_rutas_entrega,
     create_ruta_entrega,
     get_ruta_entrega,
     get_rutas_entrega,
     update_ruta_entrega,
-    delete_ruta_entrega
+    delete_ruta_entrega,
+    bulk_create_rutas_entrega,
+    bulk_update_rutas_entrega,
+    bulk_delete_rutas_entrega,
+    get_paradas
+)
+from schemas import (
+    RutaEntregaCreate,
+    RutaEntregaUpdate,
+    RutaEntregaOut,
+    Pagina,
+    Resultados,
+    RutaEncontrada,
+    BulkCreateResponse,
+    BulkUpdateResponse,
+    BulkDeleteRequest,
+    BulkDeleteResponse,
+    MAX_LOTE,
+    MAX_PARADAS,
+    OptimizarRutasRequest,
+    PlanRutasOut,
 )
-from schemas import RutaEntregaCreate, RutaEntregaOut
 
 router = APIRouter(prefix="/rutas-entrega", tags=["RutasEntrega"])
 
-@router.post("/", response_model=RutaEntregaOut)
-def crear_ruta(ruta: RutaEntregaCreate, db: Session = Depends(get_db)):
-    return create_ruta_entrega(db, ruta)
+@router.post("/", response_model=RutaEntregaOut, dependencies=[presupuesto(1)])
+async def crear_ruta(ruta: RutaEntregaCreate, db=Depends(get_db)):
+    return await ejecutar(db, create_ruta_entrega, ruta)
+
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def crear_rutas_lote(items: List[Dict[str, Any]] = Body(..., max_length=MAX_LOTE), db=Depends(get_db)):
+    return await ejecutar(db, bulk_create_rutas_entrega, items)
+
+@router.patch("/bulk", response_model=BulkUpdateResponse)
+async def actualizar_rutas_lote(items: List[Dict[str, Any]] = Body(..., max_length=MAX_LOTE), db=Depends(get_db)):
+    return await ejecutar(db, bulk_update_rutas_entrega, items)
+
+@router.delete("/bulk", response_model=BulkDeleteResponse)
+async def eliminar_rutas_lote(datos: BulkDeleteRequest, db=Depends(get_db)):
+    return await ejecutar(db, bulk_delete_rutas_entrega, datos.ids)
+
+@router.post("/optimizar", response_model=PlanRutasOut, dependencies=[presupuesto(2)])
+async def optimizar_rutas(datos: OptimizarRutasRequest, db=Depends(get_db)):
+    """Orden de visita de las paradas de un repartidor (o de cada repartidor de una zona)"""
+    inicio = time.perf_counter()
+    if datos.repartidor_id is not None and not await ejecutar(db, get_repartidor, datos.repartidor_id):
+        raise HTTPException(status_code=404, detail="Repartidor no encontrado")
+    if datos.paradas is not None:
+        paradas = {datos.repartidor_id: [parada.model_dump() for parada in datos.paradas]}
+    else:
+        paradas = await ejecutar(db, get_paradas, datos.repartidor_id, datos.zona, datos.fuente, datos.desde, datos.hasta)
+    excedidos = [repartidor_id for repartidor_id, lista in paradas.items() if len(lista) > MAX_PARADAS]
+    if excedidos:
+        raise HTTPException(status_code=422, detail=f"Más de {MAX_PARADAS} paradas para los repartidores {excedidos}: "
+                                                    "acotar con desde/hasta")
+    origen = (datos.origen.latitud, datos.origen.longitud) if datos.origen is not None else None
+    planes = await planificar(paradas, origen, datos.tiempo_max)
+    return {"planes": planes, "duracion_ms": round((time.perf_counter() - inicio) * 1e3, 2)}
 
-@router.get("/{ruta_id}", response_model=RutaEntregaOut)
-def leer_ruta(ruta_id: int, db: Session = Depends(get_db)):
-    db_ruta = get_ruta_entrega(db, ruta_id)
+@router.get("/buscar", response_model=Resultados[RutaEncontrada], dependencies=[presupuesto(2)])
+async def buscar_rutas_por_destino(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Texto a buscar"),
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+    db=Depends(get_db),  # en la primaria: el índice en memoria ya tiene las últimas escrituras
+):
+    """Rutas por destino: sin tildes, tolerante a erratas y ordenadas por parecido"""
+    return responder({"items": await ejecutar(db, buscar_rutas_entrega, q, limit)}, response)
+
+@router.get("/{ruta_id}", response_model=RutaEntregaOut, dependencies=[presupuesto(1), etag("ruta_entrega")])
+async def leer_ruta(ruta_id: int, db=Depends(get_db_lectura)):
+    db_ruta = await ejecutar(db, get_ruta_entrega, ruta_id)
     if not db_ruta:
         raise HTTPException(status_code=404, detail="Ruta no encontrada")
     return db_ruta
 
-@router.get("/", response_model=List[RutaEntregaOut])
-def leer_rutas(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return get_rutas_entrega(db, skip, limit)
+@router.get("/", response_model=Pagina[RutaEntregaOut], dependencies=[presupuesto(1), etag("ruta_entrega")])
+async def leer_rutas(response: Response, cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=MAX_LIMIT), db=Depends(get_db_lectura)):
+    return responder(await ejecutar(db, get_rutas_entrega, cursor, limit), response)
+
+@router.put("/{ruta_id}", response_model=RutaEntregaOut, dependencies=[presupuesto(1)])
+async def actualizar_ruta(ruta_id: int, ruta: RutaEntregaCreate, db=Depends(get_db)):
+    db_ruta = await ejecutar(db, update_ruta_entrega, ruta_id, ruta.model_dump())
+    if not db_ruta:
+        raise HTTPException(status_code=404, detail="Ruta no encontrada")
+    return db_ruta
 
-@router.put("/{ruta_id}", response_model=RutaEntregaOut)
-def actualizar_ruta(ruta_id: int, ruta: RutaEntregaCreate, db: Session = Depends(get_db)):
-    db_ruta = update_ruta_entrega(db, ruta_id, ruta)
+@router.patch("/{ruta_id}", response_model=RutaEntregaOut, dependencies=[presupuesto(2)])
+async def actualizar_ruta_parcial(ruta_id: int, ruta: RutaEntregaUpdate, db=Depends(get_db)):
+    db_ruta = await ejecutar(db, update_ruta_entrega, ruta_id, ruta.cambios())
     if not db_ruta:
         raise HTTPException(status_code=404, detail="Ruta no encontrada")
     return db_ruta
 
-@router.delete("/{ruta_id}")
-def eliminar_ruta(ruta_id: int, db: Session = Depends(get_db)):
-    success = delete_ruta_entrega(db, ruta_id)
+@router.delete("/{ruta_id}", dependencies=[presupuesto(1)])
+async def eliminar_ruta(ruta_id: int, db=Depends(get_db)):
+    success = await ejecutar(db, delete_ruta_entrega, ruta_id)
     if not success:
         raise HTTPException(status_code=404, detail="Ruta no encontrada")
     return {"detail": "Ruta eliminada"}
@@ -0,0 +1,100 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import config
+from difusion import FILTROS, RESYNC, difusor
+
+router = APIRouter(prefix="/stream", tags=["Stream"])
+
+# Valores máximos por filtro
+MAX_FILTROS = 100
+
+def _filtros(tablas: Optional[List[str]], zona: Optional[List[str]], producto_id: Optional[List[int]]):
+    """(tablas, zonas, productos) de la suscripción; ValueError si no son válidos"""
+    desconocidas = set(tablas or ()) - set(FILTROS)
+    if desconocidas:
+        raise ValueError(f"Tablas no difundidas: {sorted(desconocidas)}; disponibles: {sorted(FILTROS)}")
+    if len(zona or ()) > MAX_FILTROS or len(producto_id or ()) > MAX_FILTROS:
+        raise ValueError(f"Máximo {MAX_FILTROS} valores por filtro")
+    return set(tablas or FILTROS), set(zona or ()), set(producto_id or ())
+
+async def _eventos_sse(filtros):
+    # La suscripción vive dentro del generador: su finally la cancela aunque el cliente se vaya antes de empezar
+    suscriptor = difusor.suscribir(*filtros)
+    if suscriptor is None:
+        # Se llenó entre la comprobación del endpoint y el primer envío
+        return
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                evento = await asyncio.wait_for(suscriptor.siguiente(), config.STREAM_LATIDO)
+            except asyncio.TimeoutError:
+                # Comentario SSE: mantiene viva la conexión a través de proxies
+                yield ": latido\n\n"
+                continue
+            if evento is None:
+                return
+            yield f"event: {'resync' if evento == RESYNC else 'cambio'}\ndata: {evento}\n\n"
+    finally:
+        difusor.cancelar(suscriptor)
+
+@router.get("")
+async def stream_sse(
+    tablas: Optional[List[str]] = Query(None, description="Tablas a recibir (por defecto todas)"),
+    zona: Optional[List[str]] = Query(None, description="Solo entregas y rutas de repartidores de estas zonas"),
+    producto_id: Optional[List[int]] = Query(None, description="Solo ofertas de estos productos"),
+):
+    """Cambios de ofertas, entregas y rutas como Server-Sent Events.
+
+    Cada evento `cambio` trae tabla, acción y fila; un evento `resync` indica
+    que se perdieron eventos y hay que releer los listados.
+    """
+    try:
+        filtros = _filtros(tablas, zona, producto_id)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if difusor.lleno():
+        raise HTTPException(status_code=503, detail="Este worker no admite más suscriptores")
+    return StreamingResponse(_eventos_sse(filtros), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def _esperar_cierre(websocket: WebSocket, suscriptor):
+    """Leer (e ignorar) lo que envía el cliente hasta que se desconecte"""
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+    suscriptor.cerrar()
+
+@router.websocket("")
+async def stream_websocket(
+    websocket: WebSocket,
+    tablas: Optional[List[str]] = Query(None),
+    zona: Optional[List[str]] = Query(None),
+    producto_id: Optional[List[int]] = Query(None),
+):
+    """Los mismos eventos que el SSE, uno por mensaje de texto en JSON"""
+    try:
+        filtros = _filtros(tablas, zona, producto_id)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    suscriptor = difusor.suscribir(*filtros)
+    if suscriptor is None:
+        await websocket.close(code=1013, reason="Este worker no admite más suscriptores")
+        return
+    lector = None
+    try:
+        await websocket.accept()
+        lector = asyncio.create_task(_esperar_cierre(websocket, suscriptor))
+        while (evento := await suscriptor.siguiente()) is not None:
+            await websocket.send_text(evento)
+        if not lector.done():
+            # Cierre desde el servidor (parada del worker)
+            await websocket.close(code=1001)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if lector is not None:
+            lector.cancel()
+        difusor.cancelar(suscriptor)
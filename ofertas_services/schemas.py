@@ -1,6 +1,33 @@
 from pydantic import BaseModel, field_validator, model_validator, Field
-from typing import Optional
-from datetime import datetime
+from typing import ClassVar, Generic, Literal, Optional, TypeVar
+from datetime import date, datetime
+
+import config
+
+
+def coordenadas_juntas(modelo):
+    """latitud y longitud se envían juntas: las dos con valor o las dos null"""
+    enviadas = {"latitud", "longitud"} & modelo.model_fields_set
+    if len(enviadas) == 1 or (modelo.latitud is None) != (modelo.longitud is None):
+        raise ValueError('latitud y longitud deben enviarse juntas')
+    return modelo
+
+
+class ActualizacionParcial(BaseModel):
+    """Base de los esquemas de PATCH: todos los campos opcionales; solo se cambian los enviados"""
+    # Campos cuya columna es NOT NULL: pueden omitirse pero no enviarse como null
+    no_nulos: ClassVar[tuple] = ()
+
+    @model_validator(mode='after')
+    def sin_nulos(self):
+        nulos = [campo for campo in self.no_nulos if campo in self.model_fields_set and getattr(self, campo) is None]
+        if nulos:
+            raise ValueError(f"No pueden ser null: {', '.join(nulos)}")
+        return self
+
+    def cambios(self) -> dict:
+        """Solo los campos presentes en el cuerpo de la petición"""
+        return self.model_dump(exclude_unset=True)
 
 
 # 1. InventarioProducto
@@ -23,7 +50,27 @@ class InventarioProductoBase(BaseModel):
 class InventarioProductoCreate(InventarioProductoBase):
     pass
 
-class InventarioProductoOut(InventarioProductoBase):
+class InventarioProductoUpdate(ActualizacionParcial):
+    nombre: Optional[str] = Field(None, min_length=1, max_length=200)
+    cantidad: Optional[int] = Field(None, ge=0)
+    precio_unitario: Optional[float] = Field(None, gt=0)
+    fecha_ingreso: Optional[datetime] = None
+    estado: Optional[str] = None
+
+    no_nulos: ClassVar[tuple] = ("nombre", "cantidad", "precio_unitario", "fecha_ingreso", "estado")
+
+    @field_validator('estado')
+    @classmethod
+    def estado_must_be_valid(cls, v: Optional[str]) -> Optional[str]:
+        return v if v is None else InventarioProductoBase.estado_must_be_valid(v)
+
+class InventarioProductoOut(BaseModel):
+    """Producto tal como se devuelve: solo lectura, sin restricciones ni validadores"""
+    nombre: str
+    cantidad: int
+    precio_unitario: float
+    fecha_ingreso: datetime
+    estado: str
     id: int
 
     class Config:
@@ -47,12 +94,84 @@ class OfertaReducidaBase(BaseModel):
 class OfertaReducidaCreate(OfertaReducidaBase):
     pass
 
-class OfertaReducidaOut(OfertaReducidaBase):
+class OfertaReducidaUpdate(ActualizacionParcial):
+    """Si llega solo una de las fechas, el orden respecto a la otra se comprueba en el UPDATE"""
+    producto_id: Optional[int] = Field(None, gt=0)
+    precio_oferta: Optional[float] = Field(None, gt=0)
+    fecha_inicio: Optional[datetime] = None
+    fecha_fin: Optional[datetime] = None
+
+    no_nulos: ClassVar[tuple] = ("precio_oferta", "fecha_inicio", "fecha_fin")
+
+    @model_validator(mode='after')
+    def validate_fechas(self):
+        if self.fecha_inicio is not None and self.fecha_fin is not None and self.fecha_fin <= self.fecha_inicio:
+            raise ValueError('La fecha de fin debe ser posterior a la fecha de inicio')
+        return self
+
+class OfertaReducidaOut(BaseModel):
+    """Oferta tal como se devuelve: solo lectura, sin restricciones ni validadores"""
+    producto_id: Optional[int] = None
+    precio_oferta: float
+    fecha_inicio: datetime
+    fecha_fin: datetime
     id: int
 
     class Config:
         from_attributes = True
 
+class OfertaActivaOut(OfertaReducidaOut):
+    """Oferta vigente junto con el nombre y estado de su producto"""
+    producto_nombre: str
+    producto_estado: str
+
+class RepreciarRequest(BaseModel):
+    """Parámetros del motor de descuentos; los omitidos toman el valor de DESCUENTOS_* en config"""
+    curva: Optional[Literal["lineal", "exponencial", "escalonada"]] = None
+    vida_util_horas: Optional[float] = Field(None, gt=0, description="Horas desde fecha_ingreso hasta la caducidad")
+    descuento_min: Optional[float] = Field(None, ge=0, lt=1, description="Descuento recién ingresado el producto")
+    descuento_max: Optional[float] = Field(None, ge=0, lt=1, description="Descuento al llegar a la caducidad")
+    pendiente: Optional[float] = Field(None, gt=0, le=20, description="Curvatura de la curva exponencial")
+    simular: bool = Field(False, description="Solo calcular el diff, sin escribir")
+    muestra: int = Field(100, ge=0, le=1000, description="Cambios a detallar en la respuesta")
+
+    @model_validator(mode='after')
+    def validate_descuentos(self):
+        por_defecto = {
+            "curva": config.DESCUENTOS_CURVA,
+            "vida_util_horas": config.DESCUENTOS_VIDA_UTIL_HORAS,
+            "descuento_min": config.DESCUENTOS_MIN,
+            "descuento_max": config.DESCUENTOS_MAX,
+            "pendiente": config.DESCUENTOS_PENDIENTE,
+        }
+        for campo, valor in por_defecto.items():
+            if getattr(self, campo) is None:
+                setattr(self, campo, valor)
+        if self.descuento_min > self.descuento_max:
+            raise ValueError('descuento_min no puede superar a descuento_max')
+        return self
+
+class CambioOferta(BaseModel):
+    producto_id: int
+    oferta_id: Optional[int] = Field(None, description="Oferta vigente que se actualiza (None si se crea)")
+    accion: Literal["crear", "actualizar"]
+    precio_unitario: float
+    precio_anterior: Optional[float] = None
+    precio_oferta: float
+    fecha_fin_anterior: Optional[datetime] = None
+    fecha_fin: datetime
+
+class RepreciarOut(BaseModel):
+    simulado: bool
+    productos: int = Field(..., description="Productos disponibles evaluados")
+    caducados: int = Field(..., description="Productos que superaron la vida útil: sin oferta")
+    creadas: int
+    actualizadas: int
+    sin_cambios: int
+    descuento_medio: Optional[float] = None
+    cambios: list[CambioOferta] = Field([], description="Los primeros `muestra` cambios por producto_id")
+    duracion_ms: float
+
 
 # 3. Repartidor
 
@@ -73,7 +192,23 @@ class RepartidorBase(BaseModel):
 class RepartidorCreate(RepartidorBase):
     pass
 
-class RepartidorOut(RepartidorBase):
+class RepartidorUpdate(ActualizacionParcial):
+    nombre: Optional[str] = Field(None, min_length=1, max_length=100)
+    telefono: Optional[str] = Field(None, min_length=8, max_length=15)
+    zona: Optional[str] = Field(None, max_length=50)
+
+    no_nulos: ClassVar[tuple] = ("nombre", "telefono")
+
+    @field_validator('telefono')
+    @classmethod
+    def telefono_must_be_valid(cls, v: Optional[str]) -> Optional[str]:
+        return v if v is None else RepartidorBase.telefono_must_be_valid(v)
+
+class RepartidorOut(BaseModel):
+    """Repartidor tal como se devuelve: solo lectura, sin restricciones ni validadores"""
+    nombre: str
+    telefono: str
+    zona: Optional[str] = None
     id: int
 
     class Config:
@@ -86,6 +221,8 @@ class EntregaBase(BaseModel):
     repartidor_id: int = Field(..., gt=0, description="ID del repartidor asignado")
     fecha: datetime = Field(..., description="Fecha y hora de la entrega")
     descripcion: Optional[str] = Field(None, max_length=500, description="Descripción adicional de la entrega")
+    latitud: Optional[float] = Field(None, ge=-90, le=90, description="Latitud del punto de entrega")
+    longitud: Optional[float] = Field(None, ge=-180, le=180, description="Longitud del punto de entrega")
 
     @field_validator('fecha')
     @classmethod
@@ -97,12 +234,40 @@ class EntregaBase(BaseModel):
             raise ValueError('La fecha no puede ser más de un año en el futuro')
         return v
 
+    @model_validator(mode='after')
+    def validate_coordenadas(self):
+        return coordenadas_juntas(self)
+
 class EntregaCreate(EntregaBase):
     pass
 
-class EntregaOut(EntregaBase):
+class EntregaUpdate(ActualizacionParcial):
+    repartidor_id: Optional[int] = Field(None, gt=0)
+    fecha: Optional[datetime] = None
+    descripcion: Optional[str] = Field(None, max_length=500)
+    latitud: Optional[float] = Field(None, ge=-90, le=90)
+    longitud: Optional[float] = Field(None, ge=-180, le=180)
+
+    no_nulos: ClassVar[tuple] = ("fecha",)
+
+    @field_validator('fecha')
+    @classmethod
+    def fecha_no_puede_ser_futura_lejana(cls, v: Optional[datetime]) -> Optional[datetime]:
+        return v if v is None else EntregaBase.fecha_no_puede_ser_futura_lejana(v)
+
+    @model_validator(mode='after')
+    def validate_coordenadas(self):
+        return coordenadas_juntas(self)
+
+class EntregaOut(BaseModel):
+    """Entrega tal como se devuelve: solo lectura, sin restricciones ni validadores"""
+    repartidor_id: Optional[int] = None
+    fecha: datetime
+    descripcion: Optional[str] = None
+    latitud: Optional[float] = None
+    longitud: Optional[float] = None
     id: int
-    repartidor: RepartidorOut 
+    repartidor: Optional[RepartidorOut] = None
 
     class Config:
         from_attributes = True
@@ -115,6 +280,8 @@ class RutaEntregaBase(BaseModel):
     destino: str = Field(..., min_length=1, max_length=200, description="Dirección de destino")
     hora_salida: datetime = Field(..., description="Hora programada de salida")
     hora_llegada: Optional[datetime] = Field(None, description="Hora real de llegada")
+    latitud: Optional[float] = Field(None, ge=-90, le=90, description="Latitud del destino")
+    longitud: Optional[float] = Field(None, ge=-180, le=180, description="Longitud del destino")
 
     @model_validator(mode='after')
     def validate_horas(self):
@@ -122,15 +289,134 @@ class RutaEntregaBase(BaseModel):
             raise ValueError('La hora de llegada debe ser posterior a la hora de salida')
         return self
 
+    @model_validator(mode='after')
+    def validate_coordenadas(self):
+        return coordenadas_juntas(self)
+
 class RutaEntregaCreate(RutaEntregaBase):
     pass
 
-class RutaEntregaOut(RutaEntregaBase):
+class RutaEntregaUpdate(ActualizacionParcial):
+    """Si llega solo una de las horas, el orden respecto a la otra se comprueba en el UPDATE"""
+    repartidor_id: Optional[int] = Field(None, gt=0)
+    destino: Optional[str] = Field(None, min_length=1, max_length=200)
+    hora_salida: Optional[datetime] = None
+    hora_llegada: Optional[datetime] = None
+    latitud: Optional[float] = Field(None, ge=-90, le=90)
+    longitud: Optional[float] = Field(None, ge=-180, le=180)
+
+    no_nulos: ClassVar[tuple] = ("destino", "hora_salida")
+
+    @model_validator(mode='after')
+    def validate_horas(self):
+        if self.hora_salida is not None and self.hora_llegada is not None and self.hora_llegada <= self.hora_salida:
+            raise ValueError('La hora de llegada debe ser posterior a la hora de salida')
+        return self
+
+    @model_validator(mode='after')
+    def validate_coordenadas(self):
+        return coordenadas_juntas(self)
+
+class RutaEntregaOut(BaseModel):
+    """Ruta tal como se devuelve: solo lectura, sin restricciones ni validadores"""
+    repartidor_id: Optional[int] = None
+    destino: str
+    hora_salida: datetime
+    hora_llegada: Optional[datetime] = None
+    latitud: Optional[float] = None
+    longitud: Optional[float] = None
     id: int
 
     class Config:
         from_attributes = True
 
+# Optimización de recorridos (POST /rutas-entrega/optimizar)
+
+# Máximo de paradas por repartidor en una optimización
+MAX_PARADAS = 1000
+
+class Coordenada(BaseModel):
+    latitud: float = Field(..., ge=-90, le=90)
+    longitud: float = Field(..., ge=-180, le=180)
+
+class ParadaIn(Coordenada):
+    id: Optional[int] = Field(None, description="Identificador propio para reconocer la parada en el plan")
+
+class OptimizarRutasRequest(BaseModel):
+    """Un repartidor (con paradas explícitas o las suyas en la base) o todos los de una zona"""
+    repartidor_id: Optional[int] = Field(None, gt=0, description="Repartidor a planificar")
+    zona: Optional[str] = Field(None, max_length=50, description="Planificar todos los repartidores de la zona")
+    paradas: Optional[list[ParadaIn]] = Field(None, min_length=1, max_length=MAX_PARADAS,
+                                              description="Paradas a ordenar; si se omiten se leen de la base")
+    fuente: Literal["entregas", "rutas"] = Field("entregas", description="Tabla de la que se leen las paradas")
+    desde: Optional[datetime] = Field(None, description="Solo paradas con fecha (u hora de salida) desde este instante")
+    hasta: Optional[datetime] = Field(None, description="Solo paradas con fecha (u hora de salida) anterior a este instante")
+    origen: Optional[Coordenada] = Field(None, description="Punto de partida común; sin él se empieza por la parada que convenga")
+    tiempo_max: Optional[float] = Field(None, gt=0, le=30, description="Plazo en segundos (por defecto RUTAS_TIEMPO_MAX)")
+
+    @model_validator(mode='after')
+    def validate_objetivo(self):
+        if (self.repartidor_id is None) == (self.zona is None):
+            raise ValueError('Indicar repartidor_id o zona (solo uno de los dos)')
+        if self.paradas is not None and self.repartidor_id is None:
+            raise ValueError('Las paradas explícitas requieren repartidor_id')
+        return self
+
+class ParadaPlan(BaseModel):
+    id: Optional[int] = None
+    latitud: float
+    longitud: float
+    distancia_km: float = Field(..., description="Distancia desde la parada anterior (o desde el origen)")
+
+class PlanRepartidor(BaseModel):
+    repartidor_id: int
+    paradas: list[ParadaPlan]
+    distancia_km: float
+    distancia_inicial_km: float = Field(..., description="Distancia recorriendo las paradas en el orden recibido")
+    completo: bool = Field(..., description="False si la mejora 2-opt se cortó al agotar el plazo")
+
+class PlanRutasOut(BaseModel):
+    planes: list[PlanRepartidor]
+    duracion_ms: float
+
+# Posiciones de repartidores y asignación de entregas
+
+class PosicionRepartidorIn(Coordenada):
+    en: Optional[datetime] = Field(None, description="Instante de la lectura; por defecto, el de recepción")
+
+class PosicionRepartidorLote(PosicionRepartidorIn):
+    repartidor_id: int = Field(..., gt=0)
+
+class AsignarRepartidorRequest(BaseModel):
+    """Punto de recogida (latitud y longitud) o una entrega existente, que se asigna al más cercano"""
+    entrega_id: Optional[int] = Field(None, gt=0, description="Entrega a asignar; se usan sus coordenadas")
+    latitud: Optional[float] = Field(None, ge=-90, le=90)
+    longitud: Optional[float] = Field(None, ge=-180, le=180)
+    zona: Optional[str] = Field(None, max_length=50, description="Solo repartidores de esta zona")
+    k: int = Field(5, ge=1, le=50, description="Candidatos a devolver")
+    carga_max: Optional[int] = Field(None, ge=0, description="Descartar repartidores con más entregas pendientes")
+    radio_km: float = Field(20, gt=0, le=200, description="Distancia máxima al punto")
+
+    @model_validator(mode='after')
+    def validate_objetivo(self):
+        coordenadas_juntas(self)
+        if (self.entrega_id is None) == (self.latitud is None):
+            raise ValueError('Indicar entrega_id o latitud y longitud (solo uno de los dos)')
+        return self
+
+class CandidatoRepartidor(BaseModel):
+    repartidor_id: int
+    zona: Optional[str] = None
+    distancia_km: float
+    carga: int = Field(..., description="Entregas pendientes en las próximas REPARTIDORES_CARGA_HORAS")
+    latitud: float
+    longitud: float
+    posicion_en: datetime
+
+class AsignacionOut(BaseModel):
+    candidatos: list[CandidatoRepartidor]
+    entrega: Optional[EntregaOut] = Field(None, description="La entrega ya asignada al primer candidato")
+
 
 # 6. Esquemas adicionales para respuestas con relaciones (Opcional)
 
@@ -150,7 +436,47 @@ class InventarioProductoConOfertas(InventarioProductoOut):
         from_attributes = True
 
 
-# 7. Esquemas para respuestas de error
+# 7. Paginación por cursor
+
+T = TypeVar("T")
+
+class Pagina(BaseModel, Generic[T]):
+    """Página de un listado; next_cursor es None en la última página"""
+    items: list[T]
+    next_cursor: Optional[str] = Field(None, description="Cursor opaco para pedir la página siguiente")
+
+class Resultados(BaseModel, Generic[T]):
+    """Resultados de una búsqueda, del más parecido al menos"""
+    items: list[T]
+
+# Búsqueda de texto (GET /inventario-productos/buscar, /rutas-entrega/buscar)
+
+class ProductoEncontrado(InventarioProductoOut):
+    puntuacion: float = Field(..., description="Parecido con la búsqueda (0..1)")
+
+class RutaEncontrada(RutaEntregaOut):
+    puntuacion: float = Field(..., description="Parecido con la búsqueda (0..1)")
+
+
+# Reportes de logística (GET /reportes/...)
+
+class EntregasDia(BaseModel):
+    dia: date
+    repartidor_id: Optional[int] = Field(None, description="None: entregas sin repartidor asignado")
+    entregas: int
+
+class RutasZona(BaseModel):
+    zona: Optional[str] = Field(None, description="Zona actual del repartidor; None si no tiene")
+    rutas: int = Field(..., description="Rutas terminadas (con hora de llegada)")
+    minutos_promedio: float
+
+class OfertasProducto(BaseModel):
+    producto_id: int
+    nombre: str
+    ofertas: int = Field(..., description="Ofertas vigentes (no retiradas)")
+    precio_promedio: float
+
+# 8. Esquemas para respuestas de error
 
 class ErrorResponse(BaseModel):
     detail: str
@@ -161,12 +487,32 @@ class ValidationErrorResponse(BaseModel):
     errors: list[dict]
 
 
-# 8. Esquemas para operaciones en lote (Opcional)
+# 9. Esquemas para operaciones en lote (Opcional)
+
+# Máximo de elementos aceptados en una operación en lote
+MAX_LOTE = 10000
+
+class BulkItemError(BaseModel):
+    """Error de un elemento concreto dentro de un lote"""
+    index: int = Field(..., description="Posición del elemento en el lote")
+    id: Optional[int] = None
+    detail: str
+
+class BulkCreateResponse(BaseModel):
+    created_count: int
+    ids: list[int] = []
+    errors: list[BulkItemError] = []
+    message: str
+
+class BulkDeleteRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=MAX_LOTE, description="IDs a eliminar")
 
 class BulkDeleteResponse(BaseModel):
     deleted_count: int
+    errors: list[BulkItemError] = []
     message: str
 
 class BulkUpdateResponse(BaseModel):
     updated_count: int
+    errors: list[BulkItemError] = []
     message: str
\ No newline at end of file
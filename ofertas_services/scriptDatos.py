@@ -1,9 +1,24 @@
+"""Datos de prueba y generador sintético para pruebas de capacidad.
+
+Uso (desde ofertas_services/):
+    python scriptDatos.py                       # los datos de prueba de siempre
+    python scriptDatos.py generar --productos 1000000 --semilla 7
+"""
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+import argparse
+import csv
+import io
+import math
+import random
+import time
 from datetime import datetime, timedelta
-from database import SessionLocal
+
+from sqlalchemy import func, insert, select, text
+
+from database import SessionLocal, engine
 from models.inventario_producto import InventarioProducto
 from models.repartidor import Repartidor
 from models.oferta_reducida import OfertaReducida
@@ -173,5 +188,286 @@ def insertar_datos_prueba():
     finally:
         db.close()
 
+
+# ---------------------------------------------------------------------------
+# Generador sintético para pruebas de capacidad
+# ---------------------------------------------------------------------------
+
+# Peso de cada zona en los repartidores (Centro y Norte concentran la demanda)
+ZONAS = {"Centro": 30, "Norte": 25, "Sur": 20, "Este": 10, "Oeste": 10, "Valle": 5}
+
+# Catálogo base: nombre y precio unitario de referencia
+CATALOGO = [
+    ("Pan integral", 2.50), ("Croissants", 1.80), ("Ensalada fresca", 4.50), ("Sándwich jamón", 3.20),
+    ("Empanadas", 1.50), ("Torta de chocolate", 12.00), ("Muffins", 1.20), ("Yogur natural", 2.10),
+    ("Fruta de temporada", 3.00), ("Almuerzo del día", 5.50), ("Sushi variado", 9.80), ("Pizza familiar", 11.50),
+    ("Jugo natural", 2.00), ("Galletas artesanales", 2.80), ("Bolón de verde", 2.25), ("Humitas", 1.00),
+]
+VARIANTES = ["", " grande", " pequeño", " sin gluten", " del día", " premium"]
+
+# Estado del producto: (peso, rango de cantidad)
+ESTADOS = {"Disponible": (70, (1, 60)), "Vendido": (20, (0, 0)), "Expirado": (10, (0, 20))}
+
+# Descuento de las ofertas sobre el precio unitario y duración de la ventana en horas
+DESCUENTOS = {0.2: 15, 0.3: 25, 0.4: 25, 0.5: 20, 0.6: 10, 0.7: 5}
+DURACIONES_HORAS = {2: 15, 4: 25, 6: 25, 12: 20, 24: 10, 48: 5}
+
+NOMBRES = ["Carlos", "Ana", "Luis", "María", "José", "Gabriela", "Andrés", "Daniela", "Jorge", "Valeria"]
+APELLIDOS = ["Mendoza", "García", "Rodríguez", "Pérez", "Torres", "Vega", "Castro", "Morales", "Ortiz", "Flores"]
+CALLES = ["Av. Amazonas", "Av. 6 de Diciembre", "Av. Naciones Unidas", "Calle García Moreno", "Av. 10 de Agosto",
+          "Av. Shyris", "Calle Venezuela", "Av. Eloy Alfaro", "Av. América", "Calle Guayaquil"]
+
+# Área de las entregas y destinos de las rutas: (latitud min, max), (longitud min, max)
+AREA = ((-0.35, -0.05), (-78.58, -78.42))
+
+
+def _elegir(r, pesos):
+    return r.choices(list(pesos), weights=list(pesos.values()))[0]
+
+
+def _poisson(r, media):
+    """Muestra de Poisson (Knuth): las medias usadas aquí son pequeñas"""
+    limite, k, p = math.exp(-media), 0, r.random()
+    while p > limite:
+        k += 1
+        p *= r.random()
+    return k
+
+
+def _punto(r):
+    (lat_min, lat_max), (lon_min, lon_max) = AREA
+    return round(r.uniform(lat_min, lat_max), 6), round(r.uniform(lon_min, lon_max), 6)
+
+
+def generar_productos(r, primer_id, cantidad, ahora, dias):
+    for i in range(primer_id, primer_id + cantidad):
+        nombre, precio = r.choice(CATALOGO)
+        estado = _elegir(r, {e: peso for e, (peso, _) in ESTADOS.items()})
+        yield {
+            "id": i,
+            "nombre": nombre + r.choice(VARIANTES),
+            "cantidad": r.randint(*ESTADOS[estado][1]),
+            "precio_unitario": round(precio * r.lognormvariate(0, 0.15), 2),
+            "fecha_ingreso": ahora - timedelta(seconds=r.randrange(dias * 86400)),
+            "estado": estado,
+        }
+
+
+def generar_ofertas(r, producto, media):
+    """Ofertas de un producto (sin id): ventanas que empiezan poco después del ingreso"""
+    if producto["estado"] == "Vendido":
+        return []
+    ofertas = []
+    for _ in range(_poisson(r, media)):
+        inicio = producto["fecha_ingreso"] + timedelta(minutes=r.randrange(12 * 60))
+        ofertas.append({
+            "producto_id": producto["id"],
+            "precio_oferta": round(producto["precio_unitario"] * (1 - _elegir(r, DESCUENTOS)), 2),
+            "fecha_inicio": inicio,
+            "fecha_fin": inicio + timedelta(hours=_elegir(r, DURACIONES_HORAS)),
+        })
+    return ofertas
+
+
+def generar_repartidores(r, primer_id, cantidad):
+    for i in range(primer_id, primer_id + cantidad):
+        yield {
+            "id": i,
+            "nombre": f"{r.choice(NOMBRES)} {r.choice(APELLIDOS)}",
+            "telefono": f"09{r.randrange(10 ** 8):08d}",
+            "zona": _elegir(r, ZONAS),
+        }
+
+
+def generar_entregas(r, primer_id, cantidad, repartidores, ahora, dias):
+    for i in range(primer_id, primer_id + cantidad):
+        repartidor_id = r.choice(repartidores)
+        # Hasta un día en el futuro: entregas programadas además del histórico
+        fecha = ahora + timedelta(seconds=r.randrange(-dias * 86400, 86400))
+        descripcion = f"Entrega de {r.randint(1, 5)} productos"
+        latitud, longitud = _punto(r)
+        yield {
+            "id": i,
+            "repartidor_id": repartidor_id,
+            "fecha": fecha,
+            "descripcion": descripcion,
+            "latitud": latitud,
+            "longitud": longitud,
+        }
+
+
+def generar_rutas(r, primer_id, cantidad, repartidores, ahora, dias):
+    for i in range(primer_id, primer_id + cantidad):
+        salida = ahora + timedelta(seconds=r.randrange(-dias * 86400, 86400))
+        fila = {
+            "id": i,
+            "repartidor_id": r.choice(repartidores),
+            "destino": f"{r.choice(CALLES)} N{r.randint(1, 80)}-{r.randint(1, 200)}",
+            "hora_salida": salida,
+            # Las rutas que aún no salen no tienen hora de llegada
+            "hora_llegada": salida + timedelta(minutes=r.randint(10, 90)) if salida < ahora else None,
+        }
+        fila["latitud"], fila["longitud"] = _punto(r)
+        yield fila
+
+
+def _lotes(filas, tamano):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) == tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ""  # sin comillas: COPY ... (FORMAT csv) lo lee como NULL
+    return valor.isoformat() if isinstance(valor, datetime) else valor
+
+
+def _copiar(conexion, tabla, filas):
+    """COPY FROM STDIN (psycopg2) del lote en formato CSV"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for fila in filas:
+        escritor.writerow([_valor_csv(v) for v in fila.values()])
+    buffer.seek(0)
+    cursor = conexion.connection.dbapi_connection.cursor()
+    cursor.copy_expert(f"COPY {tabla.name} ({', '.join(filas[0])}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _insertar(conexion, tabla, filas):
+    # SQLAlchemy agrupa los parámetros en INSERT ... VALUES de varias filas (insertmanyvalues)
+    conexion.execute(insert(tabla), filas)
+
+
+class Carga:
+    """Carga por lotes con ids explícitos y medición de filas por segundo por tabla"""
+
+    def __init__(self, motor, metodo, lote):
+        if metodo == "auto":
+            metodo = "copy" if motor.dialect.driver == "psycopg2" else "insert"
+        if metodo == "copy" and motor.dialect.driver != "psycopg2":
+            raise ValueError("COPY solo está disponible con PostgreSQL (psycopg2)")
+        self.motor = motor
+        self.metodo = metodo
+        self.lote = lote
+        self.estadisticas = {}
+
+    def siguiente_id(self, tabla):
+        """Primer id libre: los ids se asignan aquí, sin consumir la secuencia"""
+        with self.motor.connect() as conexion:
+            return conexion.execute(select(func.coalesce(func.max(tabla.c.id), 0))).scalar() + 1
+
+    def cargar(self, tabla, filas):
+        """Insertar `filas` (una lista) en una transacción propia"""
+        if not filas:
+            return
+        inicio = time.perf_counter()
+        with self.motor.begin() as conexion:
+            (_copiar if self.metodo == "copy" else _insertar)(conexion, tabla, filas)
+        cantidad, segundos = self.estadisticas.get(tabla.name, (0, 0.0))
+        self.estadisticas[tabla.name] = (cantidad + len(filas), segundos + time.perf_counter() - inicio)
+
+    def ajustar_secuencias(self, tablas):
+        """Llevar las secuencias de PostgreSQL al máximo id, para que los INSERT de la API no choquen"""
+        if self.motor.dialect.name != "postgresql":
+            return
+        with self.motor.begin() as conexion:
+            for tabla in tablas:
+                conexion.execute(
+                    text("SELECT setval(pg_get_serial_sequence(:tabla, 'id'), "
+                         f"(SELECT COALESCE(MAX(id), 1) FROM {tabla.name}))"),
+                    {"tabla": tabla.name},
+                )
+
+
+def generar_datos(motor, productos, ofertas, repartidores, entregas, rutas, semilla=42, ahora=None, dias=7,
+                  metodo="auto", lote=5000):
+    """Generar y cargar datos sintéticos deterministas; devuelve {tabla: (filas, segundos de carga)}.
+
+    Cada tabla usa su propio Random derivado de `semilla`, así que la misma
+    semilla y el mismo `ahora` producen siempre los mismos datos. Las claves
+    foráneas apuntan a los ids asignados en esta misma corrida.
+    """
+    ahora = ahora or datetime.now().replace(minute=0, second=0, microsecond=0)
+    carga = Carga(motor, metodo, lote)
+    azar = {nombre: random.Random(f"{semilla}-{nombre}")
+            for nombre in ("productos", "ofertas", "repartidores", "entregas", "rutas")}
+    tablas = [t.__table__ for t in (InventarioProducto, OfertaReducida, Repartidor, Entrega, RutaEntrega)]
+
+    # Productos y sus ofertas por lotes: cada lote de ofertas se carga después del de sus productos
+    siguiente_oferta = carga.siguiente_id(OfertaReducida.__table__)
+    productos_generados = generar_productos(azar["productos"], carga.siguiente_id(InventarioProducto.__table__),
+                                            productos, ahora, dias)
+    for lote_productos in _lotes(productos_generados, lote):
+        carga.cargar(InventarioProducto.__table__, lote_productos)
+        lote_ofertas = [o for p in lote_productos for o in generar_ofertas(azar["ofertas"], p, ofertas)]
+        for oferta in lote_ofertas:
+            oferta["id"] = siguiente_oferta
+            siguiente_oferta += 1
+        carga.cargar(OfertaReducida.__table__, lote_ofertas)
+
+    primer_repartidor = carga.siguiente_id(Repartidor.__table__)
+    for lote_repartidores in _lotes(generar_repartidores(azar["repartidores"], primer_repartidor, repartidores), lote):
+        carga.cargar(Repartidor.__table__, lote_repartidores)
+    ids_repartidores = range(primer_repartidor, primer_repartidor + repartidores)
+    if ids_repartidores:
+        for tabla, generador in (
+            (Entrega.__table__, generar_entregas(azar["entregas"], carga.siguiente_id(Entrega.__table__), entregas,
+                                                 ids_repartidores, ahora, dias)),
+            (RutaEntrega.__table__, generar_rutas(azar["rutas"], carga.siguiente_id(RutaEntrega.__table__), rutas,
+                                                  ids_repartidores, ahora, dias)),
+        ):
+            for lote_filas in _lotes(generador, lote):
+                carga.cargar(tabla, lote_filas)
+
+    carga.ajustar_secuencias(tablas)
+    return carga.estadisticas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="accion")
+    subparsers.add_parser("prueba", help="Insertar el puñado de datos de prueba (por defecto)")
+    generar = subparsers.add_parser("generar", help="Generar datos sintéticos a escala")
+    generar.add_argument("--productos", type=int, default=100000)
+    generar.add_argument("--ofertas", type=float, default=1.0, help="Media de ofertas por producto no vendido")
+    generar.add_argument("--repartidores", type=int, help="Por defecto, productos / 100")
+    generar.add_argument("--entregas", type=int, help="Por defecto, igual a productos")
+    generar.add_argument("--rutas", type=int, help="Por defecto, igual a productos")
+    generar.add_argument("--semilla", type=int, default=42)
+    generar.add_argument("--ahora", type=datetime.fromisoformat,
+                         help="Instante de referencia (ISO); por defecto la hora en curso")
+    generar.add_argument("--dias", type=int, default=7, help="Días de histórico hacia atrás")
+    generar.add_argument("--metodo", choices=("auto", "copy", "insert"), default="auto",
+                         help="auto: COPY en PostgreSQL, INSERT de varias filas en el resto")
+    generar.add_argument("--lote", type=int, default=5000, help="Filas por transacción")
+    args = parser.parse_args()
+
+    if args.accion != "generar":
+        insertar_datos_prueba()
+        return
+
+    repartidores = args.repartidores if args.repartidores is not None else max(1, args.productos // 100)
+    inicio = time.perf_counter()
+    estadisticas = generar_datos(
+        engine, args.productos, args.ofertas, repartidores,
+        args.entregas if args.entregas is not None else args.productos,
+        args.rutas if args.rutas is not None else args.productos,
+        semilla=args.semilla, ahora=args.ahora, dias=args.dias, metodo=args.metodo, lote=args.lote,
+    )
+    total = time.perf_counter() - inicio
+
+    print(f"{'tabla':<22} {'filas':>10} {'carga s':>9} {'filas/s':>10}")
+    for tabla, (filas, segundos) in estadisticas.items():
+        print(f"{tabla:<22} {filas:>10} {segundos:>9.2f} {filas / segundos if segundos else 0:>10.0f}")
+    filas = sum(f for f, _ in estadisticas.values())
+    print(f"{'total (con generación)':<22} {filas:>10} {total:>9.2f} {filas / total if total else 0:>10.0f}")
+
+
 if __name__ == "__main__":
-    insertar_datos_prueba()
\ No newline at end of file
+    main()
@@ -0,0 +1,39 @@
+import json
+from datetime import date, datetime
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el json de la biblioteca estándar
+    orjson = None
+
+
+def _json_default(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def dumps(contenido) -> bytes:
+    """Codificar dicts/listas de tipos simples a JSON (fechas en ISO 8601, como Pydantic)"""
+    if orjson is not None:
+        return orjson.dumps(contenido)
+    return json.dumps(contenido, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class RespuestaJSON(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def responder(contenido, response: Response):
+    """Responder `contenido` (dicts ya armados por crud/*) sin pasar por response_model.
+
+    FastAPI no valida ni recorre con jsonable_encoder una Response devuelta por
+    el endpoint; el response_model de la ruta queda solo para la documentación.
+    Se copian las cabeceras que las dependencias pusieron en `response` (ETag).
+    """
+    return RespuestaJSON(contenido, headers=response.headers)
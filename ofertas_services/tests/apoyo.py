@@ -0,0 +1,82 @@
+"""Apoyo de las pruebas: datos de ejemplo y ejecución con otra configuración.
+
+config se lee al importar, así que las pruebas que necesitan otras variables
+de entorno corren en un proceso aparte (en_proceso).
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+from datetime import datetime, timedelta
+
+DIRECTORIO_SERVICIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Antes del código de la prueba: una base SQLite nueva en la última revisión
+PREAMBULO = """\
+import json
+import esquema
+import models
+from database import engine
+esquema.migrar(engine)
+"""
+
+
+def en_proceso(codigo: str, migrar: bool = True, **entorno):
+    """Ejecutar `codigo` con las variables `entorno` sobre una base nueva; devuelve el JSON de su última línea.
+
+    Con migrar=False la base ni se crea: el código recibe su ruta en la variable BASE.
+    """
+    directorio = tempfile.mkdtemp(prefix="ofertas_proceso_")
+    base = os.path.join(directorio, "base.db")
+    variables = {**os.environ, "DATABASE_URL": f"sqlite:///{base}", **entorno}
+    preambulo = PREAMBULO if migrar else f"import json\nBASE = {base!r}\n"
+    resultado = subprocess.run(
+        [sys.executable, "-c", preambulo + textwrap.dedent(codigo)],
+        cwd=DIRECTORIO_SERVICIO, env=variables, capture_output=True, text=True, timeout=120,
+    )
+    assert resultado.returncode == 0, resultado.stderr
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+# Datos de ejemplo para las pruebas por HTTP
+
+INICIO = datetime(2026, 10, 1, 9, 0)
+
+
+def producto(nombre="Pan", **campos):
+    return {"nombre": nombre, "cantidad": 5, "precio_unitario": 2.5, "fecha_ingreso": INICIO.isoformat(),
+            "estado": "Disponible", **campos}
+
+
+def oferta(producto_id, **campos):
+    return {"producto_id": producto_id, "precio_oferta": 1.5, "fecha_inicio": INICIO.isoformat(),
+            "fecha_fin": (INICIO + timedelta(days=2)).isoformat(), **campos}
+
+
+def crear_productos(cliente, cantidad, **campos):
+    """Crear `cantidad` productos con POST /bulk; devuelve sus ids"""
+    respuesta = cliente.post("/inventario-productos/bulk",
+                             json=[producto(f"p{i}", **campos) for i in range(cantidad)])
+    assert respuesta.status_code == 200
+    return respuesta.json()["ids"]
+
+
+def crear_oferta(cliente, producto_id, **campos):
+    respuesta = cliente.post("/ofertas-reducidas/", json=oferta(producto_id, **campos))
+    assert respuesta.status_code == 200
+    return respuesta.json()["id"]
+
+
+def crear_repartidor(cliente, nombre="Ana", zona="Centro"):
+    respuesta = cliente.post("/repartidores/", json={"nombre": nombre, "telefono": "600111222", "zona": zona})
+    assert respuesta.status_code == 200
+    return respuesta.json()["id"]
+
+
+def crear_entrega(cliente, repartidor_id, latitud=None, longitud=None, fecha=INICIO):
+    respuesta = cliente.post("/entregas/", json={"repartidor_id": repartidor_id, "fecha": fecha.isoformat(),
+                                                 "latitud": latitud, "longitud": longitud})
+    assert respuesta.status_code == 200
+    return respuesta.json()["id"]
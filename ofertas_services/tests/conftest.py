@@ -0,0 +1,67 @@
+"""Pruebas del servicio sobre una base SQLite temporal migrada a la última revisión.
+
+Las variables de entorno se fijan aquí, antes de importar config: todos los
+módulos del servicio lo leen al importarse.
+
+Uso (desde ofertas_services/):
+    python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_DIRECTORIO = tempfile.mkdtemp(prefix="ofertas_pruebas_")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_DIRECTORIO}/pruebas.db",
+    "DB_MODE": "sync",
+    "DB_REPLICAS": "",
+    "CACHE_BACKEND": "memoria",
+    "DB_VERIFICAR_ESQUEMA": "off",
+    "CADUCIDAD_INTERVALO": "0",
+})
+
+from sqlalchemy import delete  # noqa: E402
+
+import esquema  # noqa: E402
+from cache import cache  # noqa: E402
+import models  # noqa: E402,F401  (registra todas las tablas en Base.metadata)
+from database import Base, SessionLocal, engine  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def esquema_migrado():
+    esquema.migrar(engine)
+    yield
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def base_vacia():
+    """Cada prueba empieza sin filas y con la cache de entidades vacía (SQLite reutiliza los ids)"""
+    yield
+    with engine.begin() as conexion:
+        # Hijas antes que padres; las tablas de reportes (las mantienen los triggers) también
+        for tabla in reversed(Base.metadata.sorted_tables):
+            conexion.execute(delete(tabla))
+    if cache is not None:
+        cache.borrar_prefijo("")
+
+
+@pytest.fixture
+def db():
+    with SessionLocal() as sesion:
+        yield sesion
+
+
+@pytest.fixture
+def cliente():
+    """Cliente HTTP de la app con su lifespan (tareas periódicas y relevo de /stream)"""
+    from fastapi.testclient import TestClient
+    from main import crear_app
+
+    with TestClient(crear_app()) as cliente:
+        yield cliente
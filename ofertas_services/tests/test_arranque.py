@@ -0,0 +1,41 @@
+"""Arranque: importar y construir la app no toca la base; el lifespan comprueba el esquema"""
+import pytest
+
+import config
+from apoyo import en_proceso
+
+
+def test_importar_y_construir_la_app_sin_abrir_conexiones():
+    resultado = en_proceso("""
+        import os
+        import main
+        app = main.crear_app()
+        # SQLite crea el fichero al conectar: si no existe, nadie conectó
+        print(json.dumps({"rutas": len(app.routes), "base_creada": os.path.exists(BASE)}))
+    """, migrar=False, DB_VERIFICAR_ESQUEMA="estricto")
+    assert resultado["rutas"] > 0
+    assert not resultado["base_creada"]
+
+
+def test_estricto_no_arranca_con_la_base_sin_migrar():
+    resultado = en_proceso("""
+        from fastapi.testclient import TestClient
+        from main import crear_app
+        try:
+            with TestClient(crear_app()):
+                error = None
+        except RuntimeError as e:
+            error = str(e)
+        print(json.dumps({"error": error}))
+    """, migrar=False, DB_VERIFICAR_ESQUEMA="estricto")
+    assert resultado["error"].startswith("Esquema en la revisión None")
+
+
+@pytest.fixture
+def estricto(monkeypatch):
+    monkeypatch.setattr(config, "DB_VERIFICAR_ESQUEMA", "estricto")
+
+
+def test_estricto_arranca_con_la_base_al_dia(estricto, cliente):
+    estado = cliente.get("/health/esquema").json()
+    assert estado["al_dia"] and estado["actual"] == estado["esperada"]
@@ -0,0 +1,50 @@
+"""Modo asíncrono (DB_MODE=async): los mismos endpoints sobre AsyncSession y el trabajo de CPU fuera del event loop"""
+from apoyo import en_proceso
+
+
+def test_crud_por_http_en_modo_async():
+    resultado = en_proceso("""
+        from fastapi.testclient import TestClient
+        from main import crear_app
+
+        producto = {"nombre": "Pan", "cantidad": 5, "precio_unitario": 2.5,
+                    "fecha_ingreso": "2026-10-01T09:00:00", "estado": "Disponible"}
+        with TestClient(crear_app()) as cliente:
+            creado = cliente.post("/inventario-productos/", json=producto).json()
+            url = f"/inventario-productos/{creado['id']}"
+            pasos = {
+                "parcial": cliente.patch(url, json={"cantidad": 2}).json()["cantidad"],
+                "leido": cliente.get(url).json()["cantidad"],
+                "lote": cliente.post("/inventario-productos/bulk", json=[producto, producto]).json()["created_count"],
+                "listado": len(cliente.get("/inventario-productos/").json()["items"]),
+                "export": len(cliente.get("/inventario-productos/export").text.splitlines()),
+                "borrado": cliente.delete(url).status_code,
+                "tras_borrar": cliente.get(url).status_code,
+            }
+        print(json.dumps(pasos))
+    """, DB_MODE="async")
+    assert resultado == {"parcial": 2, "leido": 2, "lote": 2, "listado": 3, "export": 3,
+                         "borrado": 200, "tras_borrar": 404}
+
+
+def test_calcular_sale_del_hilo_del_event_loop():
+    resultado = en_proceso("""
+        import asyncio
+        import threading
+        from sqlalchemy import text
+        from crud import calcular, ejecutar
+        from database import AsyncSessionLocal
+
+        def funcion(db):
+            # Dentro de run_sync: la consulta y el resto de la función corren en el hilo del event loop
+            return [threading.get_ident(), calcular(threading.get_ident), db.scalar(text("SELECT 1"))]
+
+        async def principal():
+            async with AsyncSessionLocal() as db:
+                return [threading.get_ident(), *await ejecutar(db, funcion)]
+
+        bucle, en_run_sync, en_calcular, consulta = asyncio.run(principal())
+        print(json.dumps({"run_sync_en_el_loop": en_run_sync == bucle,
+                          "calcular_en_el_loop": en_calcular == bucle, "consulta": consulta}))
+    """, DB_MODE="async")
+    assert resultado == {"run_sync_en_el_loop": True, "calcular_en_el_loop": False, "consulta": 1}
@@ -0,0 +1,36 @@
+"""Borrado de productos: en cascada a sus ofertas o archivado conservando la fila"""
+from sqlalchemy import select
+
+from apoyo import crear_oferta, crear_productos
+from models.inventario_producto import InventarioProducto
+from models.oferta_reducida import OfertaReducida
+
+
+def test_borrar_producto_borra_sus_ofertas(cliente, db):
+    [producto_id, otro_id] = crear_productos(cliente, 2)
+    ofertas = [crear_oferta(cliente, producto_id) for _ in range(2)]
+    ajena = crear_oferta(cliente, otro_id)
+
+    assert cliente.delete(f"/inventario-productos/{producto_id}").json() == {"detail": "Producto eliminado"}
+    for oferta_id in ofertas:
+        assert cliente.get(f"/ofertas-reducidas/{oferta_id}").status_code == 404
+    assert cliente.get(f"/ofertas-reducidas/{ajena}").status_code == 200
+    assert list(db.scalars(select(OfertaReducida.id))) == [ajena]
+    assert cliente.delete(f"/inventario-productos/{producto_id}").status_code == 404
+
+
+def test_archivar_producto_conserva_la_fila_y_sus_ofertas(cliente, db):
+    [producto_id] = crear_productos(cliente, 1)
+    oferta_id = crear_oferta(cliente, producto_id)
+
+    respuesta = cliente.delete(f"/inventario-productos/{producto_id}", params={"archivar": True})
+    assert respuesta.json() == {"detail": "Producto archivado"}
+    assert cliente.get(f"/inventario-productos/{producto_id}").status_code == 404
+    assert cliente.get("/inventario-productos/").json()["items"] == []
+    assert cliente.patch(f"/inventario-productos/{producto_id}", json={"cantidad": 1}).status_code == 404
+    # Archivado no existe para la API: ni se vuelve a archivar ni se puede borrar
+    assert cliente.delete(f"/inventario-productos/{producto_id}", params={"archivar": True}).status_code == 404
+    assert cliente.delete(f"/inventario-productos/{producto_id}").status_code == 404
+
+    assert db.scalar(select(InventarioProducto.archivado_en).where(InventarioProducto.id == producto_id)) is not None
+    assert list(db.scalars(select(OfertaReducida.id))) == [oferta_id]
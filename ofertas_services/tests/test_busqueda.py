@@ -0,0 +1,42 @@
+"""Búsqueda de texto: sin tildes, tolerante a erratas, con pg_trgm o con trigramas en memoria"""
+from apoyo import producto
+from busqueda import IndiceTexto, normalizar, trigramas
+from crud import busqueda
+from crud.busqueda import reconstruir_indices
+
+
+def test_trigramas_como_pg_trgm():
+    assert normalizar("Pan de ÁVILA") == "pan de avila"
+    assert trigramas("pan") == {"  p", " pa", "pan", "an "}
+
+
+def test_indice_puntua_como_word_similarity():
+    indice = IndiceTexto()
+    indice.reconstruir([(1, "Leche entera"), (2, "Leche desnatada"), (3, "Pan")])
+    # Misma puntuación (contienen la palabra entera): desempata el texto más parecido en conjunto
+    assert indice.buscar("leche", 10, 0.5) == [(1, 1.0), (2, 1.0)]
+    assert indice.buscar("leche entera", 10, 0.5) == [(1, 1.0)]
+    assert indice.buscar("zumo", 10, 0.5) == []
+
+
+def test_buscar_productos_en_memoria(cliente, db):
+    # SQLite: sin pg_trgm, el lifespan deja la búsqueda en los índices en memoria
+    assert busqueda.pg_trgm is False
+    ids = cliente.post("/inventario-productos/bulk", json=[
+        producto(nombre) for nombre in ("Pan de Ávila", "Café molido", "Leche entera")]).json()["ids"]
+    reconstruir_indices(db)
+    # Llega al índice por cambios.py, sin reconstruir
+    nuevo = cliente.post("/inventario-productos/", json=producto("Leche desnatada")).json()["id"]
+
+    def buscar(q):
+        respuesta = cliente.get("/inventario-productos/buscar", params={"q": q})
+        assert respuesta.status_code == 200
+        return [(fila["id"], fila["puntuacion"]) for fila in respuesta.json()["items"]]
+
+    assert buscar("AVILA") == [(ids[0], 1.0)]
+    assert [fila_id for fila_id, _ in buscar("cafe molidoo")] == [ids[1]]
+    assert [fila_id for fila_id, _ in buscar("lechee")] == [ids[2], nuevo]
+    assert buscar("zumo") == []
+
+    cliente.delete(f"/inventario-productos/{ids[1]}", params={"archivar": True})
+    assert buscar("cafe") == []
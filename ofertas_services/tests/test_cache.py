@@ -0,0 +1,70 @@
+"""Cache de entidades: TTL y LRU, lectura a través de la cache e invalidación con las escrituras"""
+from sqlalchemy import update
+
+import cache as cache_modulo
+from apoyo import crear_oferta, crear_productos
+from cache import CacheLRU, cacheado, invalidar
+from cambios import ACTUALIZAR, CASCADA
+from models.inventario_producto import InventarioProducto
+
+
+def test_lru_desaloja_la_menos_usada_y_expira_por_ttl(monkeypatch):
+    reloj = [100.0]
+    monkeypatch.setattr(cache_modulo.time, "monotonic", lambda: reloj[0])
+    lru = CacheLRU(ttl=10, max_entradas=2)
+    lru.guardar("a", 1)
+    lru.guardar("b", 2)
+    assert lru.obtener("a") == 1          # "a" pasa a ser la más reciente
+    lru.guardar("c", 3)                   # desaloja "b"
+    assert (lru.obtener("b"), lru.obtener("c")) == (None, 3)
+    reloj[0] += 11
+    assert lru.obtener("a") is None
+    assert {k: lru.resumen()[k] for k in ("hits", "misses", "evictions", "expiradas", "entradas")} == {
+        "hits": 2, "misses": 2, "evictions": 1, "expiradas": 1, "entradas": 1}
+
+
+def test_acierto_no_consulta_la_base_y_las_escrituras_invalidan(cliente, db):
+    [producto_id] = crear_productos(cliente, 1)
+    url = f"/inventario-productos/{producto_id}"
+    assert cliente.get(url).json()["cantidad"] == 5
+
+    # Un cambio que no pasa por crud/* no se publica: la entrada cacheada sigue sirviéndose
+    db.execute(update(InventarioProducto).where(InventarioProducto.id == producto_id).values(cantidad=9))
+    db.commit()
+    assert cliente.get(url).json()["cantidad"] == 5
+
+    # Una escritura de la API invalida la entrada
+    assert cliente.patch(url, json={"nombre": "Pan integral"}).status_code == 200
+    leido = cliente.get(url).json()
+    assert (leido["nombre"], leido["cantidad"]) == ("Pan integral", 9)
+    cliente.delete(url)
+    assert cliente.get(url).status_code == 404
+
+
+def test_cascada_descarta_la_tabla_hija(cliente):
+    [producto_id] = crear_productos(cliente, 1)
+    oferta_id = crear_oferta(cliente, producto_id)
+    assert cliente.get(f"/ofertas-reducidas/{oferta_id}").status_code == 200
+    cliente.delete(f"/inventario-productos/{producto_id}")
+    assert cliente.get(f"/ofertas-reducidas/{oferta_id}").status_code == 404
+
+
+def test_lectura_invalidada_mientras_corre_no_se_guarda():
+    class Sesion:
+        info = {}
+
+    lecturas = []
+
+    @cacheado("prueba")
+    def leer(db, entidad_id):
+        lecturas.append(entidad_id)
+        if len(lecturas) == 1:
+            # Una escritura confirmada mientras esta lectura estaba en curso
+            invalidar("prueba", ACTUALIZAR, [{"id": entidad_id}])
+        return InventarioProducto(id=entidad_id, cantidad=len(lecturas))
+
+    assert leer(Sesion(), 1)["cantidad"] == 1
+    assert leer(Sesion(), 1)["cantidad"] == 2   # la primera no se guardó: se vuelve a leer
+    assert leer(Sesion(), 1)["cantidad"] == 2   # esta sí
+    invalidar("prueba", CASCADA, [{"padre_id": 7}])
+    assert leer(Sesion(), 1)["cantidad"] == 3
@@ -0,0 +1,80 @@
+"""Barrido de caducidad: lotes acotados, cambios publicados y un solo proceso barriendo a la vez"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+
+import caducidad
+import config
+from cambios import ACTUALIZAR, ELIMINAR
+from database import engine
+from models.inventario_producto import InventarioProducto
+from models.oferta_reducida import OfertaReducida
+
+
+@pytest.fixture
+def publicados(monkeypatch):
+    registro = []
+    monkeypatch.setattr(caducidad, "publicar", lambda tabla, accion, filas: registro.append((tabla, accion, filas)))
+    return registro
+
+
+@pytest.fixture
+def vencidos(db):
+    """5 productos vencidos (uno archivado), 1 vigente y 5 ofertas terminadas hace más que la retención"""
+    ahora = datetime.now()
+    vida_util = timedelta(hours=config.CADUCIDAD_VIDA_UTIL_HORAS)
+    productos = [
+        {"nombre": f"p{i}", "cantidad": 1, "precio_unitario": 1.0, "estado": "Disponible",
+         "fecha_ingreso": ahora - vida_util - timedelta(hours=i + 1), "archivado_en": ahora if i == 0 else None}
+        for i in range(5)
+    ]
+    productos.append({"nombre": "fresco", "cantidad": 1, "precio_unitario": 1.0, "estado": "Disponible",
+                      "fecha_ingreso": ahora})
+    ids = list(db.scalars(insert(InventarioProducto).returning(InventarioProducto.id), productos))
+    fin = ahora - timedelta(hours=config.CADUCIDAD_RETENCION_HORAS + 1)
+    db.execute(insert(OfertaReducida), [
+        {"producto_id": ids[-1], "precio_oferta": 0.5, "fecha_inicio": fin - timedelta(days=1), "fecha_fin": fin}
+        for _ in range(5)
+    ])
+    db.commit()
+    return ids
+
+
+def test_barrido_en_lotes(db, vencidos, publicados):
+    informe = caducidad.barrer(lote=2)
+
+    assert informe["estado"] == "completado"
+    assert {nombre: (t["filas"], t["lotes"]) for nombre, t in informe["tareas"].items()} == {
+        "productos": (5, 3), "ofertas": (5, 3),
+    }
+    estados = dict(db.execute(select(InventarioProducto.id, InventarioProducto.estado)).all())
+    assert [estados[i] for i in vencidos] == ["Expirado"] * 5 + ["Disponible"]
+    assert db.scalar(select(OfertaReducida.id).where(OfertaReducida.archivado_en.is_(None))) is None
+
+    productos = [fila for tabla, accion, filas in publicados if tabla == "inventario_producto"
+                 for fila in filas if accion == ACTUALIZAR]
+    ofertas = [fila for tabla, accion, filas in publicados if tabla == "oferta_reducida"
+               for fila in filas if accion == ELIMINAR]
+    # El archivado se expira pero no se notifica
+    assert sorted(fila["id"] for fila in productos) == vencidos[1:5]
+    assert len(ofertas) == 5
+
+    # Sin vencidos pendientes, el siguiente barrido no toca nada
+    segundo = caducidad.barrer(lote=2)
+    assert {nombre: (t["filas"], t["lotes"]) for nombre, t in segundo["tareas"].items()} == {
+        "productos": (0, 0), "ofertas": (0, 0),
+    }
+
+
+def test_otro_proceso_con_el_lock_omite_el_barrido(db, vencidos, publicados):
+    with caducidad._bloqueo(engine) as obtenido:
+        assert obtenido
+        informe = caducidad.barrer(lote=2)
+    assert informe["estado"] == "omitido: otro worker tiene el lock"
+    assert "tareas" not in informe
+    assert publicados == []
+    assert db.scalar(select(InventarioProducto.estado).where(InventarioProducto.id == vencidos[1])) == "Disponible"
+
+    # Liberado el lock, el siguiente barrido sí corre
+    assert caducidad.barrer(lote=2)["estado"] == "completado"
@@ -0,0 +1,67 @@
+"""GET condicional: ETag por versión de tabla, 304 hasta la próxima escritura"""
+import pytest
+
+import condicional
+from apoyo import crear_oferta, crear_productos
+from condicional import coincide
+
+
+@pytest.fixture
+def periodo_fijo(monkeypatch):
+    """El ETag local incluye el periodo de vigencia en curso: se fija para que no cambie durante la prueba"""
+    if condicional.versiones is None:
+        pytest.skip("ETag desactivado (ETAG_VIGENCIA_LOCAL=0)")
+    monkeypatch.setattr(condicional.versiones, "periodo", lambda: 0)
+
+
+def test_etag_304_hasta_que_se_escribe(cliente, periodo_fijo):
+    [producto_id] = crear_productos(cliente, 1)
+    oferta_id = crear_oferta(cliente, producto_id)
+    url = f"/ofertas-reducidas/{oferta_id}"
+
+    etag = cliente.get(url).headers["ETag"]
+    no_modificada = cliente.get(url, headers={"If-None-Match": etag})
+    assert no_modificada.status_code == 304
+    assert no_modificada.headers["ETag"] == etag
+
+    assert cliente.patch(url, json={"precio_oferta": 1.25}).status_code == 200
+    tras_escribir = cliente.get(url, headers={"If-None-Match": etag})
+    assert tras_escribir.status_code == 200
+    assert tras_escribir.json()["precio_oferta"] == 1.25
+    assert tras_escribir.headers["ETag"] != etag
+    assert cliente.get(url, headers={"If-None-Match": tras_escribir.headers["ETag"]}).status_code == 304
+
+
+def test_etag_del_listado_depende_de_las_tablas_hijas(cliente, periodo_fijo):
+    [producto_id] = crear_productos(cliente, 1)
+    etag = cliente.get("/inventario-productos/").headers["ETag"]
+    # El listado de productos incluye sus ofertas: crear una invalida el ETag
+    crear_oferta(cliente, producto_id)
+    respuesta = cliente.get("/inventario-productos/", headers={"If-None-Match": etag})
+    assert respuesta.status_code == 200
+    assert len(respuesta.json()["items"][0]["ofertas_reducidas"]) == 1
+
+
+def test_etag_caduca_con_el_periodo(cliente, monkeypatch):
+    if condicional.versiones is None or condicional.versiones.remoto:
+        pytest.skip("Solo las versiones locales caducan")
+    [producto_id] = crear_productos(cliente, 1)
+    url = f"/inventario-productos/{producto_id}"
+    monkeypatch.setattr(condicional.versiones, "periodo", lambda: 1)
+    etag = cliente.get(url).headers["ETag"]
+    # Otro worker pudo escribir sin que este lo viera: pasado el periodo el ETag ya no vale
+    monkeypatch.setattr(condicional.versiones, "periodo", lambda: 2)
+    assert cliente.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_asterisco_no_oculta_un_404(cliente, periodo_fijo):
+    [producto_id] = crear_productos(cliente, 1)
+    assert cliente.get("/inventario-productos/999999", headers={"If-None-Match": "*"}).status_code == 404
+    assert cliente.get(f"/inventario-productos/{producto_id}", headers={"If-None-Match": "*"}).status_code == 200
+
+
+def test_coincide():
+    assert coincide('"a", W/"b"', '"b"')
+    assert not coincide('"a"', '"b"')
+    assert not coincide(None, '"b"')
+    assert not coincide("*", '"b"')
@@ -0,0 +1,54 @@
+"""Relevo: los cambios de otros workers se publican como remotos y no se reenvían"""
+from datetime import datetime
+
+import pytest
+
+import cambios
+from cambios import ACTUALIZAR, ELIMINAR
+from difusion import relevo
+from serializacion import dumps
+
+
+@pytest.fixture
+def recibidos(monkeypatch):
+    """Suscriptores de prueba en una tabla: (todos los cambios, solo los locales)"""
+    todos, locales = [], []
+    monkeypatch.setitem(cambios._suscriptores, "inventario_producto", [
+        (lambda tabla, accion, filas: todos.append((accion, filas)), True),
+        (lambda tabla, accion, filas: locales.append((accion, filas)), False),
+    ])
+    return todos, locales
+
+
+def _linea(tabla, accion, fila):
+    return dumps({"tabla": tabla, "accion": accion, "fila": fila}).decode()
+
+
+def test_remotos_no_llegan_a_suscriptores_locales(recibidos):
+    todos, locales = recibidos
+    cambios.publicar("inventario_producto", ELIMINAR, [{"id": 1}], remoto=True)
+    cambios.publicar("inventario_producto", ELIMINAR, [{"id": 2}])
+    assert todos == [(ELIMINAR, [{"id": 1}]), (ELIMINAR, [{"id": 2}])]
+    assert locales == [(ELIMINAR, [{"id": 2}])]
+
+
+def test_recibir_publica_con_fechas_y_solo_difunde_tablas_filtradas(recibidos):
+    todos, locales = recibidos
+    ingreso = datetime(2026, 10, 1, 8, 30)
+    lineas = [
+        _linea("inventario_producto", ACTUALIZAR, {"id": 3, "nombre": "Pan", "fecha_ingreso": ingreso}),
+        _linea("oferta_reducida", ELIMINAR, {"id": 9}),
+    ]
+
+    difundir = relevo._recibir("otro-worker", lineas)
+
+    assert todos == [(ACTUALIZAR, [{"id": 3, "nombre": "Pan", "fecha_ingreso": ingreso}])]
+    assert locales == []
+    assert difundir == lineas[1:]
+
+
+def test_recibir_ignora_los_paquetes_propios(recibidos):
+    todos, _ = recibidos
+    lineas = [_linea("inventario_producto", ELIMINAR, {"id": 4})]
+    assert relevo._recibir(relevo.origen, lineas) == []
+    assert todos == []
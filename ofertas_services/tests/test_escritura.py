@@ -0,0 +1,30 @@
+"""Reglas de escritura: orden de fechas de una oferta en PATCH frente a lo ya guardado"""
+from datetime import timedelta
+
+from apoyo import INICIO, crear_oferta, crear_productos
+
+
+def test_patch_con_una_fecha_respeta_la_guardada(cliente):
+    [producto_id] = crear_productos(cliente, 1)
+    oferta_id = crear_oferta(cliente, producto_id)
+    url = f"/ofertas-reducidas/{oferta_id}"
+
+    for cambio in ({"fecha_fin": (INICIO - timedelta(hours=1)).isoformat()},
+                   {"fecha_inicio": (INICIO + timedelta(days=3)).isoformat()}):
+        respuesta = cliente.patch(url, json=cambio)
+        assert respuesta.status_code == 422
+        assert respuesta.json() == {"detail": "La fecha de fin debe ser posterior a la fecha de inicio"}
+    assert cliente.get(url).json()["fecha_fin"] == (INICIO + timedelta(days=2)).isoformat()
+
+    assert cliente.patch(url, json={"fecha_fin": (INICIO + timedelta(hours=1)).isoformat()}).status_code == 200
+    # La fila inexistente sigue siendo 404, no 422
+    assert cliente.patch("/ofertas-reducidas/999999", json={"fecha_fin": INICIO.isoformat()}).status_code == 404
+
+
+def test_patch_con_ambas_fechas_invertidas(cliente):
+    [producto_id] = crear_productos(cliente, 1)
+    oferta_id = crear_oferta(cliente, producto_id)
+    respuesta = cliente.patch(f"/ofertas-reducidas/{oferta_id}", json={
+        "fecha_inicio": (INICIO + timedelta(days=1)).isoformat(), "fecha_fin": INICIO.isoformat(),
+    })
+    assert respuesta.status_code == 422
@@ -0,0 +1,40 @@
+"""Migraciones: base nueva, base del antiguo create_all y verificación de planes"""
+from apoyo import en_proceso
+
+
+def test_base_nueva_queda_en_la_ultima_revision():
+    estado = en_proceso("""
+        print(json.dumps(esquema.estado_esquema(engine)))
+    """)
+    assert estado["al_dia"] and estado["actual"] == estado["esperada"]
+
+
+def test_base_de_create_all_se_marca_en_0001_y_se_actualiza():
+    resultado = en_proceso("""
+        import logging
+        from alembic import command
+        from sqlalchemy import inspect, text
+
+        # Lo que dejaba el antiguo create_all: el esquema de 0001 sin alembic_version
+        command.downgrade(esquema.configuracion_alembic(), "0001")
+        with engine.begin() as conexion:
+            conexion.execute(text("DROP TABLE alembic_version"))
+
+        mensajes = []
+        manejador = logging.Handler()
+        manejador.emit = lambda registro: mensajes.append(registro.getMessage())
+        logging.getLogger("esquema").addHandler(manejador)
+        esquema.migrar(engine)
+        print(json.dumps({"mensajes": mensajes, "estado": esquema.estado_esquema(engine),
+                          "tablas": inspect(engine).get_table_names()}))
+    """)
+    assert resultado["mensajes"] == ["Base creada con create_all: se marca en la revisión 0001"]
+    assert resultado["estado"]["al_dia"]
+    assert "reporte_entregas_diarias" in resultado["tablas"]
+
+
+def test_planes_usan_los_indices():
+    resultado = en_proceso("""
+        print(json.dumps({"correcto": esquema.verificar_planes(engine)}))
+    """)
+    assert resultado["correcto"]
@@ -0,0 +1,62 @@
+"""Modo estricto (DB_ESTRICTO): sin cargas implícitas de relaciones y con presupuesto de consultas"""
+import pytest
+from sqlalchemy import select
+
+from apoyo import en_proceso
+from instrumentacion import PresupuestoExcedido, contar_consultas
+from models.inventario_producto import InventarioProducto
+
+
+def test_contar_consultas_falla_al_superar_el_presupuesto(db):
+    with contar_consultas() as medicion:
+        db.execute(select(InventarioProducto.id)).all()
+        db.execute(select(InventarioProducto.id)).all()
+    assert medicion.consultas == 2
+    with pytest.raises(PresupuestoExcedido), contar_consultas(presupuesto=1):
+        db.execute(select(InventarioProducto.id)).all()
+        db.execute(select(InventarioProducto.id)).all()
+
+
+def test_estricto_carga_implicita_y_presupuesto():
+    resultado = en_proceso("""
+        import sys
+        sys.path.insert(0, "tests")
+        from fastapi.testclient import TestClient
+        from sqlalchemy import select
+        from sqlalchemy.exc import InvalidRequestError
+        from apoyo import crear_oferta, crear_productos
+        from database import SessionLocal
+        from instrumentacion import presupuesto
+        from main import crear_app
+        from models.inventario_producto import InventarioProducto
+
+        app = crear_app()
+
+        @app.get("/dos-consultas", dependencies=[presupuesto(1)])
+        def dos_consultas():
+            with SessionLocal() as db:
+                return db.execute(select(InventarioProducto.id)).all() + db.execute(select(InventarioProducto.id)).all()
+
+        with TestClient(app, raise_server_exceptions=False) as cliente:
+            [producto_id] = crear_productos(cliente, 1)
+            crear_oferta(cliente, producto_id)
+            # Los listados cargan sus relaciones explícitamente: funcionan igual en modo estricto
+            listado = cliente.get("/inventario-productos/")
+            excedido = cliente.get("/dos-consultas")
+
+        with SessionLocal() as db:
+            producto = db.get(InventarioProducto, producto_id)
+            try:
+                producto.ofertas_reducidas
+                carga_implicita = None
+            except InvalidRequestError as e:
+                carga_implicita = type(e).__name__
+
+        print(json.dumps({"listado": [listado.status_code, len(listado.json()["items"][0]["ofertas_reducidas"])],
+                          "excedido": [excedido.status_code, excedido.json()["detail"]],
+                          "carga_implicita": carga_implicita}))
+    """, DB_ESTRICTO="1")
+    assert resultado["listado"] == [200, 1]
+    assert resultado["excedido"][0] == 500
+    assert resultado["excedido"][1].startswith("Presupuesto de 1 consultas excedido")
+    assert resultado["carga_implicita"] == "InvalidRequestError"
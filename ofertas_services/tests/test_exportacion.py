@@ -0,0 +1,57 @@
+"""Exportación en streaming: NDJSON con las ofertas anidadas y CSV plano"""
+import asyncio
+import csv
+import io
+import json
+
+from apoyo import crear_oferta, crear_productos
+from exportacion import anidar_hijos
+
+
+def test_ndjson_anida_las_ofertas_y_omite_archivados(cliente):
+    con_ofertas, sin_ofertas, archivado = crear_productos(cliente, 3)
+    ofertas = [crear_oferta(cliente, con_ofertas, precio_oferta=precio) for precio in (1.0, 2.0)]
+    crear_oferta(cliente, archivado)
+    cliente.delete(f"/inventario-productos/{archivado}", params={"archivar": True})
+
+    respuesta = cliente.get("/inventario-productos/export")
+    assert respuesta.headers["content-type"] == "application/x-ndjson"
+    assert respuesta.headers["content-disposition"] == 'attachment; filename="inventario_productos.ndjson"'
+    productos = [json.loads(linea) for linea in respuesta.text.splitlines()]
+    assert [p["id"] for p in productos] == [con_ofertas, sin_ofertas]
+    assert [(o["id"], o["precio_oferta"]) for o in productos[0]["ofertas_reducidas"]] == list(zip(ofertas, (1.0, 2.0)))
+    assert productos[1]["ofertas_reducidas"] == []
+    assert "archivado_en" not in productos[0]
+
+
+def test_csv_una_fila_por_producto_y_oferta(cliente):
+    [producto_id] = crear_productos(cliente, 1)
+    ofertas = [crear_oferta(cliente, producto_id) for _ in range(2)]
+
+    respuesta = cliente.get("/inventario-productos/export", params={"formato": "csv"})
+    assert respuesta.headers["content-type"] == "text/csv; charset=utf-8"
+    filas = list(csv.DictReader(io.StringIO(respuesta.text)))
+    assert [(int(f["id"]), int(f["oferta_id"])) for f in filas] == [(producto_id, o) for o in ofertas]
+    assert filas[0]["fecha_fin"] == "2026-10-03T09:00:00"
+
+    ofertas_csv = list(csv.DictReader(io.StringIO(cliente.get("/ofertas-reducidas/export", params={"formato": "csv"}).text)))
+    assert [int(f["id"]) for f in ofertas_csv] == ofertas
+
+
+def test_anidar_hijos_con_un_padre_partido_entre_lotes():
+    async def lotes():
+        yield [{"id": 1, "hijo_id": 10}, {"id": 1, "hijo_id": 11}]
+        yield [{"id": 1, "hijo_id": 12}, {"id": 2, "hijo_id": None}]
+        yield [{"id": 3, "hijo_id": 30}]
+
+    async def recoger():
+        return [lote async for lote in anidar_hijos(lotes(), "id", "hijos", {"hijo_id": "id"})]
+
+    entregados = asyncio.run(recoger())
+    # Un padre sale cuando llega el siguiente: el primer lote no puede entregar nada todavía
+    assert entregados[0] == []
+    assert [padre for lote in entregados for padre in lote] == [
+        {"id": 1, "hijos": [{"id": 10}, {"id": 11}, {"id": 12}]},
+        {"id": 2, "hijos": []},
+        {"id": 3, "hijos": [{"id": 30}]},
+    ]
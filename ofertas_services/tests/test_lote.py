@@ -0,0 +1,52 @@
+"""Operaciones en lote: validación por elemento, claves foráneas y un solo INSERT/UPDATE/DELETE"""
+from sqlalchemy import select
+
+from apoyo import crear_oferta, crear_productos, oferta
+from models.oferta_reducida import OfertaReducida
+
+
+def test_crear_en_lote_descarta_claves_foraneas_inexistentes(cliente, db):
+    [producto_id] = crear_productos(cliente, 1)
+    respuesta = cliente.post("/ofertas-reducidas/bulk", json=[
+        oferta(producto_id),
+        oferta(999_999),
+        oferta(producto_id, precio_oferta=-1),
+    ])
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert cuerpo["created_count"] == 1
+    assert [e["index"] for e in cuerpo["errors"]] == [1, 2]
+    assert cuerpo["errors"][0]["detail"] == "producto_id: no existe inventario_producto con id 999999"
+    assert list(db.scalars(select(OfertaReducida.id))) == cuerpo["ids"]
+
+
+def test_actualizar_en_lote_descarta_claves_foraneas_inexistentes(cliente, db):
+    [producto_id] = crear_productos(cliente, 1)
+    buena, mala = (crear_oferta(cliente, producto_id) for _ in range(2))
+    respuesta = cliente.patch("/ofertas-reducidas/bulk", json=[
+        {"id": buena, "precio_oferta": 1.0},
+        {"id": mala, "producto_id": 999_999},
+        {"id": 999_999, "precio_oferta": 1.0},
+        {"id": buena, "precio_oferta": 2.0},
+    ])
+    cuerpo = respuesta.json()
+    assert cuerpo["updated_count"] == 1
+    assert [(e["index"], e["id"], e["detail"]) for e in cuerpo["errors"]] == [
+        (1, mala, "producto_id: no existe inventario_producto con id 999999"),
+        (2, 999_999, "No encontrado"),
+        (3, buena, "id repetido en el lote"),
+    ]
+    filas = dict(db.execute(select(OfertaReducida.id, OfertaReducida.precio_oferta)).all())
+    assert filas == {buena: 1.0, mala: 1.5}
+
+
+def test_eliminar_en_lote_informa_los_no_encontrados(cliente, db):
+    ids = crear_productos(cliente, 3)
+    crear_oferta(cliente, ids[0])
+    respuesta = cliente.request("DELETE", "/inventario-productos/bulk", json={"ids": [ids[0], 999_999, ids[2]]})
+    cuerpo = respuesta.json()
+    assert cuerpo["deleted_count"] == 2
+    assert [(e["index"], e["id"]) for e in cuerpo["errors"]] == [(1, 999_999)]
+    # Las ofertas del producto borrado se van con él (ON DELETE CASCADE)
+    assert list(db.scalars(select(OfertaReducida.id))) == []
+    assert [item["id"] for item in cliente.get("/inventario-productos/").json()["items"]] == [ids[1]]
@@ -0,0 +1,53 @@
+"""Métricas por ruta: exposición Prometheus en /metrics y cabecera Server-Timing"""
+import re
+
+import pytest
+
+import config
+from apoyo import crear_productos
+from metricas import Histograma
+
+RUTA = 'metodo="GET",ruta="/inventario-productos/{item_id}"'
+
+
+def _muestras(texto):
+    """{nombre{etiquetas}: valor} de una exposición Prometheus"""
+    return {nombre: float(valor) for nombre, valor in
+            (linea.rsplit(" ", 1) for linea in texto.splitlines() if not linea.startswith("#"))}
+
+
+def test_histograma_acumulativo():
+    histograma = Histograma(buckets=(1, 5))
+    for valor in (0.5, 1, 3, 10):
+        histograma.observar(valor)
+    assert histograma.resumen() == {"count": 4, "sum": 14.5, "buckets": {"1": 2, "5": 3, "+Inf": 4}}
+
+
+def test_metrics_por_plantilla_de_ruta(cliente):
+    [producto_id] = crear_productos(cliente, 1)
+    antes = _muestras(cliente.get("/metrics").text)
+    for _ in range(3):
+        cliente.get(f"/inventario-productos/{producto_id}")
+    cliente.get("/inventario-productos/999999")
+
+    respuesta = cliente.get("/metrics")
+    assert respuesta.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE ofertas_http_duracion_segundos histogram" in respuesta.text
+    despues = _muestras(respuesta.text)
+    # Una sola serie para los cuatro ids: la etiqueta es la plantilla, no la ruta concreta
+    contador = f"ofertas_http_duracion_segundos_count{{{RUTA}}}"
+    assert despues[contador] - antes.get(contador, 0) == 4
+    assert not any(re.search(rf'ruta="/inventario-productos/{producto_id}"', serie) for serie in despues)
+    assert despues[f"ofertas_http_consultas_total{{{RUTA}}}"] >= 1
+    assert despues['ofertas_db_pool_checkouts_total{motor="sync"}'] > 0
+
+
+@pytest.fixture
+def con_server_timing(monkeypatch):
+    monkeypatch.setattr(config, "METRICAS_SERVER_TIMING", True)
+
+
+def test_server_timing(con_server_timing, cliente):
+    [producto_id] = crear_productos(cliente, 1)
+    cabecera = cliente.get(f"/inventario-productos/{producto_id}").headers["server-timing"]
+    assert re.fullmatch(r'db;dur=[\d.]+;desc="1 consultas", app;dur=[\d.]+', cabecera)
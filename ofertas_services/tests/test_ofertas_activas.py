@@ -0,0 +1,95 @@
+"""Índice de ofertas activas: buckets ordenados, páginas por cursor y reconstrucción sin perder cambios"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from cambios import ACTUALIZAR, CREAR, ELIMINAR
+from crud.oferta_reducida import reconstruir_indice_activas
+from ofertas_activas import IndiceOfertasActivas
+from paginacion import decodificar_cursor
+from models.oferta_reducida import OfertaReducida
+
+AHORA = datetime.now().replace(microsecond=0)
+
+
+def _oferta(oferta_id, desde_h=-1, hasta_h=1, precio=1.0, producto_id=1):
+    return {"id": oferta_id, "producto_id": producto_id, "precio_oferta": precio,
+            "fecha_inicio": AHORA + timedelta(hours=desde_h), "fecha_fin": AHORA + timedelta(hours=hasta_h)}
+
+
+@pytest.fixture
+def indice():
+    """Índice construido con un producto; max_buckets=4 para que las ofertas de más de 4 h vayan aparte"""
+    indice = IndiceOfertasActivas(historial=timedelta(hours=24), max_buckets=4)
+    indice.reconstruir([], {1: {"nombre": "Pan", "estado": "Disponible"}})
+    return indice
+
+
+def _ids(filas):
+    return [fila["id"] for fila in filas]
+
+
+def test_activas_ordenadas_por_id_mezclando_largas(indice):
+    # Insertadas en desorden; 3 y 8 duran días (van con las largas), 5 ya terminó, 6 empieza después
+    ofertas = [_oferta(9), _oferta(3, -48, 48), _oferta(7), _oferta(5, -3, -2), _oferta(6, 1, 2),
+               _oferta(8, -1, 72), _oferta(1)]
+    indice.aplicar_ofertas("oferta_reducida", CREAR, ofertas)
+    assert _ids(indice.activas(AHORA)) == [1, 3, 7, 8, 9]
+
+
+def test_pagina_desde_el_cursor_y_se_corta_en_el_limite(indice):
+    indice.aplicar_ofertas("oferta_reducida", CREAR, [_oferta(i, -48, 48) if i % 3 == 0 else _oferta(i)
+                                                      for i in range(1, 21)])
+    # limit+1 filas: la sobrante indica que hay página siguiente
+    assert _ids(indice.activas(AHORA, limit=4)) == [1, 2, 3, 4, 5]
+    assert _ids(indice.activas(AHORA, despues_de=4, limit=4)) == [5, 6, 7, 8, 9]
+    assert _ids(indice.activas(AHORA, despues_de=18, limit=4)) == [19, 20]
+    assert _ids(indice.activas(AHORA, despues_de=3, precio_min=2.0)) == []
+
+
+def test_quitar_y_actualizar_mantienen_el_orden(indice):
+    indice.aplicar_ofertas("oferta_reducida", CREAR, [_oferta(i) for i in (1, 2, 3)] + [_oferta(4, -48, 48)])
+    indice.aplicar_ofertas("oferta_reducida", ELIMINAR, [{"id": 2}, {"id": 4}])
+    indice.aplicar_ofertas("oferta_reducida", ACTUALIZAR, [_oferta(1, 2, 3), _oferta(5, -48, 48)])
+    assert _ids(indice.activas(AHORA)) == [3, 5]
+    assert _ids(indice.activas(AHORA + timedelta(hours=2, minutes=30))) == [1, 5]
+
+
+def test_reconstruir_reaplica_los_cambios_recibidos_durante_la_lectura(indice):
+    indice.iniciar_reconstruccion()
+    # Llegan mientras se lee la base: la lectura no los incluye
+    indice.aplicar_ofertas("oferta_reducida", CREAR, [_oferta(2)])
+    indice.aplicar_ofertas("oferta_reducida", ELIMINAR, [{"id": 1}])
+    indice.reconstruir([_oferta(1), _oferta(3)], {1: {"nombre": "Pan", "estado": "Disponible"}})
+    assert _ids(indice.activas(AHORA)) == [2, 3]
+
+
+def test_endpoint_activas_con_cursor(cliente, db):
+    reconstruir_indice_activas(db)
+    [producto_id] = cliente.post("/inventario-productos/bulk", json=[{
+        "nombre": "Pan", "cantidad": 1, "precio_unitario": 2.0, "fecha_ingreso": AHORA.isoformat(),
+        "estado": "Disponible"}]).json()["ids"]
+    ids = [cliente.post("/ofertas-reducidas/", json={
+        "producto_id": producto_id, "precio_oferta": precio,
+        "fecha_inicio": (AHORA - timedelta(hours=1)).isoformat(), "fecha_fin": (AHORA + timedelta(hours=1)).isoformat(),
+    }).json()["id"] for precio in (1.0, 1.5, 2.0)]
+
+    primera = cliente.get("/ofertas-reducidas/activas", params={"limit": 2}).json()
+    assert _ids(primera["items"]) == ids[:2]
+    assert decodificar_cursor(primera["next_cursor"], [OfertaReducida.id]) == [ids[1]]
+    segunda = cliente.get("/ofertas-reducidas/activas", params={"limit": 2, "cursor": primera["next_cursor"]}).json()
+    assert _ids(segunda["items"]) == ids[2:] and segunda["next_cursor"] is None
+    assert primera["items"][0]["producto_nombre"] == "Pan"
+
+    filtradas = cliente.get("/ofertas-reducidas/activas", params={"precio_min": 1.2, "precio_max": 1.8}).json()
+    assert _ids(filtradas["items"]) == [ids[1]]
+
+
+def test_producto_recortado_queda_pendiente(indice):
+    indice.aplicar_ofertas("oferta_reducida", CREAR, [_oferta(1)])
+    # Llega del relevo sin nombre ni estado: no se puede actualizar, se vuelve a leer
+    indice.aplicar_productos("inventario_producto", ACTUALIZAR, [{"id": 1}])
+    assert indice.productos_pendientes() == {1}
+    assert indice.activas(AHORA) == []
+    indice.registrar_productos({1: {"nombre": "Pan integral", "estado": "Disponible"}})
+    assert [o["producto_nombre"] for o in indice.activas(AHORA)] == ["Pan integral"]
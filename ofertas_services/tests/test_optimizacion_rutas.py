@@ -0,0 +1,69 @@
+"""Optimización de rutas: vecino más cercano + 2-opt y POST /rutas-entrega/optimizar"""
+import pytest
+
+import config
+from apoyo import crear_entrega, crear_repartidor
+from optimizacion_rutas import distancias, resolver
+
+# Paradas sobre un meridiano, separadas ~1,11 km (0,01 grados de latitud)
+LINEA = [(40.0 + 0.01 * i, -3.7) for i in range(8)]
+DESORDEN = [3, 7, 0, 5, 2, 6, 1, 4]
+
+
+def test_distancias_haversine():
+    d = distancias([(40.0, -3.7), (41.0, -3.7)])
+    assert d[0, 0] == 0 and d[0, 1] == d[1, 0] == pytest.approx(111.2, abs=0.1)
+
+
+def test_resolver_recorre_la_linea_en_orden():
+    paradas = [LINEA[i] for i in DESORDEN]
+    solucion = resolver(paradas, origen=(39.99, -3.7))
+    assert [DESORDEN[i] for i in solucion["orden"]] == list(range(8))
+    assert solucion["completo"]
+    assert solucion["distancia_km"] == pytest.approx(sum(solucion["tramos_km"]))
+    assert solucion["distancia_km"] == pytest.approx(8 * 1.112, abs=0.01)
+    assert solucion["distancia_km"] < solucion["distancia_inicial_km"]
+
+
+def test_resolver_sin_plazo_devuelve_el_greedy_incompleto():
+    solucion = resolver([LINEA[i] for i in DESORDEN], fin_en=0)
+    assert not solucion["completo"] and sorted(solucion["orden"]) == list(range(8))
+
+
+@pytest.fixture
+def sin_procesos(monkeypatch):
+    """Resolver en el threadpool: sin arrancar el pool de procesos en cada prueba"""
+    monkeypatch.setattr(config, "RUTAS_PROCESOS", 0)
+
+
+def test_optimizar_paradas_explicitas(sin_procesos, cliente):
+    repartidor_id = crear_repartidor(cliente)
+    paradas = [{"id": i, "latitud": LINEA[i][0], "longitud": LINEA[i][1]} for i in DESORDEN]
+    respuesta = cliente.post("/rutas-entrega/optimizar", json={"repartidor_id": repartidor_id, "paradas": paradas})
+    assert respuesta.status_code == 200
+    [plan] = respuesta.json()["planes"]
+    assert plan["repartidor_id"] == repartidor_id and plan["completo"]
+    # Sin origen empieza por el extremo que convenga
+    assert [p["id"] for p in plan["paradas"]] in (list(range(8)), list(range(7, -1, -1)))
+    assert plan["paradas"][0]["distancia_km"] == 0
+
+
+def test_optimizar_una_zona_desde_la_base(sin_procesos, cliente):
+    centro = [crear_repartidor(cliente, f"r{i}") for i in range(2)]
+    otra_zona = crear_repartidor(cliente, "r3", zona="Norte")
+    entregas = {repartidor_id: [crear_entrega(cliente, repartidor_id, *LINEA[i]) for i in DESORDEN]
+                for repartidor_id in centro}
+    crear_entrega(cliente, otra_zona, *LINEA[0])
+    crear_entrega(cliente, centro[0])  # sin coordenadas: no es una parada
+
+    respuesta = cliente.post("/rutas-entrega/optimizar", json={"zona": "Centro", "origen": {"latitud": 39.99, "longitud": -3.7}})
+    planes = {plan["repartidor_id"]: plan for plan in respuesta.json()["planes"]}
+    assert sorted(planes) == centro
+    for repartidor_id, ids in entregas.items():
+        por_latitud = [ids[DESORDEN.index(i)] for i in range(8)]
+        assert [p["id"] for p in planes[repartidor_id]["paradas"]] == por_latitud
+
+
+def test_optimizar_repartidor_inexistente(sin_procesos, cliente):
+    respuesta = cliente.post("/rutas-entrega/optimizar", json={"repartidor_id": 999999, "paradas": [{"latitud": 40, "longitud": -3}]})
+    assert respuesta.status_code == 404
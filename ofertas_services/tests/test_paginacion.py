@@ -0,0 +1,65 @@
+"""Paginación por cursor (keyset) de los listados"""
+from datetime import timedelta
+
+from apoyo import INICIO, crear_productos
+from paginacion import codificar_cursor, decodificar_cursor, pagina
+from models.reporte import ReporteEntregasDiarias
+
+
+def _recorrer(cliente, url, limit):
+    """Todas las páginas de un listado: (ids de cada página, next_cursor de cada página)"""
+    paginas, cursores, cursor = [], [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        cuerpo = cliente.get(url, params=params).json()
+        paginas.append([item["id"] for item in cuerpo["items"]])
+        cursores.append(cuerpo["next_cursor"])
+        cursor = cuerpo["next_cursor"]
+        if cursor is None:
+            return paginas, cursores
+
+
+def test_paginas_justas_terminan_sin_cursor(cliente):
+    ids = crear_productos(cliente, 4)
+    paginas, cursores = _recorrer(cliente, "/inventario-productos/", 2)
+    # La última página está llena pero no hay fila siguiente: no se ofrece una página vacía
+    assert paginas == [ids[:2], ids[2:]]
+    assert cursores[0] is not None and cursores[1] is None
+
+
+def test_ultima_pagina_incompleta(cliente):
+    ids = crear_productos(cliente, 5)
+    paginas, cursores = _recorrer(cliente, "/inventario-productos/", 2)
+    assert paginas == [ids[:2], ids[2:4], ids[4:]]
+    assert [c is None for c in cursores] == [False, False, True]
+
+
+def test_limite_igual_al_total_no_da_cursor(cliente):
+    ids = crear_productos(cliente, 3)
+    cuerpo = cliente.get("/inventario-productos/", params={"limit": 3}).json()
+    assert [item["id"] for item in cuerpo["items"]] == ids
+    assert cuerpo["next_cursor"] is None
+
+
+def test_entregas_paginadas(cliente):
+    repartidor = cliente.post("/repartidores/", json={"nombre": "Ana", "telefono": "600000000", "zona": "norte"}).json()
+    ids = [cliente.post("/entregas/", json={"repartidor_id": repartidor["id"], "fecha": INICIO.isoformat()}).json()["id"]
+           for _ in range(3)]
+    paginas, _ = _recorrer(cliente, "/entregas/", 2)
+    assert paginas == [ids[:2], ids[2:]]
+    assert cliente.get("/entregas/", params={"limit": 501}).status_code == 422
+
+
+def test_cursor_invalido(cliente):
+    respuesta = cliente.get("/inventario-productos/", params={"cursor": "no-es-un-cursor"})
+    assert respuesta.status_code == 400
+    assert respuesta.json() == {"detail": "Cursor inválido"}
+
+
+def test_cursor_compuesto_conserva_tipos():
+    columnas = [ReporteEntregasDiarias.dia, ReporteEntregasDiarias.repartidor_id]
+    filas = [{"dia": (INICIO + timedelta(days=i)).date(), "repartidor_id": i} for i in range(3)]
+    resultado = pagina(filas, 2, [columna.key for columna in columnas])
+    assert resultado["items"] == filas[:2]
+    assert decodificar_cursor(resultado["next_cursor"], columnas) == [filas[1]["dia"], 1]
+    assert resultado["next_cursor"] == codificar_cursor([filas[1]["dia"], 1])
@@ -0,0 +1,51 @@
+"""Pool de conexiones: tamaño configurable y métricas de /health/pool"""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+import config
+import database
+from metricas import MetricasPool
+
+
+@pytest.fixture
+def motor_pequeno(monkeypatch):
+    """Un motor sobre la base de pruebas con una sola conexión, sin overflow y 0.1 s de espera"""
+    monkeypatch.setattr(config, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(config, "DB_MAX_OVERFLOW", 0)
+    monkeypatch.setattr(config, "DB_POOL_TIMEOUT", 0.1)
+    metricas = MetricasPool()
+    url = database.DATABASE_URL
+    motor = create_engine(url, **database._opciones_motor(url, QueuePool, metricas))
+    database._instrumentar(motor, metricas)
+    database.METRICAS_POOL["prueba"] = metricas
+    yield motor
+    del database.METRICAS_POOL["prueba"]
+    motor.dispose()
+
+
+def test_pool_saturado_cuenta_esperas_y_timeouts(motor_pequeno):
+    with motor_pequeno.connect() as conexion:
+        conexion.execute(text("SELECT 1"))
+        with pytest.raises(PoolTimeoutError):
+            motor_pequeno.connect()
+        estado = database.estado_pool(motor_pequeno, "prueba")
+        assert (estado["size"], estado["max_overflow"], estado["checked_out"]) == (1, 0, 1)
+
+    estado = database.estado_pool(motor_pequeno, "prueba")
+    assert estado["checked_out"] == 0
+    assert (estado["checkouts"], estado["esperas"], estado["timeouts"]) == (2, 1, 1)
+    assert (estado["conexiones_creadas"], estado["consultas"]) == (1, 1)
+    assert estado["tiempo_espera_segundos"]["count"] == 2
+    assert estado["tiempo_espera_segundos"]["sum"] >= 0.1
+
+
+def test_health_pool_refleja_las_consultas(cliente):
+    antes = cliente.get("/health/pool").json()["sync"]
+    cliente.get("/inventario-productos/")
+    despues = cliente.get("/health/pool").json()["sync"]
+    assert despues["pool"].startswith("QueuePool")
+    assert despues["size"] == config.DB_POOL_SIZE
+    assert despues["checkouts"] > antes["checkouts"]
+    assert despues["consultas"] > antes["consultas"]
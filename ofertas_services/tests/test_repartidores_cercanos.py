@@ -0,0 +1,85 @@
+"""Repartidores más cercanos: índice en rejilla reconstruido fuera de las peticiones y consulta a la base mientras tanto"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from apoyo import crear_entrega, crear_repartidor
+from crud import posicion_repartidor
+from crud.posicion_repartidor import get_repartidores_cercanos, reconstruir_indice_repartidores
+from indice_repartidores import IndiceRepartidores
+from models.posicion_repartidor import PosicionRepartidor
+from models.repartidor import Repartidor
+
+AHORA = datetime.now().replace(microsecond=0)
+
+
+def _ids(candidatos):
+    return [c["repartidor_id"] for c in candidatos]
+
+
+def _fila(repartidor_id, latitud, zona="Centro"):
+    return {"repartidor_id": repartidor_id, "latitud": latitud, "longitud": -3.7, "actualizado_en": AHORA, "zona": zona}
+
+
+def test_reconstruir_reaplica_los_cambios_recibidos_durante_la_lectura():
+    indice = IndiceRepartidores(vigencia=timedelta(minutes=5))
+    indice.iniciar_reconstruccion()
+    # Llegan mientras se lee la base: la lectura no los incluye
+    indice.registrar({1: {"zona": "Centro"}, 2: None})
+    indice.actualizar(1, 40.0, -3.7, AHORA)
+    indice.tomar_sucios()  # el volcado la guarda antes del reemplazo: ya no está entre las sucias
+    indice.reconstruir([_fila(2, 40.001), _fila(3, 40.002)])
+    assert _ids(indice.cercanos(40.0, -3.7, 5, 10)) == [1, 3]
+
+
+@pytest.fixture
+def indice_nuevo(monkeypatch):
+    """Un índice aún sin construir, como recién arrancado el worker"""
+    indice = IndiceRepartidores(vigencia=timedelta(minutes=5))
+    monkeypatch.setattr(posicion_repartidor, "indice", indice)
+    return indice
+
+
+def test_sin_indice_busca_en_la_base_sin_reconstruirlo(db, indice_nuevo):
+    db.add_all([Repartidor(id=i, nombre=f"r{i}", telefono="600111222", zona=zona)
+                for i, zona in ((1, "Centro"), (2, "Centro"), (3, "Norte"), (4, "Centro"), (5, "Centro"))])
+    db.add(Repartidor(id=6, nombre="r6", telefono="600111222", zona="Centro", archivado_en=AHORA))
+    db.commit()
+    db.add_all([
+        PosicionRepartidor(repartidor_id=1, latitud=40.02, longitud=-3.7, actualizado_en=AHORA),
+        PosicionRepartidor(repartidor_id=2, latitud=40.01, longitud=-3.7, actualizado_en=AHORA),
+        PosicionRepartidor(repartidor_id=3, latitud=40.0, longitud=-3.7, actualizado_en=AHORA),
+        PosicionRepartidor(repartidor_id=4, latitud=40.0, longitud=-3.7, actualizado_en=AHORA - timedelta(hours=1)),
+        PosicionRepartidor(repartidor_id=5, latitud=41.0, longitud=-3.7, actualizado_en=AHORA),  # a ~111 km
+        PosicionRepartidor(repartidor_id=6, latitud=40.0, longitud=-3.7, actualizado_en=AHORA),
+    ])
+    db.commit()
+
+    desde_base = get_repartidores_cercanos(db, 40.0, -3.7, k=5, radio_km=20)
+    assert _ids(desde_base) == [3, 2, 1]
+    assert _ids(get_repartidores_cercanos(db, 40.0, -3.7, k=5, zona="Centro")) == [2, 1]
+    assert not indice_nuevo.listo()
+
+    reconstruir_indice_repartidores(db)
+    assert indice_nuevo.listo()
+    assert get_repartidores_cercanos(db, 40.0, -3.7, k=5, radio_km=20) == desde_base
+
+
+def test_asignar_la_entrega_al_mas_cercano(cliente, db):
+    reconstruir_indice_repartidores(db)
+    lejos, cerca, cargado = (crear_repartidor(cliente, nombre) for nombre in ("Ana", "Luis", "Eva"))
+    respuesta = cliente.put("/repartidores/posiciones", json=[
+        {"repartidor_id": lejos, "latitud": 40.05, "longitud": -3.7},
+        {"repartidor_id": cerca, "latitud": 40.01, "longitud": -3.7},
+        {"repartidor_id": cargado, "latitud": 40.0, "longitud": -3.7},
+        {"repartidor_id": 999999, "latitud": 40.0, "longitud": -3.7},
+    ])
+    assert respuesta.json()["updated_count"] == 3
+    crear_entrega(cliente, cargado, fecha=datetime.now() + timedelta(hours=1))
+    # Se reasigna: mientras tanto cuenta en la carga de quien la tiene (dos entregas pendientes)
+    entrega_id = crear_entrega(cliente, cargado, 40.0, -3.7, fecha=datetime.now() + timedelta(hours=2))
+
+    respuesta = cliente.post("/entregas/asignar", json={"entrega_id": entrega_id, "carga_max": 1}).json()
+    assert _ids(respuesta["candidatos"]) == [cerca, lejos]
+    assert respuesta["candidatos"][0]["distancia_km"] == pytest.approx(1.112, abs=0.001)
+    assert respuesta["entrega"]["repartidor_id"] == cerca
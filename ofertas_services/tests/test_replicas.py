@@ -0,0 +1,51 @@
+"""Lectura de las propias escrituras: cookie tras escribir y lectura desde la primaria"""
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+import replicas
+
+
+@pytest.fixture
+def app_lectura_propia(monkeypatch):
+    """App mínima con MiddlewareLecturaPropia (la del servicio solo lo monta con DB_REPLICAS)"""
+    monkeypatch.setattr(replicas.config, "DB_REPLICAS_RETRASO", 30)
+    app = FastAPI()
+
+    @app.get("/leer")
+    def leer(request: Request):
+        return {"primaria": replicas.lee_sus_escrituras(request)}
+
+    @app.post("/escribir/{estado}")
+    def escribir(estado: int):
+        return JSONResponse({}, status_code=estado) if estado != 200 else {}
+
+    app.add_middleware(replicas.MiddlewareLecturaPropia)
+    return app
+
+
+def test_cookie_tras_escribir(app_lectura_propia):
+    with TestClient(app_lectura_propia) as cliente:
+        assert cliente.get("/leer").json() == {"primaria": False}
+        assert "set-cookie" not in cliente.get("/leer").headers
+
+        respuesta = cliente.post("/escribir/200")
+        cookie = respuesta.headers["set-cookie"]
+        assert cookie.startswith(f"{replicas.COOKIE_PRIMARIA}=") and "Max-Age=30" in cookie
+        assert cliente.get("/leer").json() == {"primaria": True}
+
+
+def test_escritura_fallida_no_deja_cookie(app_lectura_propia):
+    with TestClient(app_lectura_propia) as cliente:
+        assert "set-cookie" not in cliente.post("/escribir/422").headers
+        assert cliente.get("/leer").json() == {"primaria": False}
+
+
+def test_cookie_vencida_o_ilegible_lee_de_replica(app_lectura_propia):
+    with TestClient(app_lectura_propia) as cliente:
+        for valor in (f"{datetime.now().timestamp() - 1:.3f}", "basura"):
+            cliente.cookies.set(replicas.COOKIE_PRIMARIA, valor)
+            assert cliente.get("/leer").json() == {"primaria": False}
@@ -0,0 +1,83 @@
+"""Reportes: las tablas de rollup las mantienen los triggers con cada escritura"""
+from datetime import timedelta
+
+from apoyo import INICIO, crear_entrega, crear_oferta, crear_productos, crear_repartidor
+
+DIA = INICIO.date()
+RANGO = {"desde": DIA.isoformat(), "hasta": (DIA + timedelta(days=1)).isoformat()}
+
+
+def _entregas_diarias(cliente, **params):
+    respuesta = cliente.get("/reportes/entregas-diarias", params={**RANGO, **params})
+    assert respuesta.status_code == 200
+    return [(fila["dia"], fila["repartidor_id"], fila["entregas"]) for fila in respuesta.json()["items"]]
+
+
+def test_entregas_diarias(cliente):
+    ana, luis = crear_repartidor(cliente, "Ana"), crear_repartidor(cliente, "Luis")
+    manana = INICIO + timedelta(days=1)
+    primera, _, de_luis, _ = (crear_entrega(cliente, ana), crear_entrega(cliente, ana),
+                              crear_entrega(cliente, luis), crear_entrega(cliente, ana, fecha=manana))
+    dia, siguiente = DIA.isoformat(), manana.date().isoformat()
+    assert _entregas_diarias(cliente) == [(dia, ana, 2), (dia, luis, 1), (siguiente, ana, 1)]
+
+    # Un UPDATE resta la fila vieja y suma la nueva; un DELETE (en lote o en cascada) la resta
+    assert cliente.patch(f"/entregas/{primera}", json={"repartidor_id": luis, "fecha": manana.isoformat()}).status_code == 200
+    assert cliente.request("DELETE", "/entregas/bulk", json={"ids": [de_luis]}).json()["deleted_count"] == 1
+    assert _entregas_diarias(cliente) == [(dia, ana, 1), (siguiente, ana, 1), (siguiente, luis, 1)]
+    assert _entregas_diarias(cliente, repartidor_id=luis) == [(siguiente, luis, 1)]
+
+    cliente.delete(f"/repartidores/{ana}")
+    assert _entregas_diarias(cliente) == [(siguiente, luis, 1)]
+
+
+def test_rutas_por_zona(cliente):
+    centro, norte = crear_repartidor(cliente, "Ana"), crear_repartidor(cliente, "Luis", zona="Norte")
+
+    def ruta(repartidor_id, minutos=None):
+        llegada = (INICIO + timedelta(minutes=minutos)).isoformat() if minutos is not None else None
+        respuesta = cliente.post("/rutas-entrega/", json={"repartidor_id": repartidor_id, "destino": "Calle Mayor 1",
+                                                         "hora_salida": INICIO.isoformat(), "hora_llegada": llegada})
+        assert respuesta.status_code == 200
+        return respuesta.json()["id"]
+
+    ruta(centro, 30)
+    ruta(centro, 60)
+    en_curso = ruta(norte)
+    assert cliente.get("/reportes/rutas-por-zona", params=RANGO).json() == [
+        {"zona": "Centro", "rutas": 2, "minutos_promedio": 45.0}]
+
+    # Al terminar la ruta (UPDATE con hora de llegada) empieza a contar
+    cliente.patch(f"/rutas-entrega/{en_curso}", json={"hora_llegada": (INICIO + timedelta(minutes=20)).isoformat()})
+    ruta(norte, 40)
+    ruta(norte, 60)
+    assert cliente.get("/reportes/rutas-por-zona", params=RANGO).json() == [
+        {"zona": "Norte", "rutas": 3, "minutos_promedio": 40.0},
+        {"zona": "Centro", "rutas": 2, "minutos_promedio": 45.0},
+    ]
+    # La zona es la actual del repartidor
+    cliente.patch(f"/repartidores/{centro}", json={"zona": "Norte"})
+    assert cliente.get("/reportes/rutas-por-zona", params=RANGO).json() == [
+        {"zona": "Norte", "rutas": 5, "minutos_promedio": 42.0}]
+
+
+def test_ofertas_por_producto(cliente):
+    pan, leche, sin_ofertas = crear_productos(cliente, 3)
+    ofertas_pan = [crear_oferta(cliente, pan, precio_oferta=precio) for precio in (1.0, 2.0, 3.0)]
+    crear_oferta(cliente, leche, precio_oferta=0.5)
+
+    def top():
+        return [(fila["producto_id"], fila["ofertas"], fila["precio_promedio"])
+                for fila in cliente.get("/reportes/ofertas-por-producto/top").json()]
+
+    assert top() == [(pan, 3, 2.0), (leche, 1, 0.5)]
+    cliente.patch(f"/ofertas-reducidas/{ofertas_pan[0]}", json={"precio_oferta": 4.0})
+    cliente.delete(f"/ofertas-reducidas/{ofertas_pan[1]}")
+    assert top() == [(pan, 2, 3.5), (leche, 1, 0.5)]
+
+    # Borrar el producto borra sus ofertas en cascada; archivarlo lo saca del reporte
+    cliente.delete(f"/inventario-productos/{pan}")
+    assert top() == [(leche, 1, 0.5)]
+    cliente.delete(f"/inventario-productos/{leche}", params={"archivar": True})
+    assert top() == []
+    assert cliente.get("/reportes/ofertas-por-producto").json() == {"items": [], "next_cursor": None}
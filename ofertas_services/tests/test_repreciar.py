@@ -0,0 +1,105 @@
+"""Motor de descuentos: conteos del diff y filas publicadas de repreciar_ofertas"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+
+import crud.oferta_reducida as crud_ofertas
+from cambios import CREAR, ACTUALIZAR
+from models.inventario_producto import InventarioProducto
+from models.oferta_reducida import OfertaReducida
+from schemas import RepreciarRequest
+
+# Curva lineal de 100 h: el descuento es 0.1 + 0.4 * (horas desde el ingreso / 100)
+PARAMETROS = {"curva": "lineal", "vida_util_horas": 100, "descuento_min": 0.1, "descuento_max": 0.5}
+
+
+@pytest.fixture
+def inventario(db):
+    """Un producto por caso del diff; devuelve {caso: id} y el id de cada oferta previa"""
+    ahora = datetime.now().replace(microsecond=0)
+    productos = {
+        "sin_oferta": (10.0, 50, "Disponible", None),      # 0.3 de descuento -> crear a 7.00
+        "oferta_vieja": (20.0, 10, "Disponible", None),    # 0.14 -> actualizar a 17.20
+        "oferta_al_dia": (10.0, 20, "Disponible", None),   # 0.18 -> 8.20, ya tiene esa oferta
+        "caducado": (10.0, 200, "Disponible", None),       # vida útil superada: sin oferta
+        "vendido": (10.0, 50, "Vendido", None),            # no disponible: no se considera
+        "archivado": (10.0, 50, "Disponible", ahora),      # archivado: no existe para la API
+    }
+    ids, ingresos = {}, {}
+    for caso, (precio, horas, estado, archivado_en) in productos.items():
+        ingresos[caso] = ahora - timedelta(hours=horas)
+        ids[caso] = db.scalar(insert(InventarioProducto).values(
+            nombre=caso, cantidad=1, precio_unitario=precio, fecha_ingreso=ingresos[caso], estado=estado,
+            archivado_en=archivado_en,
+        ).returning(InventarioProducto.id))
+    ofertas = {
+        caso: db.scalar(insert(OfertaReducida).values(
+            producto_id=ids[caso], precio_oferta=precio, fecha_inicio=ahora - timedelta(hours=1),
+            fecha_fin=ingresos[caso] + timedelta(hours=100),
+        ).returning(OfertaReducida.id))
+        for caso, precio in (("oferta_vieja", 1.0), ("oferta_al_dia", 8.2))
+    }
+    db.commit()
+    return ids, ofertas, ingresos
+
+
+@pytest.fixture
+def publicadas(monkeypatch):
+    """Cambios que publica el motor: [(tabla, acción, filas)]"""
+    registro = []
+    monkeypatch.setattr(crud_ofertas, "publicar", lambda tabla, accion, filas: registro.append((tabla, accion, filas)))
+    return registro
+
+
+def test_repreciar_crea_actualiza_y_publica(db, inventario, publicadas):
+    ids, ofertas, ingresos = inventario
+
+    resultado = crud_ofertas.repreciar_ofertas(db, RepreciarRequest(**PARAMETROS))
+
+    assert {clave: resultado[clave] for clave in ("productos", "caducados", "creadas", "actualizadas", "sin_cambios")} == {
+        "productos": 4, "caducados": 1, "creadas": 1, "actualizadas": 1, "sin_cambios": 1,
+    }
+    guardadas = {oferta.producto_id: oferta for oferta in db.scalars(select(OfertaReducida))}
+    assert set(guardadas) == {ids["sin_oferta"], ids["oferta_vieja"], ids["oferta_al_dia"]}
+
+    nueva = guardadas[ids["sin_oferta"]]
+    assert nueva.precio_oferta == pytest.approx(7.0)
+    assert nueva.fecha_fin == ingresos["sin_oferta"] + timedelta(hours=100)
+    actualizada = guardadas[ids["oferta_vieja"]]
+    assert actualizada.id == ofertas["oferta_vieja"]
+    assert actualizada.precio_oferta == pytest.approx(17.2)
+
+    por_accion = {accion: filas for tabla, accion, filas in publicadas if tabla == "oferta_reducida"}
+    assert set(por_accion) == {CREAR, ACTUALIZAR}
+    [creada] = por_accion[CREAR]
+    assert creada["id"] == nueva.id
+    assert creada["producto_id"] == ids["sin_oferta"]
+    assert creada["precio_oferta"] == pytest.approx(7.0)
+    assert creada["fecha_inicio"] == nueva.fecha_inicio
+    assert creada["fecha_fin"] == nueva.fecha_fin
+    [cambiada] = por_accion[ACTUALIZAR]
+    assert cambiada["id"] == ofertas["oferta_vieja"]
+    assert cambiada["precio_oferta"] == pytest.approx(17.2)
+    # La fecha de inicio de una oferta actualizada no cambia
+    assert cambiada["fecha_inicio"] == actualizada.fecha_inicio
+
+
+def test_simular_no_escribe_ni_publica(db, inventario, publicadas):
+    resultado = crud_ofertas.repreciar_ofertas(db, RepreciarRequest(**PARAMETROS, simular=True))
+
+    assert (resultado["creadas"], resultado["actualizadas"], resultado["sin_cambios"]) == (1, 1, 1)
+    assert {cambio["accion"] for cambio in resultado["cambios"]} == {"crear", "actualizar"}
+    assert len(db.execute(select(OfertaReducida.id)).all()) == 2
+    assert publicadas == []
+
+
+def test_segunda_pasada_sin_cambios(db, inventario, publicadas):
+    crud_ofertas.repreciar_ofertas(db, RepreciarRequest(**PARAMETROS))
+    publicadas.clear()
+
+    resultado = crud_ofertas.repreciar_ofertas(db, RepreciarRequest(**PARAMETROS))
+
+    # Las ofertas dependen de la hora: en segundos no cambian más de medio céntimo
+    assert (resultado["creadas"], resultado["actualizadas"], resultado["sin_cambios"]) == (0, 0, 3)
+    assert publicadas == []
@@ -0,0 +1,54 @@
+"""Serialización de los listados: dicts de columnas codificados directamente, con el contrato de los esquemas"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+import serializacion
+from apoyo import crear_oferta, crear_productos
+from models.inventario_producto import InventarioProducto
+from models.oferta_reducida import OfertaReducida
+from schemas import InventarioProductoConOfertas, OfertaReducidaOut, Pagina
+
+
+@pytest.mark.parametrize("con_orjson", [True, False])
+def test_dumps_con_y_sin_orjson(monkeypatch, con_orjson):
+    if not con_orjson:
+        monkeypatch.setattr(serializacion, "orjson", None)
+    elif serializacion.orjson is None:
+        pytest.skip("orjson no está instalado")
+    contenido = {"fecha": datetime(2026, 10, 1, 9, 30), "nombre": "Ñandú", "precio": 1.5, "ids": [1, None]}
+    assert serializacion.dumps(contenido) == '{"fecha":"2026-10-01T09:30:00","nombre":"Ñandú","precio":1.5,"ids":[1,null]}'.encode()
+
+
+@pytest.fixture
+def instancias_orm():
+    """Cuenta las instancias ORM que se cargan desde la base"""
+    cargadas = []
+
+    def contar(objeto, contexto):
+        cargadas.append(type(objeto).__name__)
+
+    for modelo in (InventarioProducto, OfertaReducida):
+        event.listen(modelo, "load", contar)
+    yield cargadas
+    for modelo in (InventarioProducto, OfertaReducida):
+        event.remove(modelo, "load", contar)
+
+
+@pytest.mark.parametrize("url, esquema", [
+    ("/inventario-productos/", Pagina[InventarioProductoConOfertas]),
+    ("/ofertas-reducidas/", Pagina[OfertaReducidaOut]),
+])
+def test_listado_sin_orm_y_con_el_contrato_del_esquema(cliente, instancias_orm, url, esquema):
+    for producto_id in crear_productos(cliente, 2):
+        crear_oferta(cliente, producto_id)
+    instancias_orm.clear()
+
+    respuesta = cliente.get(url)
+    assert respuesta.headers["content-type"] == "application/json"
+    assert instancias_orm == []
+    cuerpo = respuesta.json()
+    assert len(cuerpo["items"]) == 2
+    # Lo mismo que habría producido el response_model: ni campos de más (archivado_en) ni de menos
+    assert cuerpo == esquema.model_validate(cuerpo).model_dump(mode="json")